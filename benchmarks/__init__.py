@@ -0,0 +1,10 @@
+"""Performance benchmarks for vocabuilder. The benchmarks generate synthetic
+vocabularies of different sizes, and measure the time used to load, open (parse,
+backup and compaction), select the terms ready for practice, search, import and
+synchronize with firebase (a fake, in-memory firebase). Example:
+
+.. code-block:: bash
+
+   $ python -m benchmarks --sizes 10000 100000 --output baseline.json
+   $ python -m benchmarks --sizes 10000 100000 --baseline baseline.json
+"""
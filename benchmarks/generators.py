@@ -0,0 +1,139 @@
+"""Generators for synthetic vocabularies. The generated files have the same format
+as the files written by the app, such that the benchmarks exercise the same code
+paths as a real vocabulary of the same size."""
+
+from __future__ import annotations
+
+import itertools
+import random
+from pathlib import Path
+from typing import Iterator
+
+from vocabuilder.constants import TermStatus
+from vocabuilder.csv_helpers import CsvDatabaseHeader, CSVwrapper
+from vocabuilder.hlc import HybridLogicalClock
+from vocabuilder.type_aliases import DatabaseRow
+
+# NOTE: The alphabets used for the terms. Korean and Chinese terms are short and
+#   use many different characters, emojis are outside the Basic Multilingual Plane
+ALPHABETS = {
+    "latin": [chr(c) for c in range(ord("a"), ord("z") + 1)],
+    "cyrillic": [chr(c) for c in range(0x430, 0x450)],
+    "hangul": [chr(c) for c in range(0xAC00, 0xAC00 + 400)],
+    "cjk": [chr(c) for c in range(0x4E00, 0x4E00 + 400)],
+    "emoji": [chr(c) for c in range(0x1F600, 0x1F640)],
+}
+
+
+class VocabularySpec:
+    """The shape of a synthetic vocabulary.
+
+    :param terms: The number of (not deleted) terms
+    :param churn: The number of old versions of modified terms in the database file,
+      relative to ``terms``. The app appends a new row each time a term is modified,
+      and the old rows are removed the next time the database is opened
+    :param deleted: The number of deleted terms, relative to ``terms``
+    :param unicode_mix: The fraction of the terms that use a non-latin alphabet
+    :param due: The fraction of the terms that are ready for practice
+    :param seed: The seed for the random number generator
+    """
+
+    def __init__(
+        self,
+        terms: int,
+        churn: float = 0.2,
+        deleted: float = 0.05,
+        unicode_mix: float = 0.5,
+        due: float = 0.3,
+        seed: int = 1,
+    ) -> None:
+        self.terms = terms
+        self.churn = churn
+        self.deleted = deleted
+        self.unicode_mix = unicode_mix
+        self.due = due
+        self.seed = seed
+
+
+class VocabularyGenerator:
+    """Generate the rows of a synthetic vocabulary
+
+    :param spec: The shape of the vocabulary
+    """
+
+    now = 1700000000
+    day = 24 * 60 * 60
+
+    def __init__(self, spec: VocabularySpec) -> None:
+        self.spec = spec
+        self.header = CsvDatabaseHeader()
+        self.random = random.Random(spec.seed)
+
+    # public methods alfabetically sorted below
+    # ------------------------------------------
+
+    def pairs(self, count: int, prefix: str = "") -> Iterator[tuple[str, str]]:
+        """Unique term1 and a translation"""
+        for i in range(count):
+            yield f"{prefix}{self.word()}{i}", self.word()
+
+    def rows(self) -> Iterator[DatabaseRow]:
+        """The rows of the database file, in the order they would have been
+        appended by the app: the old versions of the modified terms and the deleted
+        terms are mixed with the current versions"""
+        spec = self.spec
+        num_deleted = int(spec.terms * spec.deleted)
+        num_old = int(spec.terms * spec.churn)
+        for i, (term1, term2) in enumerate(self.pairs(spec.terms + num_deleted)):
+            deleted = i >= spec.terms
+            if deleted or (i < num_old):
+                # NOTE: an old version, written before the current version below
+                yield self.row(term1, self.word(), TermStatus.NOT_DELETED)
+            status = TermStatus.DELETED if deleted else TermStatus.NOT_DELETED
+            yield self.row(term1, term2, status)
+
+    def row(self, term1: str, term2: str, status: int) -> DatabaseRow:
+        delay = self.random.randint(1, 60)
+        if self.random.random() < self.spec.due:
+            last_test = self.now - (delay + 1) * self.day
+        else:
+            last_test = self.now - self.random.randint(0, delay - 1) * self.day
+        return {
+            self.header.status: status,
+            self.header.term1: term1,
+            self.header.term2: term2,
+            self.header.test_delay: delay,
+            self.header.last_test: last_test,
+            self.header.last_modified: last_test,
+            self.header.version: HybridLogicalClock.from_seconds(last_test, "0"),
+        }
+
+    def word(self) -> str:
+        if self.random.random() < self.spec.unicode_mix:
+            name = self.random.choice(["cyrillic", "hangul", "cjk", "emoji"])
+        else:
+            name = "latin"
+        length = self.random.randint(2, 6 if name in ("hangul", "cjk") else 12)
+        return "".join(self.random.choices(ALPHABETS[name], k=length))
+
+    def write_database(self, path: Path) -> int:
+        """Write the database file. Returns the number of rows"""
+        csvwrapper = CSVwrapper(path)
+        count = 0
+        with csvwrapper.open_for_write() as fp:
+            fp.writerow(csvwrapper.header_row())
+            for row in self.rows():
+                fp.writeline(row)
+                count += 1
+        return count
+
+    def write_import_file(self, path: Path, count: int) -> None:
+        """Write a tab separated file with ``count`` new terms, and ``count // 10``
+        terms that already exist in the vocabulary"""
+        # NOTE: A new generator with the same seed produces the same rows
+        existing = itertools.islice(VocabularyGenerator(self.spec).rows(), count // 10)
+        with open(path, "w", encoding="utf_8") as fp:
+            for term1, term2 in self.pairs(count, prefix="new-"):
+                fp.write(f"{term1}\t{term2}\n")
+            for row in existing:
+                fp.write(f"{row[self.header.term1]}\t{row[self.header.term2]}\n")
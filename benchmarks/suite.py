@@ -0,0 +1,323 @@
+"""Run the benchmarks, save the results as JSON, and compare them with a saved
+baseline. See ``python -m benchmarks --help``."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import typing
+import unittest.mock
+from pathlib import Path
+from typing import Any, Callable
+
+from benchmarks.generators import VocabularyGenerator, VocabularySpec
+from vocabuilder.config import Config
+from vocabuilder.database import Database
+from vocabuilder.hlc import HybridLogicalClock, Version
+from vocabuilder.importer import BulkImporter
+from vocabuilder.local_database import LocalDatabase
+from vocabuilder.profiling import profiler
+from vocabuilder.type_aliases import DatabaseRow, DatabaseType
+
+Results = dict[str, dict[str, Any]]
+
+# NOTE: The startup phases reported separately for the "open" benchmark, see
+#   vocabuilder.profiling
+OPEN_PHASES = ["database.parse", "database.backup", "database.compaction"]
+
+
+class FakeFirebase:
+    """An in-memory replacement for ``FirebaseDatabase`` with the methods used to
+    synchronize the local database. 10% of the terms are missing, 10% of the terms
+    have a newer version, and 10% have an older version than the local database"""
+
+    def __init__(self, items: DatabaseType, version: str) -> None:
+        self.items: DatabaseType = {}
+        for i, (key, value) in enumerate(items.items()):
+            if i % 10 == 0:
+                continue  # NOTE: pushed to firebase by the sync
+            value = value.copy()
+            if i % 10 in (1, 2):
+                delta = 1 if i % 10 == 1 else -1
+                physical, counter, node = HybridLogicalClock.decode(
+                    typing.cast(str, value[version])
+                )
+                value[version] = HybridLogicalClock.encode(
+                    physical + delta, counter, node
+                )
+            self.items[key] = value
+
+    def collect_garbage(self, horizon: int) -> int:
+        return 0
+
+    def get_items(self) -> DatabaseType:
+        return self.items
+
+    def get_tombstones(self) -> dict[str, Version]:
+        return {}
+
+    def push_item(self, key: str, value: DatabaseRow) -> None:
+        self.items[key] = value
+
+    def update_item_same_key(self, key: str, value: DatabaseRow) -> None:
+        self.items[key] = value
+
+
+class BenchmarkSuite:
+    """Benchmarks for the operations that depend on the size of the vocabulary.
+    The vocabularies are generated in a temporary directory, which is also used
+    as the config and data directory of the app.
+
+    :param specs: The vocabularies to benchmark
+    :param repeat: The number of times each benchmark is run. The fastest run is
+      reported, since the slower runs are slowed down by other processes
+    :param log: Called with a progress message
+    :param workers: Also load the vocabularies with each of these numbers of
+      worker processes, see ``vocabuilder.parallel_loader``. The files are
+      parsed in parallel regardless of their size
+    """
+
+    voca_name = "benchmark"
+
+    def __init__(
+        self,
+        specs: list[VocabularySpec],
+        repeat: int = 3,
+        log: Callable[[str], None] = print,
+        workers: list[int] | None = None,
+    ) -> None:
+        self.specs = specs
+        self.repeat = repeat
+        self.log = log
+        self.workers = [] if workers is None else workers
+        self.runs: dict[str, list[float]] = {}
+
+    # public methods alfabetically sorted below
+    # ------------------------------------------
+
+    def run(self) -> Results:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            workdir = Path(tmpdir)
+            # NOTE: The app finds the config and data directories with
+            #   platformdirs, which uses these variables on Linux
+            environ = {
+                "HOME": str(workdir),
+                "XDG_CONFIG_HOME": str(workdir / "config"),
+                "XDG_DATA_HOME": str(workdir / "data"),
+            }
+            with unittest.mock.patch.dict(os.environ, environ):
+                config = Config()
+                for spec in self.specs:
+                    self._run_spec(config, spec, workdir)
+        return {
+            name: {"seconds": min(runs), "runs": runs}
+            for name, runs in self.runs.items()
+        }
+
+    def _record(self, name: str, seconds: float) -> None:
+        self.runs.setdefault(name, []).append(seconds)
+
+    def _run_once(self, config: Config, spec: VocabularySpec, workdir: Path) -> None:
+        size = spec.terms
+        datadir = config.get_data_dir() / LocalDatabase.database_dir / self.voca_name
+        if datadir.exists():
+            shutil.rmtree(datadir)
+        datadir.mkdir(parents=True)
+        shutil.copy(workdir / f"{size}.csv", datadir / LocalDatabase.database_fn)
+        self._time(f"load/{size}", lambda: self._load(config).close())
+        for workers in self.workers:
+            self._time(
+                f"load.{workers}workers/{size}",
+                lambda n=workers: self._load(config, n).close(),  # type: ignore
+            )
+        self._startup(config, size)
+        before = {name: profiler.timings.get(name, (0, 0.0))[1] for name in OPEN_PHASES}
+        ldb = self._time(f"open/{size}", lambda: LocalDatabase(config, self.voca_name))
+        for name in OPEN_PHASES:
+            seconds = profiler.timings[name][1] - before[name]
+            self._record(f"open.{name.split('.')[1]}/{size}", seconds)
+        self._time(f"due/{size}", ldb.get_pairs_exceeding_test_delay)
+        self._time(f"search/{size}", lambda: self._search(ldb))
+        self._time(f"sync/{size}", lambda: self._sync(config, ldb))
+        importer = BulkImporter(ldb)
+        self._time(
+            f"import/{size}", lambda: importer.import_file(workdir / f"{size}.tsv")
+        )
+        ldb.close()
+
+    def _run_spec(self, config: Config, spec: VocabularySpec, workdir: Path) -> None:
+        generator = VocabularyGenerator(spec)
+        rows = generator.write_database(workdir / f"{spec.terms}.csv")
+        generator.write_import_file(workdir / f"{spec.terms}.tsv", spec.terms // 10)
+        self.log(f"Generated {spec.terms} terms ({rows} rows)")
+        for _ in range(self.repeat):
+            self._run_once(config, spec, workdir)
+        self.log(f"Finished {spec.terms} terms")
+
+    def _load(self, config: Config, workers: int | None = None) -> LocalDatabase:
+        section = config.get_section("Loader")
+        saved = dict(section)
+        if workers is not None:
+            section["Workers"] = str(workers)
+            section["ParallelMinSize"] = "0"
+        try:
+            return LocalDatabase(config, self.voca_name, read_only=True)
+        finally:
+            section.update(saved)
+
+    def _search(self, ldb: LocalDatabase) -> None:
+        # NOTE: PyQt6 is only needed for this benchmark
+        from PyQt6.QtWidgets import QApplication
+
+        from vocabuilder.view_window import MatchTerm, ViewScrollArea
+
+        _app = QApplication.instance() or QApplication(["benchmark"])  # noqa: F841
+        terms = ldb.get_term1_list()
+        translations = [ldb.get_term2(term1) for term1 in terms]
+        area = ViewScrollArea(terms, translations, print, print, "12px")
+        for text in ("a", "ab", "к", "가"):
+            area.filter_items(text, MatchTerm.TERM1)
+            area.filter_items(text, MatchTerm.TERM2)
+
+    def _startup(self, config: Config, size: int) -> None:
+        """The time from opening the database until the main window has been
+        painted, and until the database has been loaded by ``DatabaseLoader``, as
+        done by ``vocabuilder.main()``"""
+        # NOTE: PyQt6 is only needed for this benchmark
+        from PyQt6.QtCore import QEvent, QEventLoop, QObject
+        from PyQt6.QtWidgets import QApplication
+
+        from vocabuilder.main_window import MainWindow
+
+        app = QApplication.instance() or QApplication(["benchmark"])
+        painted: list[float] = []
+
+        class PaintFilter(QObject):
+            def eventFilter(self, obj: QObject | None, event: QEvent | None) -> bool:
+                if (event is not None) and (event.type() == QEvent.Type.Paint):
+                    painted.append(time.perf_counter())
+                return False
+
+        paint_filter = PaintFilter()
+        start = time.perf_counter()
+        db = Database(config, self.voca_name, update_active=False, defer_load=True)
+        window = MainWindow(typing.cast(QApplication, app), db, config)
+        window.installEventFilter(paint_filter)
+        window.show()
+        while not painted:
+            app.processEvents()
+        self._record(f"startup.paint/{size}", painted[0] - start)
+        while window.loader is not None:
+            app.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+        self._record(f"startup.loaded/{size}", time.perf_counter() - start)
+        window.removeEventFilter(paint_filter)
+        window.quit()
+        window.deleteLater()
+
+    def _sync(self, config: Config, ldb: LocalDatabase) -> None:
+        database = Database(config, self.voca_name, local_database=ldb)
+        fake = FakeFirebase(ldb.get_items(), ldb.header.version)
+        database.firebase_database = fake  # type: ignore
+        database.push_updated_items_to_firebase()
+        database.push_updated_items_to_local_database()
+
+    def _time(self, name: str, func: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        result = func()
+        self._record(name, time.perf_counter() - start)
+        return result
+
+
+def compare(results: Results, baseline: Results, threshold: float) -> list[str]:
+    """Compare the results with a baseline. Returns a line for each benchmark,
+    lines for regressions (slower than the baseline by more than ``threshold``,
+    e.g. 0.2 for 20%) end with ``REGRESSION``"""
+    lines = []
+    for name in sorted(results):
+        seconds = results[name]["seconds"]
+        if name not in baseline:
+            lines.append(f"{name:<28} {seconds:>10.4f}s  (no baseline)")
+            continue
+        base = baseline[name]["seconds"]
+        ratio = seconds / base if base > 0 else 1.0
+        line = f"{name:<28} {seconds:>10.4f}s  {base:>10.4f}s  {ratio:>6.2f}x"
+        if ratio > 1 + threshold:
+            line += "  REGRESSION"
+        lines.append(line)
+    return lines
+
+
+def parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark vocabuilder with synthetic vocabularies",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10000, 100000],
+        help="Number of terms in the vocabularies (default: 10000 100000)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="*",
+        default=[1, 2, 4],
+        help="Worker processes for the parallel load benchmark (default: 1 2 4)",
+    )
+    parser.add_argument("--churn", type=float, default=0.2)
+    parser.add_argument("--deleted", type=float, default=0.05)
+    parser.add_argument("--unicode-mix", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Save the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with results saved by --output")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Flag benchmarks slower than the baseline by this fraction",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Returns 1 if a regression is found, otherwise 0"""
+    args = parse_args(argv)
+    specs = [
+        VocabularySpec(
+            size,
+            churn=args.churn,
+            deleted=args.deleted,
+            unicode_mix=args.unicode_mix,
+            seed=args.seed,
+        )
+        for size in args.sizes
+    ]
+
+    def log(msg: str) -> None:
+        print(msg, file=sys.stderr)
+
+    results = BenchmarkSuite(specs, args.repeat, log, args.workers).run()
+    if args.output is not None:
+        data = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.time(),
+            "results": results,
+        }
+        Path(args.output).write_text(json.dumps(data, indent=2), encoding="utf_8")
+    baseline: Results = {}
+    if args.baseline is not None:
+        text = Path(args.baseline).read_text(encoding="utf_8")
+        baseline = json.loads(text)["results"]
+    lines = compare(results, baseline, args.threshold)
+    print("\n".join(lines))
+    return 1 if any(line.endswith("REGRESSION") for line in lines) else 0
@@ -3,7 +3,7 @@ from __future__ import annotations
 # import logging
 import typing
 
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QCloseEvent, QIntValidator, QKeyEvent
 from PyQt6.QtWidgets import (
     QGridLayout,
@@ -17,6 +17,7 @@ from PyQt6.QtWidgets import (
 from vocabuilder.config import Config
 from vocabuilder.csv_helpers import CsvDatabaseHeader
 from vocabuilder.database import Database
+from vocabuilder.events import DatabaseEvent, DatabaseEventType
 from vocabuilder.mixins import ResizeWindowMixin, StringMixin, TimeMixin, WarningsMixin
 from vocabuilder.type_aliases import DatabaseRow
 from vocabuilder.widgets import QSelectItemScrollArea
@@ -27,6 +28,9 @@ class AddWindow(QWidget, ResizeWindowMixin, StringMixin, TimeMixin, WarningsMixi
     Continue the above procedure of adding terms until the user clicks the cancel button
     """
 
+    # NOTE: see the comment for ViewWindow.database_changed
+    database_changed = pyqtSignal(object)
+
     def __init__(self, parent: QWidget, config: Config, database: Database):
         super().__init__()
         # NOTE: using "parent_" to avoid confilict with "parent" method in QWidget
@@ -48,6 +52,9 @@ class AddWindow(QWidget, ResizeWindowMixin, StringMixin, TimeMixin, WarningsMixi
         vpos = self.add_line_edits(layout, vpos)
         self.add_buttons(layout, vpos)
         self.setLayout(layout)
+        self.database_changed.connect(self.update_scroll_area_from_event)
+        self.db_listener = self.database_changed.emit
+        self.db.add_listener(self.db_listener)
         self.show()
 
     def add_buttons(self, layout: QGridLayout, vpos: int) -> int:
@@ -104,11 +111,9 @@ class AddWindow(QWidget, ResizeWindowMixin, StringMixin, TimeMixin, WarningsMixi
             self.header.test_delay: delay,
             self.header.last_test: now,
         }
+        # NOTE: The scroll area (and the view window, if it is open) are updated
+        #   from the database event emitted by add_item()
         self.db.add_item(item)
-        items = self.get_db().get_term1_list()
-        # NOTE: update view window later when reaching the QT eventloop
-        self.maybe_update_view_window_later()
-        self.scrollarea.update_items_list(items)
         return True
 
     def add_line_edits(self, layout: QGridLayout, vpos: int) -> int:
@@ -156,6 +161,7 @@ class AddWindow(QWidget, ResizeWindowMixin, StringMixin, TimeMixin, WarningsMixi
         parent when we are closed"""
         if event is not None:
             event.accept()
+            self.db.remove_listener(self.db_listener)
             self.parent_.add_window_closed()  # type: ignore
 
     def get_db(self) -> Database:
@@ -165,14 +171,6 @@ class AddWindow(QWidget, ResizeWindowMixin, StringMixin, TimeMixin, WarningsMixi
         if (event is not None) and event.key() == Qt.Key.Key_Escape:  # "ESC" pressed
             self.close()
 
-    def maybe_update_view_window_later(self) -> None:
-        if self.parent_.view_window_is_open():  # type: ignore
-
-            def on_start() -> None:
-                self.parent_.update_view_window()  # type: ignore
-
-            QTimer.singleShot(0, on_start)
-
     def ok_button(self) -> None:
         if self.add_data():
             self.close()
@@ -187,5 +185,14 @@ class AddWindow(QWidget, ResizeWindowMixin, StringMixin, TimeMixin, WarningsMixi
                 point, f"""Added: <font color="red">{term1}</font>""", msecShowTime=1400
             )
 
+    def update_scroll_area_from_event(self, event: DatabaseEvent) -> None:
+        if event.type == DatabaseEventType.ADDED:
+            self.scrollarea.insert_item(event.term1)
+        elif event.type == DatabaseEventType.DELETED:
+            self.scrollarea.remove_item(event.term1)
+        elif event.type == DatabaseEventType.RENAMED:
+            self.scrollarea.remove_item(typing.cast(str, event.old_term1))
+            self.scrollarea.insert_item(event.term1)
+
     def update_scroll_area_items(self, text: str) -> None:
         self.scrollarea.update_items(text)
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Optional
+
+from vocabuilder.config import Config
+from vocabuilder.profiling import profiler
+
+# NOTE: A queued append: the file, the data, and the future that is done when the
+#   data has been written. A record without a file is a flush barrier, and None
+#   stops the writer thread
+Record = Optional[tuple[Optional[Path], bytes, "Future[None]"]]
+
+
+class AppendQueue:
+    """Append data to files on a writer thread, such that the GUI does not wait
+    for the disk when a term is added, modified, or practiced. The writer thread
+    takes all the records that are in the queue, and writes the data for each file
+    with a single write followed by ``fsync`` (a group commit). The data for a
+    file is written in the order it was queued.
+
+    ``append()`` returns a future that is done when the data is on disk, for
+    callers that must know that a change is durable. ``flush()`` waits until all
+    the data queued so far is written, and is called before the files are read or
+    copied, and when the vocabulary is closed.
+
+    The queue holds at most ``QueueSize`` records (see the ``Writer`` section of
+    the config file). If the disk is slower than the changes are made,
+    ``append()`` waits until there is room in the queue. The writer thread is
+    started when data is first appended.
+
+    :param config: The configuration
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.queue: queue.Queue[Record] = queue.Queue(
+            maxsize=config.config.getint("Writer", "QueueSize")
+        )
+        self.fsync = config.config.getboolean("Writer", "Fsync")
+        # NOTE: The position after the last data written to each file
+        self.ends: dict[Path, int] = {}
+        # NOTE: The last write error since the last flush
+        self.error: OSError | None = None
+        self.thread: threading.Thread | None = None
+
+    # public methods alfabetically sorted below
+    # ------------------------------------------
+
+    def append(self, path: Path, data: bytes) -> Future[None]:
+        """Queue ``data`` to be appended to ``path``. Returns a future that is done
+        when the data has been written, or has the ``OSError`` if it failed"""
+        future: Future[None] = Future()
+        self._start()
+        self.queue.put((path, data, future))
+        return future
+
+    def close(self) -> None:
+        """Write the queued data and stop the writer thread. Raises ``OSError`` if
+        the data could not be written"""
+        if self.thread is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def flush(self) -> None:
+        """Wait until all the data queued so far has been written. Raises
+        ``OSError`` if a write has failed since the last flush"""
+        if self.thread is None:
+            return
+        future: Future[None] = Future()
+        self.queue.put((None, b"", future))
+        try:
+            future.result()
+        finally:
+            error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    def get_end(self, path: Path) -> int:
+        """The position in ``path`` after the data written by the last append, or 0
+        if nothing has been written to the file"""
+        return self.ends.get(path, 0)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [record for record in batch if record is not None]
+            self._write(records)
+            if len(records) < len(batch):
+                return
+
+    def _start(self) -> None:
+        if self.thread is None:
+            self.thread = threading.Thread(
+                target=self._run, name="vocabuilder-writer", daemon=True
+            )
+            self.thread.start()
+
+    def _write(self, records: list[tuple[Optional[Path], bytes, Future[None]]]) -> None:
+        """Write the data for each file with one write and one fsync, then mark the
+        futures as done. If a write fails, the futures of all the records get the
+        error"""
+        data: dict[Path, list[bytes]] = {}
+        for path, chunk, _ in records:
+            if path is not None:
+                data.setdefault(path, []).append(chunk)
+        error: OSError | None = None
+        with profiler.timer("writer.batch"):
+            for path, chunks in data.items():
+                try:
+                    with open(path, "ab") as fp:
+                        fp.write(b"".join(chunks))
+                        fp.flush()
+                        if self.fsync:
+                            os.fsync(fp.fileno())
+                        self.ends[path] = fp.tell()
+                except OSError as exc:
+                    logging.error(f"Could not append to {path}: {exc}")
+                    error = self.error = exc
+        for _, _, future in records:
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
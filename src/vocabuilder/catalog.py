@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import typing
+from pathlib import Path
+
+from vocabuilder.type_aliases import CatalogEntries, CatalogValue
+
+
+class VocabularyInfo:
+    """Metadata for a vocabulary that can be shown without loading it. The counts
+    are ``None`` for vocabularies that have not been opened since the catalog
+    was created.
+
+    :param name: The name of the vocabulary
+    :param path: The vocabulary directory
+    :param terms: The number of terms
+    :param due: The number of terms that were ready for practice when the metadata
+      was saved
+    :param size: The size of the database file in bytes
+    :param modified: The modification time (epoch) of the database file
+    """
+
+    def __init__(
+        self,
+        name: str,
+        path: str = "",
+        terms: int | None = None,
+        due: int | None = None,
+        size: int | None = None,
+        modified: float = 0.0,
+    ) -> None:
+        self.name = name
+        self.path = path
+        self.terms = terms
+        self.due = due
+        self.size = size
+        self.modified = modified
+
+    def __str__(self) -> str:
+        if self.terms is None:
+            return self.name
+        return f"{self.name} ({self.terms} terms, {self.due} due)"
+
+    @classmethod
+    def from_dict(cls, name: str, values: dict[str, CatalogValue]) -> VocabularyInfo:
+        return cls(
+            name,
+            path=str(values.get("path", "")),
+            terms=typing.cast(int | None, values.get("terms")),
+            due=typing.cast(int | None, values.get("due")),
+            size=typing.cast(int | None, values.get("size")),
+            modified=typing.cast(float, values.get("modified", 0.0)),
+        )
+
+    def to_dict(self) -> dict[str, CatalogValue]:
+        return {
+            "path": self.path,
+            "terms": self.terms,
+            "due": self.due,
+            "size": self.size,
+            "modified": self.modified,
+        }
+
+
+class VocabularyCatalog:
+    """The metadata for all the vocabularies, saved in ``catalog_fn`` in the
+    ``databases`` directory. It is updated by ``LocalDatabase`` each time it
+    writes the database file in bulk (when the database is opened, when terms are
+    imported, and when it is closed), such that the vocabularies can be listed and
+    selected without scanning the directory and reading each database file.
+
+    If the catalog file does not exist (e.g. it was created by an older version),
+    it is created from the vocabulary directories the first time it is read.
+
+    :param db_dir: The ``databases`` directory
+    """
+
+    catalog_fn = "catalog.json"
+
+    def __init__(self, db_dir: Path) -> None:
+        self.db_dir = db_dir
+        self.path = db_dir / self.catalog_fn
+
+    # public methods alfabetically sorted below
+    # ------------------------------------------
+
+    def get_info(self, name: str) -> VocabularyInfo | None:
+        values = self._read().get(name)
+        if values is None:
+            return None
+        return VocabularyInfo.from_dict(name, values)
+
+    def get_names(self) -> list[str]:
+        """The names of all the vocabularies, sorted alphabetically"""
+        return sorted(self._read())
+
+    def list_vocabularies(self) -> list[VocabularyInfo]:
+        entries = self._read()
+        return [
+            VocabularyInfo.from_dict(name, entries[name]) for name in sorted(entries)
+        ]
+
+    def most_recent(self) -> str | None:
+        """The name of the most recently modified vocabulary"""
+        infos = self.list_vocabularies()
+        if len(infos) == 0:
+            return None
+        return max(infos, key=lambda info: info.modified).name
+
+    def remove(self, name: str) -> None:
+        entries = self._read()
+        if entries.pop(name, None) is not None:
+            self._write(entries)
+
+    def update(self, info: VocabularyInfo) -> None:
+        # NOTE: Different processes write different vocabularies (see
+        #   VocabularyLock), and the file is replaced atomically, so a reader never
+        #   sees a partially written catalog. Two processes updating the catalog
+        #   at the same time may lose one of the updates, which is corrected the
+        #   next time that vocabulary is written
+        entries = self._read()
+        entries[info.name] = info.to_dict()
+        self._write(entries)
+
+    def _read(self) -> CatalogEntries:
+        try:
+            entries = json.loads(self.path.read_text(encoding="utf_8"))
+        except FileNotFoundError:
+            return self._scan()
+        except ValueError:
+            logging.warning(f"Rebuilding corrupt vocabulary catalog {self.path}")
+            return self._scan()
+        return typing.cast(CatalogEntries, entries)
+
+    def _scan(self) -> CatalogEntries:
+        # NOTE: Imported here to avoid a circular import, LocalDatabase updates the
+        #   catalog
+        from vocabuilder.local_database import LocalDatabase
+
+        entries: CatalogEntries = {}
+        if not self.db_dir.is_dir():
+            return entries
+        for path in self.db_dir.iterdir():
+            dbfile = path / LocalDatabase.database_fn
+            if dbfile.is_file():
+                stat = dbfile.stat()
+                info = VocabularyInfo(
+                    path.name, str(path), size=stat.st_size, modified=stat.st_mtime
+                )
+                entries[path.name] = info.to_dict()
+        try:
+            self._write(entries)
+        except OSError as exc:
+            # NOTE: E.g. the data directory is on read-only media
+            logging.warning(f"Could not save vocabulary catalog {self.path}: {exc}")
+            return entries
+        logging.info(f"Created vocabulary catalog {self.path}")
+        return entries
+
+    def _write(self, entries: CatalogEntries) -> None:
+        self.db_dir.mkdir(parents=True, exist_ok=True)
+        tmpname = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmpname.write_text(json.dumps(entries, sort_keys=True), encoding="utf_8")
+        os.replace(tmpname, self.path)
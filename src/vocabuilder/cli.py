@@ -0,0 +1,267 @@
+"""Command line tool for working with vocabularies without starting the GUI. It
+does not import PyQt6, so it can be used from scripts and cron jobs. Example:
+
+.. code-block:: bash
+
+   $ vocabuilder-cli --all stats
+   $ vocabuilder-cli -v english-korean due --count
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import typing
+from pathlib import Path
+from typing import Callable
+
+from vocabuilder.catalog import VocabularyCatalog
+from vocabuilder.config import Config
+from vocabuilder.exceptions import (
+    CommandLineException,
+    DatabaseLockedException,
+    ExportException,
+)
+from vocabuilder.exporter import Compression, Exporter, ExportFormat
+from vocabuilder.importer import BulkImporter, ImportFormat
+from vocabuilder.local_database import LocalDatabase
+from vocabuilder.profiling import profiler
+
+Command = Callable[[argparse.Namespace, Config, str], int]
+
+
+def cmd_backup(args: argparse.Namespace, config: Config, voca_name: str) -> int:
+    # NOTE: A backup is created each time the database is opened
+    db = open_local_database(config, voca_name)
+    db.close()
+    print(f"{voca_name}: created backup in {db.backupdir}")
+    return 0
+
+
+def cmd_compact(args: argparse.Namespace, config: Config, voca_name: str) -> int:
+    dbname = get_vocabulary_dir(config, voca_name) / LocalDatabase.database_fn
+    size = dbname.stat().st_size
+    # NOTE: The database file is compacted each time the database is opened
+    db = open_local_database(config, voca_name)
+    db.close()
+    new_size = db.dbname.stat().st_size
+    print(f"{voca_name}: compacted {dbname} from {size} to {new_size} bytes")
+    return 0
+
+
+def cmd_due(args: argparse.Namespace, config: Config, voca_name: str) -> int:
+    db = open_local_database(config, voca_name, read_only=True)
+    pairs = db.get_pairs_exceeding_test_delay()
+    if args.count:
+        print(f"{voca_name}: {len(pairs)}")
+    else:
+        for term1, term2 in pairs:
+            print(f"{term1}\t{term2}")
+    return 0
+
+
+def cmd_export(args: argparse.Namespace, config: Config, voca_name: str) -> int:
+    db = open_local_database(config, voca_name, read_only=True)
+    path = Path(args.file)
+    try:
+        report = Exporter(db).export_file(path, args.format, args.compression)
+    except ExportException as exc:
+        print(f"{voca_name}: {exc}", file=sys.stderr)
+        return 1
+    print(f"{voca_name}: {report} to {path}")
+    return 0
+
+
+def cmd_import(args: argparse.Namespace, config: Config, voca_name: str) -> int:
+    path = Path(args.file)
+    if args.firebase:
+        from vocabuilder.database import Database
+
+        database = Database(config, voca_name, update_active=False)
+        firebase = database.firebase_database
+        if not firebase.is_initialized():
+            print(f"{voca_name}: firebase is not configured", file=sys.stderr)
+            return 1
+        importer = BulkImporter(database.get_local_database(), firebase)
+    else:
+        importer = BulkImporter(open_local_database(config, voca_name))
+    try:
+        report = importer.import_file(path, args.format)
+    finally:
+        # NOTE: Write the imported terms before the program exits
+        importer.db.close()
+    print(f"{voca_name}: imported {path}: {report}")
+    return 0
+
+
+def cmd_stats(args: argparse.Namespace, config: Config, voca_name: str) -> int:
+    db = open_local_database(config, voca_name, read_only=True)
+    num_terms = len(db.get_term1_list())
+    num_due = len(db.get_pairs_exceeding_test_delay())
+    num_reviews = len(db.review_log.records())
+    print(
+        f"{voca_name}: {num_terms} terms, {num_due} ready for practice, "
+        f"{num_reviews} reviews"
+    )
+    return 0
+
+
+def cmd_sync(args: argparse.Namespace, config: Config, voca_name: str) -> int:
+    # NOTE: firebase_admin is slow to import, so it is only imported when needed
+    from vocabuilder.database import Database
+
+    db = Database(config, voca_name, update_active=False)
+    try:
+        if not db.firebase_database.is_initialized():
+            print(f"{voca_name}: firebase is not configured", file=sys.stderr)
+            return 1
+    finally:
+        # NOTE: Write the terms and tombstones received from firebase before the
+        #   program exits
+        db.get_local_database().close()
+    print(f"{voca_name}: synchronized with firebase")
+    return 0
+
+
+COMMANDS: dict[str, Command] = {
+    "backup": cmd_backup,
+    "compact": cmd_compact,
+    "due": cmd_due,
+    "export": cmd_export,
+    "import": cmd_import,
+    "stats": cmd_stats,
+    "sync": cmd_sync,
+}
+
+
+def get_vocabulary_dir(config: Config, voca_name: str) -> Path:
+    return config.get_data_dir() / LocalDatabase.database_dir / voca_name
+
+
+def list_vocabularies(config: Config) -> list[str]:
+    """The names of all vocabularies in the vocabulary catalog, sorted"""
+    db_dir = config.get_data_dir() / LocalDatabase.database_dir
+    return VocabularyCatalog(db_dir).get_names()
+
+
+def open_local_database(
+    config: Config, voca_name: str, read_only: bool = False
+) -> LocalDatabase:
+    # NOTE: The vocabulary used by the GUI should not change when running scripts.
+    #   Commands that only read the vocabulary open it read-only, such that they
+    #   can be used while the GUI (the writer) is running
+    return LocalDatabase(config, voca_name, update_active=False, read_only=read_only)
+
+
+def parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="vocabuilder-cli",
+        description="Work with vocabularies from the command line",
+    )
+    parser.add_argument(
+        "-v",
+        "--vocabulary",
+        action="append",
+        default=[],
+        help="Vocabulary to use (can be repeated). Default: the active vocabulary",
+    )
+    parser.add_argument("--all", action="store_true", help="Use all vocabularies")
+    parser.add_argument("--verbose", action="store_true", help="Show log messages")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print the time used by each phase at exit",
+    )
+    parser.add_argument(
+        "--profile-output",
+        metavar="FILE",
+        help="Profile with cProfile and write the statistics to FILE",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("backup", help="Commit the database to the backup repo")
+    subparsers.add_parser("compact", help="Remove old versions of terms from file")
+    due = subparsers.add_parser("due", help="List the terms ready for practice")
+    due.add_argument("--count", action="store_true", help="Only show the number")
+    export = subparsers.add_parser("export", help="Export the terms to a file")
+    export.add_argument("file")
+    export.add_argument(
+        "--format",
+        choices=[
+            ExportFormat.CSV,
+            ExportFormat.JSONL,
+            ExportFormat.Anki,
+            ExportFormat.Columnar,
+        ],
+        help="Default: determined from the file name (.csv, .jsonl, .tsv, .vbc)",
+    )
+    export.add_argument(
+        "--compression",
+        choices=[Compression.NONE, Compression.GZIP, Compression.ZSTD],
+        help="Default: determined from the file name (.gz, .zst)",
+    )
+    import_ = subparsers.add_parser(
+        "import", help="Import terms from a file with columns term1, term2"
+    )
+    import_.add_argument("file")
+    import_.add_argument(
+        "--format",
+        choices=[ImportFormat.CSV, ImportFormat.TSV, ImportFormat.Anki],
+        help="Default: determined from the file name (.csv, .tsv, or .txt for Anki)",
+    )
+    import_.add_argument(
+        "--firebase", action="store_true", help="Also push the new terms to firebase"
+    )
+    subparsers.add_parser("stats", help="Show statistics")
+    subparsers.add_parser("sync", help="Synchronize with firebase")
+    return parser.parse_args(argv)
+
+
+def read_active_vocabulary(config: Config) -> str:
+    path = config.get_config_dir() / LocalDatabase.active_voca_info_fn
+    if path.is_file():
+        name = path.read_text(encoding="utf-8").strip()
+        if name in list_vocabularies(config):
+            return name
+    raise CommandLineException("No active vocabulary. Use --vocabulary or --all")
+
+
+def select_vocabularies(args: argparse.Namespace, config: Config) -> list[str]:
+    if args.all:
+        return list_vocabularies(config)
+    if len(args.vocabulary) > 0:
+        existing = list_vocabularies(config)
+        for name in args.vocabulary:
+            if (name not in existing) and (args.command != "import"):
+                raise CommandLineException(f"Unknown vocabulary: {name}")
+        return typing.cast(list[str], args.vocabulary)
+    return [read_active_vocabulary(config)]
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    level = logging.INFO if args.verbose else logging.WARNING
+    logging.basicConfig(level=level)
+    profiler.enable_from_environment()
+    if args.profile or (args.profile_output is not None):
+        output = args.profile_output
+        profiler.enable(None if output is None else Path(output))
+    config = Config()
+    try:
+        names = select_vocabularies(args, config)
+    except CommandLineException as exc:
+        print(str(exc), file=sys.stderr)
+        return 2
+    status = 0
+    for voca_name in names:
+        try:
+            status = max(status, COMMANDS[args.command](args, config, voca_name))
+        except DatabaseLockedException as exc:
+            print(f"{voca_name}: {exc}", file=sys.stderr)
+            status = max(status, 1)
+    profiler.dump()
+    return status
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
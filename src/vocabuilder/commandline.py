@@ -1,6 +1,7 @@
 import logging
+from pathlib import Path
 
-from PyQt6.QtCore import QCommandLineParser
+from PyQt6.QtCore import QCommandLineOption, QCommandLineParser
 from PyQt6.QtWidgets import QApplication
 
 from vocabuilder.exceptions import CommandLineException
@@ -14,7 +15,26 @@ class CommandLineOptions:
         parser.addHelpOption()
         parser.addVersionOption()
         parser.addPositionalArgument("database", "Database to open")
+        profile = QCommandLineOption(
+            "profile", "Print the time used by each startup phase at exit"
+        )
+        profile_output = QCommandLineOption(
+            "profile-output",
+            "Profile with cProfile and write the statistics to <file>",
+            "file",
+        )
+        read_only = QCommandLineOption(
+            "read-only", "Open the vocabulary without modifying any files"
+        )
+        parser.addOption(profile)
+        parser.addOption(profile_output)
+        parser.addOption(read_only)
         parser.process(app)
+        self.read_only = parser.isSet(read_only)
+        self.profile = parser.isSet(profile) or parser.isSet(profile_output)
+        self.profile_output: str | None = None
+        if parser.isSet(profile_output):
+            self.profile_output = parser.value(profile_output)
         arguments = parser.positionalArguments()
         logging.info(f"Commandline database argument: {arguments}")
         num_args = len(arguments)
@@ -30,3 +50,8 @@ class CommandLineOptions:
 
     def get_database_name(self) -> str | None:
         return self.database_name
+
+    def get_profile_output(self) -> Path | None:
+        if self.profile_output is None:
+            return None
+        return Path(self.profile_output)
@@ -7,6 +7,7 @@ from pathlib import Path
 import platformdirs
 
 from vocabuilder.exceptions import ConfigException
+from vocabuilder.profiling import profiler
 
 
 class Config:
@@ -20,7 +21,8 @@ class Config:
         self.lockfile_string = "author=HH"
         self.config_dir = self.check_config_dir()
         self.config_path = Path(self.config_dir) / self.config_fn
-        self.read_config()
+        with profiler.timer("config.read"):
+            self.read_config()
         self.datadir_path = self.get_data_dir_path()
 
     def check_config_dir(self) -> Path:
@@ -21,3 +21,15 @@ class TestMethod:
 
     Random = 1
     List = 2
+
+
+class Grade:
+    """How well the user remembered a term when practicing it. ``MANUAL`` means
+    that the user did not grade the answer, but typed the number of days until
+    the next practice directly."""
+
+    MANUAL = 0
+    AGAIN = 1
+    HARD = 2
+    GOOD = 3
+    EASY = 4
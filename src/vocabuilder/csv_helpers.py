@@ -1,13 +1,25 @@
 from __future__ import annotations
 
 import csv
+import io
+import logging
+import mmap
+import os
+import typing
+import zlib
 from pathlib import Path
 from types import TracebackType
-from typing import Literal, Optional
+from typing import Generator, Iterable, Iterator, Literal, Optional
 
 from vocabuilder.exceptions import CsvFileException
+from vocabuilder.hlc import HybridLogicalClock
 from vocabuilder.type_aliases import DatabaseRow, DatabaseValue
 
+# NOTE: The last record for each term, see CSVwrapperMmapReader: maps the UTF-8
+#   encoded term to the start offset of the record, or to the row if the record
+#   was decoded
+LastRows = dict[bytes, typing.Union[int, DatabaseRow]]
+
 
 class CsvDatabaseHeader:
     """
@@ -17,6 +29,15 @@ class CsvDatabaseHeader:
     * test_delay    : Number of days to next possible test, 0 or negative means no delay
     * last_test     : timestamp (epoch) of last time this term was practiced
     * last_modified : timestamp (epoch) of last time any of the previous was modified
+    * version       : hybrid logical clock version of the last modification, used
+      to decide which change wins when the databases are synchronized, see
+      ``HybridLogicalClock``
+
+    In the database file, each row also has a trailing ``checksum`` column: the
+    CRC-32 of the other fields, see ``CSVwrapper.checksum()``. It is not a part of
+    the items. Rows written by older versions do not have a checksum, and files
+    written by older versions do not have the ``version`` column (the version is
+    then computed from ``last_modified``).
     """
 
     status = "Status"
@@ -25,7 +46,9 @@ class CsvDatabaseHeader:
     test_delay = "TestDelay"
     last_test = "LastTest"
     last_modified = "LastModified"
-    header = [status, term1, term2, test_delay, last_test, last_modified]
+    version = "Version"
+    header = [status, term1, term2, test_delay, last_test, last_modified, version]
+    checksum = "Checksum"
     types = {
         status: int,
         term1: str,
@@ -34,6 +57,7 @@ class CsvDatabaseHeader:
         # NOTE: epoch value: when an item is added, last_test is set to "now"
         last_test: int,
         last_modified: int,  # NOTE: epoch value
+        version: str,
     }
 
 
@@ -58,31 +82,125 @@ class CSVwrapper:
             )
             csvwriter.writerow(row)
 
+    @staticmethod
+    def checksum(values: Iterable[DatabaseValue]) -> str:
+        """The checksum of the fields of a row, as 8 hex digits"""
+        text = "\x1f".join(str(value) for value in values)
+        return f"{zlib.crc32(text.encode('utf_8')):08x}"
+
     def dict_to_row(self, row_dict: DatabaseRow) -> list[DatabaseValue]:
+        """The fields of the row in the database file, including the checksum"""
         row = []
         for key in self.header.header:
             row.append(row_dict[key])
+        row.append(self.checksum(row))
         return row
 
-    def open_for_read(self, header: CsvDatabaseHeader) -> "CSVwrapperReader":
-        return CSVwrapperReader(self, self.filename, header)
+    def format_line(self, row_dict: DatabaseRow) -> bytes:
+        """The line that ``append_line()`` writes for ``row_dict``, encoded"""
+        buffer = io.StringIO(newline="")
+        csvwriter = csv.writer(
+            buffer,
+            delimiter=self.delimiter,
+            quotechar=self.quotechar,
+            quoting=csv.QUOTE_MINIMAL,
+        )
+        csvwriter.writerow(self.dict_to_row(row_dict))
+        return buffer.getvalue().encode("utf_8")
+
+    def header_row(self) -> list[DatabaseValue]:
+        """The first row of the database file"""
+        return [*self.header.header, self.header.checksum]
+
+    def open_for_append(self) -> "CSVwrapperWriter":
+        return CSVwrapperWriter(self, self.filename, mode="a")
+
+    def open_for_mmap_read(
+        self,
+        header: CsvDatabaseHeader,
+        offset: int = 0,
+        complete_only: bool = False,
+        end: int | None = None,
+    ) -> "CSVwrapperMmapReader":
+        return CSVwrapperMmapReader(
+            self, self.filename, header, offset, complete_only, end
+        )
+
+    def open_for_read(
+        self,
+        header: CsvDatabaseHeader,
+        offset: int = 0,
+        complete_only: bool = False,
+        inode: int | None = None,
+    ) -> "CSVwrapperReader":
+        return CSVwrapperReader(
+            self, self.filename, header, offset, complete_only, inode
+        )
 
     def open_for_write(self) -> "CSVwrapperWriter":
         return CSVwrapperWriter(self, self.filename)
 
 
 class CSVwrapperReader:
-    """Context manager for reading lines from the database csv file"""
+    """Context manager for reading lines from the database csv file.
 
-    def __init__(self, parent: CSVwrapper, filename: str, header: CsvDatabaseHeader):
+    :param offset: The byte offset in the file to start reading from. If zero, the
+      first line is the header, otherwise the columns are assumed to be in the
+      order of ``header.header``
+    :param complete_only: If True, stop at an incomplete row at the end of the file,
+      for example a row that another process is appending. The ``offset``
+      attribute is the end of the last row that was read, and can be used to
+      continue reading when more rows have been appended
+    :param inode: The inode of the file when ``offset`` was recorded. If the file
+      has been replaced since then, it is read from the start and the
+      ``restarted`` attribute is set to True
+
+    Corrupt rows (a bad checksum, the wrong number of fields, or values of the
+    wrong type), for example from a write that was interrupted by a power loss,
+    are skipped. Their start and end offsets are saved in ``bad_rows``.
+    """
+
+    def __init__(
+        self,
+        parent: CSVwrapper,
+        filename: str,
+        header: CsvDatabaseHeader,
+        offset: int = 0,
+        complete_only: bool = False,
+        inode: int | None = None,
+    ):
         self.parent = parent
         self.header = header
-        self.fp = open(filename, "r", encoding="utf_8")
-        self.csvh = csv.DictReader(
-            self.fp,
+        self.complete_only = complete_only
+        self.fp = open(filename, "rb")
+        stat = os.fstat(self.fp.fileno())
+        self.inode = stat.st_ino
+        self.restarted = False
+        if (inode is not None) and (offset > 0):
+            if (inode != self.inode) or (stat.st_size < offset):
+                offset = 0
+                self.restarted = True
+        self.fp.seek(offset)
+        self.offset = offset
+        self.consumed = offset
+        self.csvh = csv.reader(
+            self._read_lines(),
             delimiter=self.parent.delimiter,
             quotechar=self.parent.quotechar,
+            strict=complete_only,
         )
+        self.bad_rows: list[tuple[int, int]] = []
+        self.fieldnames = self.header.header
+        if offset == 0:
+            self.fieldnames = next(self.csvh, self.header.header)
+            if self.fieldnames[-1:] == [self.header.checksum]:
+                self.fieldnames = self.fieldnames[:-1]
+            self.offset = self.consumed
+        # NOTE: In a file written by an older version of the app, without the
+        #   version column, the rows appended by this version have all the columns
+        self.appended_fieldnames = self.fieldnames
+        if self.header.header[: len(self.fieldnames)] == self.fieldnames:
+            self.appended_fieldnames = self.header.header
 
     def __enter__(self) -> CSVwrapperReader:
         return self
@@ -100,12 +218,22 @@ class CSVwrapperReader:
         return self
 
     def __next__(self) -> dict[str, DatabaseValue]:
-        try:
-            row = next(self.csvh)
-        except StopIteration as e:
-            raise e
-        self.fixup_datatypes(row)
-        return row
+        while True:
+            start = self.offset
+            try:
+                values = next(self.csvh)
+            except csv.Error as exc:
+                if self.complete_only:
+                    # NOTE: the file ends inside a quoted field
+                    raise StopIteration from exc
+                values = [str(exc)]  # NOTE: reported as a bad row below
+            self.offset = self.consumed
+            if values == []:
+                continue  # NOTE: empty line
+            try:
+                return self.values_to_row(values)
+            except CsvFileException as exc:
+                self._skip_bad_row(start, self.offset, exc)
 
     def fixup_datatypes(self, row: dict[str, str]) -> None:
         """NOTE: this method modifies the input argument 'row'"""
@@ -114,16 +242,256 @@ class CSVwrapperReader:
                 row[key] = self.header.types[key](
                     row[key]
                 )  # cast the element to the correct type
-            except TypeError as exc:
+            except (TypeError, ValueError) as exc:
                 raise CsvFileException("Bad type found in CSV file") from exc
 
+    def values_to_row(self, values: list[str]) -> dict[str, DatabaseValue]:
+        """Check the number of fields and the checksum, and convert the values"""
+        fieldnames = self.fieldnames
+        if len(values) == len(self.appended_fieldnames) + 1:
+            fieldnames = self.appended_fieldnames
+        if len(values) == len(fieldnames) + 1:
+            checksum = values.pop()
+            if checksum != self.parent.checksum(values):
+                raise CsvFileException("Bad checksum")
+        elif len(values) != len(fieldnames):
+            raise CsvFileException(f"Bad number of fields: {len(values)}")
+        row = dict(zip(fieldnames, values))
+        self.fixup_datatypes(row)
+        if self.header.version not in row:
+            # NOTE: A file written by an older version of the app
+            last_modified = typing.cast(int, row.get(self.header.last_modified, 0))
+            row[self.header.version] = HybridLogicalClock.from_seconds(last_modified)
+        return typing.cast(DatabaseRow, row)
+
+    def _read_lines(self) -> Iterator[str]:
+        for line in self.fp:
+            if self.complete_only and not line.endswith(b"\n"):
+                return
+            self.consumed += len(line)
+            # NOTE: invalid UTF-8 from a torn write makes the row fail the checks
+            yield line.decode("utf_8", errors="replace")
+
+    def _skip_bad_row(self, start: int, end: int, exc: CsvFileException) -> None:
+        self.bad_rows.append((start, end))
+        logging.warning(
+            f"Skipping bad row at offset {start} in {self.parent.filename}: "
+            f"{exc.value}"
+        )
+
+
+class CSVwrapperMmapReader(CSVwrapperReader):
+    """Read the database csv file through a memory map, and return only the last
+    row for each term, the row that wins when the rows are applied in order (a
+    deleted term is returned as its deleting row). The rows are returned in the
+    order the terms first occur in the file.
+
+    The records are found in the raw bytes, and only the term and the checksum of
+    each record are looked at before the last record for each term is known, such
+    that the fields of superseded rows are never decoded. Records that contain a
+    quote character, rows without a checksum, and files with the columns in
+    another order than ``header.header`` are decoded with the csv module, like
+    ``CSVwrapperReader`` does. The parameters and the ``offset``, ``bad_rows``,
+    and ``fieldnames`` attributes are the same as for ``CSVwrapperReader``. The
+    ``count`` attribute is the number of rows that were read, including the
+    superseded rows.
+
+    :param end: If given, stop reading at this byte offset. The offset must be at
+      the start of a row, see ``vocabuilder.parallel_loader``
+    """
+
+    # NOTE: The file is split into lines a block at a time, such that the lines of
+    #   a large file are not all in memory at the same time
+    block_size = 1024 * 1024
+
+    def __init__(
+        self,
+        parent: CSVwrapper,
+        filename: str,
+        header: CsvDatabaseHeader,
+        offset: int = 0,
+        complete_only: bool = False,
+        end: int | None = None,
+    ):
+        super().__init__(parent, filename, header, offset, complete_only)
+        self.end = end
+        self.count = 0
+        self.rows: Generator[DatabaseRow, None, None] | None = None
+        # NOTE: Records are only split on the raw bytes if the columns are in the
+        #   default order
+        self.fast = self.fieldnames == self.header.header
+        self.int_fields = [self.header.types[name] is int for name in self.fieldnames]
+
+    def __enter__(self) -> CSVwrapperMmapReader:
+        return self
+
+    def __exit__(
+        self,
+        type: Optional[type[BaseException]],
+        value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> Literal[False]:
+        if self.rows is not None:
+            self.rows.close()  # NOTE: closes the memory map
+        return super().__exit__(type, value, traceback)
+
+    def __next__(self) -> dict[str, DatabaseValue]:
+        if self.rows is None:
+            self.rows = self._read_last_rows()
+        return next(self.rows)
+
+    def _add_record(self, record: bytes, start: int, stop: int, last: LastRows) -> None:
+        """Decode a record with the csv module. Raises ``csv.Error`` if reading
+        must stop, see ``complete_only``"""
+        self.offset = start
+        text = record.decode("utf_8", errors="replace")
+        csvh = csv.reader(
+            [line + "\n" for line in text.split("\n")],
+            delimiter=self.parent.delimiter,
+            quotechar=self.parent.quotechar,
+            strict=self.complete_only,
+        )
+        try:
+            values = next(csvh, [])
+        except csv.Error as exc:
+            if self.complete_only:
+                raise  # NOTE: the file ends inside a quoted field
+            values = [str(exc)]  # NOTE: reported as a bad row below
+        if values == []:
+            return  # NOTE: empty line
+        try:
+            row = self.values_to_row(values)
+        except CsvFileException as exc:
+            self._skip_bad_row(start, stop, exc)
+            return
+        self.count += 1
+        last[typing.cast(str, row[self.header.term1]).encode("utf_8")] = row
+
+    def _blocks(self, mm: mmap.mmap, end: int) -> Iterator[bytes]:
+        """Blocks of about ``block_size`` bytes from ``offset`` to ``end``. A block
+        ends at a newline outside quotes, such that no record is split between
+        two blocks"""
+        pos = self.offset
+        while pos < end:
+            stop = min(pos + self.block_size, end)
+            newline = mm.find(b"\n", stop - 1, end)
+            stop = end if newline == -1 else newline + 1
+            parts = [mm[pos:stop]]
+            quotes = parts[0].count(b'"')
+            while (quotes % 2 == 1) and (stop < end):
+                newline = mm.find(b"\n", stop, end)
+                next_stop = end if newline == -1 else newline + 1
+                parts.append(mm[stop:next_stop])
+                quotes += parts[-1].count(b'"')
+                stop = next_stop
+            yield parts[0] if len(parts) == 1 else b"".join(parts)
+            pos = stop
+
+    def _decode_block(self, block: bytes, start: int, last: LastRows) -> None:
+        """Find the records of a block with quotes, and decode them with the csv
+        module"""
+        block_end = start + len(block)
+        parts: list[bytes] = []
+        quotes = 0
+        for line in self._lines(block):
+            parts.append(line)
+            quotes += line.count(b'"')
+            if quotes % 2 == 1:
+                continue  # NOTE: a newline inside a quoted field
+            record = line if len(parts) == 1 else b"\n".join(parts)
+            stop = min(start + len(record) + 1, block_end)
+            self._add_record(record, start, stop, last)
+            start = stop
+            parts = []
+        if parts and not self.complete_only:
+            self._add_record(b"\n".join(parts), start, block_end, last)
+            start = block_end
+        self.offset = start
+
+    def _find_last_rows(self, mm: mmap.mmap, end: int) -> LastRows:
+        last: LastRows = {}
+        start = self.offset
+        try:
+            for block in self._blocks(mm, end):
+                if self.fast and (b'"' not in block):
+                    self._scan_block(block, start, last)
+                else:
+                    self._decode_block(block, start, last)
+                start += len(block)
+        except csv.Error:
+            pass  # NOTE: complete_only, see _add_record()
+        return last
+
+    def _fields_to_row(self, record: bytes) -> DatabaseRow:
+        """Convert a record that has been checked by ``_scan_block()``"""
+        values = record.rstrip(b"\r\n").split(b",")[:-1]
+        row: DatabaseRow = {}
+        try:
+            for name, is_int, value in zip(self.fieldnames, self.int_fields, values):
+                row[name] = (
+                    int(value) if is_int else value.decode("utf_8", errors="replace")
+                )
+        except ValueError as exc:
+            raise CsvFileException("Bad type found in CSV file") from exc
+        return row
+
+    def _lines(self, block: bytes) -> list[bytes]:
+        lines = block.split(b"\n")
+        if (lines[-1] == b"") or self.complete_only:
+            lines.pop()  # NOTE: the line after the last newline
+        return lines
+
+    def _read_last_rows(self) -> Generator[DatabaseRow, None, None]:
+        size = os.fstat(self.fp.fileno()).st_size
+        end = size if self.end is None else min(self.end, size)
+        if self.offset >= end:
+            return
+        with mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            last = self._find_last_rows(mm, end)
+            for value in last.values():
+                if isinstance(value, dict):
+                    yield value
+                    continue
+                stop = mm.find(b"\n", value, end) + 1 or end
+                # NOTE: The checksum is correct, so a value of the wrong type was
+                #   written like that. Earlier rows for the term are not used
+                try:
+                    yield self._fields_to_row(mm[value:stop])
+                except CsvFileException as exc:
+                    self._skip_bad_row(value, stop, exc)
+
+    def _scan_block(self, block: bytes, start: int, last: LastRows) -> None:
+        """Find the last record for each term in a block without quotes. Only the
+        records with a correct checksum are added, the other records are decoded
+        with the csv module"""
+        block_end = start + len(block)
+        num_fields = len(self.fieldnames)
+        count = 0
+        for line in self._lines(block):
+            stop = start + len(line) + 1
+            fields = line.split(b",")
+            checksum = fields.pop() if len(fields) == num_fields + 1 else b""
+            if checksum == b"%08x\r" % zlib.crc32(b"\x1f".join(fields)):
+                last[fields[1]] = start
+                count += 1
+            else:
+                self._add_record(line, start, min(stop, block_end), last)
+            start = stop
+        self.count += count
+        self.offset = min(start, block_end)
+
 
 class CSVwrapperWriter:
     """Context manager for writing lines to the database csv file"""
 
-    def __init__(self, parent: CSVwrapper, filename: str):
+    # NOTE: A large buffer makes appending many lines fast
+    buffer_size = 1024 * 1024
+
+    def __init__(self, parent: CSVwrapper, filename: str, mode: str = "w"):
         self.parent = parent
-        self.fp = open(filename, "w", newline="", encoding="utf_8")
+        self.fp = open(
+            filename, mode, newline="", encoding="utf_8", buffering=self.buffer_size
+        )
         self.csvwriter = csv.writer(
             self.fp,
             delimiter=self.parent.delimiter,
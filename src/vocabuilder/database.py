@@ -1,22 +1,61 @@
+from __future__ import annotations
+
 import logging
 import typing
+from typing import TYPE_CHECKING, Callable, Iterator
 
 from vocabuilder.config import Config
+from vocabuilder.constants import Grade
+from vocabuilder.events import DatabaseListener
 from vocabuilder.firebase_database import FirebaseDatabase
+from vocabuilder.hlc import Version
 from vocabuilder.local_database import LocalDatabase
+from vocabuilder.merkle import MerkleTree
 from vocabuilder.mixins import TimeMixin
-from vocabuilder.type_aliases import DatabaseRow
+from vocabuilder.profiling import profiler
+from vocabuilder.type_aliases import DatabaseRow, DatabaseType
+
+if TYPE_CHECKING:  # pragma: no cover
+    from vocabuilder.maintenance import CancelToken, Finish, MaintenanceScheduler
 
 
 class Database(TimeMixin):
-    def __init__(self, config: Config, voca_name: str) -> None:
-        self.local_database = LocalDatabase(config, voca_name)
-        self.firebase_database = FirebaseDatabase(config, voca_name)
-        if self.firebase_database.is_initialized():
-            self.push_updated_items_to_firebase()
-            self.push_updated_items_to_local_database()
+    # NOTE: local_database: An already loaded database for voca_name, see Workspace
+    # NOTE: maintenance: If given, the local database and firebase are synchronized
+    #   when the app is idle, see MaintenanceScheduler
+    # NOTE: read_only: If True, the local database is opened read-only (see
+    #   LocalDatabase), and firebase is not used
+    # NOTE: defer_load: If True, the local database is not read, and firebase is
+    #   not synchronized, until load() and finish_loading() are called, see
+    #   DatabaseLoader
+    def __init__(
+        self,
+        config: Config,
+        voca_name: str,
+        update_active: bool = True,
+        local_database: LocalDatabase | None = None,
+        maintenance: MaintenanceScheduler | None = None,
+        read_only: bool = False,
+        defer_load: bool = False,
+    ) -> None:
+        if local_database is None:
+            local_database = LocalDatabase(
+                config,
+                voca_name,
+                update_active,
+                read_only=read_only,
+                maintenance=maintenance,
+                defer_load=defer_load,
+            )
+        self.local_database = local_database
+        self.firebase_database = FirebaseDatabase(
+            config, voca_name, connect=not read_only
+        )
         self.config = config
         self.voca_name = voca_name
+        self.maintenance = maintenance
+        if not defer_load:
+            self._sync()
 
     # public methods sorted alphabetically
     # ------------------------------------
@@ -24,6 +63,12 @@ class Database(TimeMixin):
     def add_item(self, item: DatabaseRow) -> None:
         self.local_database.add_item(item)
 
+    def add_listener(self, listener: DatabaseListener) -> None:
+        self.local_database.add_listener(listener)
+
+    def check_term1_exceeds_test_delay(self, term1: str) -> bool:
+        return self.local_database.check_term1_exceeds_test_delay(term1)
+
     def check_term1_exists(self, term1: str) -> bool:
         return self.local_database.check_term1_exists(term1)
 
@@ -33,22 +78,133 @@ class Database(TimeMixin):
     def delete_item(self, term1: str) -> None:
         self.local_database.delete_item(term1)
         self.firebase_database.delete_item(term1)
+        self._push_tombstone(term1)
+        self.firebase_database.flush()
 
-    def push_updated_items_to_firebase(self) -> None:
-        csv_items = self.local_database.get_items()
-        firebase_items = self.firebase_database.get_items()
+    def finish_loading(self) -> None:
+        """Synchronize with firebase after the local database has been loaded.
+        Called on the main thread, see ``LocalDatabase.finish_loading()``"""
+        self.local_database.finish_loading()
+        self._sync()
+
+    # NOTE: buckets: If given, only the terms in these buckets are compared, see
+    #   FirebaseDatabase.get_changed_buckets()
+    def push_updated_items_to_firebase(self, buckets: list[int] | None = None) -> None:
+        self._push_to_firebase(
+            self._select(self.local_database.get_items(), buckets),
+            self._select(self.firebase_database.get_items(), buckets),
+            self.local_database.get_tombstones(),
+        )
+
+    def push_updated_items_to_local_database(
+        self, buckets: list[int] | None = None
+    ) -> None:
+        self._push_to_local_database(
+            self._select(self.firebase_database.get_items(), buckets),
+            self.firebase_database.get_tombstones(),
+        )
+
+    def get_local_database(self) -> LocalDatabase:
+        return self.local_database
+
+    def get_pairs_exceeding_test_delay(self) -> list[tuple[str, str]]:
+        return self.local_database.get_pairs_exceeding_test_delay()
+
+    def get_random_pair(self) -> tuple[str, str] | None:
+        return self.local_database.get_random_pair()
+
+    def get_term1_data(self, term1: str) -> DatabaseRow:
+        return self.local_database.get_term1_data(term1)
+
+    def get_term1_list(self) -> list[str]:
+        return self.local_database.get_term1_list()
+
+    def get_term2(self, term1: str) -> str:
+        return self.local_database.get_term2(term1)
+
+    def get_term2_list(self) -> list[str]:
+        return self.local_database.get_term2_list()
+
+    def get_voca_name(self) -> str:
+        return self.local_database.get_voca_name()
+
+    def iter_pairs_exceeding_test_delay(self) -> Iterator[tuple[str, str]]:
+        return self.local_database.iter_pairs_exceeding_test_delay()
+
+    def load(self, progress: Callable[[int], None] | None = None) -> None:
+        """Read the local database, see ``LocalDatabase.load()``"""
+        self.local_database.load(progress)
+
+    def modify_item(self, old_term1: str, item: DatabaseRow) -> None:
+        self.local_database.rename_item(old_term1, item)
+        new_term1 = typing.cast(str, item[self.local_database.header.term1])
+        self.firebase_database.update_item_different_key(old_term1, new_term1, item)
+        if new_term1 != old_term1:
+            self._push_tombstone(old_term1)
+        self.firebase_database.flush()
+
+    def next_interval(self, term1: str, grade: int) -> int:
+        return self.local_database.next_interval(term1, grade)
+
+    def remove_listener(self, listener: DatabaseListener) -> None:
+        self.local_database.remove_listener(listener)
+
+    def reset_firebase(self) -> None:
+        self.firebase_database.run_reset()
+
+    def update_item(self, term1: str, item: DatabaseRow) -> None:
+        self.local_database.update_item(term1, item)
+        # NOTE: With the new version, see LocalDatabase._update_dbfile_item()
+        self.firebase_database.update_item_same_key(
+            term1, self.local_database.get_term1_data(term1)
+        )
+        self.firebase_database.flush()
+
+    def update_retest_value(
+        self, term1: str, delay: int, grade: int = Grade.MANUAL
+    ) -> None:
+        self.local_database.update_retest_value(term1, delay, grade)
+
+    # private methods sorted alphabetically
+    # -------------------------------------
+
+    def _get_changed_buckets(self, csv_items: DatabaseType) -> list[int] | None:
+        """The buckets with terms that differ between ``csv_items`` and firebase, or
+        None if all the terms must be compared, see ``MerkleTree``"""
+        tree = MerkleTree.from_items(csv_items, self.local_database.header.version)
+        buckets = self.firebase_database.get_changed_buckets(tree)
+        if buckets is None:
+            logging.info("Firebase: comparing all items")
+        elif len(buckets) == 0:
+            logging.info("Firebase: local database is in sync")
+        else:
+            logging.info(
+                f"Firebase: comparing {len(buckets)} of "
+                f"{MerkleTree.num_buckets} buckets"
+            )
+        return buckets
+
+    def _push_to_firebase(
+        self,
+        csv_items: DatabaseType,
+        firebase_items: DatabaseType,
+        tombstones: dict[str, Version],
+        token: CancelToken | None = None,
+    ) -> None:
         header = self.local_database.header
+        firebase_tombstones = self.firebase_database.get_tombstones().copy()
         num_items = 0
         logging.info("updating firebase..")
         for key, value in csv_items.items():
+            if token is not None:
+                token.check()
+            version_local = typing.cast(str, value[header.version])
+            if firebase_tombstones.get(key, "") >= version_local:
+                # NOTE: deleted on another device, see _push_to_local_database()
+                continue
             if key in firebase_items:
-                last_mod_local = typing.cast(int, value[header.last_modified])
-                assert isinstance(last_mod_local, int)
-                last_mod_fb = typing.cast(
-                    int, firebase_items[key][header.last_modified]
-                )
-                assert isinstance(last_mod_fb, int)
-                if last_mod_local > last_mod_fb:
+                version_fb = typing.cast(str, firebase_items[key][header.version])
+                if version_local > version_fb:
                     logging.info(
                         f"Updating firebase item: {key} (local value is newer)"
                     )
@@ -61,20 +217,64 @@ class Database(TimeMixin):
             logging.info(f"Pushed {num_items} items to firebase")
         else:
             logging.info("No items pushed to firebase")
+        self._push_tombstones_to_firebase(csv_items, firebase_items, tombstones, token)
+
+    def _push_tombstone(self, term1: str) -> None:
+        version = self.local_database.get_tombstones().get(term1)
+        if version is not None:
+            self.firebase_database.add_tombstone(term1, version)
+
+    def _push_tombstones_to_firebase(
+        self,
+        csv_items: DatabaseType,
+        firebase_items: DatabaseType,
+        tombstones: dict[str, Version],
+        token: CancelToken | None = None,
+    ) -> None:
+        """Save the local tombstones in firebase, delete the items in firebase that
+        they supersede, and remove the expired tombstones from firebase. A term that
+        was added again after it was deleted is newer than its tombstone, and has
+        been pushed by ``_push_to_firebase()``, so the tombstone is skipped"""
+        header = self.local_database.header
+        firebase_tombstones = self.firebase_database.get_tombstones().copy()
+        num_tombstones = 0
+        for key, version in tombstones.items():
+            if token is not None:
+                token.check()
+            if firebase_tombstones.get(key, "") >= version:
+                continue
+            if (key in csv_items) and (
+                typing.cast(str, csv_items[key][header.version]) > version
+            ):
+                continue
+            if key in firebase_items:
+                version_fb = typing.cast(str, firebase_items[key][header.version])
+                if version_fb <= version:
+                    self.firebase_database.delete_item(key)
+            if self.firebase_database.add_tombstone(key, version):
+                num_tombstones += 1
+        if num_tombstones > 0:
+            logging.info(f"Pushed {num_tombstones} tombstones to firebase")
+        self.firebase_database.collect_garbage(
+            self.local_database.get_tombstone_horizon()
+        )
 
-    def push_updated_items_to_local_database(self) -> None:
+    def _push_to_local_database(
+        self, firebase_items: DatabaseType, firebase_tombstones: dict[str, Version]
+    ) -> None:
         csv_items = self.local_database.get_items()
-        firebase_items = self.firebase_database.get_items()
         header = self.local_database.header
         num_items = 0
         logging.info("updating local database..")
         for key, value in firebase_items.items():
+            version_fb = typing.cast(str, value[header.version])
+            if self.local_database.is_deleted(key, version_fb):
+                # NOTE: The item was deleted here, and is deleted from firebase by
+                #   _push_tombstones_to_firebase()
+                continue
             if key in csv_items:
-                last_mod_fb = typing.cast(int, value[header.last_modified])
-                assert isinstance(last_mod_fb, int)
-                last_mod_local = typing.cast(int, csv_items[key][header.last_modified])
-                assert isinstance(last_mod_local, int)
-                if last_mod_fb > last_mod_local:
+                version_local = typing.cast(str, csv_items[key][header.version])
+                if version_fb > version_local:
                     logging.info(
                         f"Updating local db item: {key} (firebase value is newer)"
                     )
@@ -87,43 +287,63 @@ class Database(TimeMixin):
             logging.info(f"Pushed {num_items} items to local database")
         else:
             logging.info("No items pushed to local database")
+        num_deleted = 0
+        for key, version in firebase_tombstones.items():
+            if self.local_database.apply_tombstone(key, version):
+                num_deleted += 1
+        if num_deleted > 0:
+            logging.info(f"Deleted {num_deleted} items deleted on other devices")
 
-    def get_local_database(self) -> LocalDatabase:
-        return self.local_database
+    def _select(self, items: DatabaseType, buckets: list[int] | None) -> DatabaseType:
+        if buckets is None:
+            return items
+        return MerkleTree.select(items, buckets)
 
-    def get_pairs_exceeding_test_delay(self) -> list[tuple[str, str]]:
-        return self.local_database.get_pairs_exceeding_test_delay()
+    def _submit_sync(self, maintenance: MaintenanceScheduler) -> None:
+        # NOTE: Imported here since PyQt6 is not needed by the command line tool
+        from vocabuilder.maintenance import MaintenanceTask
 
-    def get_random_pair(self) -> tuple[str, str] | None:
-        return self.local_database.get_random_pair()
+        maintenance.submit(
+            MaintenanceTask("firebase sync", self._sync_task, 3, group=self.voca_name)
+        )
 
-    def get_term1_data(self, term1: str) -> DatabaseRow:
-        return self.local_database.get_term1_data(term1)
-
-    def get_term1_list(self) -> list[str]:
-        return self.local_database.get_term1_list()
-
-    def get_term2(self, term1: str) -> str:
-        return self.local_database.get_term2(term1)
-
-    def get_term2_list(self) -> list[str]:
-        return self.local_database.get_term2_list()
-
-    def get_voca_name(self) -> str:
-        return self.local_database.get_voca_name()
-
-    def modify_item(self, old_term1: str, item: DatabaseRow) -> None:
-        self.local_database.delete_item(old_term1)
-        self.local_database.add_item(item)
-        new_term1 = typing.cast(str, item[self.local_database.header.term1])
-        self.firebase_database.update_item_different_key(old_term1, new_term1, item)
-
-    def reset_firebase(self) -> None:
-        self.firebase_database.run_reset()
-
-    def update_item(self, term1: str, item: DatabaseRow) -> None:
-        self.local_database.update_item(term1, item)
-        self.firebase_database.update_item_same_key(term1, item)
+    def _sync(self) -> None:
+        if not self.firebase_database.is_initialized():
+            return
+        if self.maintenance is None:
+            with profiler.timer("firebase.sync"):
+                buckets = self._get_changed_buckets(self.local_database.get_items())
+                if buckets != []:
+                    self.push_updated_items_to_firebase(buckets)
+                    self.push_updated_items_to_local_database(buckets)
+                self.firebase_database.flush()
+        else:
+            self._submit_sync(self.maintenance)
 
-    def update_retest_value(self, term1: str, delay: int) -> None:
-        self.local_database.update_retest_value(term1, delay)
+    def _sync_task(self, token: CancelToken) -> Finish:
+        """Push the local changes to firebase on a worker thread, then apply the
+        changes from firebase to the local database on the main thread"""
+        with profiler.timer("firebase.sync"):
+            # NOTE: Copies, since the terms can be changed on the main thread
+            csv_items = {
+                key: value.copy()
+                for key, value in self.local_database.get_items().copy().items()
+            }
+            buckets = self._get_changed_buckets(csv_items)
+            if buckets == []:
+                # NOTE: The items may have been read, for example if firebase had
+                #   no saved tree
+                self.firebase_database.flush()
+                return None
+            csv_items = self._select(csv_items, buckets)
+            firebase_items = self._select(
+                self.firebase_database.get_items().copy(), buckets
+            )
+            tombstones = self.local_database.get_tombstones().copy()
+            firebase_tombstones = self.firebase_database.get_tombstones().copy()
+            self._push_to_firebase(csv_items, firebase_items, tombstones, token)
+            # NOTE: On this thread, since the shards are compressed before they are
+            #   written, see ShardedLayout. The changes are taken under the lock of
+            #   the firebase database, see FirebaseDatabase.flush()
+            self.firebase_database.flush()
+        return lambda: self._push_to_local_database(firebase_items, firebase_tombstones)
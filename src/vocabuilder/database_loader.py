@@ -0,0 +1,79 @@
+"""Load the database on a worker thread, such that the main window can be shown
+before the database file has been read. The window shows the number of terms read
+so far, and the actions that need the terms are enabled when the database has
+been loaded."""
+
+from __future__ import annotations
+
+import logging
+import threading
+
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+
+from vocabuilder.database import Database
+from vocabuilder.profiling import profiler
+
+
+class DatabaseLoader(QObject):
+    """Call ``Database.load()`` on a worker thread, then
+    ``Database.finish_loading()`` on the main thread. ``progress`` is emitted with
+    the number of terms read so far, ``loaded`` when the database can be used, and
+    ``failed`` with an error message if the database could not be read.
+
+    :param db: A database created with ``defer_load=True``
+    :param parent: The parent object
+    """
+
+    progress = pyqtSignal(int)
+    loaded = pyqtSignal()
+    failed = pyqtSignal(str)
+    # NOTE: Emitted from the worker thread with the exception, or None, and
+    #   received on the main thread
+    _done = pyqtSignal(object)
+
+    def __init__(self, db: Database, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self.db = db
+        self.worker: threading.Thread | None = None
+        self._done.connect(
+            self._finished,
+            Qt.ConnectionType.QueuedConnection,  # type: ignore[call-arg]
+        )
+
+    # public methods alfabetically sorted below
+    # ------------------------------------------
+
+    def start(self) -> None:
+        self.worker = threading.Thread(
+            target=self._run, name="vocabuilder-loader", daemon=True
+        )
+        self.worker.start()
+
+    def wait(self) -> None:
+        """Wait until the worker thread has finished, and ignore the result. Called
+        when the app quits before the database has been loaded"""
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
+
+    def _finished(self, exc: Exception | None) -> None:
+        if self.worker is None:
+            return  # NOTE: the result was discarded by wait()
+        self.worker.join()
+        self.worker = None
+        if exc is not None:
+            logging.error(f"Could not load vocabulary: {exc}")
+            self.failed.emit(str(exc))
+            return
+        self.db.finish_loading()
+        logging.info(f"Loaded vocabulary {self.db.get_voca_name()}")
+        self.loaded.emit()
+
+    def _run(self) -> None:
+        try:
+            with profiler.timer("startup.load"):
+                self.db.load(self.progress.emit)
+        except Exception as exc:
+            self._done.emit(exc)
+        else:
+            self._done.emit(None)
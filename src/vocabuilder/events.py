@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import enum
+from typing import Callable
+
+
+class DatabaseEventType(enum.Enum):
+    """The kind of change that was made to the database"""
+
+    ADDED = "added"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    RENAMED = "renamed"
+
+
+class DatabaseEvent:
+    """Describes a single change to the database. Listeners registered with
+    ``LocalDatabase.add_listener()`` receive one of these objects for each change,
+    such that views can insert or remove the affected rows instead of rebuilding
+    their complete list of terms.
+
+    :param type_: The kind of change
+    :param term1: The term that was changed. For ``RENAMED`` events this is the
+       new name of the term
+    :param term2: The translation of ``term1``. This is ``None`` for ``DELETED``
+       events
+    :param old_term1: For ``RENAMED`` events: the previous name of the term
+    """
+
+    def __init__(
+        self,
+        type_: DatabaseEventType,
+        term1: str,
+        term2: str | None = None,
+        old_term1: str | None = None,
+    ) -> None:
+        self.type = type_
+        self.term1 = term1
+        self.term2 = term2
+        self.old_term1 = old_term1
+
+    def __repr__(self) -> str:
+        return (
+            f"DatabaseEvent({self.type.value}, term1={self.term1!r}, "
+            f"term2={self.term2!r}, old_term1={self.old_term1!r})"
+        )
+
+
+DatabaseListener = Callable[[DatabaseEvent], None]
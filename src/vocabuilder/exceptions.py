@@ -22,6 +22,22 @@ class CsvFileException(Exception):
         return f"CSV file exception: {self.value}"
 
 
+class DatabaseLockedException(Exception):
+    def __init__(self, value: str):
+        self.value = value
+
+    def __str__(self) -> str:
+        return f"Database locked: {self.value}"
+
+
+class ExportException(Exception):
+    def __init__(self, value: str):
+        self.value = value
+
+    def __str__(self) -> str:
+        return f"Export exception: {self.value}"
+
+
 class FirebaseDatabaseException(Exception):
     def __init__(self, value: str):
         self.value = value
@@ -38,6 +54,14 @@ class LocalDatabaseException(Exception):
         return f"Database exception: {self.value}"
 
 
+class ReviewLogException(Exception):
+    def __init__(self, value: str):
+        self.value = value
+
+    def __str__(self) -> str:
+        return f"Review log exception: {self.value}"
+
+
 class SelectVocabularyException(Exception):
     def __init__(self, value: str):
         self.value = value
@@ -46,6 +70,14 @@ class SelectVocabularyException(Exception):
         return f"Select vocabulary exception: {self.value}"
 
 
+class TaskCancelledException(Exception):
+    def __init__(self, value: str):
+        self.value = value
+
+    def __str__(self) -> str:
+        return f"Task cancelled: {self.value}"
+
+
 class TimeException(Exception):
     def __init__(self, value: str):
         self.value = value
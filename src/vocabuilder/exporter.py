@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import itertools
+import json
+import logging
+import struct
+import time
+from pathlib import Path
+from typing import IO, BinaryIO, Iterator
+
+import numpy as np
+import numpy.typing as npt
+
+from vocabuilder.exceptions import ExportException
+from vocabuilder.local_database import LocalDatabase
+from vocabuilder.type_aliases import DatabaseRow, DatabaseValue
+
+
+class ExportFormat:
+    """File formats supported by ``Exporter``. The ``Columnar`` format stores the
+    terms in row groups where the values of each column are stored together, see
+    ``Exporter.write_columnar()``."""
+
+    CSV = "csv"
+    JSONL = "jsonl"
+    Anki = "anki"
+    Columnar = "columnar"
+
+    suffixes = {
+        ".csv": CSV,
+        ".jsonl": JSONL,
+        ".tsv": Anki,
+        ".txt": Anki,
+        ".vbc": Columnar,
+    }
+
+
+class Compression:
+    NONE = "none"
+    GZIP = "gzip"
+    ZSTD = "zstd"
+
+    suffixes = {".gz": GZIP, ".zst": ZSTD}
+
+
+class ExportReport:
+    """Statistics for an export"""
+
+    def __init__(self) -> None:
+        self.terms = 0
+        self.seconds = 0.0
+
+    def __str__(self) -> str:
+        return f"exported {self.terms} terms in {self.seconds:.2f} seconds"
+
+
+class Exporter:
+    """Export the current terms of a vocabulary. Unlike the database file, the
+    output does not contain deleted terms or old versions of modified terms. The
+    terms are written one at a time (one row group at a time for the columnar
+    format) directly from the database, so no copy of the database is made.
+
+    :param database: The database to export
+    :param row_group_size: The number of terms in each row group of the columnar
+       format
+    """
+
+    columnar_magic = b"VBCOLS01"
+
+    def __init__(self, database: LocalDatabase, row_group_size: int = 10000) -> None:
+        self.db = database
+        self.header = database.get_header()
+        self.row_group_size = row_group_size
+
+    def export_file(
+        self,
+        path: Path,
+        file_format: str | None = None,
+        compression: str | None = None,
+    ) -> ExportReport:
+        """Export the terms to ``path``.
+
+        :param file_format: One of the ``ExportFormat`` constants. If ``None``, the
+          format is determined from the file name suffix, e.g. ``terms.jsonl.gz``
+        :param compression: One of the ``Compression`` constants. If ``None``, the
+          compression is determined from the file name suffix
+        """
+        suffixes = path.suffixes
+        if compression is None:
+            compression = Compression.NONE
+            if suffixes and (suffixes[-1] in Compression.suffixes):
+                compression = Compression.suffixes[suffixes.pop()]
+        if file_format is None:
+            suffix = suffixes[-1] if suffixes else ""
+            file_format = ExportFormat.suffixes.get(suffix, ExportFormat.CSV)
+        report = ExportReport()
+        start = time.perf_counter()
+        with self._open(path, compression) as fp:
+            report.terms = self.write(fp, file_format)
+        report.seconds = time.perf_counter() - start
+        logging.info(f"Export: {report}")
+        return report
+
+    def iter_items(self) -> Iterator[DatabaseRow]:
+        """Generate the current terms, including the term1 field, in the column
+        order of the database file"""
+        columns = self.header.header
+        term1_key = self.header.term1
+        for term1, values in self.db.get_items().items():
+            yield {key: (term1 if key == term1_key else values[key]) for key in columns}
+
+    def write(self, fp: BinaryIO, file_format: str) -> int:
+        """Write the terms to ``fp`` and return the number of terms written"""
+        if file_format == ExportFormat.Columnar:
+            return self.write_columnar(fp)
+        text = io.TextIOWrapper(fp, encoding="utf_8", newline="")
+        try:
+            if file_format == ExportFormat.CSV:
+                return self.write_csv(text)
+            if file_format == ExportFormat.JSONL:
+                return self.write_jsonl(text)
+            if file_format == ExportFormat.Anki:
+                return self.write_anki(text)
+            raise ExportException(f"Unknown format: {file_format}")
+        finally:
+            text.flush()
+            # NOTE: Do not close fp when the wrapper is garbage collected
+            text.detach()
+
+    def write_anki(self, fp: IO[str]) -> int:
+        """Write the terms in the plain text format that Anki imports: one note per
+        line with the two fields separated by a tab"""
+        fp.write("#separator:tab\n#html:false\n")
+        count = 0
+        for term1, values in self.db.get_items().items():
+            term2 = _to_str(values[self.header.term2])
+            fp.write(f"{self._anki_field(term1)}\t{self._anki_field(term2)}\n")
+            count += 1
+        return count
+
+    def write_columnar(self, fp: BinaryIO) -> int:
+        """Write the terms in a simple columnar format. The file starts with
+        ``columnar_magic`` followed by the length (a little endian uint32) of a
+        JSON schema with the column names and types. Then follow the row groups.
+        Each row group starts with the number of rows (uint32) followed by the
+        columns in schema order. Integer columns are stored as little endian int64
+        arrays, and string columns are stored as an int64 array of the
+        ``rows + 1`` offsets into the following UTF-8 encoded data. The row
+        groups are terminated by a row count of zero. See ``read_columnar()``.
+        """
+        schema = [
+            {"name": key, "type": self._column_type(key)} for key in self.header.header
+        ]
+        schema_bytes = json.dumps(schema).encode("utf_8")
+        fp.write(self.columnar_magic)
+        fp.write(struct.pack("<I", len(schema_bytes)))
+        fp.write(schema_bytes)
+        count = 0
+        items = self.iter_items()
+        while group := list(itertools.islice(items, self.row_group_size)):
+            fp.write(struct.pack("<I", len(group)))
+            for column in schema:
+                values = [item[column["name"]] for item in group]
+                fp.write(self._encode_column(values, column["type"]))
+            count += len(group)
+        fp.write(struct.pack("<I", 0))
+        return count
+
+    def write_csv(self, fp: IO[str]) -> int:
+        """Write the terms in the same CSV format as the database file"""
+        writer = csv.writer(fp, quoting=csv.QUOTE_MINIMAL)
+        writer.writerow(self.header.header)
+        count = 0
+        for item in self.iter_items():
+            writer.writerow(list(item.values()))
+            count += 1
+        return count
+
+    def write_jsonl(self, fp: IO[str]) -> int:
+        """Write one JSON object per term"""
+        count = 0
+        for item in self.iter_items():
+            fp.write(json.dumps(item, ensure_ascii=False))
+            fp.write("\n")
+            count += 1
+        return count
+
+    def _anki_field(self, value: str) -> str:
+        return value.replace("\t", " ").replace("\n", " ")
+
+    def _column_type(self, key: str) -> str:
+        return "str" if self.header.types[key] is str else "int64"
+
+    def _encode_column(self, values: list[DatabaseValue], column_type: str) -> bytes:
+        if column_type == "int64":
+            return np.asarray(values, dtype="<i8").tobytes()
+        encoded = [_to_str(value).encode("utf_8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return offsets.tobytes() + b"".join(encoded)
+
+    def _open(self, path: Path, compression: str) -> BinaryIO:
+        if compression == Compression.NONE:
+            return open(path, "wb")
+        if compression == Compression.GZIP:
+            # NOTE: The default level 9 is several times slower than level 6 and
+            #   compresses text only slightly better
+            return gzip.open(path, "wb", compresslevel=6)  # type: ignore
+        if compression == Compression.ZSTD:
+            try:
+                import zstandard  # type: ignore
+            except ImportError as exc:
+                raise ExportException(
+                    "zstd compression requires the zstandard package"
+                ) from exc
+            compressor = zstandard.ZstdCompressor()
+            writer: BinaryIO = compressor.stream_writer(open(path, "wb"), closefd=True)
+            return writer
+        raise ExportException(f"Unknown compression: {compression}")
+
+
+def read_columnar(fp: BinaryIO) -> Iterator[dict[str, npt.NDArray[np.generic]]]:
+    """Read a file written by ``Exporter.write_columnar()``. Generates one
+    dictionary of column arrays for each row group."""
+    if fp.read(len(Exporter.columnar_magic)) != Exporter.columnar_magic:
+        raise ExportException("Bad columnar file format")
+    (size,) = struct.unpack("<I", fp.read(4))
+    schema = json.loads(fp.read(size).decode("utf_8"))
+    while True:
+        (rows,) = struct.unpack("<I", fp.read(4))
+        if rows == 0:
+            break
+        group: dict[str, npt.NDArray[np.generic]] = {}
+        for column in schema:
+            if column["type"] == "int64":
+                group[column["name"]] = np.frombuffer(fp.read(8 * rows), dtype="<i8")
+                continue
+            offsets = np.frombuffer(fp.read(8 * (rows + 1)), dtype="<i8")
+            data = fp.read(int(offsets[-1]))
+            group[column["name"]] = np.array(
+                [
+                    data[start:end].decode("utf_8")
+                    for start, end in zip(offsets[:-1], offsets[1:])
+                ]
+            )
+        yield group
+
+
+def _to_str(value: DatabaseValue) -> str:
+    return value if isinstance(value, str) else str(value)
@@ -1,4 +1,10 @@
+from __future__ import annotations
+
 import logging
+import secrets
+import threading
+import time
+import typing
 
 import firebase_admin  # type: ignore
 import firebase_admin.db  # type: ignore
@@ -7,9 +13,13 @@ from firebase_admin.exceptions import FirebaseError  # type: ignore
 from vocabuilder.config import Config
 from vocabuilder.csv_helpers import CsvDatabaseHeader
 from vocabuilder.exceptions import FirebaseDatabaseException
+from vocabuilder.hlc import HybridLogicalClock, Version
+from vocabuilder.merkle import MerkleTree
 
 # from vocabuilder.local_database import LocalDatabase
 from vocabuilder.mixins import TimeMixin
+from vocabuilder.profiling import profiler
+from vocabuilder.shards import ShardedLayout
 from vocabuilder.type_aliases import DatabaseRow, DatabaseType
 
 
@@ -20,30 +30,124 @@ class FirebaseStatus:
 
 class FirebaseDatabase(TimeMixin):
     appname = "vocabuilder"
+    # NOTE: The characters used by firebase for push keys, in ascending ASCII order
+    push_chars = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+    # NOTE: The children of the vocabulary that are not items start with "_", the
+    #   push keys of the items start with "-" (until the year 2109)
+    tombstones_child = "_tombstones"
+    merkle_child = "_merkle"
+    shards_child = "_shards"
+    # NOTE: The key for the version of the deletion in a tombstone
+    deleted_key = "Deleted"
 
-    def __init__(self, config: Config, voca_name: str):
+    # NOTE: connect: If False, the firebase database is not read (reading it
+    #   deletes duplicate items), and the object is not initialized, see
+    #   is_initialized()
+    # NOTE: If firebase has a summary of the items (see flush()), only the root of
+    #   the summary is read, and the items are read when they are needed, see
+    #   get_changed_buckets()
+    # NOTE: If the Shards option of the Firebase section of the config file is
+    #   given, the items are saved in that number of shards, see ShardedLayout
+    def __init__(self, config: Config, voca_name: str, connect: bool = True):
         self.config = config
         self.voca_name = voca_name
         self.header = CsvDatabaseHeader()
         self.status = FirebaseStatus.NOT_INITIALIZED
         self.data: DatabaseType = {}
         self.fb_keys: dict[str, str] = {}  # Maps local keys to firebase keys
-        if self._read_config_parameters():
-            if self._initialize_service_account():
-                if self._get_database_reference():
-                    if self.read_database():
-                        self.status = FirebaseStatus.INITIALIZED
+        # NOTE: Maps the deleted terms to the versions of the deletions, and to the
+        #   firebase keys of the tombstones, see TombstoneIndex
+        self.tombstones: dict[str, Version] = {}
+        self.tombstone_keys: dict[str, str] = {}
+        self.shards: ShardedLayout | None = None
+        # NOTE: The items in firebase, including the items written since they were
+        #   read, and the root of the tree saved in firebase (None if there is no
+        #   saved tree, or it was deleted before the items were changed)
+        self.tree = MerkleTree()
+        self.summary_root: str | None = None
+        self.loaded = False
+        # NOTE: The items are read on the main thread or by the sync maintenance
+        #   task, whichever needs them first, and flush() can run on the thread of
+        #   the task. The lock guards the items, the tree and the changed shards
+        self.lock = threading.RLock()
+        with profiler.timer("firebase.init"):
+            if connect and self._read_config_parameters():
+                if self._initialize_service_account():
+                    if self._get_database_reference():
+                        if self._read_summary_root():
+                            self.status = FirebaseStatus.INITIALIZED
         logging.info(f"Firebase status: {self._status_string()}")
 
     # public methods sorted alphabetically
     # ------------------------------------
 
+    def add_tombstone(self, key: str, version: Version) -> bool:
+        """Save the version of the deletion of ``key``, such that the deletion is
+        applied on the other devices. Returns True if the tombstone was saved"""
+        if not self.is_initialized():
+            return False
+        self._ensure_loaded()
+        if self.tombstones.get(key, "") >= version:
+            return True
+        fb_key = self.tombstone_keys.get(key)
+        if fb_key is None:
+            fb_key = self._generate_push_key()
+        object = {self.header.term1: key, self.deleted_key: version}
+        try:
+            self.db.child(self.tombstones_child).child(fb_key).set(object)
+        except FirebaseError as exc:
+            logging.info(
+                "Firebase: could not save tombstone: cause:"
+                f" {exc.cause}, error: {exc.code}, "
+                f"http_response: {exc.http_response}"
+            )
+            return False
+        except ValueError:
+            logging.info(f"Firebase: invalid tombstone: {object}")
+            return False
+        self.tombstones[key] = version
+        self.tombstone_keys[key] = fb_key
+        logging.info(f"Firebase: saved tombstone: '{key}'")
+        return True
+
+    def collect_garbage(self, horizon: int) -> int:
+        """Delete the tombstones for terms deleted before ``horizon`` (epoch
+        time). Returns the number of tombstones deleted"""
+        self._ensure_loaded()
+        expired = [
+            key
+            for key, version in self.tombstones.items()
+            if HybridLogicalClock.to_seconds(version) < horizon
+        ]
+        if len(expired) == 0:
+            return 0
+        updates = {self.tombstone_keys[key]: None for key in expired}
+        try:
+            self.db.child(self.tombstones_child).update(updates)
+        except FirebaseError as exc:
+            logging.info(
+                "Firebase: could not delete tombstones: cause:"
+                f" {exc.cause}, error: {exc.code}, "
+                f"http_response: {exc.http_response}"
+            )
+            return 0
+        for key in expired:
+            del self.tombstones[key]
+            del self.tombstone_keys[key]
+        logging.info(f"Firebase: deleted {len(expired)} expired tombstones")
+        return len(expired)
+
     def delete_item(self, key: str) -> None:
-        if key not in self.fb_keys:
+        self._ensure_loaded()
+        if key not in (self.fb_keys if self.shards is None else self.data):
             raise FirebaseDatabaseException(
                 f"Unexpected: Firebase: key '{key}' not found in database. "
                 f"Cannot delete item."
             )
+        if self.shards is not None:
+            self._set_sharded_item(key, None)
+            logging.info(f"Firebase: deleted item: '{key}'")
+            return
         fb_key = self.fb_keys[key]
         try:
             child_ref = self.db.child(fb_key)
@@ -57,6 +161,8 @@ class FirebaseDatabase(TimeMixin):
                 f"Firebase: delete failed: key '{key}' does not exist in database"
             )
             return
+        if not self._delete_summary():
+            return
         try:
             child_ref.delete()
         except FirebaseError as exc:
@@ -66,22 +172,102 @@ class FirebaseDatabase(TimeMixin):
                 f"http_response: {exc.http_response}"
             )
             return
+        del self.fb_keys[key]
+        with self.lock:
+            self.data.pop(key, None)
+            self.tree.set(key, None)
         logging.info(f"Firebase: deleted item: '{key}'")
 
+    def flush(self) -> bool:
+        """Write the changed shards (see ``ShardedLayout``), and save the tree of
+        the items in firebase (see ``MerkleTree``), such that the next time the app
+        is started, it can find out if the local database has changed, or the items
+        have been changed by another device, without reading the items. The shards
+        and the tree are written with a single request. (With one child per item,
+        the items are written when they are changed, and the root of the saved tree
+        is deleted before, see ``_delete_summary()``.) Returns True if firebase is
+        up to date.
+
+        The changes are taken under the lock, and the request is made without it,
+        such that the main thread can change the items while the changes are
+        written. If the request fails, the shards are marked as changed again"""
+        if (not self.is_initialized()) or (not self.loaded):
+            return True
+        with self.lock:
+            updates: dict[str, object] = {}
+            dirty: set[int] = set()
+            stale: set[str] = set()
+            if self.shards is not None:
+                updates.update(self.shards.get_updates(self.data, self.shards_child))
+                dirty, self.shards.dirty = self.shards.dirty, set()
+                stale, self.shards.stale = self.shards.stale, set()
+            root = self.tree.root()
+            if root != self.summary_root:
+                updates[self.merkle_child] = self._get_summary(root)
+        if len(updates) == 0:
+            return True
+        try:
+            self.db.update(updates)
+        except FirebaseError as exc:
+            logging.info(
+                "Firebase: could not save changes: cause:"
+                f" {exc.cause}, error: {exc.code}, "
+                f"http_response: {exc.http_response}"
+            )
+            with self.lock:
+                if self.shards is not None:
+                    self.shards.dirty.update(dirty)
+                    self.shards.stale.update(stale)
+            return False
+        with self.lock:
+            self.summary_root = root
+        return True
+
+    def get_changed_buckets(self, local_tree: MerkleTree) -> list[int] | None:
+        """The buckets of ``local_tree`` (see ``MerkleTree``) with terms or versions
+        that differ from the items in firebase. If the items have not been read,
+        the tree saved in firebase is compared with a few small reads: the root,
+        the inner nodes if the roots differ, and the buckets below the inner nodes
+        that differ. Returns None if the saved tree could not be read"""
+        if self.loaded:
+            return local_tree.diff(
+                self.tree.root(), self.tree.inner_hashes, self.tree.leaves
+            )
+        assert self.summary_root is not None
+        return local_tree.diff(
+            self.summary_root,
+            lambda: self._read_summary_hashes("inner"),
+            lambda i: self._read_summary_hashes(f"leaves/{i:x}"),
+        )
+
     def get_firebase_key(self, key: str) -> str:
+        self._ensure_loaded()
         if key not in self.fb_keys:
             raise FirebaseDatabaseException(f"Key '{key}' not found in database.")
         return self.fb_keys[key]
 
     def get_items(self) -> DatabaseType:
+        self._ensure_loaded()
         return self.data
 
+    def get_tombstones(self) -> dict[str, Version]:
+        """Maps the deleted terms to the versions of the deletions"""
+        self._ensure_loaded()
+        return self.tombstones
+
     def is_initialized(self) -> bool:
         return self.status == FirebaseStatus.INITIALIZED
 
     def push_item(self, key: str, value: DatabaseRow) -> None:
+        self._ensure_loaded()
+        if self.shards is not None:
+            self._set_sharded_item(key, value)
+            logging.info(f"Firebase: pushed item: '{key}'")
+            return
         object = value.copy()
         object[self.header.term1] = key
+        if not self._delete_summary():
+            return
         try:
             self.db.push(object)
         except FirebaseError as exc:
@@ -97,8 +283,46 @@ class FirebaseDatabase(TimeMixin):
         except TypeError:
             logging.info(f"Firebase: invalid type error: {object}")
             return
+        with self.lock:
+            self.tree.set(key, typing.cast(str, value.get(self.header.version, "")))
         logging.info(f"Firebase: pushed item: '{key}'")
 
+    def push_items(self, items: list[DatabaseRow]) -> bool:
+        """Push many new items with a single request. The keys are generated
+        locally, in the same format as the keys generated by ``push()``.
+
+        :param items: dicts with the same keys as the items in the local database,
+          including the ``header.term1`` key
+        :return: True if the items were pushed
+        """
+        self._ensure_loaded()
+        if self.shards is not None:
+            for item in items:
+                self._set_sharded_item(typing.cast(str, item[self.header.term1]), item)
+            logging.info(f"Firebase: pushed {len(items)} items")
+            return self.flush()
+        updates = {self._generate_push_key(): item.copy() for item in items}
+        if not self._delete_summary():
+            return False
+        try:
+            self.db.update(updates)
+        except FirebaseError as exc:
+            logging.info(
+                "Firebase: could not push items: cause:"
+                f" {exc.cause}, error: {exc.code}, "
+                f"http_response: {exc.http_response}"
+            )
+            return False
+        with self.lock:
+            for fb_key, object in updates.items():
+                key = typing.cast(str, object.pop(self.header.term1))
+                self.fb_keys[key] = fb_key
+                self.data[key] = object
+                version = typing.cast(str, object.get(self.header.version, ""))
+                self.tree.set(key, version)
+        logging.info(f"Firebase: pushed {len(updates)} items")
+        return True
+
     def read_database(self) -> bool:
         try:
             snapshot = self.db.get()
@@ -114,22 +338,35 @@ class FirebaseDatabase(TimeMixin):
             return False
         self.data = {}
         self.fb_keys = {}
+        self.tombstones = {}
+        self.tombstone_keys = {}
+        self.tree = MerkleTree()
+        self.loaded = True
         if snapshot is None:
             logging.info("Firebase database is empty")
             return True
         num_duplicates = 0
         num_items = 0
         logging.info("Firebase: reading database..")
+        self._read_tombstones(snapshot.get(self.tombstones_child, {}))
         for raw_key in snapshot.keys():
+            if raw_key.startswith("_"):
+                # NOTE: The tombstones, the shards, and the tree, see flush()
+                continue
             item = snapshot[raw_key].copy()
             # logging.info(f"Firebase: read item: {raw_key}, value: {item}")
             key = item.pop(self.header.term1)
+            if not HybridLogicalClock.is_valid(item.get(self.header.version)):
+                # NOTE: An item saved by an older version of the app
+                item[self.header.version] = HybridLogicalClock.from_seconds(
+                    item.get(self.header.last_modified, 0)
+                )
             if key in self.data:
                 assert key in self.fb_keys
                 num_duplicates += 1
-                lm1 = self.data[key][self.header.last_modified]
-                lm2 = item[self.header.last_modified]
-                if lm1 > lm2:  # old value is newer
+                version1 = self.data[key][self.header.version]
+                version2 = item[self.header.version]
+                if version1 > version2:  # old value is newer
                     self._delete_duplicate_item(raw_key, key)  # delete new value
                     continue
                 else:
@@ -146,6 +383,8 @@ class FirebaseDatabase(TimeMixin):
         if num_duplicates > 0:
             logging.info(f"Firebase: found {num_duplicates} duplicate items")
         logging.info(f"Firebase: read {num_items} items from database")
+        self._read_shards(snapshot.get(self.shards_child, {}))
+        self.tree = MerkleTree.from_items(self.data, self.header.version)
         return True
 
     def run_reset(self) -> None:
@@ -153,6 +392,11 @@ class FirebaseDatabase(TimeMixin):
         # self.db.delete()
 
     def update_item_same_key(self, key: str, value: DatabaseRow) -> None:
+        if self.shards is not None:
+            if self._check_sharded_item(key):
+                self._set_sharded_item(key, value)
+                logging.info(f"Firebase: updated item: '{key}'")
+            return
         object = value.copy()
         object[self.header.term1] = key
         try:
@@ -161,11 +405,20 @@ class FirebaseDatabase(TimeMixin):
             logging.info(f"Cannot update item: {exc.value}")
             return
         if self._update_item(fb_key, object):
+            with self.lock:
+                version = typing.cast(str, value.get(self.header.version, ""))
+                self.tree.set(key, version)
             logging.info(f"Firebase: updated item: '{key}'")
 
     def update_item_different_key(
         self, old_key: str, new_key: str, value: DatabaseRow
     ) -> None:
+        if self.shards is not None:
+            if self._check_sharded_item(old_key):
+                self._set_sharded_item(old_key, None)
+                self._set_sharded_item(new_key, value)
+                logging.info(f"Firebase: renamed item: '{old_key}' -> '{new_key}'")
+            return
         object = value.copy()
         object[self.header.term1] = new_key
         try:
@@ -176,12 +429,25 @@ class FirebaseDatabase(TimeMixin):
         del self.fb_keys[old_key]
         self.fb_keys[new_key] = fb_key
         if self._update_item(fb_key, object):
+            with self.lock:
+                self.tree.set(old_key, None)
+                version = typing.cast(str, value.get(self.header.version, ""))
+                self.tree.set(new_key, version)
             logging.info(f"Firebase: renamed item: '{old_key}' -> '{new_key}'")
 
     # private methods sorted alphabetically
     # -------------------------------------
 
+    def _check_sharded_item(self, key: str) -> bool:
+        self._ensure_loaded()
+        if key not in self.data:
+            logging.info(f"Cannot update item: Key '{key}' not found in database.")
+            return False
+        return True
+
     def _delete_duplicate_item(self, fb_key: str, duplicate_key: str) -> None:
+        if not self._delete_summary():
+            return
         try:
             # TODO: this is not atomic. It should ideally be done in a transaction.
             #  But since the database is expected to be used by a single person only,
@@ -198,6 +464,44 @@ class FirebaseDatabase(TimeMixin):
             return
         logging.info(f"Firebase: deleted duplicate item '{duplicate_key}'.")
 
+    def _delete_summary(self) -> bool:
+        """Delete the root of the saved tree before the items are changed, such that
+        other devices do not compare with an old tree if the app is stopped before
+        the new tree is saved. Returns False if the root could not be deleted, then
+        the items must not be changed"""
+        if self.summary_root is None:
+            return True
+        try:
+            self.db.child(self.merkle_child).child("root").delete()
+        except FirebaseError as exc:
+            logging.info(
+                "Firebase: could not delete summary: cause:"
+                f" {exc.cause}, error: {exc.code}, "
+                f"http_response: {exc.http_response}"
+            )
+            return False
+        with self.lock:
+            self.summary_root = None
+        return True
+
+    def _ensure_loaded(self) -> None:
+        """Read the items, if only the root of the saved tree was read at startup"""
+        with self.lock:
+            if self.is_initialized() and (not self.loaded):
+                self.read_database()
+
+    def _generate_push_key(self) -> str:
+        """A 20 character key: 8 characters encoding the time in milliseconds,
+        followed by 12 random characters"""
+        now = int(time.time() * 1000)
+        chars = []
+        for _ in range(8):
+            chars.append(self.push_chars[now % 64])
+            now //= 64
+        chars.reverse()
+        chars.extend(secrets.choice(self.push_chars) for _ in range(12))
+        return "".join(chars)
+
     def _get_database_reference(self) -> bool:
         # https://firebase.google.com/static/docs/reference/admin/python/firebase_admin.db#reference_1
         try:
@@ -213,6 +517,20 @@ class FirebaseDatabase(TimeMixin):
             return False
         return True
 
+    def _get_summary(self, root: str) -> dict[str, object]:
+        return {
+            "root": root,
+            "inner": {
+                f"{i:x}": hash_ for i, hash_ in enumerate(self.tree.inner_hashes())
+            },
+            "leaves": {
+                f"{i:x}": {
+                    f"{j:x}": hash_ for j, hash_ in enumerate(self.tree.leaves(i))
+                }
+                for i in range(MerkleTree.fanout)
+            },
+        }
+
     def _initialize_service_account(self) -> bool:
         # See: https://firebase.google.com/docs/admin/setup#python for more information
         try:
@@ -224,8 +542,17 @@ class FirebaseDatabase(TimeMixin):
         except ValueError:
             logging.info("Firebase credentials file is invalid")
             return False
-        # https://firebase.google.com/docs/reference/admin/python/firebase_admin#initialize_app
-        firebase_admin.initialize_app(cred, options={"databaseURL": self.database_url})
+        # NOTE: The default app can only be initialized once per process, and it is
+        #   shared by all the vocabularies, for example when the CLI synchronizes
+        #   several vocabularies or the user switches vocabulary in the GUI
+        try:
+            # https://firebase.google.com/docs/reference/admin/python/firebase_admin#get_app
+            firebase_admin.get_app()
+        except ValueError:
+            # https://firebase.google.com/docs/reference/admin/python/firebase_admin#initialize_app
+            firebase_admin.initialize_app(
+                cred, options={"databaseURL": self.database_url}
+            )
         return True
 
     def _read_config_parameters(self) -> bool:
@@ -244,8 +571,115 @@ class FirebaseDatabase(TimeMixin):
         except KeyError:
             logging.info("Missing firebase databaseURL in config file")
             return False
+        self._read_layout(cfg_firebase.get("Shards", "0"))
         return True
 
+    def _read_layout(self, option: str) -> None:
+        """The number of shards, 0 means one child per item"""
+        try:
+            num_shards = int(option)
+        except ValueError:
+            num_shards = -1
+        if not (0 <= num_shards <= MerkleTree.num_buckets):
+            logging.info(f"Invalid number of firebase shards in config file: {option}")
+        elif num_shards > 0:
+            self.shards = ShardedLayout(num_shards)
+
+    def _read_shards(self, blobs: dict[str, object]) -> None:
+        """Read the items in the shards. The items saved as children of the
+        vocabulary (by older versions of the app, or before the Shards option was
+        given), and the shards saved with another number of shards, are moved to
+        the shards by ``flush()``"""
+        shards = self.shards
+        if shards is None:
+            return
+        for key, fb_key in self.fb_keys.items():
+            shards.dirty.add(shards.shard(key))
+            shards.stale.add(fb_key)
+        self.fb_keys = {}
+        num_items = 0
+        for shard_key, blob in blobs.items():
+            items = shards.decode(blob)
+            if items is None:
+                logging.info(f"Firebase: invalid shard: '{shard_key}'")
+                items = {}
+            if shard_key not in shards.keys:
+                shards.stale.add(f"{self.shards_child}/{shard_key}")
+                shards.dirty.update(shards.shard(key) for key in items)
+            for key, item in items.items():
+                version = typing.cast(str, item.get(self.header.version, ""))
+                if key in self.data:
+                    # NOTE: A child saved by an older version of the app
+                    shards.dirty.add(shards.shard(key))
+                    if typing.cast(str, self.data[key][self.header.version]) >= version:
+                        continue
+                self.data[key] = item
+                num_items += 1
+        logging.info(f"Firebase: read {num_items} items from {len(blobs)} shards")
+
+    def _read_summary_hashes(self, path: str) -> list[str] | None:
+        """The hashes of the inner nodes, or of the buckets below an inner node, of
+        the saved tree"""
+        try:
+            nodes = self.db.child(self.merkle_child).child(path).get()
+        except FirebaseError as exc:
+            logging.info(
+                "Firebase: could not read summary: cause:"
+                f" {exc.cause}, error: {exc.code}, "
+                f"http_response: {exc.http_response}"
+            )
+            return None
+        if not isinstance(nodes, dict):
+            return None
+        return [nodes.get(f"{i:x}", "") for i in range(MerkleTree.fanout)]
+
+    def _read_summary_root(self) -> bool:
+        """Read the root of the saved tree, see ``flush()``. If there is no
+        saved tree, the items are read"""
+        try:
+            root = self.db.child(self.merkle_child).child("root").get()
+        except FirebaseError as exc:
+            logging.info(
+                "Firebase: could not read summary: cause:"
+                f" {exc.cause}, error: {exc.code}, "
+                f"http_response: {exc.http_response}"
+            )
+            return False
+        if not isinstance(root, str):
+            return self.read_database()
+        self.summary_root = root
+        logging.info("Firebase: read summary")
+        return True
+
+    def _read_tombstones(self, tombstones: dict[str, DatabaseRow]) -> None:
+        for fb_key, object in tombstones.items():
+            key = typing.cast(str, object[self.header.term1])
+            version = object[self.deleted_key]
+            if not HybridLogicalClock.is_valid(version):
+                logging.info(f"Firebase: invalid tombstone: {object}")
+                continue
+            version = typing.cast(str, version)
+            if self.tombstones.get(key, "") < version:
+                self.tombstones[key] = version
+                self.tombstone_keys[key] = fb_key
+        logging.info(f"Firebase: read {len(self.tombstones)} tombstones")
+
+    def _set_sharded_item(self, key: str, value: DatabaseRow | None) -> None:
+        """Change an item in the sharded layout, the shard is written by
+        ``flush()``"""
+        assert self.shards is not None
+        with self.lock:
+            if value is None:
+                self.data.pop(key, None)
+                self.tree.set(key, None)
+            else:
+                object = value.copy()
+                object.pop(self.header.term1, None)
+                self.data[key] = object
+                version = typing.cast(str, value.get(self.header.version, ""))
+                self.tree.set(key, version)
+            self.shards.dirty.add(self.shards.shard(key))
+
     def _status_string(self) -> str:
         if self.status == FirebaseStatus.NOT_INITIALIZED:
             return "NOT_INITIALIZED"
@@ -255,6 +689,8 @@ class FirebaseDatabase(TimeMixin):
             return "UNKNOWN"  # pragma: no cover
 
     def _update_item(self, fb_key: str, object: DatabaseRow) -> bool:
+        if not self._delete_summary():
+            return False
         try:
             logging.info(f"Firebase: updating item: {fb_key}, value: {object}")
             self.db.child(fb_key).update(object)
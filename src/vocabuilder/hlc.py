@@ -0,0 +1,116 @@
+"""Hybrid logical clock (HLC) versions. Each change to a term gets a version, and
+when the local database and firebase are synchronized the version that compares
+larger wins (last writer wins). Unlike the ``LastModified`` epoch seconds, the
+versions of two changes never compare equal, and a change made after another
+change was seen (for example a term updated from firebase and then modified
+here) gets a larger version even if the clocks of the devices are not in
+sync."""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# NOTE: A version. See HybridLogicalClock
+Version = str
+
+
+class HybridLogicalClock:
+    """A version is the string ``<physical>-<counter>-<node>``: the physical time in
+    milliseconds since the epoch as 12 hex digits, a counter as 4 hex digits, and
+    the id of the device that made the change. The versions compare as strings in
+    the order the changes were made, and the node id breaks the ties between
+    changes made on different devices in the same millisecond.
+
+    The physical time of the clock is the largest of the wall clock time and the
+    times of the versions passed to ``update()``, and the counter orders the
+    versions with the same physical time. So ``now()`` returns a version that is
+    larger than all the versions it has returned before, and all the versions it
+    has seen, also if the wall clock of this device is behind, or is set back.
+
+    :param node: The id of the device, see ``get_node_id()``. Only hex digits
+    """
+
+    counter_max = 0xFFFF
+    node_id_fn = "device_id.txt"
+    pattern = re.compile(r"[0-9a-f]{12}-[0-9a-f]{4}-[0-9a-f]*")
+
+    def __init__(self, node: str) -> None:
+        self.node = node
+        self.physical = 0
+        self.counter = 0
+        # NOTE: Versions are created on the main thread and by the firebase sync
+        #   maintenance task
+        self.lock = threading.Lock()
+
+    # public methods alfabetically sorted below
+    # ------------------------------------------
+
+    @staticmethod
+    def decode(version: Version) -> tuple[int, int, str]:
+        """The physical time (ms), the counter, and the node id of ``version``"""
+        physical, counter, node = version.split("-", 2)
+        return int(physical, 16), int(counter, 16), node
+
+    @staticmethod
+    def encode(physical: int, counter: int, node: str) -> Version:
+        return f"{physical:012x}-{counter:04x}-{node}"
+
+    @classmethod
+    def from_seconds(cls, seconds: int, node: str = "") -> Version:
+        """The version of a change made at epoch time ``seconds``, for data written
+        by older versions of the app, that only have the ``LastModified`` time. The
+        empty node id makes the version smaller than the versions of the changes
+        made in the same millisecond by devices that use the clock"""
+        return cls.encode(seconds * 1000, 0, node)
+
+    @classmethod
+    def get_node_id(cls, config_dir: Path) -> str:
+        """The id of this device. A random id is created and saved in the config
+        directory the first time it is needed"""
+        path = config_dir / cls.node_id_fn
+        if path.is_file():
+            node = path.read_text(encoding="utf-8").strip()
+            if re.fullmatch(r"[0-9a-f]+", node):
+                return node
+        node = uuid.uuid4().hex[:8]
+        path.write_text(node, encoding="utf-8")
+        return node
+
+    @classmethod
+    def is_valid(cls, version: object) -> bool:
+        return isinstance(version, str) and (cls.pattern.fullmatch(version) is not None)
+
+    def now(self) -> Version:
+        """A new version, larger than all the versions returned before and all the
+        versions passed to ``update()``"""
+        with self.lock:
+            wall = time.time_ns() // 1_000_000
+            if wall > self.physical:
+                self.physical = wall
+                self.counter = 0
+            elif self.counter < self.counter_max:
+                self.counter += 1
+            else:
+                # NOTE: The counter overflows if the wall clock is far behind the
+                #   versions seen, borrow a millisecond from the future
+                self.physical += 1
+                self.counter = 0
+            return self.encode(self.physical, self.counter, self.node)
+
+    @classmethod
+    def to_seconds(cls, version: Version) -> int:
+        """The epoch time of ``version``, in seconds"""
+        return cls.decode(version)[0] // 1000
+
+    def update(self, version: Version) -> None:
+        """Advance the clock to a version read from the database file or from
+        firebase, such that the next call to ``now()`` returns a larger version"""
+        physical, counter, _ = self.decode(version)
+        with self.lock:
+            if (physical, counter) > (self.physical, self.counter):
+                self.physical = physical
+                self.counter = counter
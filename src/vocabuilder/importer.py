@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import csv
+import itertools
+import logging
+import re
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from vocabuilder.local_database import LocalDatabase
+from vocabuilder.mixins import StringMixin
+from vocabuilder.type_aliases import DatabaseRow
+
+# NOTE: firebase_admin is slow to import, and is not needed when importing to the
+#   local database only (e.g. from the command line tool)
+if TYPE_CHECKING:  # pragma: no cover
+    from vocabuilder.firebase_database import FirebaseDatabase
+
+
+class ImportFormat:
+    """File formats supported by ``BulkImporter``. The ``Anki`` format is the plain
+    text export from Anki: tab separated, with ``#`` header lines and HTML in
+    the fields."""
+
+    CSV = "csv"
+    TSV = "tsv"
+    Anki = "anki"
+
+    suffixes = {".csv": CSV, ".tsv": TSV, ".txt": Anki}
+
+
+class ImportReport:
+    """Statistics for an import"""
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self.added = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.seconds = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"read {self.rows} rows, added {self.added} terms, skipped "
+            f"{self.duplicates} duplicates and {self.invalid} invalid rows "
+            f"in {self.seconds:.2f} seconds ({self.rows_per_second():.0f} rows/sec)"
+        )
+
+    def rows_per_second(self) -> float:
+        if self.seconds == 0:
+            return 0.0
+        return self.rows / self.seconds
+
+
+class BulkImporter(StringMixin):
+    """Import terms from large files. The input file is read as a stream, so the
+    memory used (in addition to the database itself) does not depend on the size
+    of the file. The rows are validated and checked against the existing terms in
+    batches, and the new terms in each batch are written to the database file with
+    a single buffered append. If ``firebase`` is given, the new terms in a batch are
+    pushed to firebase when the batch has been written to the database file,
+    ``firebase_batch_size`` terms per request.
+
+    :param database: The database to import into
+    :param firebase: If not ``None``, the firebase database to push the new terms to
+    :param batch_size: The number of rows that are read from the file at a time
+    :param firebase_batch_size: The number of terms pushed to firebase at a time
+    """
+
+    html_tag = re.compile(r"<[^>]+>")
+
+    def __init__(
+        self,
+        database: LocalDatabase,
+        firebase: FirebaseDatabase | None = None,
+        batch_size: int = 10000,
+        firebase_batch_size: int = 500,
+    ) -> None:
+        self.db = database
+        self.firebase = firebase
+        self.batch_size = batch_size
+        self.firebase_batch_size = firebase_batch_size
+        self.header = database.get_header()
+
+    def import_file(self, path: Path, file_format: str | None = None) -> ImportReport:
+        """Import the terms in ``path``. The first column is term1 and the second
+        column is term2, any other columns are ignored.
+
+        :param file_format: One of the ``ImportFormat`` constants. If ``None``, the
+          format is determined from the file name suffix
+        """
+        if file_format is None:
+            file_format = ImportFormat.suffixes.get(path.suffix, ImportFormat.CSV)
+        with open(path, "r", newline="", encoding="utf_8") as fp:
+            return self.import_rows(self.read_rows(fp, file_format))
+
+    def import_rows(self, rows: Iterable[list[str]]) -> ImportReport:
+        report = ImportReport()
+        start = time.perf_counter()
+        now = self.db.epoch_in_seconds()
+        rows = iter(rows)
+        while batch := list(itertools.islice(rows, self.batch_size)):
+            report.rows += len(batch)
+            new_items: list[DatabaseRow] = []
+            items = self._new_items(batch, report, now, new_items)
+            report.added += self.db.add_items(items)
+            if self.firebase is not None:
+                for i in range(0, len(new_items), self.firebase_batch_size):
+                    self.firebase.push_items(
+                        new_items[i : i + self.firebase_batch_size]
+                    )
+        report.seconds = time.perf_counter() - start
+        logging.info(f"Import: {report}")
+        return report
+
+    def read_rows(self, fp: Iterable[str], file_format: str) -> Iterator[list[str]]:
+        if file_format == ImportFormat.CSV:
+            return csv.reader(fp)
+        if file_format == ImportFormat.TSV:
+            return csv.reader(fp, delimiter="\t")
+        lines = (line for line in fp if not line.startswith("#"))
+        rows = csv.reader(lines, delimiter="\t")
+        return ([self.html_tag.sub("", field) for field in row] for row in rows)
+
+    def _new_items(
+        self,
+        batch: list[list[str]],
+        report: ImportReport,
+        now: int,
+        new_items: list[DatabaseRow],
+    ) -> Iterator[DatabaseRow]:
+        """The items for the valid rows with new terms in ``batch``. If the terms
+        are pushed to firebase, the items are also collected in ``new_items``"""
+        # NOTE: This generator is consumed by LocalDatabase.add_items(), which adds
+        #   each item to the database before the next item is requested. Hence,
+        #   duplicates within the file are also detected by the check against
+        #   the database.
+        for row in batch:
+            if not self._is_valid(row):
+                report.invalid += 1
+                continue
+            if self.db.check_term1_exists(row[0]):
+                report.duplicates += 1
+                continue
+            item: DatabaseRow = {
+                self.header.term1: row[0],
+                self.header.term2: row[1],
+                self.header.test_delay: 0,
+                self.header.last_test: now,
+            }
+            if self.firebase is not None:
+                new_items.append(item)
+            yield item
+
+    def _is_valid(self, row: list[str]) -> bool:
+        if len(row) < 2:
+            return False
+        return not any(self.check_space_or_empty_str(field) for field in row[:2])
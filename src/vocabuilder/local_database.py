@@ -1,18 +1,61 @@
 from __future__ import annotations
 
+import itertools
+import json
 import logging
+import os
 import random
 import shutil
+import threading
 import typing
+from concurrent.futures import Future
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator
 
 import git
 
+from vocabuilder.append_queue import AppendQueue
+from vocabuilder.catalog import VocabularyCatalog, VocabularyInfo
 from vocabuilder.config import Config
-from vocabuilder.constants import TermStatus
-from vocabuilder.csv_helpers import CsvDatabaseHeader, CSVwrapper
-from vocabuilder.exceptions import LocalDatabaseException
+from vocabuilder.constants import Grade, TermStatus
+from vocabuilder.csv_helpers import CsvDatabaseHeader, CSVwrapper, CSVwrapperReader
+from vocabuilder.events import DatabaseEvent, DatabaseEventType, DatabaseListener
+from vocabuilder.exceptions import LocalDatabaseException, TaskCancelledException
+from vocabuilder.hlc import HybridLogicalClock, Version
+from vocabuilder.lock import VocabularyLock
 from vocabuilder.mixins import TimeMixin
-from vocabuilder.type_aliases import DatabaseRow, DatabaseType, DatabaseValue
+from vocabuilder.parallel_loader import ChunkResult, ParallelLoader
+from vocabuilder.profiling import profiler
+from vocabuilder.review_log import Review, ReviewLog
+from vocabuilder.scheduler import get_scheduler
+from vocabuilder.tombstones import TombstoneIndex
+from vocabuilder.type_aliases import DatabaseRow, DatabaseType
+
+# NOTE: PyQt6 is not needed by the command line tool, see _submit_maintenance()
+if TYPE_CHECKING:  # pragma: no cover
+    from vocabuilder.maintenance import CancelToken, Finish, MaintenanceScheduler
+
+
+class RecoveryReport:
+    """Corrupt rows that were skipped when the database file was read, for
+    example a row that was only partly written because of a power loss. The rows
+    are saved in a file in the quarantine directory.
+
+    :param rows: The number of corrupt rows
+    :param size: The total size of the rows in bytes
+    :param path: The file the rows were saved to
+    """
+
+    def __init__(self, rows: int, size: int, path: Path) -> None:
+        self.rows = rows
+        self.size = size
+        self.path = path
+
+    def __str__(self) -> str:
+        return (
+            f"Skipped {self.rows} corrupt rows ({self.size} bytes) in the database "
+            f"file. The rows were saved to {self.path}"
+        )
 
 
 class LocalDatabase(TimeMixin):
@@ -23,24 +66,78 @@ class LocalDatabase(TimeMixin):
     backup_dirname = "backup"
     git_dirname = ".git"
     active_voca_info_fn = "active_db.txt"
-
-    def __init__(self, config: "Config", voca_name: str):
+    quarantine_dirname = "quarantine"
+    scheduler_fn = "scheduler.json"
+    # NOTE: The number of rows read between the calls to the progress callback of
+    #   load()
+    progress_rows = 10000
+
+    # NOTE: update_active: If True, remember voca_name as the vocabulary to open
+    #   the next time the app is started
+    # NOTE: read_only: If True, the database is opened without taking the writer
+    #   lock, see VocabularyLock. No files are modified, and reload() can be used to
+    #   read the changes made by the writer
+    # NOTE: maintenance: If given, the backup, compaction and catalog update are
+    #   run by the scheduler when the app is idle, instead of when the database is
+    #   opened
+    # NOTE: defer_load: If True, the database file is not read by the constructor.
+    #   The caller must call load() (e.g. on a worker thread) and then
+    #   finish_loading(), see DatabaseLoader
+    def __init__(
+        self,
+        config: "Config",
+        voca_name: str,
+        update_active: bool = True,
+        read_only: bool = False,
+        maintenance: MaintenanceScheduler | None = None,
+        defer_load: bool = False,
+    ):
         self.config = config
         self.voca_name = voca_name
+        self.read_only = read_only
+        self.maintenance = maintenance
         self.datadir = config.get_data_dir() / self.database_dir / voca_name
-        self.datadir.mkdir(parents=True, exist_ok=True)
         self.db: DatabaseType = {}
+        self.listeners: list[DatabaseListener] = []
         self.status = TermStatus()
         self.header = CsvDatabaseHeader()
         self.dbname = self.datadir / self.database_fn
         self.csvwrapper = CSVwrapper(self.dbname)
         self.backupdir = self.datadir / self.backup_dirname
-        self._maybe_create_db()
-        self._maybe_create_backup_repo()
-        self._read_database()
-        self.create_backup()
-        self._write_cleaned_up()
-        self._update_active_vocabulary_info()
+        self.scheduler = get_scheduler(config)
+        self.lock = VocabularyLock(self.datadir)
+        self.append_queue = AppendQueue(config)
+        self.catalog = VocabularyCatalog(self.datadir.parent)
+        # NOTE: The position in the database file after the last row that was read,
+        #   and the inode of the file (it changes when the file is rewritten)
+        self.db_offset = 0
+        self.db_inode = 0
+        self.recovery: RecoveryReport | None = None
+        # NOTE: Counts the changes to self.db, see _emit()
+        self.changes = 0
+        self.backup_lock = threading.Lock()
+        self.update_active = update_active
+        self.loaded = False
+        # NOTE: True if load() ran the maintenance tasks, instead of leaving them
+        #   to the scheduler
+        self.maintained = False
+        if read_only:
+            self._check_read_only()
+        else:
+            self.datadir.mkdir(parents=True, exist_ok=True)
+            self.lock.acquire()
+            self.clock = HybridLogicalClock(
+                HybridLogicalClock.get_node_id(config.get_config_dir())
+            )
+            self.review_log = ReviewLog(self.datadir, append_queue=self.append_queue)
+            self.tombstones = TombstoneIndex(
+                self.datadir, append_queue=self.append_queue
+            )
+            self._maybe_create_db()
+            self._maybe_create_backup_repo()
+        if not defer_load:
+            self.load()
+            self.finish_loading()
 
     # public methods alfabetically sorted below
     # ------------------------------------------
@@ -56,17 +153,69 @@ class LocalDatabase(TimeMixin):
         The ``header.status`` and ``header.last_modified`` keys are added automatically, then
         the dict is pushed to the database
         """
-        item[self.header.status] = self.status.NOT_DELETED
-        item[self.header.last_modified] = self.epoch_in_seconds()  # epoch
-        self._validate_item_content(item)
-        db_object = item.copy()
-        # NOTE: according to the type hints term1 will have type str | int | None,
-        #   but we can be sure that term1 will always be of type str, so we skip
-        #   the mypy type check below
-        term1 = typing.cast(str, db_object.pop(self.header.term1))
-        self.db[term1] = db_object
-        self.csvwrapper.append_line(item)
-        logging.info("ADDED: " + self._item_to_string(item))
+        self._assert_writable()
+        term1 = self._add_item(item)
+        self._emit(DatabaseEvent(DatabaseEventType.ADDED, term1, self.get_term2(term1)))
+
+    def add_items(self, items: Iterable[DatabaseRow]) -> int:
+        """Add many new items to the database. The items are consumed one at a time
+        (``items`` can be a generator) and written to the database file with a
+        single buffered append.
+
+        :param items: dicts with the same keys as for ``add_item()``. Unlike
+          ``add_item()`` the items are not validated: the caller must make sure that
+          the values have the correct types, and that term1 does not already exist
+          in the database, see ``BulkImporter``
+        :return: The number of items added
+        """
+        self._assert_writable()
+        self.flush()
+        now = self.epoch_in_seconds()
+        count = 0
+        with self.csvwrapper.open_for_append() as fp:
+            for item in items:
+                item[self.header.status] = self.status.NOT_DELETED
+                item[self.header.last_modified] = now
+                item[self.header.version] = self.clock.now()
+                fp.writeline(item)
+                db_object = item.copy()
+                term1 = typing.cast(str, db_object.pop(self.header.term1))
+                self.db[term1] = db_object
+                self._emit(
+                    DatabaseEvent(
+                        DatabaseEventType.ADDED,
+                        term1,
+                        typing.cast(str, db_object[self.header.term2]),
+                    )
+                )
+                count += 1
+        self._advance_offset()
+        self._update_catalog()
+        logging.info(f"ADDED {count} items")
+        return count
+
+    def add_listener(self, listener: DatabaseListener) -> None:
+        """Register a callback that is called with a ``DatabaseEvent`` each time
+        a term is added, updated, deleted, or renamed"""
+        self.listeners.append(listener)
+
+    def apply_tombstone(self, term1: str, version: Version) -> bool:
+        """Apply a deletion made on another device: save the tombstone, and delete
+        ``term1`` if it was not modified after the deletion, see
+        ``TombstoneIndex``. Returns True if the term was deleted
+
+        :param version: The version of the deletion, see ``HybridLogicalClock``
+        """
+        self._assert_writable()
+        self.clock.update(version)
+        self.tombstones.add(term1, version)
+        if (term1 not in self.db) or not self.is_deleted(
+            term1, typing.cast(str, self.db[term1][self.header.version])
+        ):
+            return False
+        self._delete_item(term1, tombstone=None)
+        self._emit(DatabaseEvent(DatabaseEventType.DELETED, term1))
+        return True
 
     def assign_item(self, term1: str, item: DatabaseRow) -> None:
         """Replace, add, or delete a new item to the database. The item
@@ -75,40 +224,97 @@ class LocalDatabase(TimeMixin):
 
         :param item: a dict with the following keys:
           ``header.status``, ``header.term2``,
-          ``header.test_delay``, ``header.last_test``, and
-          ``header.last_modified``. Here ``header`` refers to the
+          ``header.test_delay``, ``header.last_test``, ``header.last_modified``,
+          and ``header.version``. Here ``header`` refers to the
           ``CsvDatabaseHeader`` object.
         """
+        self._assert_writable()
         file_obj = item.copy()
         file_obj[self.header.term1] = term1
         self._validate_item_content(file_obj)
+        self.clock.update(typing.cast(str, item[self.header.version]))
+        event_type = DatabaseEventType.ADDED
+        if term1 in self.db:
+            event_type = DatabaseEventType.UPDATED
         db_object = item.copy()
         self.db[term1] = db_object
-        self.csvwrapper.append_line(file_obj)
+        self._append_line(file_obj)
         logging.info("ASSIGNED: " + self._item_to_string(file_obj))
+        self._emit(DatabaseEvent(event_type, term1, self.get_term2(term1)))
+
+    def check_term1_exceeds_test_delay(self, term1: str) -> bool:
+        """Is the term ready for practice? Returns False if the term does not
+        exist."""
+        if term1 not in self.db:
+            return False
+        return self._exceeds_test_delay(self.db[term1], self.epoch_in_seconds())
 
     def check_term1_exists(self, term1: str) -> bool:
         return term1 in self.db
 
+    def close(self) -> None:
+        """Write the queued changes, save the metadata in the vocabulary catalog and
+        release the writer lock. The object should not be used after this"""
+        if self.maintenance is not None:
+            self.maintenance.cancel(self.voca_name)
+        try:
+            self.append_queue.close()
+        except OSError as exc:
+            logging.error(f"Changes to {self.dbname} were lost: {exc}")
+        if self.lock.acquired and self.loaded:
+            self._update_catalog()
+        self.lock.release()
+
     def create_backup(self) -> None:
-        shutil.copy(str(self.dbname), str(self.backupdir))
-        repo = git.Repo(str(self.backupdir))
-        index = repo.index
-        index.add([self.dbname.name])
-        author = git.Actor("vocabuilder", "hakon.hagland@gmail.com")
-        committer = author
-        index.commit("Startup commit", author=author, committer=committer)
-        logging.info(f"Created backup in {self.backupdir}")
+        self._assert_writable()
+        self.flush()
+        self._commit_backup()
 
     def delete_item(self, term1: str) -> None:
-        if term1 not in self.db:
-            raise LocalDatabaseException(f"Term1 '{term1}' does not exist in database")
-        item = self.db[term1].copy()
-        item[self.header.status] = self.status.DELETED
-        item[self.header.term1] = term1
-        self.csvwrapper.append_line(item)
-        logging.info("DELETED: " + self._item_to_string(item))
-        del self.db[term1]
+        self._assert_writable()
+        self._delete_item(term1, tombstone=self.clock.now())
+        self._emit(DatabaseEvent(DatabaseEventType.DELETED, term1))
+
+    def finish_loading(self) -> None:
+        """Register the maintenance tasks with the scheduler, and remember the
+        vocabulary as the active vocabulary. Called on the main thread after
+        ``load()``"""
+        self.loaded = True
+        if self.read_only:
+            return
+        if not self.maintained:
+            self._register_maintenance()
+        if self.update_active:
+            self._update_active_vocabulary_info()
+
+    def flush(self) -> None:
+        """Wait until all the changes have been written to disk, see
+        ``AppendQueue``"""
+        try:
+            self.append_queue.flush()
+        except OSError as exc:
+            raise LocalDatabaseException(
+                f"Could not write changes to {self.dbname}: {exc}"
+            ) from exc
+        # NOTE: The rows appended by this object are already in self.db, so
+        #   reload() should not read them again
+        self.db_offset = max(self.db_offset, self.append_queue.get_end(self.dbname))
+
+    def get_info(self) -> VocabularyInfo:
+        """The metadata saved in the vocabulary catalog"""
+        stat = self.dbname.stat()
+        now = self.epoch_in_seconds()
+        # NOTE: A copy, since this is also called on a worker thread, see
+        #   _catalog_task()
+        rows = list(self.db.values())
+        return VocabularyInfo(
+            self.voca_name,
+            path=str(self.datadir),
+            terms=len(rows),
+            due=sum(1 for values in rows if self._exceeds_test_delay(values, now)),
+            size=stat.st_size,
+            modified=stat.st_mtime,
+        )
 
     def get_items(self) -> DatabaseType:
         return self.db
@@ -118,23 +324,15 @@ class LocalDatabase(TimeMixin):
 
     def get_pairs_exceeding_test_delay(self) -> list[tuple[str, str]]:
         """Get all candidates for a practice session."""
-        now = self.epoch_in_seconds()
-        keys = self.get_term1_list()
-        pairs = []
-        for key in keys:
-            values = self.db[key]
-            last_test = typing.cast(int, values[self.header.last_test])
-            candidate = False
-            days_since_last_test = self.get_epoch_diff_in_days(int(last_test), now)
-            assert isinstance(values[self.header.test_delay], int)
-            # NOTE: cast from type str | int | None -> int
-            test_delay = typing.cast(int, values[self.header.test_delay])
-            if days_since_last_test >= test_delay:
-                candidate = True
-            if candidate:
-                assert isinstance(self.header.term2, str)
-                term2 = typing.cast(str, values[self.header.term2])
-                pairs.append((key, term2))
+        with profiler.timer("database.due"):
+            now = self.epoch_in_seconds()
+            keys = self.get_term1_list()
+            pairs = []
+            for key in keys:
+                values = self.db[key]
+                if self._exceeds_test_delay(values, now):
+                    term2 = typing.cast(str, values[self.header.term2])
+                    pairs.append((key, term2))
         return pairs
 
     def get_random_pair(self) -> tuple[str, str] | None:
@@ -165,41 +363,400 @@ class LocalDatabase(TimeMixin):
     def get_term2_list(self) -> list[str]:
         return [self.get_term2(term1) for term1 in self.get_term1_list()]
 
+    def get_tombstone_horizon(self) -> int:
+        """Tombstones for terms deleted before this epoch time are removed, see
+        ``KeepDays`` in the ``Tombstones`` section of the config file"""
+        days = self.config.config.getfloat("Tombstones", "KeepDays")
+        return self.epoch_in_seconds() - int(days * 24 * 60 * 60)
+
+    def get_tombstones(self) -> dict[str, Version]:
+        """Maps the deleted terms to the versions of the deletions"""
+        return self.tombstones.get_items()
+
     def get_voca_name(self) -> str:
         return self.voca_name
 
+    def is_deleted(self, term1: str, version: Version) -> bool:
+        """True if ``version`` of ``term1`` has been deleted, on this device or on
+        another device"""
+        return self.tombstones.supersedes(term1, version)
+
+    def iter_pairs_exceeding_test_delay(self) -> Iterator[tuple[str, str]]:
+        """Iterate over all candidates for a practice session. Unlike
+        ``get_pairs_exceeding_test_delay()`` the pairs are not sorted, and no list of
+        pairs is built."""
+        now = self.epoch_in_seconds()
+        for key, values in self.db.items():
+            if self._exceeds_test_delay(values, now):
+                yield key, typing.cast(str, values[self.header.term2])
+
+    def load(self, progress: Callable[[int], None] | None = None) -> None:
+        """Read the database file and the review log. This does not use the GUI or
+        the scheduler, so it can run on a worker thread, see ``DatabaseLoader``.
+
+        :param progress: Called with the number of terms read so far, for each
+          ``progress_rows`` rows (or each chunk, if the file is parsed in parallel)
+        """
+        if self.read_only:
+            self._load_read_only(progress)
+            return
+        with profiler.timer("database.parse"):
+            self._read_database(progress)
+        self._update_clock()
+        with profiler.timer("database.review_log"):
+            self._apply_review_log()
+        with profiler.timer("database.reschedule"):
+            rescheduled = self._maybe_reschedule()
+        if (self.maintenance is None) or rescheduled or (self.recovery is not None):
+            # NOTE: The rescheduled test delays are only saved in the cleaned up
+            #   file, and a partly written row must be removed before new rows are
+            #   appended after it, so this cannot wait until the app is idle
+            self._maintain()
+            self.maintained = True
+
+    def make_active(self) -> None:
+        """Remember the vocabulary as the vocabulary to open the next time the app
+        is started. Does nothing if the database is opened read-only"""
+        if not self.read_only:
+            self._update_active_vocabulary_info()
+
+    def next_interval(self, term1: str, grade: int) -> int:
+        """The number of days until ``term1`` should be practiced again, as computed
+        by the scheduler, if the term is graded ``grade`` now"""
+        history = self.review_log.get_history(term1)
+        return self.scheduler.next_interval(history, grade, self.epoch_in_seconds())
+
+    def reload(self) -> int:
+        """Read the changes that other processes have made since the database was
+        read, for example by the writer when this database is opened read-only.
+        Only the rows appended since the last read are parsed, and rows that are
+        being written are not read until they are complete. The listeners are
+        notified about the changes, see ``DatabaseWatcher``.
+
+        :return: The number of rows read from the database file
+        """
+        if not self.read_only:
+            self.flush()
+        old_db: DatabaseType | None = None
+        with self.csvwrapper.open_for_read(
+            self.header, self.db_offset, complete_only=True, inode=self.db_inode
+        ) as fp:
+            if fp.restarted:
+                # NOTE: The writer has replaced the file with a cleaned up version
+                old_db = self.db
+                self.db = {}
+            rows = self._read_rows(fp, emit=(old_db is None))
+        reviews = self.review_log.reload()
+        self.tombstones.reload()
+        if old_db is not None:
+            self._apply_review_log()
+            self._emit_differences(old_db)
+        else:
+            for term1, review in reviews:
+                if self._apply_review(term1, review):
+                    self._emit(
+                        DatabaseEvent(
+                            DatabaseEventType.UPDATED, term1, self.get_term2(term1)
+                        )
+                    )
+        if rows > 0:
+            logging.info(f"Reloaded {rows} rows from local database {self.dbname}")
+        return rows
+
+    def remove_listener(self, listener: DatabaseListener) -> None:
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def rename_item(self, old_term1: str, item: DatabaseRow) -> None:
+        """Give an existing term a new name (and possibly a new translation).
+
+        :param old_term1: The current name of the term
+        :param item: a dict with the same keys as for ``add_item()``. The new name
+          of the term is given by the ``header.term1`` key
+        """
+        self._assert_writable()
+        # NOTE: No tombstone if only the translation is changed, the term is not
+        #   deleted on the other devices
+        renamed = item[self.header.term1] != old_term1
+        self._delete_item(old_term1, self.clock.now() if renamed else None)
+        new_term1 = self._add_item(item)
+        self._emit(
+            DatabaseEvent(
+                DatabaseEventType.RENAMED,
+                new_term1,
+                self.get_term2(new_term1),
+                old_term1=old_term1,
+            )
+        )
+
     def update_item(self, term1: str, item: DatabaseRow) -> None:
+        self._assert_writable()
         self._assert_term1_exists(term1)
         self.db[term1] = item.copy()
         self._update_dbfile_item(term1)
+        self._emit(
+            DatabaseEvent(DatabaseEventType.UPDATED, term1, self.get_term2(term1))
+        )
+
+    def update_retest_value(
+        self, term1: str, delay: int, grade: int = Grade.MANUAL
+    ) -> None:
+        """Set a delay (in days) until next time this term should be practiced, and
+        add the practice result to the review log.
 
-    def update_retest_value(self, term1: str, delay: int) -> None:
-        """Set a delay (in days) until next time this term should be practiced"""
+        :param grade: How well the user remembered the term, see ``Grade``
+        """
+        self._assert_writable()
         self._assert_term1_exists(term1)
         # NOTE: we can assume that delay is a non-negative integer
         assert delay >= 0
+        now = self.epoch_in_seconds()
         self.db[term1][self.header.test_delay] = delay
-        self.db[term1][self.header.last_test] = self.epoch_in_seconds()
-        self._update_dbfile_item(term1)
+        self.db[term1][self.header.last_test] = now
+        self.db[term1][self.header.last_modified] = now
+        self.db[term1][self.header.version] = self.clock.now()
+        # NOTE: The result is only written to the review log, not to the database
+        #   file. See _apply_review_log()
+        self.review_log.append(term1, Review(now, grade, delay))
+        logging.info(
+            f"REVIEWED: term1 = '{term1}', delay = '{delay}', grade = '{grade}'"
+        )
+        self._emit(
+            DatabaseEvent(DatabaseEventType.UPDATED, term1, self.get_term2(term1))
+        )
 
     # private methods alfabetically sorted below
     # -------------------------------------------
 
+    def _add_item(self, item: DatabaseRow) -> str:
+        """Add a new item to the database without notifying the listeners.
+
+        :return: the term1 of the added item"""
+        item[self.header.status] = self.status.NOT_DELETED
+        item[self.header.last_modified] = self.epoch_in_seconds()  # epoch
+        item[self.header.version] = self.clock.now()
+        self._validate_item_content(item)
+        db_object = item.copy()
+        # NOTE: according to the type hints term1 will have type str | int | None,
+        #   but we can be sure that term1 will always be of type str, so we skip
+        #   the mypy type check below
+        term1 = typing.cast(str, db_object.pop(self.header.term1))
+        self.db[term1] = db_object
+        self._append_line(item)
+        logging.info("ADDED: " + self._item_to_string(item))
+        return term1
+
+    def _advance_offset(self) -> None:
+        # NOTE: The rows appended by this object are already in self.db, so
+        #   reload() should not read them again
+        self.db_offset = self.dbname.stat().st_size
+
+    def _append_line(self, item: DatabaseRow) -> Future[None]:
+        return self.append_queue.append(self.dbname, self.csvwrapper.format_line(item))
+
+    def _apply_review_log(self) -> None:
+        """Practice results are not written to the database file, so the test delays
+        read from the file might be out of date. Update them from the last review
+        of each term if it is newer than the last test in the file. (The review
+        is older if, for example, the term was deleted and added again, and it has
+        the same timestamp if it has already been written to the file by
+        ``_write_cleaned_up()``.)"""
+        for term1 in self.review_log.terms():
+            self._apply_review(term1, self.review_log.get_history(term1)[-1])
+
+    def _apply_review(self, term1: str, review: Review) -> bool:
+        """Returns True if the test delay of the term was updated"""
+        if term1 not in self.db:
+            return False
+        values = self.db[term1]
+        if review.timestamp <= typing.cast(int, values[self.header.last_test]):
+            return False
+        values[self.header.test_delay] = review.interval
+        values[self.header.last_test] = review.timestamp
+        last_modified = typing.cast(int, values[self.header.last_modified])
+        values[self.header.last_modified] = max(last_modified, review.timestamp)
+        # NOTE: The review log has no versions, and the review log is also applied
+        #   by read-only databases, that do not have a clock
+        version = typing.cast(str, values[self.header.version])
+        values[self.header.version] = max(
+            version, HybridLogicalClock.from_seconds(review.timestamp)
+        )
+        return True
+
+    def _apply_row(self, row: DatabaseRow, count: int, emit: bool) -> None:
+        # NOTE: It should be impossible (?) that len(row) != len(header) here,
+        #  due to the checks in fixup_datatypes() in CSVwrapperReader
+        assert len(row) == len(self.header.header)
+        status = row[self.header.status]
+        term1 = typing.cast(str, row[self.header.term1])
+        if status == self.status.NOT_DELETED:
+            event_type = DatabaseEventType.ADDED
+            if term1 in self.db:
+                event_type = DatabaseEventType.UPDATED
+            self.db[term1] = {
+                self.header.term2: row[self.header.term2],
+                self.header.status: status,
+                self.header.test_delay: row[self.header.test_delay],
+                self.header.last_test: row[self.header.last_test],
+                self.header.last_modified: row[self.header.last_modified],
+                self.header.version: row[self.header.version],
+            }
+            if emit:
+                self._emit(DatabaseEvent(event_type, term1, self.get_term2(term1)))
+        elif status == self.status.DELETED:
+            if term1 in self.db:
+                del self.db[term1]
+                if emit:
+                    self._emit(DatabaseEvent(DatabaseEventType.DELETED, term1))
+        else:
+            raise LocalDatabaseException(
+                f"Unexpected value for status in row {count} after offset "
+                f"{self.db_offset} in file {self.csvwrapper.filename}"
+            )
+
+    def _assert_writable(self) -> None:
+        if self.read_only:
+            raise LocalDatabaseException(
+                f"Vocabulary '{self.voca_name}' is opened read-only"
+            )
+
     def _assert_term1_exists(self, term1: str) -> None:
         if term1 not in self.db:
             raise LocalDatabaseException(
                 f"Unexpected: trying to update non-existent term '{term1}'"
             )
 
+    def _backup_task(self, token: CancelToken) -> Finish:
+        self.append_queue.flush()
+        token.check()
+        self._commit_backup()
+        return None
+
+    def _catalog_task(self, token: CancelToken) -> Finish:
+        info = self.get_info()
+        return lambda: self.catalog.update(info)
+
+    def _check_read_only(self) -> None:
+        if not self.dbname.is_file():
+            raise LocalDatabaseException(
+                f"CSV database file {str(self.dbname)} does not exist"
+            )
+        self.review_log = ReviewLog(self.datadir, read_only=True)
+        self.tombstones = TombstoneIndex(self.datadir, read_only=True)
+
+    def _commit_backup(self) -> None:
+        # NOTE: The backup button can be pressed while the maintenance task is
+        #   committing a backup
+        with self.backup_lock:
+            shutil.copy(str(self.dbname), str(self.backupdir))
+            repo = git.Repo(str(self.backupdir))
+            index = repo.index
+            index.add([self.dbname.name])
+            author = git.Actor("vocabuilder", "hakon.hagland@gmail.com")
+            committer = author
+            index.commit("Startup commit", author=author, committer=committer)
+        logging.info(f"Created backup in {self.backupdir}")
+
+    def _compaction_task(self, token: CancelToken) -> Finish:
+        """Write a cleaned up version of the database file on a worker thread. The
+        file is replaced on the main thread, unless the database was changed while
+        it was written (then the task is submitted again)"""
+        changes = self.changes
+        tmpname = self.dbname.with_suffix(".tmp")
+        try:
+            self._write_compacted(tmpname, self.db.copy(), token)
+        except TaskCancelledException:
+            tmpname.unlink()
+            raise
+
+        def finish() -> None:
+            if self.changes != changes:
+                tmpname.unlink()
+                logging.info("Database changed during compaction, will retry")
+                self._submit_maintenance("compaction", self._compaction_task, 1)
+                return
+            self.flush()
+            self._replace_compacted(tmpname)
+
+        return finish
+
+    def _delete_item(self, term1: str, tombstone: Version | None) -> None:
+        """Delete ``term1`` without notifying the listeners.
+
+        :param tombstone: The version of the deletion, saved in the tombstone
+          index. If None, no tombstone is saved
+        """
+        if term1 not in self.db:
+            raise LocalDatabaseException(f"Term1 '{term1}' does not exist in database")
+        item = self.db[term1].copy()
+        item[self.header.status] = self.status.DELETED
+        item[self.header.term1] = term1
+        if tombstone is not None:
+            item[self.header.version] = tombstone
+        self._append_line(item)
+        logging.info("DELETED: " + self._item_to_string(item))
+        del self.db[term1]
+        if tombstone is not None:
+            self.tombstones.add(term1, tombstone)
+
+    def _emit(self, event: DatabaseEvent) -> None:
+        self.changes += 1
+        # NOTE: iterate over a copy such that a listener can remove itself
+        for listener in list(self.listeners):
+            listener(event)
+
+    def _emit_differences(self, old_db: DatabaseType) -> None:
+        """Notify the listeners about the differences between ``old_db`` and the
+        current database"""
+        for term1 in old_db:
+            if term1 not in self.db:
+                self._emit(DatabaseEvent(DatabaseEventType.DELETED, term1))
+        for term1, values in self.db.items():
+            if term1 not in old_db:
+                event_type = DatabaseEventType.ADDED
+            elif values != old_db[term1]:
+                event_type = DatabaseEventType.UPDATED
+            else:
+                continue
+            self._emit(DatabaseEvent(event_type, term1, self.get_term2(term1)))
+
+    def _exceeds_test_delay(self, values: DatabaseRow, now: int) -> bool:
+        last_test = typing.cast(int, values[self.header.last_test])
+        # NOTE: A term practiced on a device with a clock that is ahead of this
+        #   clock can have a last test time in the future
+        days_since_last_test = self.get_epoch_diff_in_days(min(last_test, now), now)
+        assert isinstance(values[self.header.test_delay], int)
+        # NOTE: cast from type str | int | None -> int
+        test_delay = typing.cast(int, values[self.header.test_delay])
+        return days_since_last_test >= test_delay
+
     def _item_to_string(self, item: DatabaseRow) -> str:
         return (
             f"term1 = '{item[self.header.term1]}', "
             f"term2 = '{item[self.header.term2]}', "
             f"delay = '{item[self.header.test_delay]}', "
             f"last_test = '{item[self.header.last_test]}', "
-            f"last_modified = '{item[self.header.last_modified]}'"
+            f"last_modified = '{item[self.header.last_modified]}', "
+            f"version = '{item[self.header.version]}'"
         )
 
+    def _load_read_only(self, progress: Callable[[int], None] | None) -> None:
+        if self._read_parallel(complete_only=True, progress=progress) is None:
+            with self.csvwrapper.open_for_mmap_read(
+                self.header, complete_only=True
+            ) as fp:
+                self._read_rows(fp, progress=progress)
+        self._apply_review_log()
+        logging.info(f"Opened local database {self.dbname} read-only")
+
+    def _maintain(self) -> None:
+        with profiler.timer("database.backup"):
+            self.create_backup()
+        with profiler.timer("database.compaction"):
+            self._write_cleaned_up()
+        with profiler.timer("database.catalog"):
+            self._update_catalog()
+
     def _maybe_create_backup_repo(self) -> None:
         if self.backupdir.exists():
             if self.backupdir.is_file():
@@ -226,37 +783,145 @@ class LocalDatabase(TimeMixin):
                 )
         else:
             self.csvwrapper.append_row(
-                typing.cast(list[DatabaseValue], self.header.header)
+                self.csvwrapper.header_row()
             )  # This will create the file
 
-    def _read_database(self) -> None:
-        with self.csvwrapper.open_for_read(self.header) as fp:
-            for lineno, row in enumerate(fp, start=1):
-                # NOTE: It should be impossible (?) that len(row) != len(header) here,
-                #  due to the checks in fixup_datatypes() in CSVwrapperReader
-                assert len(row) == len(self.header.header)
-                status = row[self.header.status]
-                term1 = typing.cast(str, row[self.header.term1])
-                if status == self.status.NOT_DELETED:
-                    self.db[term1] = {
-                        self.header.term2: row[self.header.term2],
-                        self.header.status: status,
-                        self.header.test_delay: row[self.header.test_delay],
-                        self.header.last_test: row[self.header.last_test],
-                        self.header.last_modified: row[self.header.last_modified],
-                    }
-                elif status == self.status.DELETED:
-                    if term1 in self.db:
-                        del self.db[term1]
-                else:
-                    raise LocalDatabaseException(
-                        f"Unexpected value for status at line {lineno} in file "
-                        f"{self.csvwrapper.filename}"
-                    )
+    def _maybe_reschedule(self) -> bool:
+        """If the scheduler or its parameters have changed since the last time the
+        database was opened, recompute the test delays of all practiced terms.
+        Returns True if the test delays were recomputed"""
+        path = self.datadir / self.scheduler_fn
+        info = {"name": self.scheduler.name, **self.scheduler.parameters()}
+        rescheduled = False
+        if path.is_file():
+            if json.loads(path.read_text(encoding="utf-8")) != info:
+                self._reschedule()
+                rescheduled = True
+        path.write_text(json.dumps(info), encoding="utf-8")
+        return rescheduled
+
+    def _quarantine(self, bad_rows: list[tuple[int, int]]) -> None:
+        """Save the corrupt rows to a file in the quarantine directory. They are
+        removed from the database file by ``_write_cleaned_up()``"""
+        quarantine_dir = self.datadir / self.quarantine_dirname
+        quarantine_dir.mkdir(exist_ok=True)
+        path = quarantine_dir / f"database-{self.epoch_in_seconds()}.csv"
+        size = 0
+        with open(self.dbname, "rb") as src, open(path, "ab") as dest:
+            for start, end in bad_rows:
+                src.seek(start)
+                size += dest.write(src.read(end - start))
+        self.recovery = RecoveryReport(len(bad_rows), size, path)
+        logging.warning(str(self.recovery))
+
+    def _read_chunks(
+        self,
+        results: list[ChunkResult],
+        progress: Callable[[int], None] | None = None,
+    ) -> list[tuple[int, int]]:
+        """Apply the rows parsed by ``ParallelLoader`` in file order. Returns the
+        corrupt rows"""
+        bad_rows: list[tuple[int, int]] = []
+        count = 0
+        for result in results:
+            for row in result.rows:
+                self._apply_row(row, count, emit=False)
+            count += result.count
+            bad_rows.extend(result.bad_rows)
+            self.db_offset = result.offset
+            if progress is not None:
+                progress(len(self.db))
+            if result.offset < result.end:
+                # NOTE: reading stopped early (complete_only), the rest of the
+                #   file is read by reload()
+                break
+        profiler.count("database.rows_read", count)
+        self.db_inode = results[0].inode
+        return bad_rows
+
+    def _read_database(self, progress: Callable[[int], None] | None = None) -> None:
+        bad_rows = self._read_parallel(progress=progress)
+        if bad_rows is None:
+            with self.csvwrapper.open_for_mmap_read(self.header) as fp:
+                self._read_rows(fp, progress=progress)
+            bad_rows = fp.bad_rows
+        if len(bad_rows) > 0:
+            self._quarantine(bad_rows)
         logging.info(
             f"Read {len(self.db.keys())} lines from local database {self.dbname}"
         )
 
+    def _read_parallel(
+        self,
+        complete_only: bool = False,
+        progress: Callable[[int], None] | None = None,
+    ) -> list[tuple[int, int]] | None:
+        """Parse a large database file with ``ParallelLoader``. Returns the corrupt
+        rows, or None if the file must be read sequentially"""
+        results = ParallelLoader(self.config).load(self.csvwrapper, complete_only)
+        if results is None:
+            return None
+        if len({result.inode for result in results}) > 1:
+            # NOTE: the file was replaced by the writer while it was read
+            return None
+        return self._read_chunks(results, progress)
+
+    def _read_rows(
+        self,
+        fp: CSVwrapperReader,
+        emit: bool = False,
+        progress: Callable[[int], None] | None = None,
+    ) -> int:
+        """Apply the rows from ``fp`` to the database, and remember the position
+        after the last row. Returns the number of rows read
+
+        :param emit: If True, notify the listeners about each change
+        :param progress: See ``load()``
+        """
+        count = 0
+        for count, row in enumerate(fp, start=1):
+            self._apply_row(row, count, emit)
+            if (progress is not None) and (count % self.progress_rows == 0):
+                progress(len(self.db))
+        profiler.count("database.rows_read", count)
+        self.db_offset = fp.offset
+        self.db_inode = fp.inode
+        return count
+
+    def _register_maintenance(self) -> None:
+        # NOTE: The backup is made before the file is compacted, and the catalog
+        #   is updated with the size of the compacted file
+        self._submit_maintenance("backup", self._backup_task, 0)
+        self._submit_maintenance("compaction", self._compaction_task, 1)
+        self._submit_maintenance("catalog", self._catalog_task, 2)
+
+    def _replace_compacted(self, tmpname: Path) -> None:
+        # NOTE: The file is replaced atomically, such that processes that have
+        #   opened the database read-only never see a partially written file
+        os.replace(tmpname, self.dbname)
+        self.db_inode = self.dbname.stat().st_ino
+        self._advance_offset()
+        logging.info("Wrote cleaned up version of DB")
+        # NOTE: The deleted rows have been removed from the database file, only
+        #   the tombstones remember the deleted terms
+        self.tombstones.collect_garbage(self.get_tombstone_horizon())
+
+    def _reschedule(self) -> None:
+        """Recompute the test delays of all terms with a review history. The memory
+        states of all the terms are computed together (see
+        ``Scheduler.memory_states()``), then all the delays are computed in one go.
+        The changes are written to file by ``_write_cleaned_up()``"""
+        terms = [term1 for term1 in self.review_log.terms() if term1 in self.db]
+        histories = (self.review_log.get_history(term1) for term1 in terms)
+        states = self.scheduler.memory_states(histories)
+        delays = self.scheduler.intervals(states).tolist()
+        now = self.epoch_in_seconds()
+        for term1, delay in zip(terms, delays):
+            self.db[term1][self.header.test_delay] = delay
+            self.db[term1][self.header.last_modified] = now
+            self.db[term1][self.header.version] = self.clock.now()
+        logging.info(f"Rescheduled {len(terms)} terms with {self.scheduler.name}")
+
     def _validate_item_content(self, item: DatabaseRow) -> None:
         """Validate that ``item`` has the correct keys and that the values have the correct
         types. All the keys listed in the ``CsvDatabaseHeader`` object must be present in the
@@ -272,7 +937,8 @@ class LocalDatabase(TimeMixin):
         for key in self.header.header:
             if not (key in item):
                 raise LocalDatabaseException(f"item missing key '{key}'")
-        # header = [status, term1, term2, test_delay, last_test, last_modified]
+        # header = [status, term1, term2, test_delay, last_test, last_modified,
+        #   version]
         for key in item:
             if not isinstance(item[key], self.header.types[key]):
                 raise LocalDatabaseException(
@@ -280,17 +946,47 @@ class LocalDatabase(TimeMixin):
                     f"{type(item[key])}, expected type {self.header.types[key]}"
                 )
 
+    def _submit_maintenance(
+        self, name: str, run: typing.Callable[[CancelToken], Finish], priority: int
+    ) -> None:
+        # NOTE: Imported here since PyQt6 is not needed by the command line tool
+        from vocabuilder.maintenance import MaintenanceTask
+
+        assert self.maintenance is not None
+        self.maintenance.submit(
+            MaintenanceTask(name, run, priority, group=self.voca_name)
+        )
+
     def _update_active_vocabulary_info(self) -> None:
         cfg_dir = self.config.get_config_dir()
         active_voca_info_fn_path = cfg_dir / self.active_voca_info_fn
         active_voca_info_fn_path.write_text(self.voca_name, encoding="utf-8")
 
+    def _update_catalog(self) -> None:
+        self.catalog.update(self.get_info())
+
+    def _update_clock(self) -> None:
+        """Advance the clock past the versions in the files, such that changes made
+        now win over the changes already saved, also if the wall clock has been
+        set back"""
+        versions = itertools.chain(
+            (
+                typing.cast(str, values[self.header.version])
+                for values in self.db.values()
+            ),
+            self.tombstones.get_items().values(),
+        )
+        latest = max(versions, default=None)
+        if latest is not None:
+            self.clock.update(latest)
+
     def _update_dbfile_item(self, term1: str) -> None:
         """Write the data for db[term1] to the database file"""
         self.db[term1][self.header.last_modified] = self.epoch_in_seconds()  # epoch
+        self.db[term1][self.header.version] = self.clock.now()
         item = self.db[term1].copy()
         item[self.header.term1] = term1
-        self.csvwrapper.append_line(item)
+        self._append_line(item)
         logging.info("UPDATED: " + self._item_to_string(item))
 
     def _write_cleaned_up(self) -> None:
@@ -304,12 +1000,20 @@ class LocalDatabase(TimeMixin):
         However, database in memory (the self.db dict) does not contain any duplicates
         so this method will remove any duplicates from the database on file
         """
-        terms = self.get_term1_list()
-        with self.csvwrapper.open_for_write() as fp:
-            header = typing.cast(list[DatabaseValue], self.header.header)
-            fp.writerow(header)
-            for term1 in terms:
-                item = self.db[term1].copy()
+        tmpname = self.dbname.with_suffix(".tmp")
+        self._write_compacted(tmpname, self.db)
+        self._replace_compacted(tmpname)
+
+    def _write_compacted(
+        self, path: Path, db: DatabaseType, token: CancelToken | None = None
+    ) -> None:
+        """Write the terms in ``db`` to ``path``, sorted by term1. If ``token`` is
+        given, it is checked for each 1000 rows, see ``CancelToken``"""
+        with CSVwrapper(path).open_for_write() as fp:
+            fp.writerow(self.csvwrapper.header_row())
+            for count, term1 in enumerate(sorted(db)):
+                if (token is not None) and (count % 1000 == 0):
+                    token.check()
+                item = db[term1].copy()
                 item[self.header.term1] = term1
                 fp.writeline(item)
-        logging.info("Wrote cleaned up version of DB")
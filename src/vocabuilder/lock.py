@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import logging
+import os
+import sys
+from pathlib import Path
+
+from vocabuilder.exceptions import DatabaseLockedException
+
+if sys.platform != "win32":
+    import fcntl
+
+
+class VocabularyLock:
+    """Advisory lock that gives a single process the right to write to a
+    vocabulary directory (the writer lease). Processes that only read the
+    vocabulary (see the ``read_only`` parameter of ``LocalDatabase``) do not take
+    the lock, so they never block the writer. Instead, the writer replaces the
+    database file atomically when it rewrites it, and appends complete lines.
+
+    The lock is a POSIX record lock (``fcntl.lockf()``) on ``lock_fn`` in the data
+    directory. It is released automatically by the operating system if the
+    process dies. The process id of the writer is written to the lock file, such
+    that the error message can tell the user which process holds the lock.
+
+    :param datadir: The data directory of the vocabulary
+    """
+
+    lock_fn = "writer.lock"
+    # NOTE: POSIX record locks are owned by the process, and all the locks on a
+    #   file are released when any file descriptor for the file is closed. So the
+    #   lock file is opened once per process, and the descriptor is shared by all
+    #   the LocalDatabase objects in the process that write to the vocabulary.
+    #   Maps the lock file path to the file descriptor and the number of users
+    held: dict[Path, tuple[int, int]] = {}
+
+    def __init__(self, datadir: Path) -> None:
+        self.path = datadir / self.lock_fn
+        self.acquired = False
+
+    def acquire(self) -> None:
+        """Acquire the writer lease. Raises ``DatabaseLockedException`` if another
+        process holds it"""
+        if self.acquired:
+            return
+        if sys.platform == "win32":  # pragma: no cover
+            logging.info("Vocabulary locking is not supported on Windows")
+            return
+        if self.path in self.held:
+            fd, count = self.held[self.path]
+            self.held[self.path] = (fd, count + 1)
+            self.acquired = True
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError as exc:
+            owner = os.read(fd, 32).decode("ascii", errors="replace").strip()
+            os.close(fd)
+            raise DatabaseLockedException(
+                f"{self.path.parent} is opened for writing by another process "
+                f"(pid {owner})"
+            ) from exc
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode("ascii"))
+        self.held[self.path] = (fd, 1)
+        self.acquired = True
+        logging.info(f"Acquired writer lock {self.path}")
+
+    def release(self) -> None:
+        if not self.acquired:
+            return
+        self.acquired = False
+        if self.path not in self.held:  # pragma: no cover
+            return  # NOTE: Windows
+        fd, count = self.held.pop(self.path)
+        if count > 1:
+            self.held[self.path] = (fd, count - 1)
+            return
+        # NOTE: closing the file descriptor releases the lock
+        os.close(fd)
+        logging.info(f"Released writer lock {self.path}")
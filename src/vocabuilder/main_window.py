@@ -9,6 +9,7 @@ from PyQt6.QtGui import QAction, QCloseEvent, QKeyEvent
 from PyQt6.QtWidgets import (
     QApplication,
     QGridLayout,
+    QLabel,
     QMainWindow,
     QMenu,
     QMenuBar,
@@ -21,16 +22,34 @@ from PyQt6.QtWidgets import (
 from vocabuilder.add_window import AddWindow
 from vocabuilder.config import Config
 from vocabuilder.database import Database
-from vocabuilder.exceptions import ConfigException
+from vocabuilder.database_loader import DatabaseLoader
+from vocabuilder.events import DatabaseEvent
+from vocabuilder.exceptions import ConfigException, DatabaseLockedException
+from vocabuilder.maintenance import MaintenanceScheduler
 from vocabuilder.mixins import WarningsMixin
 from vocabuilder.modify_window import ModifyWindow
+from vocabuilder.profiling import profiler
 from vocabuilder.test_window import TestWindow
 from vocabuilder.view_window import ViewWindow
+from vocabuilder.watcher import DatabaseWatcher
 from vocabuilder.widgets import QGridMinimalLabel, SelectWordFromList
+from vocabuilder.workspace import Workspace
 
 
 class MainWindow(QMainWindow, WarningsMixin):
-    def __init__(self, app: QApplication, db: Database, config: "Config"):
+    # NOTE: maintenance: The scheduler that the database registered its maintenance
+    #   tasks with, see main(). If None, a scheduler is created for the
+    #   vocabularies opened from the window
+    # NOTE: db: If the database has not been loaded (see defer_load in Database),
+    #   it is loaded on a worker thread after the window has been created, see
+    #   load_database()
+    def __init__(
+        self,
+        app: QApplication,
+        db: Database,
+        config: "Config",
+        maintenance: MaintenanceScheduler | None = None,
+    ):
         super().__init__()
         self.config = config
         self.button_config = self.config.config["Buttons"]
@@ -40,8 +59,18 @@ class MainWindow(QMainWindow, WarningsMixin):
         self.view_window: ViewWindow | None = None
         self.add_window: AddWindow | None = None
         self.test_window: TestWindow | None = None
+        self.watcher: DatabaseWatcher | None = None
+        self.loader: DatabaseLoader | None = None
         self.app = app
         self.db = db
+        # NOTE: The vocabularies are opened read-only if the first one is, see the
+        #   --read-only command line option
+        self.read_only = db.get_local_database().read_only
+        if maintenance is None:
+            maintenance = MaintenanceScheduler(config, self)
+        self.maintenance = maintenance
+        # NOTE: Keeps the recently used vocabularies loaded, see switch_vocabulary()
+        self.workspace = Workspace(config, maintenance, self.read_only)
         self.resize(int(self.window_config["Width"]), int(self.window_config["Height"]))
         self.setWindowTitle("VocaBuilder")
         self.create_menus()
@@ -58,6 +87,12 @@ class MainWindow(QMainWindow, WarningsMixin):
         widget = QWidget()
         widget.setLayout(layout)
         self.setCentralWidget(widget)
+        self.add_maintenance_label()
+        self.add_terms_label()
+        if db.get_local_database().loaded:
+            self.database_loaded()
+        else:
+            self.load_database()
 
     def add_buttons(self, layout: QGridLayout, vpos: int) -> int:
         self.buttons = []
@@ -95,19 +130,33 @@ class MainWindow(QMainWindow, WarningsMixin):
         return vpos + 2
 
     def add_database_info_label(self, layout: QGridLayout, vpos: int) -> int:
-        name = self.db.get_voca_name()
-        color = self.config.config["FontColor"]["Red"]
-        label = QGridMinimalLabel(
-            f"Vocabulary: <span style='color: {color};'>{name}</span>"
-        )
+        label = QGridMinimalLabel(self.database_info_text())
         label.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Maximum)
         layout.addWidget(label, vpos, 0, 1, 3)
+        self.database_info_label = label
         layout.setRowStretch(vpos, 0)
         return vpos + 1
 
+    def add_maintenance_label(self) -> None:
+        """Show the state of the maintenance tasks in the status bar"""
+        self.maintenance_label = QLabel(self.maintenance.get_state())
+        status_bar = self.statusBar()
+        assert status_bar is not None
+        status_bar.addWidget(self.maintenance_label)
+        self.maintenance.state_changed.connect(self.maintenance_label.setText)
+
+    def add_terms_label(self) -> None:
+        """Show the number of terms in the status bar. While the database is
+        loaded, it shows the number of terms read so far"""
+        self.terms_label = QLabel("Loading...")
+        status_bar = self.statusBar()
+        assert status_bar is not None
+        status_bar.addPermanentWidget(self.terms_label)
+
     def add_new_entry(self) -> None:
         if self.add_window is None:
-            self.add_window = AddWindow(self, self.config, self.db)
+            with profiler.timer("window.add"):
+                self.add_window = AddWindow(self, self.config, self.db)
         else:
             self.add_window.activateWindow()
 
@@ -132,6 +181,10 @@ class MainWindow(QMainWindow, WarningsMixin):
         file_menu.addAction(self.edit_config_action)
         self.edit_config_action.setShortcut("Ctrl+E")
         self.edit_config_action.triggered.connect(self.edit_config)
+        self.switch_action = QAction("&Switch vocabulary", self)
+        file_menu.addAction(self.switch_action)
+        self.switch_action.setShortcut("Ctrl+O")
+        self.switch_action.triggered.connect(self.select_vocabulary)
 
     def create_database_menu(self) -> None:
         database_menu = QMenu("&Database", self)
@@ -150,10 +203,39 @@ class MainWindow(QMainWindow, WarningsMixin):
         # self.create_edit_menu()
         # self.create_help_menu()
 
+    def database_loaded(self) -> None:
+        """Enable the actions, and start watching the database for changes made by
+        other processes, when the database has been loaded"""
+        self.loader = None
+        local_database = self.db.get_local_database()
+        self.workspace.add_database(local_database)
+        self.watcher = DatabaseWatcher(local_database, self.config)
+        self.db.add_listener(self.update_terms_label)
+        self.update_terms_label()
+        self.set_actions_enabled(True)
+        if self.read_only:
+            self.disable_editing()
+        recovery = local_database.recovery
+        if recovery is not None:
+            self.display_warning(self, str(recovery))
+
+    def database_info_text(self) -> str:
+        name = self.db.get_voca_name()
+        color = self.config.config["FontColor"]["Red"]
+        return f"Vocabulary: <span style='color: {color};'>{name}</span>"
+
     def delete_entry(self) -> QMessageBox:
         mbox = self.display_warning(self, "Delete entry. Not implemented yet")
         return mbox
 
+    def disable_editing(self) -> None:
+        """Disable the actions that modify the vocabulary, when it is opened
+        read-only"""
+        self.setWindowTitle("VocaBuilder (read-only)")
+        for name in ["Add", "Modify", "Test", "Delete", "Backup"]:
+            self.buttons[self.button_names[name]].setEnabled(False)
+        self.reset_fb_action.setEnabled(False)
+
     def edit_config(self) -> None:
         cfg = self.config.config["Editor"]
         config_path = str(self.config.get_config_path())
@@ -195,10 +277,36 @@ class MainWindow(QMainWindow, WarningsMixin):
             self.view_entries,
             self.quit,
         ]
+        # NOTE: The key is ignored if its button is disabled, e.g. when the
+        #   vocabulary is opened read-only, or has not been loaded yet
+        button_names = ["Add", "Backup", "Delete", "Modify", "", "Test", "View", ""]
         for i, key in enumerate(keys):
             if (event is not None) and event.key() == key:
+                name = button_names[i]
+                if name and not self.buttons[self.button_names[name]].isEnabled():
+                    return
                 callbacks[i]()
 
+    def load_database(self) -> None:
+        """Read the database on a worker thread, see ``DatabaseLoader``. The actions
+        are disabled until the database has been loaded"""
+        self.set_actions_enabled(False)
+        # NOTE: No parent, since the worker thread must be able to emit the
+        #   signals of the loader also if the window has been deleted
+        self.loader = DatabaseLoader(self.db)
+        self.loader.progress.connect(self.show_load_progress)
+        self.loader.loaded.connect(self.database_loaded)
+        self.loader.failed.connect(self.load_failed)
+        self.loader.start()
+
+    def load_failed(self, message: str) -> QMessageBox:
+        """The database could not be read, quit when the user has read the
+        message"""
+        self.terms_label.setText("Loading failed")
+        return self.display_warning(
+            self, f"Could not load vocabulary: {message}", self.quit
+        )
+
     def modify_entry(self) -> SelectWordFromList:
         """Modify/edit the translation of an existing term1 (and/or its translation)
         and update the database. Then, ask for a another term to modify. Continue
@@ -229,6 +337,14 @@ class MainWindow(QMainWindow, WarningsMixin):
 
     def quit(self) -> None:
         logging.info("Quitting the application")
+        if self.watcher is not None:
+            self.watcher.stop()
+        self.maintenance.shutdown()
+        if self.loader is not None:
+            # NOTE: The database is added to the workspace when it has been loaded
+            self.loader.wait()
+            self.db.get_local_database().close()
+        self.workspace.close()
         self.app.quit()
 
     def reset_firebase(self) -> None:
@@ -236,27 +352,88 @@ class MainWindow(QMainWindow, WarningsMixin):
 
     def run_test(self) -> None:
         if self.test_window is None:
-            self.test_window = TestWindow(self, self.config, self.db)
+            with profiler.timer("window.test"):
+                self.test_window = TestWindow(self, self.config, self.db)
         else:
             self.test_window.activateWindow()
 
+    def select_vocabulary(self) -> SelectWordFromList:
+        """Let the user select the vocabulary to switch to"""
+        infos = self.workspace.list_vocabularies()
+
+        def callback(pair: tuple[str, str]) -> None:
+            self.switch_vocabulary(pair[0])
+
+        def get_pair_callback(word: str, idx: int) -> tuple[str, str]:
+            return infos[idx].name, word
+
+        options = {"click_accept": True}
+        dialog = SelectWordFromList(
+            self,
+            self.config,
+            "Choose vocabulary",
+            [str(info) for info in infos],
+            callback,
+            get_pair_callback,
+            options,
+        )
+        return dialog
+
+    def set_actions_enabled(self, enabled: bool) -> None:
+        """Enable or disable the buttons and menu items that use the database"""
+        for button in self.buttons:
+            button.setEnabled(enabled)
+        self.switch_action.setEnabled(enabled)
+        self.reset_fb_action.setEnabled(enabled)
+
+    def show_load_progress(self, terms: int) -> None:
+        self.terms_label.setText(f"Loading... {terms} terms")
+
+    def switch_vocabulary(self, name: str) -> None:
+        """Replace the current vocabulary with ``name``. The open windows are
+        closed, since they show the terms of the current vocabulary"""
+        if name == self.db.get_voca_name():
+            return
+        try:
+            local_database = self.workspace.get_database(name)
+        except DatabaseLockedException as exc:
+            self.display_warning(self, str(exc))
+            return
+        for window in (self.add_window, self.test_window, self.view_window):
+            if window is not None:
+                window.close()
+        assert self.watcher is not None
+        self.watcher.stop()
+        self.db.remove_listener(self.update_terms_label)
+        self.db = Database(
+            self.config,
+            name,
+            local_database=local_database,
+            maintenance=self.maintenance,
+            read_only=self.read_only,
+        )
+        self.watcher = DatabaseWatcher(local_database, self.config)
+        self.db.add_listener(self.update_terms_label)
+        self.update_terms_label()
+        self.database_info_label.setText(self.database_info_text())
+        logging.info(f"Switched to vocabulary {name}")
+
     def test_window_closed(self) -> None:
         self.test_window = None
         logging.info("TestWindow closed")
 
-    def update_view_window(self) -> None:
-        if self.view_window is not None:
-            self.view_window.update_from_database()
+    def update_terms_label(self, event: DatabaseEvent | None = None) -> None:
+        """Show the number of terms. Called when a term is added or deleted"""
+        terms = len(self.db.get_local_database().get_items())
+        self.terms_label.setText(f"{terms} terms")
 
     def view_entries(self) -> None:
         if self.view_window is None:
-            self.view_window = ViewWindow(self, self.config, self.db)
+            with profiler.timer("window.view"):
+                self.view_window = ViewWindow(self, self.config, self.db)
         else:
             self.view_window.activateWindow()
 
     def view_window_closed(self) -> None:
         self.view_window = None
         logging.info("ViewWindow closed")
-
-    def view_window_is_open(self) -> bool:
-        return self.view_window is not None
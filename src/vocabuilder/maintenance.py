@@ -0,0 +1,260 @@
+"""Run maintenance tasks (compaction and backup of the database file, updating
+the vocabulary catalog, synchronizing with firebase) in the background while the
+user is not using the app. The subsystems register their tasks with the
+``MaintenanceScheduler`` instead of running them when a vocabulary is opened."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from PyQt6.QtCore import QCoreApplication, QEvent, QObject, Qt, QTimer, pyqtSignal
+
+from vocabuilder.config import Config
+from vocabuilder.exceptions import TaskCancelledException
+
+# NOTE: The work done on the main thread when a task has finished, see
+#   MaintenanceTask
+Finish = Optional[Callable[[], None]]
+
+
+class CancelToken:
+    """Tells a running task that it should stop. Tasks call ``check()``
+    regularly, e.g. for each 1000 rows written, and are restarted from the
+    beginning the next time the app is idle"""
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+
+    # public methods alfabetically sorted below
+    # ------------------------------------------
+
+    def cancel(self) -> None:
+        self.event.set()
+
+    def check(self) -> None:
+        """Raises ``TaskCancelledException`` if the task has been cancelled"""
+        if self.event.is_set():
+            raise TaskCancelledException("cancelled by the scheduler")
+
+
+class MaintenanceTask:
+    """A maintenance task.
+
+    :param name: Shown in the main window. A pending task with the same name and
+      group is replaced when the task is submitted again
+    :param run: Called on a worker thread with a ``CancelToken``. It must not
+      modify objects used by the GUI, instead it can return a function that is
+      called on the main thread when it has finished, e.g. to apply its results
+    :param priority: Tasks with a lower priority run first
+    :param group: Tasks in the same group (e.g. the tasks that write the files of
+      a vocabulary) never run at the same time
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[CancelToken], Finish],
+        priority: int = 0,
+        group: str = "",
+    ) -> None:
+        self.name = name
+        self.run = run
+        self.priority = priority
+        self.group = group
+        self.token = CancelToken()
+
+    def __str__(self) -> str:
+        if self.group:
+            return f"{self.name} ({self.group})"
+        return self.name
+
+
+class MaintenanceScheduler(QObject):
+    """Run the maintenance tasks in a pool of worker threads when the app is
+    idle: no mouse or keyboard input for ``IdleDelay`` seconds (see the
+    ``Maintenance`` section of the config file). When the user interacts with the
+    app, the running tasks are cancelled (see ``CancelToken``), and restarted when
+    the app is idle again. The tasks run in order of priority, and at most
+    ``Workers`` tasks run at the same time.
+
+    The input events are detected with an event filter installed on the
+    application. ``state_changed`` is emitted with a description of the current
+    state, see ``get_state()``.
+
+    :param config: The configuration
+    :param parent: The parent object
+    """
+
+    state_changed = pyqtSignal(str)
+    # NOTE: Emitted from the worker thread, and received on the main thread
+    _finished = pyqtSignal(object, object)
+
+    input_events = frozenset(
+        {
+            QEvent.Type.KeyPress,
+            QEvent.Type.MouseButtonPress,
+            QEvent.Type.MouseMove,
+            QEvent.Type.TouchBegin,
+            QEvent.Type.Wheel,
+        }
+    )
+
+    def __init__(self, config: Config, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self.workers = config.config.getint("Maintenance", "Workers")
+        self.pending: list[MaintenanceTask] = []
+        self.running: dict[MaintenanceTask, Future[Finish]] = {}
+        self.executor: ThreadPoolExecutor | None = None
+        self.idle = False
+        self.state = ""
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(
+            int(config.config.getfloat("Maintenance", "IdleDelay") * 1000)
+        )
+        self.timer.timeout.connect(self._became_idle)
+        # NOTE: Queued also when the task is done before the callback is added
+        self._finished.connect(
+            self._task_finished,
+            Qt.ConnectionType.QueuedConnection,  # type: ignore[call-arg]
+        )
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.installEventFilter(self)
+        self.timer.start()
+
+    # public methods alfabetically sorted below
+    # ------------------------------------------
+
+    def cancel(self, group: str) -> None:
+        """Remove the pending tasks in ``group``, and wait for the running tasks in
+        the group to stop. Called when a vocabulary is closed"""
+        self.pending = [task for task in self.pending if task.group != group]
+        for task, future in list(self.running.items()):
+            if task.group == group:
+                task.token.cancel()
+                self._wait(future)
+                del self.running[task]
+        self._update_state()
+
+    def eventFilter(self, obj: QObject | None, event: QEvent | None) -> bool:
+        if (event is not None) and (event.type() in self.input_events):
+            self._user_active()
+        return False
+
+    def get_state(self) -> str:
+        """A description of the running and pending tasks"""
+        waiting = f"{len(self.pending)} waiting"
+        if self.running:
+            names = ", ".join(str(task) for task in self.running)
+            if self.pending:
+                return f"Running {names}, {waiting}"
+            return f"Running {names}"
+        if self.pending:
+            return f"Maintenance: {waiting}"
+        return "Maintenance: idle"
+
+    def shutdown(self) -> None:
+        """Stop the running tasks and forget the pending tasks. Called when the app
+        quits"""
+        self.timer.stop()
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.removeEventFilter(self)
+        self.pending = []
+        for task, future in self.running.items():
+            task.token.cancel()
+            self._wait(future)
+        self.running = {}
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        self._update_state()
+
+    def submit(self, task: MaintenanceTask) -> None:
+        """Run ``task`` the next time the app is idle"""
+        self.pending = [
+            other
+            for other in self.pending
+            if (other.name, other.group) != (task.name, task.group)
+        ]
+        self.pending.append(task)
+        self._run_pending()
+
+    def _became_idle(self) -> None:
+        self.idle = True
+        self._run_pending()
+
+    def _next_task(self) -> MaintenanceTask | None:
+        """The pending task with the lowest priority that is not in the group of a
+        running task. Tasks with the same priority run in the order submitted"""
+        groups = {task.group for task in self.running if task.group}
+        for task in sorted(self.pending, key=lambda task: task.priority):
+            if task.group not in groups:
+                return task
+        return None
+
+    def _requeue(self, task: MaintenanceTask) -> None:
+        """Restart a cancelled task, unless it has been submitted again"""
+        key = (task.name, task.group)
+        if all((other.name, other.group) != key for other in self.pending):
+            self.pending.append(task)
+
+    def _run_pending(self) -> None:
+        while self.idle and (len(self.running) < self.workers):
+            task = self._next_task()
+            if task is None:
+                break
+            self._start(task)
+        self._update_state()
+
+    def _start(self, task: MaintenanceTask) -> None:
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                self.workers, thread_name_prefix="vocabuilder-maintenance"
+            )
+        self.pending.remove(task)
+        task.token = CancelToken()
+        future = self.executor.submit(task.run, task.token)
+        self.running[task] = future
+        future.add_done_callback(lambda future: self._finished.emit(task, future))
+        logging.info(f"Maintenance: started {task}")
+
+    def _task_finished(self, task: MaintenanceTask, future: Future[Finish]) -> None:
+        if self.running.get(task) is not future:
+            return  # NOTE: the task was removed by cancel() or shutdown()
+        del self.running[task]
+        try:
+            finish = future.result()
+            if finish is not None:
+                finish()
+        except TaskCancelledException:
+            logging.info(f"Maintenance: cancelled {task}")
+            self._requeue(task)
+        except Exception as exc:
+            logging.error(f"Maintenance: {task} failed: {exc}")
+        else:
+            logging.info(f"Maintenance: finished {task}")
+        self._run_pending()
+
+    def _update_state(self) -> None:
+        state = self.get_state()
+        if state != self.state:
+            self.state = state
+            self.state_changed.emit(state)
+
+    def _user_active(self) -> None:
+        self.idle = False
+        self.timer.start()
+        for task in self.running:
+            task.token.cancel()
+
+    def _wait(self, future: Future[Finish]) -> None:
+        try:
+            future.result()
+        except Exception:
+            # NOTE: The task is discarded, so its result is not used
+            pass
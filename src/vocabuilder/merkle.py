@@ -0,0 +1,125 @@
+"""Hash trees over the terms and their versions, used to find out if the local
+database and firebase differ without comparing all the terms. See
+``FirebaseDatabase.get_changed_buckets()``."""
+
+from __future__ import annotations
+
+import hashlib
+import typing
+from typing import Callable
+
+from vocabuilder.hlc import Version
+from vocabuilder.type_aliases import DatabaseType
+
+# NOTE: Returns the hashes of a level of another tree (for example read from
+#   firebase), or None if they are not available
+GetHashes = Callable[[], typing.Optional[list[str]]]
+
+
+class MerkleTree:
+    """A hash tree with three levels: the root, ``fanout`` inner nodes, and
+    ``fanout`` leaves (buckets) below each inner node. A term is in the bucket given
+    by the hash of the term, and the hash of a bucket is the hash of the sorted
+    ``(term, version)`` pairs in the bucket. The hash of an inner node is the hash
+    of the hashes of its buckets, and the root is the hash of the inner nodes.
+
+    Two trees have the same root if they have the same terms with the same versions
+    (see ``HybridLogicalClock``), and ``diff()`` finds the buckets that differ by
+    comparing only the nodes below the inner nodes that differ.
+    """
+
+    fanout = 16
+    num_buckets = fanout * fanout
+    digest_size = 8
+
+    def __init__(self) -> None:
+        # NOTE: Maps the terms in each bucket to their versions
+        self.buckets: list[dict[str, Version]] = [{} for _ in range(self.num_buckets)]
+        # NOTE: Computed when they are needed
+        self.leaf_hashes: list[str | None] = [None] * self.num_buckets
+
+    # public methods alfabetically sorted below
+    # ------------------------------------------
+
+    @classmethod
+    def bucket(cls, term1: str) -> int:
+        digest = hashlib.blake2b(term1.encode("utf_8"), digest_size=2).digest()
+        return int.from_bytes(digest, "big") % cls.num_buckets
+
+    def diff(
+        self, root: str, inner: GetHashes, leaves: Callable[[int], list[str] | None]
+    ) -> list[int] | None:
+        """The buckets that differ from another tree with the given ``root``. The
+        hashes of the inner nodes of the other tree, and the hashes of the buckets
+        below an inner node, are only asked for if they are needed. Returns None if
+        they are not available"""
+        if root == self.root():
+            return []
+        other_inner = inner()
+        if (other_inner is None) or (len(other_inner) != self.fanout):
+            return None
+        changed: list[int] = []
+        for i, hash_ in enumerate(self.inner_hashes()):
+            if hash_ == other_inner[i]:
+                continue
+            other_leaves = leaves(i)
+            if (other_leaves is None) or (len(other_leaves) != self.fanout):
+                return None
+            for j, leaf in enumerate(self.leaves(i)):
+                if leaf != other_leaves[j]:
+                    changed.append(i * self.fanout + j)
+        return changed
+
+    @classmethod
+    def from_items(cls, items: DatabaseType, version_key: str) -> MerkleTree:
+        """A tree over the terms in ``items`` and the versions in the
+        ``version_key`` field"""
+        tree = cls()
+        for term1, values in items.items():
+            tree.buckets[cls.bucket(term1)][term1] = typing.cast(
+                str, values[version_key]
+            )
+        return tree
+
+    def inner_hashes(self) -> list[str]:
+        return [self._hash("".join(self.leaves(i))) for i in range(self.fanout)]
+
+    def leaves(self, inner: int) -> list[str]:
+        """The hashes of the buckets below the inner node ``inner``"""
+        start = inner * self.fanout
+        return [self._leaf_hash(i) for i in range(start, start + self.fanout)]
+
+    def root(self) -> str:
+        return self._hash("".join(self.inner_hashes()))
+
+    @classmethod
+    def select(cls, items: DatabaseType, buckets: list[int]) -> DatabaseType:
+        """The items with terms in ``buckets``"""
+        selected = set(buckets)
+        return {
+            key: value for key, value in items.items() if cls.bucket(key) in selected
+        }
+
+    def set(self, term1: str, version: Version | None) -> None:
+        """Set the version of ``term1``, or remove it if ``version`` is None"""
+        i = self.bucket(term1)
+        if version is None:
+            self.buckets[i].pop(term1, None)
+        else:
+            self.buckets[i][term1] = version
+        self.leaf_hashes[i] = None
+
+    def _hash(self, text: str) -> str:
+        return hashlib.blake2b(
+            text.encode("utf_8"), digest_size=self.digest_size
+        ).hexdigest()
+
+    def _leaf_hash(self, i: int) -> str:
+        hash_ = self.leaf_hashes[i]
+        if hash_ is None:
+            bucket = self.buckets[i]
+            hash_ = self._hash(
+                "".join(f"{term1}\t{bucket[term1]}\n" for term1 in sorted(bucket))
+            )
+            self.leaf_hashes[i] = hash_
+        return hash_
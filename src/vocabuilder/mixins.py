@@ -1,11 +1,16 @@
-import time
-from typing import Callable
+from __future__ import annotations
 
-from PyQt6.QtCore import Qt
-from PyQt6.QtWidgets import QMessageBox, QWidget
+import time
+from typing import TYPE_CHECKING, Callable
 
 from vocabuilder.exceptions import TimeException
 
+# NOTE: PyQt6 is only imported when it is needed, such that the non-GUI modules
+#   (for example LocalDatabase, which uses TimeMixin) can be used by the command
+#   line tool without loading Qt
+if TYPE_CHECKING:  # pragma: no cover
+    from PyQt6.QtWidgets import QMessageBox, QWidget
+
 
 class ConfigWindow:  # pragma: no cover
     window_config: dict[str, str]
@@ -65,6 +70,9 @@ class WarningsMixin:
     def display_warning(
         parent: QWidget, msg: str, callback: Callable[[], None] | None = None
     ) -> QMessageBox:
+        from PyQt6.QtCore import Qt
+        from PyQt6.QtWidgets import QMessageBox
+
         mbox = QMessageBox(
             parent
         )  # giving "parent" makes the message box appear centered on the parent
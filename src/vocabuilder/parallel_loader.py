@@ -0,0 +1,163 @@
+"""Parse a large database file in parallel. The database file is a log: a new row
+is appended each time a term is added, modified, or deleted, and the last row for
+a term wins. The file is split into byte ranges that start and end at row
+boundaries, and each range is parsed in a separate process. Each process returns
+the last row for each term in its range, and the results are merged in file order
+by ``LocalDatabase``, which gives the same database as reading the file from
+start to end.
+
+Small files are read in the calling process, since starting the worker processes
+takes longer than parsing the file. The limit is ``ParallelMinSize`` (megabytes)
+in the ``Loader`` section of the config file.
+"""
+
+from __future__ import annotations
+
+import logging
+import mmap
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+from vocabuilder.config import Config
+from vocabuilder.csv_helpers import CSVwrapper
+from vocabuilder.type_aliases import DatabaseRow
+
+
+class ChunkResult:
+    """The result of parsing a byte range of the database file.
+
+    :param rows: The last row for each term in the range, in the order the terms
+      first occur in the range
+    :param count: The number of rows in the range
+    :param end: The end of the range
+    :param bad_rows: The start and end offsets of the corrupt rows
+    :param offset: The position after the last row that was read. It is before
+      the end of the range if reading stopped early, see ``complete_only`` in
+      ``CSVwrapperReader``
+    :param inode: The inode of the file that was read
+    """
+
+    def __init__(
+        self,
+        rows: list[DatabaseRow],
+        count: int,
+        end: int,
+        bad_rows: list[tuple[int, int]],
+        offset: int,
+        inode: int,
+    ) -> None:
+        self.rows = rows
+        self.count = count
+        self.end = end
+        self.bad_rows = bad_rows
+        self.offset = offset
+        self.inode = inode
+
+
+class ParallelLoader:
+    """Read a database file with a pool of worker processes.
+
+    :param config: The configuration. ``Workers`` in the ``Loader`` section is the
+      number of processes, 0 means the number of CPUs
+    """
+
+    # NOTE: Each worker gets several chunks, such that a worker that finishes
+    #   early can take over work from the others
+    chunks_per_worker = 4
+
+    def __init__(self, config: Config) -> None:
+        min_size = config.config.getfloat("Loader", "ParallelMinSize")
+        self.min_size = int(min_size * 1024 * 1024)
+        self.workers = config.config.getint("Loader", "Workers") or os.cpu_count() or 1
+
+    # public methods alfabetically sorted below
+    # ------------------------------------------
+
+    def load(
+        self, csvwrapper: CSVwrapper, complete_only: bool = False
+    ) -> list[ChunkResult] | None:
+        """Parse the file in parallel. Returns the results in file order, or None
+        if the file should be read sequentially: the file is small, there is only
+        one worker, or the columns are not in the default order"""
+        filename = csvwrapper.filename
+        size = os.path.getsize(filename)
+        if (self.workers < 2) or (size == 0) or (size < self.min_size):
+            return None
+        with csvwrapper.open_for_read(csvwrapper.header) as fp:
+            if fp.fieldnames != csvwrapper.header.header:
+                return None
+            start = fp.offset
+        chunks = plan_chunks(
+            Path(filename),
+            start,
+            size,
+            self.workers * self.chunks_per_worker,
+            complete_only,
+        )
+        if len(chunks) < 2:
+            return None
+        starts, ends = zip(*chunks)
+        # NOTE: Forking a process with Qt (and its threads) running is not safe
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.workers, mp_context=context) as pool:
+            results = list(
+                pool.map(
+                    parse_chunk, repeat(filename), starts, ends, repeat(complete_only)
+                )
+            )
+        logging.info(
+            f"Parsed {filename} in {len(chunks)} chunks with {self.workers} workers"
+        )
+        return results
+
+
+def parse_chunk(
+    filename: str, start: int, end: int, complete_only: bool = False
+) -> ChunkResult:
+    """Parse the rows between the byte offsets ``start`` and ``end``. This function
+    runs in a worker process"""
+    csvwrapper = CSVwrapper(Path(filename))
+    with csvwrapper.open_for_mmap_read(
+        csvwrapper.header, offset=start, complete_only=complete_only, end=end
+    ) as fp:
+        rows = list(fp)
+    return ChunkResult(rows, fp.count, end, fp.bad_rows, fp.offset, fp.inode)
+
+
+def plan_chunks(
+    path: Path, start: int, end: int, num_chunks: int, complete_only: bool = False
+) -> list[tuple[int, int]]:
+    """Split the bytes from ``start`` (the start of a row) to ``end`` into about
+    ``num_chunks`` ranges that start and end at row boundaries.
+
+    A row can contain a newline inside a quoted field, so a newline is only a row
+    boundary if the number of quote characters before it is even (a quote inside
+    a quoted field is written as two quotes). If ``complete_only`` is True, the
+    last range ends after the last newline in the file, see ``CSVwrapperReader``.
+    """
+    with open(path, "rb") as fp, mmap.mmap(
+        fp.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mm:
+        if complete_only:
+            end = mm.rfind(b"\n", start, end) + 1 or start
+        target = max((end - start) // num_chunks, 1)
+        bounds = [start]
+        pos = start
+        quotes = 0
+        candidate = start + target
+        while candidate < end:
+            newline = mm.find(b"\n", candidate - 1, end)
+            if newline == -1:
+                break
+            quotes += mm[pos : newline + 1].count(b'"')
+            pos = newline + 1
+            if quotes % 2 == 0 and pos < end:
+                bounds.append(pos)
+                candidate = pos + target
+            else:
+                candidate = pos + 1
+        bounds.append(end)
+    return [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if a < b]
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import collections
+import json
+import logging
+import os
+import random
+from pathlib import Path
+from typing import Iterable, TypeVar
+
+from vocabuilder.database import Database
+from vocabuilder.events import DatabaseEvent
+
+T = TypeVar("T")
+
+
+def reservoir_sample(items: Iterable[T], k: int, rng: random.Random) -> list[T]:
+    """Draw ``k`` items uniformly at random from ``items`` in a single pass, without
+    building a list of all the items (Algorithm R). If there are fewer than ``k``
+    items, all the items are returned. The returned list is shuffled."""
+    sample: list[T] = []
+    for i, item in enumerate(items):
+        if i < k:
+            sample.append(item)
+        else:
+            j = rng.randint(0, i)
+            if j < k:
+                sample[j] = item
+    rng.shuffle(sample)
+    return sample
+
+
+class PracticeQueue:
+    """A prepared queue of terms that are ready for practice. Computing the list
+    of terms exceeding their test delay requires a pass over the whole database, so
+    instead of doing that for each term that is practiced, a batch of ``size``
+    randomly chosen terms is prepared at a time. The queue is refilled when the
+    window is idle, such that the next term can be shown immediately.
+
+    :param database: The database to pick terms from
+    :param size: The number of terms to prepare
+    """
+
+    def __init__(
+        self, database: Database, size: int, rng: random.Random | None = None
+    ) -> None:
+        self.db = database
+        self.size = size
+        self.rng = rng if rng is not None else random.Random()
+        self.queue: collections.deque[tuple[str, str]] = collections.deque()
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+    def apply_event(self, event: DatabaseEvent) -> None:
+        """A queued term that was changed in the database might no longer be ready
+        for practice, so it is dropped from the queue. It will be picked up again at
+        the next refill if it is still ready for practice."""
+        self.invalidate(event.term1)
+        if event.old_term1 is not None:
+            self.invalidate(event.old_term1)
+
+    def clear(self) -> None:
+        self.queue.clear()
+
+    def invalidate(self, term1: str) -> None:
+        pairs = [pair for pair in self.queue if pair[0] != term1]
+        if len(pairs) != len(self.queue):
+            self.queue = collections.deque(pairs)
+
+    def next_pair(self, exclude: set[str]) -> tuple[str, str] | None:
+        """Get the next term to practice.
+
+        :param exclude: Terms that should not be returned, for example terms whose
+          new test delay has not been written to the database yet
+        :return: A pair (term1, term2), or ``None`` if no terms are ready for
+          practice
+        """
+        while len(self.queue) > 0:
+            pair = self.queue.popleft()
+            if pair[0] not in exclude:
+                return pair
+        self.refill(exclude)
+        if len(self.queue) == 0:
+            return None
+        return self.queue.popleft()
+
+    def refill(self, exclude: set[str]) -> None:
+        """Fill up the queue with randomly chosen terms that are ready for practice.
+        The terms are drawn with a single pass over the database, see
+        ``reservoir_sample()``.
+
+        :param exclude: Terms that should not be added to the queue, for example
+          the term that is currently being practiced
+        """
+        missing = self.size - len(self.queue)
+        if missing <= 0:
+            return
+        queued = {pair[0] for pair in self.queue}
+        candidates = (
+            pair
+            for pair in self.db.iter_pairs_exceeding_test_delay()
+            if (pair[0] not in queued) and (pair[0] not in exclude)
+        )
+        pairs = reservoir_sample(candidates, missing, self.rng)
+        self.queue.extend(pairs)
+        logging.info(f"Practice queue: added {len(pairs)} terms")
+
+
+class PracticeSession(PracticeQueue):
+    """A ``PracticeQueue`` that remembers the terms that have been shown, such that
+    no term is shown twice in a session, even if it is still ready for practice
+    (for example with a test delay of zero days). The session ends when no more
+    terms can be shown. The queue and the shown terms are saved to ``path``, such
+    that the session can be resumed if the application is closed (or crashes) in
+    the middle of a session.
+
+    :param path: The file to save the session to. If ``None`` the session is not
+      saved
+    """
+
+    session_fn = "practice_session.json"
+
+    def __init__(
+        self,
+        database: Database,
+        size: int,
+        path: Path | None = None,
+        rng: random.Random | None = None,
+    ) -> None:
+        super().__init__(database, size, rng)
+        self.path = path
+        self.shown: set[str] = set()
+        if (self.path is not None) and self.path.is_file():
+            self._load()
+
+    def clear(self) -> None:
+        """End the session"""
+        super().clear()
+        self.shown.clear()
+
+    def next_pair(self, exclude: set[str]) -> tuple[str, str] | None:
+        """See ``PracticeQueue.next_pair()``. Returns ``None`` when all the terms
+        that are ready for practice have been shown, and a new session is started"""
+        pair = super().next_pair(exclude)
+        if pair is None:
+            self.shown.clear()
+        else:
+            self.shown.add(pair[0])
+        return pair
+
+    def refill(self, exclude: set[str]) -> None:
+        """See ``PracticeQueue.refill()``. The terms that have been shown are not
+        added to the queue"""
+        super().refill(exclude | self.shown)
+
+    def save(self) -> None:
+        """Save the terms in the queue and the terms that have been shown. If both
+        are empty there is nothing to resume, and the session file is removed."""
+        if self.path is None:
+            return
+        if (len(self) == 0) and (len(self.shown) == 0):
+            self.path.unlink(missing_ok=True)
+            return
+        data = {
+            "terms": [term1 for term1, _ in self.queue],
+            "shown": sorted(self.shown),
+        }
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def _load(self) -> None:
+        """Queue the saved terms that are still ready for practice. The database
+        may have been changed since the session was saved, for example by another
+        device"""
+        assert self.path is not None
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            terms = [str(term1) for term1 in data["terms"]]
+            shown = {str(term1) for term1 in data["shown"]}
+        except (ValueError, KeyError, TypeError):
+            logging.info(f"Practice session: ignoring invalid file {self.path}")
+            return
+        self.shown = shown
+        self.queue.extend(
+            (term1, self.db.get_term2(term1))
+            for term1 in terms
+            if self.db.check_term1_exceeds_test_delay(term1)
+        )
+        logging.info(f"Practice session: resuming session with {len(self)} terms left")
@@ -0,0 +1,111 @@
+"""Timers and counters for the startup phases and the hot paths. The timers are
+always running, since a timer costs less than a microsecond, such that the
+phases that run before the command line is parsed are also measured. Profiling
+only decides if the report is printed (to ``stderr``) when the app exits, and if
+the whole run is profiled with ``cProfile``.
+
+Profiling is enabled with the ``--profile`` command line option of
+``vocabuilder`` and ``vocabuilder-cli``, or by setting the environment variable
+``VOCABUILDER_PROFILE``. If the value of the variable is not ``1``, it is the name
+of a file to write the ``cProfile`` statistics to (the same as
+``--profile-output``). The statistics can be viewed with ``pstats``, e.g.:
+
+.. code-block:: bash
+
+   $ VOCABUILDER_PROFILE=startup.prof vocabuilder
+   $ python -m pstats startup.prof
+
+Example of a timer:
+
+.. code-block:: python
+
+   from vocabuilder.profiling import profiler
+
+   with profiler.timer("database.parse"):
+       ...
+"""
+
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, TextIO
+
+
+class Profiler:
+    env_var = "VOCABUILDER_PROFILE"
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.output: Path | None = None
+        self.cprofile: cProfile.Profile | None = None
+        # NOTE: Maps the name of a timer to the number of calls and the total
+        #   number of seconds
+        self.timings: dict[str, tuple[int, float]] = {}
+        self.counters: dict[str, int] = {}
+
+    # public methods alfabetically sorted below
+    # ------------------------------------------
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def dump(self, file: TextIO | None = None) -> None:
+        """Print the report and write the ``cProfile`` statistics, if profiling is
+        enabled. Called when the app exits"""
+        if not self.enabled:
+            return
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(str(self.output))
+            self.cprofile = None
+            logging.info(f"Wrote profile statistics to {self.output}")
+        print(self.report(), file=sys.stderr if file is None else file)
+
+    def enable(self, output: Path | None = None) -> None:
+        """Enable profiling. If ``output`` is given, the rest of the run is
+        profiled with ``cProfile``, and the statistics are written to ``output``"""
+        self.enabled = True
+        if (output is not None) and (self.cprofile is None):
+            self.output = output
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+
+    def enable_from_environment(self) -> None:
+        value = os.environ.get(self.env_var, "")
+        if value in ("", "0"):
+            return
+        self.enable(None if value == "1" else Path(value))
+
+    def report(self) -> str:
+        width = max((len(name) for name in self.timings), default=5)
+        lines = [f"{'phase':<{width}}  {'calls':>7}  {'seconds':>9}"]
+        for name in sorted(self.timings):
+            calls, seconds = self.timings[name]
+            lines.append(f"{name:<{width}}  {calls:>7}  {seconds:>9.4f}")
+        for name in sorted(self.counters):
+            lines.append(f"{name}: {self.counters[name]}")
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        self.timings = {}
+        self.counters = {}
+
+    @contextlib.contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Add the time spent in the ``with`` block to the timer ``name``"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            calls, seconds = self.timings.get(name, (0, 0.0))
+            self.timings[name] = (calls + 1, seconds + time.perf_counter() - start)
+
+
+# NOTE: The profiler for the process, used by all the modules
+profiler = Profiler()
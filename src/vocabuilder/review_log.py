@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+
+from vocabuilder.append_queue import AppendQueue
+from vocabuilder.exceptions import ReviewLogException
+
+
+class Review(NamedTuple):
+    """The result of practicing a term once.
+
+    :param timestamp: epoch time of the practice
+    :param grade: One of the ``Grade`` constants
+    :param interval: The number of days until the next practice that was chosen
+    """
+
+    timestamp: int
+    grade: int
+    interval: int
+
+
+class ReviewLog:
+    """Append-only log of all the practice results for a vocabulary.
+
+    The reviews are stored in a binary file of fixed size records: term id,
+    timestamp, grade, and interval (see ``record_dtype``). The terms are stored
+    once in a separate file with one JSON encoded term per line, the term id is the
+    line number (starting from zero). Since the records have a fixed size, the
+    review file can be memory-mapped as a NumPy structured array, see
+    ``records()``.
+
+    :param datadir: The data directory of the vocabulary
+    :param read_only: If True, the files are not modified. Use ``reload()`` to read
+      the reviews that the writer has appended since the log was read
+    :param append_queue: If given, new reviews are written by the writer thread of
+      the queue, see ``AppendQueue``
+    """
+
+    review_log_fn = "reviews.bin"
+    review_terms_fn = "review_terms.jsonl"
+    magic = b"VBREVS01"
+    record_dtype = np.dtype(
+        [
+            ("term_id", "<u4"),
+            ("timestamp", "<i8"),
+            ("grade", "u1"),
+            ("interval", "<i4"),
+        ]
+    )
+
+    def __init__(
+        self,
+        datadir: Path,
+        read_only: bool = False,
+        append_queue: AppendQueue | None = None,
+    ) -> None:
+        self.path = datadir / self.review_log_fn
+        self.terms_path = datadir / self.review_terms_fn
+        self.read_only = read_only
+        self.history: dict[str, list[Review]] = {}
+        self.term_ids: dict[str, int] = {}
+        self.term_names: list[str] = []
+        self.num_records = 0
+        self.terms_offset = 0
+        self.append_queue = append_queue
+        if read_only:
+            self.reload()
+            return
+        if not self.path.is_file():
+            self.path.write_bytes(self.magic)
+        self._read()
+
+    def append(self, term1: str, review: Review) -> None:
+        self.history.setdefault(term1, []).append(review)
+        record = np.array(
+            [(self._get_term_id(term1), *review)], dtype=self.record_dtype
+        )
+        self._append(self.path, record.tobytes())
+        self.num_records += 1
+
+    def get_history(self, term1: str) -> list[Review]:
+        """The practice results for ``term1``, oldest first"""
+        return self.history.get(term1, [])
+
+    def get_term(self, term_id: int) -> str:
+        """The term with id ``term_id``, see the ``term_id`` field of
+        ``records()``"""
+        return self.term_names[term_id]
+
+    def records(self) -> npt.NDArray[np.void]:
+        """All the reviews as a read-only memory-mapped structured array with the
+        fields of ``record_dtype``. An incomplete record at the end of the file
+        (from an interrupted write) is ignored."""
+        if not self.path.is_file():
+            # NOTE: read-only, and the writer has not created the file yet
+            return np.empty(0, dtype=self.record_dtype)
+        size = self.path.stat().st_size - len(self.magic)
+        count = max(size, 0) // self.record_dtype.itemsize
+        if count == 0:
+            return np.empty(0, dtype=self.record_dtype)
+        return np.memmap(
+            self.path,
+            dtype=self.record_dtype,
+            mode="r",
+            offset=len(self.magic),
+            shape=(count,),
+        )
+
+    def reload(self) -> list[tuple[str, Review]]:
+        """Read the reviews that have been appended since the log was read (by
+        another process, if this log is read-only).
+
+        :return: The new reviews with their terms, oldest first
+        """
+        if self.terms_path.is_file():
+            self._read_terms()
+        records = self.records()[self.num_records :]
+        self.num_records += len(records)
+        reviews = []
+        # NOTE: a single conversion to Python objects is much faster than
+        #   accessing the fields of each record separately
+        for term_id, timestamp, grade, interval in records.tolist():
+            if term_id >= len(self.term_names):
+                # NOTE: the term was not written to the terms file
+                continue
+            term1 = self.term_names[term_id]
+            review = Review(timestamp, grade, interval)
+            self.history.setdefault(term1, []).append(review)
+            reviews.append((term1, review))
+        return reviews
+
+    def terms(self) -> Iterator[str]:
+        """Iterate over all terms that have been practiced"""
+        return iter(self.history)
+
+    def _append(self, path: Path, data: bytes) -> None:
+        if self.append_queue is None:
+            with open(path, "ab") as fp:
+                fp.write(data)
+        else:
+            self.append_queue.append(path, data)
+
+    def _get_term_id(self, term1: str) -> int:
+        if term1 not in self.term_ids:
+            line = (json.dumps(term1) + "\n").encode("utf_8")
+            self._append(self.terms_path, line)
+            self.terms_offset += len(line)
+            self.term_ids[term1] = len(self.term_names)
+            self.term_names.append(term1)
+        return self.term_ids[term1]
+
+    def _read(self) -> None:
+        with open(self.path, "rb") as fp:
+            if fp.read(len(self.magic)) != self.magic:
+                raise ReviewLogException(f"Bad file format: {self.path}")
+        size = self.path.stat().st_size - len(self.magic)
+        # NOTE: Remove an incomplete record left by an interrupted write, such
+        #   that the next record is appended at the correct offset
+        size -= size % self.record_dtype.itemsize
+        self._truncate(self.path, len(self.magic) + size)
+        reviews = self.reload()
+        if self.terms_path.is_file():
+            self._truncate(self.terms_path, self.terms_offset)
+        logging.info(f"Review log: read {len(reviews)} reviews from {self.path}")
+
+    def _read_terms(self) -> None:
+        """Read the terms added since the last call. A line without a newline at
+        the end is from an interrupted write, or the writer is appending it"""
+        with open(self.terms_path, "rb") as fp:
+            fp.seek(self.terms_offset)
+            for line in fp:
+                if not line.endswith(b"\n"):
+                    break
+                term1 = json.loads(line)
+                self.term_ids[term1] = len(self.term_names)
+                self.term_names.append(term1)
+                self.terms_offset += len(line)
+
+    def _truncate(self, path: Path, size: int) -> None:
+        if path.stat().st_size > size:
+            logging.info(f"Review log: removing incomplete data at end of {path}")
+            with open(path, "r+b") as fp:
+                fp.truncate(size)
@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import abc
+import itertools
+import math
+from typing import Iterable, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from vocabuilder.config import Config
+from vocabuilder.constants import Grade
+from vocabuilder.exceptions import ConfigException
+from vocabuilder.review_log import Review
+
+FloatArray = npt.NDArray[np.float64]
+IntArray = npt.NDArray[np.int64]
+MemoryState = tuple[float, ...]
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+class Scheduler(abc.ABC):
+    """Computes the number of days until a term should be practiced again from the
+    practice history of the term.
+
+    The history of a term is summarized in a memory state: a fixed size tuple of
+    floats. The intervals are computed from the memory states by ``intervals()``,
+    which works on a two-dimensional array with one memory state per row. This
+    makes it possible to recompute the intervals for all the terms in a vocabulary
+    at once when the parameters of the scheduler change. The memory states are
+    also computed for all the terms at once, see ``memory_states()``.
+    """
+
+    name: str
+
+    @abc.abstractmethod
+    def initial_state(self) -> MemoryState:
+        """The memory state of a term that has not been practiced"""
+
+    @abc.abstractmethod
+    def intervals(self, states: FloatArray) -> IntArray:
+        """Compute the interval (in days) for each memory state (row) in ``states``"""
+
+    def memory_state(self, history: Sequence[Review]) -> MemoryState:
+        return tuple(self.memory_states([history])[0].tolist())
+
+    def memory_states(self, histories: Iterable[Sequence[Review]]) -> FloatArray:
+        """The memory states for a list of histories as a two-dimensional array.
+        The histories are padded into arrays, and ``next_states()`` applies the
+        first review of all the histories, then the second review of the histories
+        that have two reviews or more, and so on"""
+        histories = list(histories)
+        lengths = np.array([len(history) for history in histories], dtype=np.int64)
+        initial = np.array(self.initial_state(), dtype=np.float64)
+        states = np.tile(initial, (len(histories), 1))
+        if lengths.sum() == 0:
+            return states
+        # NOTE: The longest histories first, such that the histories with a review
+        #   at each step are the first rows
+        order = np.argsort(-lengths, kind="stable")
+        lengths = lengths[order]
+        histories = [histories[i] for i in order]
+        timestamps, grades, intervals = self._pad(histories, lengths)
+        sorted_states = states.copy()
+        for step in range(timestamps.shape[1]):
+            rows = int(np.count_nonzero(lengths > step))
+            elapsed = np.zeros(rows, dtype=np.float64)
+            if step > 0:
+                seconds = timestamps[:rows, step] - timestamps[:rows, step - 1]
+                elapsed = np.maximum(seconds, 0) / SECONDS_PER_DAY
+            sorted_states[:rows] = self.next_states(
+                sorted_states[:rows],
+                grades[:rows, step],
+                intervals[:rows, step],
+                elapsed,
+            )
+        states[order] = sorted_states
+        return states
+
+    def next_interval(self, history: Sequence[Review], grade: int, now: int) -> int:
+        """The number of days until the next practice if the term is graded
+        ``grade`` now"""
+        states = self.memory_states([[*history, Review(now, grade, 0)]])
+        return int(self.intervals(states)[0])
+
+    @abc.abstractmethod
+    def next_states(
+        self,
+        states: FloatArray,
+        grades: IntArray,
+        intervals: IntArray,
+        elapsed_days: FloatArray,
+    ) -> FloatArray:
+        """Update each memory state (row) in ``states`` with a new review
+
+        :param grades: The grades of the reviews
+        :param intervals: The intervals of the reviews, see ``Review``
+        :param elapsed_days: The number of days since the previous reviews
+        """
+
+    @abc.abstractmethod
+    def parameters(self) -> dict[str, float]:
+        """The parameters that the intervals depend on"""
+
+    @staticmethod
+    def _pad(histories: list[Sequence[Review]], lengths: IntArray) -> IntArray:
+        """The timestamps, grades and intervals of the reviews, as three arrays
+        with one row per history, padded with zeros"""
+        # NOTE: Much faster than np.array() with a list of the reviews
+        chain = itertools.chain.from_iterable
+        width = len(Review._fields)
+        count = width * int(lengths.sum())
+        reviews = np.fromiter(
+            chain(chain(histories)), dtype=np.int64, count=count
+        ).reshape(-1, width)
+        rows = np.repeat(np.arange(len(histories)), lengths)
+        starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        columns = np.arange(len(reviews)) - starts
+        padded = np.zeros((3, len(histories), int(lengths.max())), dtype=np.int64)
+        padded[:, rows, columns] = reviews.T
+        return padded
+
+
+class SM2Scheduler(Scheduler):
+    """The SuperMemo 2 algorithm. The memory state is (easiness factor, interval,
+    number of successful reviews in a row).
+
+    :param interval_modifier: All intervals are multiplied by this factor
+    """
+
+    name = "SM-2"
+    # NOTE: SM-2 grades answers on a scale from 0 to 5, where 3 or more is a pass.
+    #   Indexed by the grade, the quality of Grade.MANUAL is not used
+    quality = np.array([0, 1, 3, 4, 5], dtype=np.float64)
+
+    def __init__(self, interval_modifier: float = 1.0) -> None:
+        self.interval_modifier = interval_modifier
+
+    def initial_state(self) -> MemoryState:
+        return (2.5, 0.0, 0.0)
+
+    def intervals(self, states: FloatArray) -> IntArray:
+        intervals = np.rint(states[:, 1] * self.interval_modifier)
+        return np.maximum(intervals, 0).astype(np.int64)
+
+    def next_states(
+        self,
+        states: FloatArray,
+        grades: IntArray,
+        intervals: IntArray,
+        elapsed_days: FloatArray,
+    ) -> FloatArray:
+        ease, interval, repetitions = states.T
+        manual = grades == Grade.MANUAL
+        quality = self.quality[grades]
+        # NOTE: If the answer did not pass, start over, but keep the easiness factor
+        passed = (quality >= 3) & (~manual)
+        next_interval = np.select(
+            [repetitions == 0, repetitions == 1], [1.0, 6.0], interval * ease
+        )
+        next_ease = ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+        return np.column_stack(
+            (
+                np.where(passed, np.maximum(next_ease, 1.3), ease),
+                np.where(
+                    manual,
+                    intervals / self.interval_modifier,
+                    np.where(passed, next_interval, 0.0),
+                ),
+                np.where(passed, repetitions + 1, np.where(manual, repetitions, 0.0)),
+            )
+        )
+
+    def parameters(self) -> dict[str, float]:
+        return {"interval_modifier": self.interval_modifier}
+
+
+class FSRSScheduler(Scheduler):
+    """The Free Spaced Repetition Scheduler (version 4, with its default weights
+    and forgetting curve). The memory state is (stability, difficulty). The
+    stability is the number of days until the probability of remembering the term
+    has dropped to 90%. A stability of zero means that the term has not been
+    practiced.
+
+    :param desired_retention: The probability of remembering a term when it
+      is practiced
+    """
+
+    name = "FSRS"
+    decay = -1.0
+    factor = 1 / 9
+    weights = (
+        0.4,
+        0.6,
+        2.4,
+        5.8,
+        4.93,
+        0.94,
+        0.86,
+        0.01,
+        1.49,
+        0.14,
+        0.94,
+        2.18,
+        0.05,
+        0.34,
+        1.26,
+        0.29,
+        2.61,
+    )
+
+    def __init__(self, desired_retention: float = 0.9) -> None:
+        self.desired_retention = desired_retention
+
+    def initial_state(self) -> MemoryState:
+        return (0.0, 0.0)
+
+    def intervals(self, states: FloatArray) -> IntArray:
+        intervals = np.rint(states[:, 0] * self._interval_per_stability())
+        return np.maximum(intervals, 0).astype(np.int64)
+
+    def next_states(
+        self,
+        states: FloatArray,
+        grades: IntArray,
+        intervals: IntArray,
+        elapsed_days: FloatArray,
+    ) -> FloatArray:
+        w = self.weights
+        stability, difficulty = states.T
+        manual = grades == Grade.MANUAL
+        first = stability == 0
+        # NOTE: The values for the manual intervals and the first reviews are
+        #   replaced below, these avoid invalid indices and division by zero
+        grades = np.where(manual, Grade.GOOD, grades)
+        previous = np.where(first, 1.0, stability)
+        retrievability = (1 + self.factor * elapsed_days / previous) ** self.decay
+        next_difficulty = difficulty - w[6] * (grades - 3)
+        mean_reversion = w[7] * self._initial_difficulty(Grade.GOOD)
+        next_difficulty = np.clip(
+            mean_reversion + (1 - w[7]) * next_difficulty, 1.0, 10.0
+        )
+        next_stability = np.where(
+            grades == Grade.AGAIN,
+            self._stability_after_forgetting(previous, next_difficulty, retrievability),
+            self._stability_after_recall(
+                previous, next_difficulty, retrievability, grades
+            ),
+        )
+        next_stability = np.where(first, np.asarray(w)[grades - 1], next_stability)
+        next_difficulty = np.where(
+            first, self._initial_difficulty(grades), next_difficulty
+        )
+        # NOTE: A manual interval sets the stability, the difficulty is kept
+        manual_stability = intervals / self._interval_per_stability()
+        manual_difficulty = np.where(
+            first, self._initial_difficulty(Grade.GOOD), difficulty
+        )
+        return np.column_stack(
+            (
+                np.where(manual, np.maximum(manual_stability, 0.1), next_stability),
+                np.where(manual, manual_difficulty, next_difficulty),
+            )
+        )
+
+    def parameters(self) -> dict[str, float]:
+        return {"desired_retention": self.desired_retention}
+
+    def _initial_difficulty(self, grades: int | IntArray) -> FloatArray:
+        difficulty = self.weights[4] - (np.asarray(grades) - 3) * self.weights[5]
+        return np.clip(difficulty, 1.0, 10.0)
+
+    def _interval_per_stability(self) -> float:
+        """The interval is proportional to the stability. A desired retention of
+        90% gives an interval equal to the stability"""
+        retention_factor: float = self.desired_retention ** (1 / self.decay)
+        return (retention_factor - 1) / self.factor
+
+    def _stability_after_forgetting(
+        self, stability: FloatArray, difficulty: FloatArray, retrievability: FloatArray
+    ) -> FloatArray:
+        w = self.weights
+        factor = w[11] * difficulty ** -w[12] * ((stability + 1) ** w[13] - 1)
+        return factor * np.exp(w[14] * (1 - retrievability))
+
+    def _stability_after_recall(
+        self,
+        stability: FloatArray,
+        difficulty: FloatArray,
+        retrievability: FloatArray,
+        grades: IntArray,
+    ) -> FloatArray:
+        w = self.weights
+        hard_penalty = np.where(grades == Grade.HARD, w[15], 1.0)
+        easy_bonus = np.where(grades == Grade.EASY, w[16], 1.0)
+        growth = math.exp(w[8]) * (11 - difficulty) * stability ** -w[9]
+        growth *= np.exp(w[10] * (1 - retrievability)) - 1
+        return stability * (1 + growth * hard_penalty * easy_bonus)
+
+
+def get_scheduler(config: Config) -> Scheduler:
+    """Create the scheduler given by the ``[Scheduler]`` section of the config"""
+    section = config.get_section("Scheduler")
+    algorithm = section["Algorithm"]
+    if algorithm == SM2Scheduler.name:
+        return SM2Scheduler(float(section["IntervalModifier"]))
+    elif algorithm == FSRSScheduler.name:
+        return FSRSScheduler(float(section["DesiredRetention"]))
+    raise ConfigException(f"Unknown scheduler algorithm: {algorithm}")
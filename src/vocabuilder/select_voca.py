@@ -12,6 +12,7 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
+from vocabuilder.catalog import VocabularyCatalog
 from vocabuilder.commandline import CommandLineOptions
 from vocabuilder.config import Config
 from vocabuilder.local_database import LocalDatabase
@@ -45,28 +46,19 @@ class SelectVocabulary:
                         quit()
 
     def choose_most_recent(self) -> bool:
-        db_dir = self.cfg.get_data_dir() / LocalDatabase.database_dir
-        current_mtime = 0
-        candidate = None
-        for name in self.existing_vocabularies:
-            dbfile = db_dir / name / LocalDatabase.database_fn
-            mtime = dbfile.stat().st_mtime
-            if mtime > current_mtime:
-                candidate = name
+        candidate = self.catalog.most_recent()
         if candidate is not None:
-            self.selected_name = name
+            self.selected_name = candidate
             return True
         return False
 
     def find_existing_vocabularies(self) -> None:
-        db_dir = self.cfg.get_data_dir() / LocalDatabase.database_dir
-        self.existing_vocabularies = []
-        if db_dir.exists():
-            for file in db_dir.iterdir():
-                if file.is_dir():
-                    dbfile = file / LocalDatabase.database_fn
-                    if dbfile.is_file():
-                        self.existing_vocabularies.append(file.name)
+        # NOTE: The names are read from the vocabulary catalog, such that the data
+        #   directory is not scanned each time the app is started
+        self.catalog = VocabularyCatalog(
+            self.cfg.get_data_dir() / LocalDatabase.database_dir
+        )
+        self.existing_vocabularies = self.catalog.get_names()
 
     def get_name(self) -> str | None:
         return self.selected_name
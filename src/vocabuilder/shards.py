@@ -0,0 +1,80 @@
+"""The sharded layout of a vocabulary in firebase, see ``ShardedLayout``."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import zlib
+
+from vocabuilder.merkle import MerkleTree
+from vocabuilder.type_aliases import DatabaseType
+
+
+class ShardedLayout:
+    """Instead of one child per term, the terms are saved in ``num_shards`` children
+    (shards) of the ``_shards`` child of the vocabulary. A shard has the terms in a
+    range of the buckets of ``MerkleTree`` (i.e. a range of the hashes of the
+    terms), and the key of the shard is the range, for example ``"00-0f"``. The
+    value of a shard is the JSON encoded dict of its terms, compressed with zlib
+    and base64 encoded.
+
+    The shards that have changed (``dirty``) are written by
+    ``FirebaseDatabase.flush()``, and ``stale`` has the paths (relative to the
+    vocabulary) of children that should be deleted, for example the items saved
+    in the old layout, or shards for another number of shards.
+
+    :param num_shards: The number of shards, at most the number of buckets
+    """
+
+    def __init__(self, num_shards: int) -> None:
+        self.num_shards = num_shards
+        first = [MerkleTree.num_buckets] * num_shards
+        last = [0] * num_shards
+        for bucket in range(MerkleTree.num_buckets):
+            shard = self._bucket_to_shard(bucket)
+            first[shard] = min(first[shard], bucket)
+            last[shard] = max(last[shard], bucket)
+        self.keys = [f"{first[i]:02x}-{last[i]:02x}" for i in range(num_shards)]
+        self.dirty: set[int] = set()
+        self.stale: set[str] = set()
+
+    # public methods alfabetically sorted below
+    # ------------------------------------------
+
+    @staticmethod
+    def decode(blob: object) -> DatabaseType | None:
+        """The terms in a shard, or None if ``blob`` is not a valid shard"""
+        if not isinstance(blob, str):
+            return None
+        try:
+            items = json.loads(zlib.decompress(base64.b64decode(blob, validate=True)))
+        except (binascii.Error, zlib.error, ValueError):
+            return None
+        if not isinstance(items, dict):
+            return None
+        return items
+
+    @staticmethod
+    def encode(items: DatabaseType) -> str:
+        data = json.dumps(items, ensure_ascii=False, separators=(",", ":"))
+        return base64.b64encode(zlib.compress(data.encode("utf_8"), 9)).decode("ascii")
+
+    def get_updates(self, items: DatabaseType, child: str) -> dict[str, str | None]:
+        """The values of the dirty shards of ``items``, and None for the stale
+        children, as paths relative to the vocabulary. The shards are in ``child``"""
+        updates: dict[str, str | None] = {path: None for path in self.stale}
+        shards: dict[int, DatabaseType] = {shard: {} for shard in self.dirty}
+        for key, value in items.items():
+            shard = self.shard(key)
+            if shard in shards:
+                shards[shard][key] = value
+        for shard, shard_items in shards.items():
+            updates[f"{child}/{self.keys[shard]}"] = self.encode(shard_items)
+        return updates
+
+    def shard(self, term1: str) -> int:
+        return self._bucket_to_shard(MerkleTree.bucket(term1))
+
+    def _bucket_to_shard(self, bucket: int) -> int:
+        return bucket * self.num_shards // MerkleTree.num_buckets
@@ -4,7 +4,7 @@ from __future__ import annotations
 import typing
 from typing import Callable
 
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import QCloseEvent, QIntValidator, QKeyEvent
 from PyQt6.QtWidgets import (
     QDialog,
@@ -19,13 +19,17 @@ from PyQt6.QtWidgets import (
 )
 
 from vocabuilder.config import Config
-from vocabuilder.constants import TestDirection, TestMethod
+from vocabuilder.constants import Grade, TestDirection, TestMethod
 from vocabuilder.database import Database
 from vocabuilder.mixins import ResizeWindowMixin, WarningsMixin
+from vocabuilder.practice import PracticeSession
 from vocabuilder.widgets import SelectWordFromList
 
 
 class TestWindow(QWidget, ResizeWindowMixin, WarningsMixin):
+    # NOTE: see the comment for ViewWindow.database_changed
+    database_changed = pyqtSignal(object)
+
     def __init__(self, parent: QWidget, config: Config, database: Database):
         super().__init__()
         self.db = database
@@ -34,6 +38,16 @@ class TestWindow(QWidget, ResizeWindowMixin, WarningsMixin):
         self.window_config = typing.cast(
             dict[str, str], self.config.config["TestWindow"]
         )
+        prefetch_size = int(self.config.config["Practice"]["PrefetchSize"])
+        session_path = self.db.get_local_database().datadir / PracticeSession.session_fn
+        self.session = PracticeSession(self.db, prefetch_size, session_path)
+        self.database_changed.connect(self.session.apply_event)
+        self.db_listener = self.database_changed.emit
+        self.db.add_listener(self.db_listener)
+        # NOTE: Results (term1, delay, grade) that have not yet been written to the
+        #   database
+        self.pending_results: list[tuple[str, int, int]] = []
+        self.grade = Grade.MANUAL
         # NOTE: This complicated approach with callback is mainly done to make it easier
         #  to test the code with pytest
         self.params = TestWindowChooseParameters(
@@ -84,6 +98,16 @@ class TestWindow(QWidget, ResizeWindowMixin, WarningsMixin):
         vpos += 1
         return vpos
 
+    def add_grade_button(
+        self, grid: QGridLayout, i: int, name: str, grade: int, edit: QLineEdit
+    ) -> None:
+        button = QPushButton(name, self)
+        self.grade_buttons.append(button)
+        callback = self.update_retest_lineedit_from_grade(edit, grade)
+        self.grade_button_callbacks.append(callback)
+        button.clicked.connect(callback)
+        grid.addWidget(button, 4, i)
+
     def add_next_done_buttons(self, layout: QGridLayout, vpos: int) -> int:
         self.next_button = QPushButton("&Next", self)
         self.next_button.clicked.connect(self.next_button_clicked)
@@ -132,6 +156,7 @@ class TestWindow(QWidget, ResizeWindowMixin, WarningsMixin):
         validator = QIntValidator()
         validator.setBottom(0)
         edit.setValidator(validator)
+        edit.textEdited.connect(self.set_manual_grade)
         # edit.setStyleSheet(f"QLineEdit {{font-size: {fontsize};}}")
         grid.addWidget(edit, 0, 2)
         # NOTE: Buttons and callbacks are saved in these lists to help pytest
@@ -142,6 +167,21 @@ class TestWindow(QWidget, ResizeWindowMixin, WarningsMixin):
             if delay == 1:
                 checked = True
             self.add_retest_radio_button(grid, i, delay, checked, edit)
+        label31 = QLabel(
+            "<i>Or let the scheduler choose from how well you knew it:</i>"
+        )
+        label31.setStyleSheet("QLabel {color: #ffb84d}")
+        grid.addWidget(label31, 3, 0, 1, 3)
+        self.grade_buttons: list[QPushButton] = []
+        self.grade_button_callbacks: list[Callable[[], None]] = []
+        grades = [
+            ("Again", Grade.AGAIN),
+            ("Hard", Grade.HARD),
+            ("Good", Grade.GOOD),
+            ("Easy", Grade.EASY),
+        ]
+        for i, (name, grade) in enumerate(grades):
+            self.add_grade_button(grid, i, name, grade, edit)
         groupbox.setLayout(grid)
         layout.addWidget(groupbox, vpos, 0, 1, 2)
         return vpos + 1
@@ -198,7 +238,7 @@ class TestWindow(QWidget, ResizeWindowMixin, WarningsMixin):
         if self.params.test_method == TestMethod.List:
             self.choose_word_from_list(callback=callback2)
         else:
-            pair = self.db.get_random_pair()
+            pair = self.session.next_pair(exclude=self.pending_exclude())
             callback2(pair)
 
     def choose_word_from_list(
@@ -242,11 +282,15 @@ class TestWindow(QWidget, ResizeWindowMixin, WarningsMixin):
         parent when we are closed"""
         if event is not None:
             event.accept()
+            self.write_pending_results()
+            self.db.remove_listener(self.db_listener)
+            self.session.save()
             self.parent_.test_window_closed()  # type: ignore
 
     def done_button_clicked(self) -> None:
         delay = self.delay_edit.text()
-        self.db.update_retest_value(self.term1, int(delay))
+        self.pending_results.append((self.term1, int(delay), self.grade))
+        self.write_pending_results()
         self.close()
 
     def keyPressEvent(self, event: QKeyEvent | None) -> None:
@@ -285,7 +329,11 @@ class TestWindow(QWidget, ResizeWindowMixin, WarningsMixin):
 
     def next_button_clicked(self) -> None:
         delay = self.delay_edit.text()
-        self.db.update_retest_value(self.term1, int(delay))
+        self.pending_results.append((self.term1, int(delay), self.grade))
+        self.grade = Grade.MANUAL
+        if self.params.test_method == TestMethod.List:
+            # NOTE: The list of words to choose from must reflect the new delay
+            self.write_pending_results()
 
         def callback() -> None:
             self.term1_label.setText(self.lang1_term)
@@ -295,6 +343,18 @@ class TestWindow(QWidget, ResizeWindowMixin, WarningsMixin):
             self.user_edit.setFocus()
 
         self.assign_terms_to_practice(callback=callback)
+        # NOTE: The next term is shown before the result for the previous term is
+        #   written to the database, and before the queue of terms is refilled
+        QTimer.singleShot(0, self.write_pending_results_and_refill)
+
+    def pending_exclude(self) -> set[str]:
+        """Terms that should not be practiced next since their new delay has not
+        yet been written to the database"""
+        return {term1 for term1, delay, _ in self.pending_results if delay > 0}
+
+    def set_manual_grade(self) -> None:
+        """The user chose the delay without grading the answer"""
+        self.grade = Grade.MANUAL
 
     def show_hidden_translation(self, label: QLabel) -> Callable[[], None]:
         def callback() -> None:
@@ -310,9 +370,33 @@ class TestWindow(QWidget, ResizeWindowMixin, WarningsMixin):
     def update_retest_lineedit(self, edit: QLineEdit, delay: str) -> Callable[[], None]:
         def callback() -> None:
             edit.setText(delay)
+            self.set_manual_grade()
 
         return callback
 
+    def update_retest_lineedit_from_grade(
+        self, edit: QLineEdit, grade: int
+    ) -> Callable[[], None]:
+        def callback() -> None:
+            edit.setText(str(self.db.next_interval(self.term1, grade)))
+            self.grade = grade
+
+        return callback
+
+    def write_pending_results(self) -> None:
+        for term1, delay, grade in self.pending_results:
+            self.db.update_retest_value(term1, delay, grade)
+        self.pending_results = []
+
+    def write_pending_results_and_refill(self) -> None:
+        self.write_pending_results()
+        if self.params.test_method == TestMethod.Random:
+            if len(self.session) <= self.session.size // 2:
+                # NOTE: A refill is a pass over the database, so it is not done
+                #   after each term
+                self.session.refill(exclude={self.term1})
+            self.session.save()
+
 
 class TestWindowChooseParameters(QDialog):
     def __init__(
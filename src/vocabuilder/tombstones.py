@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+
+from vocabuilder.append_queue import AppendQueue
+from vocabuilder.hlc import HybridLogicalClock, Version
+
+
+class TombstoneIndex:
+    """The terms that have been deleted, with the versions of the deletions. The
+    database file does not remember deleted terms after it has been cleaned up, so
+    without the tombstones a term deleted on this device would be added again from
+    firebase, and terms deleted on other devices would never be deleted here.
+
+    A tombstone wins over the versions of the term that are not larger than the
+    version of the deletion, see ``supersedes()`` and ``HybridLogicalClock``. The
+    tombstones are removed by ``collect_garbage()`` when they are older than
+    ``KeepDays`` (see the ``Tombstones`` section of the config file).
+
+    The tombstones are saved in a file with one JSON encoded ``[term1, version]``
+    pair per line. New tombstones are appended, and the file is rewritten when old
+    tombstones are removed. (Files written by older versions of the app have the
+    epoch time of the deletion instead of the version.)
+
+    :param datadir: The data directory of the vocabulary
+    :param read_only: If True, the file is not modified. Use ``reload()`` to read
+      the tombstones that the writer has appended since the file was read
+    :param append_queue: If given, new tombstones are written by the writer thread
+      of the queue, see ``AppendQueue``
+    """
+
+    tombstones_fn = "tombstones.jsonl"
+
+    def __init__(
+        self,
+        datadir: Path,
+        read_only: bool = False,
+        append_queue: AppendQueue | None = None,
+    ) -> None:
+        self.path = datadir / self.tombstones_fn
+        self.read_only = read_only
+        self.append_queue = append_queue
+        # NOTE: Maps term1 to the version of the deletion
+        self.deleted: dict[str, Version] = {}
+        # NOTE: The position after the last line read, and the inode of the file
+        #   (it changes when the file is rewritten)
+        self.offset = 0
+        self.inode = 0
+        self.reload()
+        if (not read_only) and self.path.is_file():
+            self._truncate()
+
+    # public methods alfabetically sorted below
+    # ------------------------------------------
+
+    def add(self, term1: str, version: Version) -> bool:
+        """Remember that ``term1`` was deleted, with the version ``version``. Returns
+        False if there already is a tombstone for the term that is as new"""
+        if self.deleted.get(term1, "") >= version:
+            return False
+        self.deleted[term1] = version
+        line = self._encode(term1, version)
+        if self.append_queue is None:
+            with open(self.path, "ab") as fp:
+                fp.write(line)
+        else:
+            self.append_queue.append(self.path, line)
+        return True
+
+    def collect_garbage(self, horizon: int) -> int:
+        """Remove the tombstones for terms deleted before ``horizon`` (epoch time),
+        and rewrite the file. Returns the number of tombstones removed"""
+        expired = [
+            term1
+            for term1, version in self.deleted.items()
+            if HybridLogicalClock.to_seconds(version) < horizon
+        ]
+        if len(expired) == 0:
+            return 0
+        for term1 in expired:
+            del self.deleted[term1]
+        if self.append_queue is not None:
+            # NOTE: The queued tombstones must be in the file before it is replaced
+            self.append_queue.flush()
+        tmpname = self.path.with_suffix(".tmp")
+        with open(tmpname, "wb") as fp:
+            for term1, version in self.deleted.items():
+                fp.write(self._encode(term1, version))
+        os.replace(tmpname, self.path)
+        stat = self.path.stat()
+        self.offset = stat.st_size
+        self.inode = stat.st_ino
+        logging.info(f"Tombstones: removed {len(expired)} expired tombstones")
+        return len(expired)
+
+    def get(self, term1: str) -> Version | None:
+        """The version of the deletion of ``term1``, or None if there is no
+        tombstone"""
+        return self.deleted.get(term1)
+
+    def get_items(self) -> dict[str, Version]:
+        return self.deleted
+
+    def reload(self) -> int:
+        """Read the tombstones added since the file was read. A line without a
+        newline at the end is from an interrupted write, or the writer is appending
+        it. Returns the number of tombstones read"""
+        if not self.path.is_file():
+            return 0
+        stat = self.path.stat()
+        if stat.st_ino != self.inode:
+            # NOTE: The file was rewritten by collect_garbage()
+            self.deleted = {}
+            self.offset = 0
+            self.inode = stat.st_ino
+        count = 0
+        with open(self.path, "rb") as fp:
+            fp.seek(self.offset)
+            for line in fp:
+                if not line.endswith(b"\n"):
+                    break
+                self.offset += len(line)
+                try:
+                    term1, version = json.loads(line)
+                except ValueError:
+                    logging.info(f"Tombstones: skipping bad line: {line!r}")
+                    continue
+                if self.deleted.get(term1, "") < version:
+                    self.deleted[term1] = version
+                count += 1
+        return count
+
+    def supersedes(self, term1: str, version: Version) -> bool:
+        """True if ``version`` of ``term1`` is deleted, i.e. the deletion has the
+        same or a larger version"""
+        deleted = self.deleted.get(term1)
+        return (deleted is not None) and (deleted >= version)
+
+    def _encode(self, term1: str, version: Version) -> bytes:
+        return (json.dumps([term1, version], ensure_ascii=False) + "\n").encode("utf_8")
+
+    def _truncate(self) -> None:
+        """Remove an incomplete line left by an interrupted write, such that the
+        next tombstone starts on a new line"""
+        if self.path.stat().st_size > self.offset:
+            logging.info(f"Tombstones: removing incomplete data at end of {self.path}")
+            with open(self.path, "r+b") as fp:
+                fp.truncate(self.offset)
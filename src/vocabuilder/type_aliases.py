@@ -7,3 +7,5 @@
 DatabaseValue = str | int | None
 DatabaseRow = dict[str, DatabaseValue]
 DatabaseType = dict[str, DatabaseRow]
+CatalogValue = str | int | float | None
+CatalogEntries = dict[str, dict[str, CatalogValue]]
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
+import bisect
 import enum
 import logging
 import typing
 from typing import Callable
 
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QCloseEvent, QKeyEvent
 from PyQt6.QtWidgets import (
     QGridLayout,
@@ -18,6 +19,7 @@ from PyQt6.QtWidgets import (
 
 from vocabuilder.config import Config
 from vocabuilder.database import Database
+from vocabuilder.events import DatabaseEvent, DatabaseEventType
 from vocabuilder.mixins import ResizeWindowMixin, WarningsMixin
 from vocabuilder.widgets import QLabelClickable
 
@@ -39,13 +41,18 @@ class ViewScrollArea(QScrollArea):
         fontsize: str,
     ):
         super().__init__()
-        self.items = [items1, items2]
+        # NOTE: items1 is expected to be sorted, and items2[i] is the translation of
+        #   items1[i]. The terms are kept sorted such that a single changed term can
+        #   be located by bisection when the database is updated
+        self.terms = list(items1)
+        self.translations = dict(zip(items1, items2))
         self.callbacks = [callback1, callback2]
+        self.filter_text = ""
+        self.match_term = MatchTerm.TERM1
         # We implement lazy loading of the items in the scroll area to avoid
         # performance issues when there are a large number of items.
-        num_items = len(self.items[0])
-        self.filtered_indices = list(
-            range(num_items)  # Initially no filtering, so all items are included
+        self.filtered_terms = list(
+            self.terms  # Initially no filtering, so all items are included
         )
         self.loaded_rows = (
             0  # Will be updated below, and also in maybe_load_more_items()
@@ -75,7 +82,6 @@ class ViewScrollArea(QScrollArea):
         """Add a maximum of items self.add_increment items to the scroll area. This lazy
         loading of items is done to avoid performance issues when there are a large number
         of items."""
-        style = f"border: 1px solid #bbbbbb; font-size: {self.fontsize}"
         added_rows = 0
         if self.loaded_rows > 0:
             self.vbox.takeAt(self.vbox.count() - 1)  # Remove the stretch
@@ -84,46 +90,96 @@ class ViewScrollArea(QScrollArea):
             # layout_item.widget().deleteLater()
             # self.vbox.removeItem(layout_item)
         for i in range(self.add_increment):
-            if self.loaded_rows + i >= len(self.filtered_indices):
+            if self.loaded_rows + i >= len(self.filtered_terms):
                 break
-            idx = self.filtered_indices[self.loaded_rows + i]
-            widget = QWidget()
-            hbox = QHBoxLayout()
-            hbox.setContentsMargins(0, 0, 0, 0)
-            widget.setLayout(hbox)
-            for j in range(0, 2):
-                term = self.items[j][idx]
-                label = QLabelClickable(term)
-                label.setStyleSheet(style)
-
-                def callback(j: int = j, term: str = term) -> None:
-                    self.callbacks[j](term)
-
-                label.addCallback(callback)
-                hbox.addWidget(label)
-            self.vbox.addWidget(widget)
+            term1 = self.filtered_terms[self.loaded_rows + i]
+            self.vbox.addWidget(self.create_row(term1))
             added_rows += 1
         self.vbox.addStretch()
         self.loaded_rows += added_rows
 
+    def apply_event(self, event: DatabaseEvent) -> None:
+        """Update the rows affected by a change in the database. Only the rows of the
+        changed term are touched, the rest of the scroll area is left as it is."""
+        if event.type == DatabaseEventType.ADDED:
+            self.insert_row(event.term1, typing.cast(str, event.term2))
+        elif event.type == DatabaseEventType.DELETED:
+            self.remove_row(event.term1)
+        elif event.type == DatabaseEventType.UPDATED:
+            self.update_row(event.term1, typing.cast(str, event.term2))
+        elif event.type == DatabaseEventType.RENAMED:
+            self.remove_row(typing.cast(str, event.old_term1))
+            self.insert_row(event.term1, typing.cast(str, event.term2))
+
+    def create_row(self, term1: str) -> QWidget:
+        style = f"border: 1px solid #bbbbbb; font-size: {self.fontsize}"
+        widget = QWidget()
+        hbox = QHBoxLayout()
+        hbox.setContentsMargins(0, 0, 0, 0)
+        widget.setLayout(hbox)
+        for j, term in enumerate([term1, self.translations[term1]]):
+            label = QLabelClickable(term)
+            label.setStyleSheet(style)
+
+            def callback(j: int = j, term: str = term) -> None:
+                self.callbacks[j](term)
+
+            label.addCallback(callback)
+            hbox.addWidget(label)
+        return widget
+
     def filter_items(self, text: str, match_term: MatchTerm) -> None:
         """Filter the items based on the text and the match_term"""
-        self.filtered_indices = []
-        num_items = len(self.items[0])
+        self.filter_text = text
+        self.match_term = match_term
         self.loaded_rows = 0
-        for i in range(num_items):
-            if match_term == MatchTerm.TERM1:
-                if text in self.items[0][i]:
-                    self.filtered_indices.append(i)
-            elif match_term == MatchTerm.TERM2:
-                if text in self.items[1][i]:
-                    self.filtered_indices.append(i)
+        self.filtered_terms = [term1 for term1 in self.terms if self.matches(term1)]
+
+    def insert_row(self, term1: str, term2: str) -> None:
+        """Insert a new term at its sorted position. A row widget is only created if
+        the row is within the part of the list that has already been loaded"""
+        if term1 in self.translations:
+            self.remove_row(term1)
+        bisect.insort(self.terms, term1)
+        self.translations[term1] = term2
+        if not self.matches(term1):
+            return
+        pos = bisect.bisect_left(self.filtered_terms, term1)
+        self.filtered_terms.insert(pos, term1)
+        all_loaded = self.loaded_rows == len(self.filtered_terms) - 1
+        if pos < self.loaded_rows or all_loaded:
+            # NOTE: The first item in the layout is the stretch, see
+            #   add_left_and_right_column()
+            self.vbox.insertWidget(pos + 1, self.create_row(term1))
+            self.loaded_rows += 1
+
+    def matches(self, term1: str) -> bool:
+        """Does the term pass the current filter?"""
+        if self.match_term == MatchTerm.TERM1:
+            return self.filter_text in term1
+        return self.filter_text in self.translations[term1]
 
     def maybe_load_more_items(self) -> None:
         if scrollbar := self.verticalScrollBar():
             if scrollbar.value() == scrollbar.maximum():
                 self.add_items()
 
+    def remove_row(self, term1: str) -> None:
+        if term1 not in self.translations:
+            return
+        del self.terms[bisect.bisect_left(self.terms, term1)]
+        del self.translations[term1]
+        pos = bisect.bisect_left(self.filtered_terms, term1)
+        if pos == len(self.filtered_terms) or self.filtered_terms[pos] != term1:
+            return  # The term did not pass the filter
+        del self.filtered_terms[pos]
+        if pos < self.loaded_rows:
+            layout_item = self.vbox.takeAt(pos + 1)
+            if layout_item is not None:
+                if widget := layout_item.widget():
+                    widget.deleteLater()
+            self.loaded_rows -= 1
+
     def update_items1(self, text: str) -> None:
         self.update_items(text, MatchTerm.TERM1)
 
@@ -144,18 +200,18 @@ class ViewScrollArea(QScrollArea):
         self.add_items()
         self.scrollwidget.update()
 
-    def update_items_from_db(
-        self, items1: list[str], items2: list[str], text1: str, text2: str
-    ) -> None:
-        self.items = [items1, items2]
-        # logging.info(f"update_items_from_db: {text1}, {text2}")
-        if len(text2) > 0:
-            self.update_items2(text2)
-        else:
-            self.update_items1(text1)
+    def update_row(self, term1: str, term2: str) -> None:
+        if self.translations.get(term1) == term2:
+            return  # Nothing visible has changed, e.g. only the retest delay
+        self.remove_row(term1)
+        self.insert_row(term1, term2)
 
 
 class ViewWindow(QWidget, ResizeWindowMixin, WarningsMixin):
+    # NOTE: The database events are forwarded to the scroll area through this signal,
+    #   such that they are handled in the GUI thread
+    database_changed = pyqtSignal(object)
+
     def __init__(self, parent: QWidget, config: Config, database: Database) -> None:
         super().__init__()
         self.parent_ = parent  # use parent_ to avoid name clash with QWidget.parent()
@@ -171,6 +227,9 @@ class ViewWindow(QWidget, ResizeWindowMixin, WarningsMixin):
         vpos = self.add_line_edits(layout, vpos)
         vpos = self.add_scroll_area(layout, vpos)
         self.setLayout(layout)
+        self.database_changed.connect(self.scrollarea1.apply_event)
+        self.db_listener = self.database_changed.emit
+        self.db.add_listener(self.db_listener)
         self.resize_window_from_config()
         # self.setGeometry()
         self.show()
@@ -214,6 +273,7 @@ class ViewWindow(QWidget, ResizeWindowMixin, WarningsMixin):
         parent when we are closed"""
         if event is not None:
             event.accept()
+            self.db.remove_listener(self.db_listener)
             # parent = typing.cast(MainWindow, self.parent_)
             self.parent_.view_window_closed()  # type: ignore
 
@@ -226,13 +286,6 @@ class ViewWindow(QWidget, ResizeWindowMixin, WarningsMixin):
             logging.info("ViewWindow: ESC pressed")
             self.close()
 
-    def update_from_database(self) -> None:
-        items1 = self.get_db().get_term1_list()
-        items2 = self.get_db().get_term2_list()
-        self.scrollarea1.update_items_from_db(
-            items1, items2, self.edit1.text(), self.edit2.text()
-        )
-
     def update_items1(self, txt: str) -> None:
         self.scrollarea1.update_items1(txt)
 
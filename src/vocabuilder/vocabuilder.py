@@ -8,13 +8,19 @@ import platform  # determine os name
 import sys
 
 from PyQt6 import QtGui
-from PyQt6.QtWidgets import QApplication
+from PyQt6.QtWidgets import QApplication, QMessageBox
 
 from vocabuilder.commandline import CommandLineOptions
 from vocabuilder.config import Config
 from vocabuilder.database import Database
-from vocabuilder.exceptions import SelectVocabularyException
+from vocabuilder.exceptions import (
+    DatabaseLockedException,
+    LocalDatabaseException,
+    SelectVocabularyException,
+)
 from vocabuilder.main_window import MainWindow
+from vocabuilder.maintenance import MaintenanceScheduler
+from vocabuilder.profiling import profiler
 from vocabuilder.select_voca import SelectVocabulary
 
 # from pprint import pprint
@@ -57,16 +63,45 @@ def main() -> None:
     #     level=logging.DEBUG,
     # )
     logging.basicConfig(level=logging.INFO)
+    profiler.enable_from_environment()
     app = QApplication(sys.argv)
     # options = CommandLineOptions(app)
     cmdline_opts = CommandLineOptions(app)
+    if cmdline_opts.profile:
+        profiler.enable(cmdline_opts.get_profile_output())
     config = Config()
-    voca_name = select_vocabulary(cmdline_opts, config, app)
-    db = Database(config, voca_name)
+    with profiler.timer("startup.select_vocabulary"):
+        voca_name = select_vocabulary(cmdline_opts, config, app)
+    # NOTE: The backup and compaction of the database file, and the synchronization
+    #   with firebase, are run in the background when the app is idle
+    maintenance = MaintenanceScheduler(config)
+    # NOTE: Only the lock is taken here, the database file is read on a worker
+    #   thread after the main window is shown, see DatabaseLoader
+    try:
+        with profiler.timer("startup.database"):
+            db = Database(
+                config,
+                voca_name,
+                maintenance=maintenance,
+                read_only=cmdline_opts.read_only,
+                defer_load=True,
+            )
+    except DatabaseLockedException as exc:
+        QMessageBox.warning(None, "Vocabulary in use", str(exc))
+        maintenance.shutdown()
+        sys.exit(1)
+    except LocalDatabaseException as exc:
+        # NOTE: E.g. a vocabulary that does not exist is opened read-only
+        QMessageBox.warning(None, "Cannot open vocabulary", str(exc))
+        maintenance.shutdown()
+        sys.exit(1)
     set_app_options(app, config)
-    window = MainWindow(app, db, config)
-    window.show()
+    with profiler.timer("startup.main_window"):
+        window = MainWindow(app, db, config, maintenance)
+        window.show()
     app.exec()
+    maintenance.shutdown()
+    profiler.dump()
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import logging
+
+from PyQt6.QtCore import QFileSystemWatcher, QObject, QTimer
+
+from vocabuilder.config import Config
+from vocabuilder.local_database import LocalDatabase
+
+
+class DatabaseWatcher(QObject):
+    """Apply the changes that other processes make to the database files, for
+    example an import from the command line tool, while the app is running. When
+    the files change, ``LocalDatabase.reload()`` parses only the rows appended since
+    the last read, and the open windows are updated through the database
+    listeners.
+
+    Changes are detected with ``QFileSystemWatcher`` (inotify on Linux). Since
+    file system notifications are not available for all file systems (e.g. some
+    network file systems), the files are also polled at the interval given by
+    ``PollInterval`` in the ``Watcher`` section of the config file.
+
+    :param database: The database to keep up to date
+    :param config: The configuration
+    """
+
+    def __init__(self, database: LocalDatabase, config: Config) -> None:
+        super().__init__()
+        self.db = database
+        self.paths = [str(database.dbname), str(database.review_log.path)]
+        self.watcher = QFileSystemWatcher(self)
+        self._watch_files()
+        # NOTE: The database file is replaced (not modified) when the writer cleans
+        #   it up, and the review log is created by the writer, so also watch the
+        #   directory for new files
+        self.watcher.addPath(str(database.datadir))
+        self.watcher.fileChanged.connect(self.check)
+        self.watcher.directoryChanged.connect(self.check)
+        self.timer = QTimer(self)
+        interval = config.config.getfloat("Watcher", "PollInterval")
+        if interval > 0:
+            self.timer.timeout.connect(self.check)
+            self.timer.start(int(interval * 1000))
+
+    def check(self) -> int:
+        """Apply the changes made since the last check. Returns the number of rows
+        read from the database file"""
+        # NOTE: A watched file is removed from the watcher when it is replaced
+        self._watch_files()
+        rows = self.db.reload()
+        if rows > 0:
+            logging.info(f"DatabaseWatcher: applied {rows} new rows")
+        return rows
+
+    def stop(self) -> None:
+        self.timer.stop()
+        self.watcher.removePaths(self.watcher.files() + self.watcher.directories())
+
+    def _watch_files(self) -> None:
+        watched = self.watcher.files()
+        for path in self.paths:
+            if path not in watched:
+                # NOTE: addPath() fails (returns False) if the file does not exist
+                self.watcher.addPath(path)
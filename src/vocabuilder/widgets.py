@@ -1,4 +1,5 @@
 # import logging
+import bisect
 import typing
 from typing import Any, Callable
 
@@ -47,8 +48,10 @@ class QGridMinimalLabel(QLabel):
 class QSelectItemScrollArea(QScrollArea):
     def __init__(self, items: list[str], select_callback: Callable[[str], None]):
         super().__init__()
+        # NOTE: items is expected to be sorted
         self.items = items
         self.select_callback = select_callback
+        self.match_str: str | None = None
         self.scrollwidget = QWidget()
         self.vbox = QVBoxLayout()
         self.vbox.addStretch()  # https://stackoverflow.com/a/63438161/2173773
@@ -62,16 +65,37 @@ class QSelectItemScrollArea(QScrollArea):
         return
 
     def add_items(self, match_str: str | None = None) -> None:
+        self.match_str = match_str
         self.labels = []  # This list is used from pytest
+        # NOTE: self.visible is the sorted list of terms that are currently shown
+        self.visible = [term for term in self.items if self.matches(term)]
         for term in reversed(
-            self.items
+            self.visible
         ):  # need reverse since vbox has bottom-to-top direction
-            if (match_str is None) or (match_str in term):
-                label = QLabelClickable(term)
-                callback = self.item_clicked(term)
-                label.addCallback(callback)
-                self.labels.append(label)
-                self.vbox.addWidget(label)
+            label = self.create_label(term)
+            self.labels.append(label)
+            self.vbox.addWidget(label)
+
+    def create_label(self, term: str) -> QLabelClickable:
+        label = QLabelClickable(term)
+        callback = self.item_clicked(term)
+        label.addCallback(callback)
+        return label
+
+    def insert_item(self, term: str) -> None:
+        """Insert a new term into the sorted list of items, and show it if it
+        matches the current filter"""
+        bisect.insort(self.items, term)
+        if not self.matches(term):
+            return
+        pos = bisect.bisect_left(self.visible, term)
+        self.visible.insert(pos, term)
+        # NOTE: the labels are stored in reversed order, and the first item in
+        #   the layout is the stretch
+        idx = len(self.visible) - 1 - pos
+        label = self.create_label(term)
+        self.labels.insert(idx, label)
+        self.vbox.insertWidget(idx + 1, label)
 
     def item_clicked(self, item: str) -> Callable[[], None]:
         def callback() -> None:
@@ -79,6 +103,23 @@ class QSelectItemScrollArea(QScrollArea):
 
         return callback
 
+    def matches(self, term: str) -> bool:
+        return (self.match_str is None) or (self.match_str in term)
+
+    def remove_item(self, term: str) -> None:
+        pos = bisect.bisect_left(self.items, term)
+        if pos == len(self.items) or self.items[pos] != term:
+            return
+        del self.items[pos]
+        pos = bisect.bisect_left(self.visible, term)
+        if pos == len(self.visible) or self.visible[pos] != term:
+            return
+        idx = len(self.visible) - 1 - pos
+        del self.visible[pos]
+        label = self.labels.pop(idx)
+        self.vbox.removeWidget(label)
+        label.deleteLater()
+
     def update_items(self, text: str) -> None:
         # See: https://stackoverflow.com/a/13103617/2173773
         layout = self.vbox
@@ -88,13 +129,13 @@ class QSelectItemScrollArea(QScrollArea):
             if layout_item is not None:
                 widget = layout_item.widget()
                 if widget is not None:
+                    # NOTE: remove the widget from the layout right away, such that
+                    #   the layout positions are correct for insert_item()
+                    layout.removeWidget(widget)
                     widget.deleteLater()
         self.add_items(text)
         self.scrollwidget.update()
 
-    def update_items_list(self, items: list[str]) -> None:
-        self.items = items
-
 
 class SelectWordFromList(QDialog, StringMixin, WarningsMixin):
     def __init__(
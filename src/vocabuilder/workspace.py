@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import logging
+import sys
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from vocabuilder.catalog import VocabularyCatalog, VocabularyInfo
+from vocabuilder.config import Config
+from vocabuilder.local_database import LocalDatabase
+
+if TYPE_CHECKING:  # pragma: no cover
+    from vocabuilder.maintenance import MaintenanceScheduler
+
+
+class Workspace:
+    """All the vocabularies in the ``databases`` directory. The vocabularies are
+    listed from the vocabulary catalog (see ``VocabularyCatalog``), without loading
+    them. A vocabulary is loaded the first time it is requested with
+    ``get_database()``, and the loaded databases are kept in least recently used
+    order, such that switching back to a recently used vocabulary does not read
+    the files again. When the estimated memory used by the loaded databases
+    exceeds ``MemoryBudget`` (megabytes, in the ``Workspace`` section of the config
+    file), the least recently used databases are closed. The database that was
+    requested last is never closed.
+
+    Each loaded database holds the writer lock for its vocabulary, see
+    ``VocabularyLock``. The lock is released when the database is closed.
+
+    :param config: The configuration
+    :param maintenance: Runs the maintenance tasks of the loaded databases, see
+      ``LocalDatabase``
+    :param read_only: If True, the vocabularies are opened read-only
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        maintenance: MaintenanceScheduler | None = None,
+        read_only: bool = False,
+    ) -> None:
+        self.config = config
+        self.maintenance = maintenance
+        self.read_only = read_only
+        self.catalog = VocabularyCatalog(
+            config.get_data_dir() / LocalDatabase.database_dir
+        )
+        self.budget = int(
+            config.config.getfloat("Workspace", "MemoryBudget") * 1024 * 1024
+        )
+        # NOTE: Maps the vocabulary name to the database and its estimated size in
+        #   bytes. The most recently used database is last
+        self.databases: OrderedDict[str, tuple[LocalDatabase, int]] = OrderedDict()
+
+    # public methods alfabetically sorted below
+    # ------------------------------------------
+
+    def add_database(self, database: LocalDatabase) -> None:
+        """Add a database that was loaded outside the workspace, e.g. at startup"""
+        name = database.get_voca_name()
+        self.databases[name] = (database, self._estimate_size(database))
+        self._evict()
+
+    def close(self) -> None:
+        """Close all the loaded databases"""
+        while self.databases:
+            self._close_database(next(iter(self.databases)))
+
+    def get_database(self, name: str) -> LocalDatabase:
+        """Return the database for vocabulary ``name``, and load it if it is not
+        loaded. The vocabulary is remembered as the vocabulary to open the next
+        time the app is started"""
+        if name in self.databases:
+            self.databases.move_to_end(name)
+            database = self.databases[name][0]
+            database.make_active()
+            return database
+        database = LocalDatabase(
+            self.config, name, read_only=self.read_only, maintenance=self.maintenance
+        )
+        self.add_database(database)
+        return database
+
+    def get_info(self, name: str) -> VocabularyInfo:
+        if name in self.databases:
+            return self.databases[name][0].get_info()
+        info = self.catalog.get_info(name)
+        if info is None:
+            return VocabularyInfo(name)
+        return info
+
+    def get_loaded_names(self) -> list[str]:
+        """The names of the loaded vocabularies, the most recently used last"""
+        return list(self.databases)
+
+    def get_names(self) -> list[str]:
+        """The names of all the vocabularies, sorted alphabetically"""
+        return self.catalog.get_names()
+
+    def list_vocabularies(self) -> list[VocabularyInfo]:
+        return [self.get_info(name) for name in self.get_names()]
+
+    def memory_usage(self) -> int:
+        """The estimated size in bytes of the loaded databases"""
+        return sum(size for _, size in self.databases.values())
+
+    def _close_database(self, name: str) -> None:
+        database, _ = self.databases.pop(name)
+        database.close()
+        logging.info(f"Workspace: closed {name}")
+
+    def _estimate_size(self, database: LocalDatabase) -> int:
+        size = sys.getsizeof(database.db)
+        for term1, row in database.db.items():
+            size += sys.getsizeof(term1) + sys.getsizeof(row)
+            size += sum(sys.getsizeof(value) for value in row.values())
+        return size
+
+    def _evict(self) -> None:
+        while len(self.databases) > 1 and self.memory_usage() > self.budget:
+            self._close_database(next(iter(self.databases)))
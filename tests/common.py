@@ -7,6 +7,8 @@ from vocabuilder.vocabuilder import Config
 #       believe that they are test classes, see https://stackoverflow.com/q/76689604/2173773
 
 PytestDataDict = dict[str, str]
+# NOTE: A version of a term, for rows written by the tests, see HybridLogicalClock
+VERSION = "018b8f3ae758-0000-0"
 QtBot = Any  # Missing type hints here
 P = ParamSpec("P")
 
@@ -289,3 +289,43 @@ class TestGeneral:
             qtbot.mouseClick(label, Qt.MouseButton.LeftButton)
         txt = callback.args[0]
         assert txt == "cloud"
+
+
+class TestDatabaseEvents:
+    def test_scroll_area_updated(
+        self,
+        main_window: MainWindow,
+    ) -> None:
+        window = main_window
+        window.add_new_entry()
+        add_win = typing.cast(AddWindow, window.add_window)
+        scrollarea = add_win.scrollarea
+        num_labels = len(scrollarea.labels)
+        add_win.edits[add_win.header.term1].setText("zebra")
+        add_win.edits[add_win.header.term2].setText("얼룩말")
+        assert add_win.add_data()
+        # NOTE: the filter was "zebra" when the item was added
+        assert [label.text() for label in scrollarea.labels] == ["zebra"]
+        add_win.update_scroll_area_items("")
+        assert len(scrollarea.labels) == num_labels + 1
+        # NOTE: labels are stored in reversed order
+        assert scrollarea.labels[0].text() == "zebra"
+        ldb = window.db.get_local_database()
+        item = window.db.get_term1_data("apple").copy()
+        item[add_win.header.term1] = "zebra2"
+        del item[add_win.header.status]
+        del item[add_win.header.last_modified]
+        ldb.rename_item("apple", item)
+        assert scrollarea.labels[0].text() == "zebra2"
+        assert "apple" not in scrollarea.items
+        ldb.delete_item("zebra")
+        ldb.delete_item("zebra2")
+        assert len(scrollarea.labels) == num_labels - 1
+        scrollarea.remove_item("zebra")  # not present: ignored
+        add_win.update_scroll_area_items("xyz")
+        scrollarea.insert_item("qqq")  # does not match the filter
+        assert len(scrollarea.labels) == 0
+        ldb.delete_item("cloud")  # present, but not shown
+        assert "cloud" not in scrollarea.items
+        ldb.update_retest_value("and", 1)  # ignored by the scroll area
+        assert len(scrollarea.items) == num_labels - 1
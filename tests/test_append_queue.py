@@ -0,0 +1,106 @@
+import logging
+import threading
+from pathlib import Path
+
+import pytest
+from _pytest.logging import LogCaptureFixture
+from pytest_mock.plugin import MockerFixture
+
+from vocabuilder.append_queue import AppendQueue
+from vocabuilder.exceptions import LocalDatabaseException
+
+from .common import GetConfig, GetDatabase
+
+
+class TestAppendQueue:
+    def test_append(self, get_config: GetConfig, tmp_path: Path) -> None:
+        append_queue = AppendQueue(get_config())
+        append_queue.flush()
+        append_queue.close()
+        path = tmp_path / "file.txt"
+        future = append_queue.append(path, b"abc")
+        assert future.result() is None
+        append_queue.append(path, b"def")
+        append_queue.flush()
+        assert path.read_bytes() == b"abcdef"
+        assert append_queue.get_end(path) == 6
+        assert append_queue.get_end(tmp_path / "other.txt") == 0
+        append_queue.append(path, b"ghi")
+        append_queue.close()
+        assert path.read_bytes() == b"abcdefghi"
+        assert append_queue.thread is None
+
+    def test_group_commit(
+        self, get_config: GetConfig, tmp_path: Path, mocker: MockerFixture
+    ) -> None:
+        started = threading.Event()
+        release = threading.Event()
+
+        def fsync(fd: int) -> None:
+            started.set()
+            release.wait(timeout=5)
+
+        mock = mocker.patch("vocabuilder.append_queue.os.fsync", side_effect=fsync)
+        append_queue = AppendQueue(get_config())
+        path1 = tmp_path / "file1.txt"
+        path2 = tmp_path / "file2.txt"
+        append_queue.append(path1, b"0")
+        assert started.wait(timeout=5)
+        # NOTE: queued while the first write is in progress, written as one batch
+        futures = [
+            append_queue.append(path1 if i % 2 else path2, str(i).encode())
+            for i in range(1, 10)
+        ]
+        release.set()
+        for future in futures:
+            future.result()
+        assert path1.read_bytes() == b"013579"
+        assert path2.read_bytes() == b"2468"
+        assert mock.call_count == 3
+        append_queue.close()
+
+    def test_write_error(
+        self, get_config: GetConfig, tmp_path: Path, caplog: LogCaptureFixture
+    ) -> None:
+        append_queue = AppendQueue(get_config())
+        future = append_queue.append(tmp_path / "missing" / "file.txt", b"abc")
+        assert isinstance(future.exception(), FileNotFoundError)
+        assert "Could not append to" in caplog.text
+        with pytest.raises(FileNotFoundError):
+            append_queue.flush()
+        # NOTE: the error is only reported once
+        append_queue.flush()
+        append_queue.close()
+
+
+class TestLocalDatabase:
+    def test_flush(self, get_database: GetDatabase) -> None:
+        ldb = get_database().get_local_database()
+        ldb.delete_item("apple")
+        ldb.flush()
+        assert ldb.db_offset == ldb.dbname.stat().st_size
+        assert (
+            ldb.dbname.read_text(encoding="utf_8")
+            .splitlines()[-1]
+            .startswith("0,apple,")
+        )
+        ldb.close()
+
+    def test_write_error(
+        self,
+        get_database: GetDatabase,
+        mocker: MockerFixture,
+        caplog: LogCaptureFixture,
+    ) -> None:
+        ldb = get_database().get_local_database()
+        mocker.patch(
+            "vocabuilder.append_queue.os.fsync", side_effect=OSError("disk full")
+        )
+        ldb.delete_item("apple")
+        with pytest.raises(LocalDatabaseException) as excinfo:
+            ldb.flush()
+        assert "disk full" in str(excinfo.value)
+        ldb.delete_item("and")
+        with caplog.at_level(logging.ERROR):
+            ldb.close()
+        assert "were lost" in caplog.text
@@ -0,0 +1,65 @@
+import json
+from pathlib import Path
+
+from _pytest.capture import CaptureFixture
+from PyQt6.QtWidgets import QApplication
+
+from benchmarks import suite
+from benchmarks.generators import VocabularyGenerator, VocabularySpec
+from vocabuilder.csv_helpers import CSVwrapper
+
+
+class TestGenerators:
+    def test_database(self, tmp_path: Path) -> None:
+        spec = VocabularySpec(100, churn=0.5, deleted=0.1, unicode_mix=1.0)
+        path = tmp_path / "database.csv"
+        assert VocabularyGenerator(spec).write_database(path) == 100 + 50 + 2 * 10
+        with CSVwrapper(path).open_for_read(CSVwrapper(path).header) as fp:
+            rows = list(fp)
+        assert fp.bad_rows == []
+        assert len({row["Term1"] for row in rows}) == 110
+        assert not any(str(row["Term1"]).isascii() for row in rows)
+
+
+class TestSuite:
+    def test_main(
+        self, qapp: QApplication, tmp_path: Path, capsys: CaptureFixture[str]
+    ) -> None:
+        output = tmp_path / "results.json"
+        argv = ["--sizes", "100", "--repeat", "2", "--workers", "1", "2"]
+        assert suite.main(argv + ["--output", str(output)]) == 0
+        results = json.loads(output.read_text(encoding="utf_8"))["results"]
+        for name in (
+            "load",
+            "load.1workers",
+            "load.2workers",
+            "open",
+            "open.parse",
+            "due",
+            "search",
+            "startup.paint",
+            "startup.loaded",
+            "import",
+            "sync",
+        ):
+            assert results[f"{name}/100"]["seconds"] >= 0
+        assert "(no baseline)" in capsys.readouterr().out
+        # NOTE: a baseline that is much faster than any real run
+        for value in results.values():
+            value["seconds"] = 1e-9
+        del results["sync/100"]
+        baseline = tmp_path / "baseline.json"
+        baseline.write_text(json.dumps({"results": results}), encoding="utf_8")
+        assert suite.main(argv[:4] + ["--workers", "--baseline", str(baseline)]) == 1
+        out = capsys.readouterr().out
+        assert "load/100" in out and "REGRESSION" in out
+        assert "sync/100" in out and "(no baseline)" in out
+
+    def test_compare(self) -> None:
+        results = {"due/10": {"seconds": 1.1}, "load/10": {"seconds": 1.0}}
+        baseline = {"due/10": {"seconds": 1.0}, "load/10": {"seconds": 0.0}}
+        lines = suite.compare(results, baseline, threshold=0.2)
+        assert not any(line.endswith("REGRESSION") for line in lines)
+        assert suite.compare(results, baseline, threshold=0.05)[0].endswith(
+            "REGRESSION"
+        )
@@ -0,0 +1,94 @@
+import json
+import os
+from pathlib import Path
+
+from _pytest.logging import LogCaptureFixture
+from pytest_mock.plugin import MockerFixture
+
+from vocabuilder.catalog import VocabularyCatalog, VocabularyInfo
+from vocabuilder.local_database import LocalDatabase
+
+from .common import GetDatabase, PytestDataDict
+
+
+class TestVocabularyCatalog:
+    def test_maintained_by_database(
+        self, get_database: GetDatabase, test_data: PytestDataDict
+    ) -> None:
+        name = test_data["vocaname"]
+        ldb = get_database().get_local_database()
+        catalog = VocabularyCatalog(ldb.datadir.parent)
+        info = catalog.get_info(name)
+        assert info is not None
+        assert (info.terms, info.due) == (40, 40)
+        assert info.path == str(ldb.datadir)
+        assert info.size == ldb.dbname.stat().st_size
+        ldb.delete_item("apple")
+        ldb.close()
+        info = catalog.get_info(name)
+        assert (info is not None) and (info.terms == 39)
+        assert catalog.get_info("unknown") is None
+
+    def test_most_recent(self, get_database: GetDatabase) -> None:
+        ldb = get_database().get_local_database()
+        db_dir = ldb.datadir.parent
+        LocalDatabase(ldb.config, "b-voca", update_active=False).close()
+        LocalDatabase(ldb.config, "c-voca", update_active=False).close()
+        catalog = VocabularyCatalog(db_dir)
+        for i, name in enumerate(["c-voca", ldb.get_voca_name(), "b-voca"]):
+            info = catalog.get_info(name)
+            assert info is not None
+            info.modified = 1000 + i
+            catalog.update(info)
+        assert catalog.most_recent() == "b-voca"
+        catalog.remove("b-voca")
+        catalog.remove("b-voca")  # already removed
+        assert catalog.get_names() == ["c-voca", ldb.get_voca_name()]
+        assert catalog.most_recent() == ldb.get_voca_name()
+
+    def test_scan(
+        self,
+        get_database: GetDatabase,
+        test_data: PytestDataDict,
+        caplog: LogCaptureFixture,
+    ) -> None:
+        ldb = get_database().get_local_database()
+        db_dir = ldb.datadir.parent
+        catalog = VocabularyCatalog(db_dir)
+        (db_dir / "not-a-vocabulary").mkdir()
+        # NOTE: the catalog is created from the directories if it is missing or
+        #   corrupt, e.g. when upgrading from an older version
+        os.unlink(catalog.path)
+        assert catalog.get_names() == [test_data["vocaname"]]
+        infos = catalog.list_vocabularies()
+        assert infos[0].terms is None
+        assert infos[0].modified == ldb.dbname.stat().st_mtime
+        assert str(infos[0]) == test_data["vocaname"]
+        catalog.path.write_text("{", encoding="utf_8")
+        assert catalog.get_names() == [test_data["vocaname"]]
+        assert "Rebuilding corrupt vocabulary catalog" in caplog.text
+        assert json.loads(catalog.path.read_text(encoding="utf_8"))
+
+    def test_read_only(
+        self,
+        get_database: GetDatabase,
+        test_data: PytestDataDict,
+        caplog: LogCaptureFixture,
+        mocker: MockerFixture,
+    ) -> None:
+        ldb = get_database().get_local_database()
+        catalog = VocabularyCatalog(ldb.datadir.parent)
+        os.unlink(catalog.path)
+        mocker.patch.object(
+            VocabularyCatalog, "_write", side_effect=OSError("Read-only file system")
+        )
+        assert catalog.get_names() == [test_data["vocaname"]]
+        assert "Could not save vocabulary catalog" in caplog.text
+        assert not catalog.path.exists()
+
+    def test_no_databases(self, tmp_path: Path) -> None:
+        catalog = VocabularyCatalog(tmp_path / "databases")
+        assert catalog.list_vocabularies() == []
+        assert catalog.most_recent() is None
+        catalog.update(VocabularyInfo("new", terms=1, due=0))
+        assert str(catalog.list_vocabularies()[0]) == "new (1 terms, 0 due)"
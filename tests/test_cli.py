@@ -0,0 +1,214 @@
+import subprocess
+import sys
+from pathlib import Path
+from typing import Callable
+
+import firebase_admin  # type: ignore
+import pytest
+from _pytest.capture import CaptureFixture
+from firebase_admin import initialize_app
+from pytest_mock.plugin import MockerFixture
+
+from vocabuilder import cli
+from vocabuilder.exceptions import DatabaseLockedException
+from vocabuilder.local_database import LocalDatabase
+from vocabuilder.profiling import profiler
+
+from .common import GetConfig, GetDatabase, PytestDataDict
+
+
+@pytest.fixture()
+def cli_setup(setup_database_dir: Callable[[], Path], get_config: GetConfig) -> Path:
+    """Create the test vocabulary and mock the config and data directories"""
+    get_config()
+    return setup_database_dir()
+
+
+class TestCommands:
+    def test_no_pyqt(self) -> None:
+        code = (
+            "import sys, vocabuilder.cli\n"
+            "assert not any(m.startswith('PyQt6') for m in sys.modules)"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+    def test_stats_and_due(self, cli_setup: Path, capsys: CaptureFixture[str]) -> None:
+        assert cli.main(["stats"]) == 0
+        out = capsys.readouterr().out
+        assert out.startswith("english-korean: 40 terms")
+        assert cli.main(["--all", "due", "--count"]) == 0
+        assert capsys.readouterr().out.startswith("english-korean: ")
+        assert cli.main(["-v", "english-korean", "--verbose", "due"]) == 0
+        assert "apple\t사과" in capsys.readouterr().out.splitlines()
+
+    def test_profile(
+        self,
+        cli_setup: Path,
+        tmp_path: Path,
+        mocker: MockerFixture,
+        capsys: CaptureFixture[str],
+    ) -> None:
+        # NOTE: the timers are in the modules, so the process wide profiler is used
+        mocker.patch.multiple(profiler, enabled=False, timings={}, counters={})
+        assert cli.main(["stats"]) == 0
+        assert "database.parse" not in capsys.readouterr().err
+        output = tmp_path / "stats.prof"
+        assert cli.main(["--profile-output", str(output), "stats"]) == 0
+        err = capsys.readouterr().err
+        assert "config.read" in err
+        assert "database.rows_read" in err
+        assert output.is_file()
+
+    def test_import_export(
+        self,
+        cli_setup: Path,
+        tmp_path: Path,
+        mocker: MockerFixture,
+        capsys: CaptureFixture[str],
+    ) -> None:
+        src = tmp_path / "new.tsv"
+        src.write_text("apple\t사과\nyes\t네\nbad line\n", encoding="utf_8")
+        assert cli.main(["import", str(src)]) == 0
+        out = capsys.readouterr().out
+        assert "added 1 terms" in out
+        assert "skipped 1 duplicates and 1 invalid rows" in out
+        dest = tmp_path / "export.csv"
+        assert cli.main(["export", str(dest)]) == 0
+        lines = dest.read_text(encoding="utf_8").splitlines()
+        assert len(lines) == 42
+        assert any(line.startswith("1,yes,네,0,") for line in lines)
+        dest = tmp_path / "export.jsonl.gz"
+        assert cli.main(["export", str(dest), "--format", "csv"]) == 0
+        assert "exported 41 terms" in capsys.readouterr().out
+        mocker.patch.dict(sys.modules, {"zstandard": None})
+        assert cli.main(["export", str(dest), "--compression", "zstd"]) == 1
+        assert "zstandard" in capsys.readouterr().err
+
+    def test_import_firebase(
+        self,
+        get_database: GetDatabase,
+        test_data: PytestDataDict,
+        tmp_path: Path,
+        capsys: CaptureFixture[str],
+    ) -> None:
+        get_database(init=True)
+        src = tmp_path / "new.txt"
+        src.write_text("#html:true\nyes\t<i>네</i>\n", encoding="utf_8")
+        name = test_data["vocaname"]
+        assert cli.main(["-v", name, "import", "--firebase", str(src)]) == 0
+        assert "added 1 terms" in capsys.readouterr().out
+
+    def test_import_firebase_not_configured(
+        self,
+        cli_setup: Path,
+        tmp_path: Path,
+        mocker: MockerFixture,
+        capsys: CaptureFixture[str],
+    ) -> None:
+        mocker.patch(
+            "vocabuilder.database.FirebaseDatabase._initialize_service_account",
+            return_value=False,
+        )
+        src = tmp_path / "new.csv"
+        src.write_text("yes,네\n", encoding="utf_8")
+        assert cli.main(["import", "--firebase", str(src)]) == 1
+        assert "not configured" in capsys.readouterr().err
+
+    def test_compact_and_backup(
+        self, cli_setup: Path, capsys: CaptureFixture[str]
+    ) -> None:
+        dbfile = cli_setup / LocalDatabase.database_fn
+        with open(dbfile, "a", encoding="utf_8") as fp:
+            fp.write("1,apple,사과,1,1684886400,1687329957\n")
+        assert cli.main(["compact"]) == 0
+        assert "compacted" in capsys.readouterr().out
+        assert cli.main(["backup"]) == 0
+        assert "created backup" in capsys.readouterr().out
+
+    def test_locked(
+        self, cli_setup: Path, mocker: MockerFixture, capsys: CaptureFixture[str]
+    ) -> None:
+        mocker.patch(
+            "vocabuilder.local_database.VocabularyLock.acquire",
+            side_effect=DatabaseLockedException("in use"),
+        )
+        assert cli.main(["compact"]) == 1
+        assert "english-korean: Database locked: in use" in capsys.readouterr().err
+        # NOTE: commands that only read do not need the writer lock
+        assert cli.main(["stats"]) == 0
+
+    def test_sync(
+        self,
+        get_database: GetDatabase,
+        test_data: PytestDataDict,
+        mocker: MockerFixture,
+        capsys: CaptureFixture[str],
+    ) -> None:
+        get_database(init=True)
+        close = mocker.spy(LocalDatabase, "close")
+        name = test_data["vocaname"]
+        assert cli.main(["-v", name, "sync"]) == 0
+        assert "synchronized" in capsys.readouterr().out
+        close.assert_called_once()
+
+    def test_sync_all(
+        self,
+        get_database: GetDatabase,
+        tmp_path: Path,
+        mocker: MockerFixture,
+        capsys: CaptureFixture[str],
+    ) -> None:
+        get_database(init=True)
+        # NOTE: Use the real initialize_app(), which raises ValueError if the default
+        #   app already exists
+        mocker.patch(
+            "vocabuilder.firebase_database.firebase_admin.initialize_app",
+            side_effect=initialize_app,
+        )
+        src = tmp_path / "new.csv"
+        src.write_text("yes,네\n", encoding="utf_8")
+        assert cli.main(["-v", "new-voca", "import", str(src)]) == 0
+        try:
+            assert cli.main(["--all", "sync"]) == 0
+        finally:
+            firebase_admin.delete_app(firebase_admin.get_app())
+        out = capsys.readouterr().out
+        assert "english-korean: synchronized" in out
+        assert "new-voca: synchronized" in out
+
+    def test_sync_not_configured(
+        self, cli_setup: Path, mocker: MockerFixture, capsys: CaptureFixture[str]
+    ) -> None:
+        mocker.patch(
+            "vocabuilder.database.FirebaseDatabase._initialize_service_account",
+            return_value=False,
+        )
+        assert cli.main(["sync"]) == 1
+        assert "not configured" in capsys.readouterr().err
+
+
+class TestSelectVocabulary:
+    def test_unknown(self, cli_setup: Path, capsys: CaptureFixture[str]) -> None:
+        assert cli.main(["-v", "xyz", "stats"]) == 2
+        assert "Unknown vocabulary" in capsys.readouterr().err
+
+    def test_no_active(
+        self, get_config: GetConfig, capsys: CaptureFixture[str]
+    ) -> None:
+        config = get_config()
+        (config.get_config_dir() / LocalDatabase.active_voca_info_fn).unlink()
+        assert cli.list_vocabularies(config) == []
+        assert cli.main(["stats"]) == 2
+        assert "No active vocabulary" in capsys.readouterr().err
+
+    def test_import_new(
+        self, cli_setup: Path, tmp_path: Path, capsys: CaptureFixture[str]
+    ) -> None:
+        src = tmp_path / "new.csv"
+        src.write_text("yes,네\n", encoding="utf_8")
+        assert cli.main(["-v", "new-voca", "import", str(src)]) == 0
+        assert "added 1 terms" in capsys.readouterr().out
+        config = cli.Config()
+        assert cli.list_vocabularies(config) == ["english-korean", "new-voca"]
+        active = config.get_config_dir() / LocalDatabase.active_voca_info_fn
+        assert active.read_text(encoding="utf-8").strip() == "english-korean"
@@ -1,4 +1,6 @@
 # import logging
+from pathlib import Path
+
 import pytest
 
 # from PyQt6.QtCore import Qt
@@ -24,6 +26,20 @@ class TestGeneral:
         )
         args = CommandLineOptions(qapp)
         assert args.database_name == cmd_line_args[0]
+        assert not args.read_only
+
+    def test_read_only(
+        self,
+        mocker: MockerFixture,
+        qapp: QApplication,
+    ) -> None:
+        mocker.patch(
+            "vocabuilder.commandline.QCommandLineParser.isSet",
+            side_effect=lambda option: option.names() == ["read-only"],
+        )
+        args = CommandLineOptions(qapp)
+        assert args.read_only
+        assert not args.profile
 
     def test_ok2(
         self,
@@ -37,6 +53,24 @@ class TestGeneral:
         )
         args = CommandLineOptions(qapp)
         assert args.database_name is None
+        assert not args.profile
+        assert args.get_profile_output() is None
+
+    def test_profile(
+        self,
+        mocker: MockerFixture,
+        qapp: QApplication,
+    ) -> None:
+        mocker.patch(
+            "vocabuilder.commandline.QCommandLineParser.isSet", return_value=True
+        )
+        mocker.patch(
+            "vocabuilder.commandline.QCommandLineParser.value",
+            return_value="startup.prof",
+        )
+        args = CommandLineOptions(qapp)
+        assert args.profile
+        assert args.get_profile_output() == Path("startup.prof")
 
     def test_bad(
         self,
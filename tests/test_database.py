@@ -9,18 +9,20 @@ from firebase_admin.exceptions import FirebaseError  # type: ignore
 from pytest_mock.plugin import MockerFixture
 
 from vocabuilder.constants import TermStatus
-from vocabuilder.csv_helpers import CsvDatabaseHeader
+from vocabuilder.csv_helpers import CsvDatabaseHeader, CSVwrapper
 from vocabuilder.database import Database
+from vocabuilder.events import DatabaseEvent, DatabaseEventType
 from vocabuilder.exceptions import (
-    CsvFileException,
     FirebaseDatabaseException,
     LocalDatabaseException,
     TimeException,
 )
 from vocabuilder.local_database import LocalDatabase
-from vocabuilder.type_aliases import DatabaseRow, DatabaseType
+from vocabuilder.type_aliases import DatabaseRow, DatabaseType, DatabaseValue
 
-from .common import GetConfig, GetDatabase, PytestDataDict
+from .common import VERSION, GetConfig, GetDatabase, PytestDataDict
+
+V = VERSION.encode("ascii")
 
 # from .conftest import database_object, test_data, data_dir_path
 
@@ -453,7 +455,7 @@ class TestLocalDatabaseCreate:
         cfg = get_config()
         voca_name = test_data["vocaname"]
         LocalDatabase(cfg, voca_name)
-        assert filename.stat().st_size == 52
+        assert filename.stat().st_size == 69
 
 
 class TestDeleteItem:
@@ -500,22 +502,26 @@ class TestDeleteItem:
                 code="code", message="message", http_response=None
             )
         db.delete_item("apple")
+        # NOTE: The tombstone is saved also if the item could not be deleted
         if value_error:
-            assert caplog.records[-1].msg.startswith(
+            assert caplog.records[-2].msg.startswith(
                 "Firebase: delete failed: invalid child path"
             )
-        elif no_child:
-            assert caplog.records[-1].msg.startswith(
+            assert caplog.records[-1].msg.startswith("Firebase: invalid tombstone")
+            return
+        if no_child:
+            assert caplog.records[-2].msg.startswith(
                 "Firebase: delete failed: key 'apple' does not exist"
             )
         elif delete_error:
-            assert caplog.records[-1].msg.startswith(
+            assert caplog.records[-2].msg.startswith(
                 "Firebase: could not delete item: cause: "
                 "None, error: code, http_response: None"
             )
         else:
-            assert caplog.records[-2].msg.startswith("DELETED: term1 = 'apple'")
-            assert caplog.records[-1].msg.startswith("Firebase: deleted item: 'apple'")
+            assert caplog.records[-3].msg.startswith("DELETED: term1 = 'apple'")
+            assert caplog.records[-2].msg.startswith("Firebase: deleted item: 'apple'")
+        assert caplog.records[-1].msg == "Firebase: saved tombstone: 'apple'"
 
 
 class TestEpochDiff:
@@ -612,9 +618,118 @@ class TestReadDatabase:
             fp.write("1, 2, 3")
         cfg = get_config()
         voca_name = test_data["vocaname"]
-        with pytest.raises(CsvFileException) as excinfo:
-            LocalDatabase(cfg, voca_name)
-        assert re.search(r"Bad type found", str(excinfo))
+        db = LocalDatabase(cfg, voca_name)
+        assert db.recovery is not None
+        assert db.recovery.rows == 1
+        assert db.recovery.path.read_text(encoding="utf_8") == "1, 2, 3"
+        assert "Skipped 1 corrupt rows (7 bytes)" in str(db.recovery)
+        assert len(db.get_term1_list()) == 40
+        # NOTE: the corrupt row was removed from the database file
+        assert LocalDatabase(cfg, voca_name).recovery is None
+
+    def test_checksums(
+        self,
+        setup_database_dir: Callable[[], Path],
+        get_config: GetConfig,
+        test_data: PytestDataDict,
+    ) -> None:
+        data_dir = setup_database_dir()
+        filename = data_dir / LocalDatabase.database_fn
+        csvwrapper = CSVwrapper(filename)
+        header = CsvDatabaseHeader()
+        item: DatabaseRow = {
+            header.status: 1,
+            header.term1: "yes",
+            header.term2: "네",
+            header.test_delay: 0,
+            header.last_test: 1698866695,
+            header.last_modified: 1698866695,
+            header.version: VERSION,
+        }
+        csvwrapper.append_line(item)
+        with open(filename, "ab") as fp:
+            fp.write(b"1,no,\xec\x95\x84,0,1698866695,1698866695,00000000\r\n")
+            fp.write(b"1,maybe,\xec\x95")  # NOTE: torn write
+        item[header.term1] = "sure"
+        csvwrapper.append_line(item)
+        item[header.term1] = "ok"
+        csvwrapper.append_line(item)
+        with open(filename, "ab") as fp:
+            fp.write(b'1,"' + b"x" * 200000 + b'"\r\n')
+            fp.write(b"1,typo,x,zero,1698866695,1698866695\r\n")  # NOTE: bad type
+        db = LocalDatabase(get_config(), test_data["vocaname"])
+        assert db.recovery is not None
+        assert db.recovery.rows == 4
+        assert db.check_term1_exists("yes")
+        assert db.check_term1_exists("ok")
+        assert not db.check_term1_exists("no")
+        assert not db.check_term1_exists("sure")
+        with open(filename, encoding="utf_8") as fp:
+            assert fp.readline().strip() == ",".join(header.header + [header.checksum])
+
+    @pytest.mark.parametrize(
+        "complete_only, bad_quote", [(False, True), (True, False), (True, True)]
+    )
+    def test_mmap_reader(
+        self, tmp_path: Path, complete_only: bool, bad_quote: bool
+    ) -> None:
+        filename = tmp_path / LocalDatabase.database_fn
+        csvwrapper = CSVwrapper(filename)
+        header = csvwrapper.header
+        csvwrapper.append_row(csvwrapper.header_row())
+        item: DatabaseRow = {
+            header.status: 1,
+            header.term1: "yes",
+            header.term2: "네",
+            header.test_delay: 0,
+            header.last_test: 1698866695,
+            header.last_modified: 1698866695,
+            header.version: VERSION,
+        }
+        csvwrapper.append_line(item)
+        item[header.term2] = '"long"\r\n' * 20
+        csvwrapper.append_line(item)
+        values: list[DatabaseValue] = [
+            1,
+            "typo",
+            "x",
+            "zero",
+            1698866695,
+            1698866695,
+            VERSION,
+        ]
+        csvwrapper.append_row([*values, csvwrapper.checksum(values)])
+        with open(filename, "ab") as fp:
+            fp.write(b"1,no,x,0,1698866695,1698866695,%s,00000000\r\n" % V)
+            fp.write(b"\r\n")
+            fp.write(b"1,typo,x,zero,1698866695,1698866695,%s\r\n" % V)
+            if not complete_only:
+                # NOTE: longer than the field size limit of the csv module
+                fp.write(b'1,"' + b"x" * 200000 + b'"\r\n')
+            if bad_quote:
+                # NOTE: read as "nox", the strict reader stops here
+                fp.write(b'1,"no"x,x,0,1698866695,1698866695,%s\r\n' % V)
+        item[header.term2] = "예"
+        csvwrapper.append_line(item)
+        with open(filename, "ab") as fp:
+            fp.write(b'1,"maybe,\r\n\xec\x95')  # NOTE: torn write
+        with csvwrapper.open_for_read(header, complete_only=complete_only) as fp1:
+            expected = {row[header.term1]: row for row in fp1}
+        with csvwrapper.open_for_mmap_read(header, complete_only=complete_only) as fp2:
+            # NOTE: split the file in small blocks
+            fp2.block_size = 16
+            rows = list(fp2)
+        assert {row[header.term1]: row for row in rows} == expected
+        assert fp2.offset == fp1.offset
+        assert sorted(fp2.bad_rows) == sorted(fp1.bad_rows)
+        if complete_only:
+            assert [row[header.term1] for row in rows] == ["yes"]
+            assert fp2.count == (3 if bad_quote else 4)
+            assert len(fp2.bad_rows) == 3
+        else:
+            assert [row[header.term1] for row in rows] == ["yes", "nox"]
+            assert fp2.count == 5
+            assert len(fp2.bad_rows) == 5
 
     def test_deleted(
         self,
@@ -635,7 +750,8 @@ class TestReadDatabase:
             header.last_test: "1684886400",
             header.last_modified: "1687329957",
         }
-        row = [item[key] for key in header.header]
+        # NOTE: The test file is written by an older version, without versions
+        row = list(item.values())
         with open(filename, "a", encoding="utf_8") as fp:
             fp.write(",".join(row))
         cfg = get_config()
@@ -661,7 +777,8 @@ class TestReadDatabase:
             header.last_test: "1684886400",
             header.last_modified: "1687329957",
         }
-        row = [item[key] for key in header.header]
+        # NOTE: The test file is written by an older version, without versions
+        row = list(item.values())
         with open(filename, "a", encoding="utf_8") as fp:
             fp.write(",".join(row))
         cfg = get_config()
@@ -717,8 +834,11 @@ class TestUpdateDatabase:
     ) -> None:
         db = get_database()
         caplog.set_level(logging.INFO)
+        dbfile = db.get_local_database().dbname
+        size = dbfile.stat().st_size
         db.update_retest_value("apple", 5)
-        assert caplog.records[-1].msg.startswith("UPDATED: term1 = 'apple'")
+        assert caplog.records[-1].msg.startswith("REVIEWED: term1 = 'apple'")
+        assert dbfile.stat().st_size == size
 
 
 class TestModifyDatabase:
@@ -739,8 +859,7 @@ class TestModifyDatabase:
             header.last_test: 1684886400,
             header.last_modified: 1687329957,
         }
-        mocker.patch.object(db.local_database, "delete_item", return_value=None)
-        mocker.patch.object(db.local_database, "add_item", return_value=None)
+        mocker.patch.object(db.local_database, "rename_item", return_value=None)
         caplog.set_level(logging.INFO)
         db.modify_item("milk", row)
         assert caplog.records[-1].msg.startswith(
@@ -764,10 +883,185 @@ class TestModifyDatabase:
             header.last_test: 1684886400,
             header.last_modified: 1687329957,
         }
-        mocker.patch.object(db.local_database, "delete_item", return_value=None)
-        mocker.patch.object(db.local_database, "add_item", return_value=None)
+        mocker.patch.object(db.local_database, "rename_item", return_value=None)
         caplog.set_level(logging.INFO)
         db.modify_item("apple", row)
         assert caplog.records[-1].msg.startswith(
             "Firebase: renamed item: 'apple' -> 'milk'"
         )
+
+
+class TestEvents:
+    def test_add_update_delete(self, get_database: GetDatabase) -> None:
+        db = get_database()
+        ldb = db.get_local_database()
+        events: list[DatabaseEvent] = []
+        db.add_listener(events.append)
+        header = CsvDatabaseHeader()
+        item: DatabaseRow = {
+            header.term1: "rose",
+            header.term2: "장미",
+            header.test_delay: 0,
+            header.last_test: db.epoch_in_seconds(),
+        }
+        db.add_item(item)
+        db.update_retest_value("rose", 2)
+        ldb.delete_item("rose")
+        types = [event.type for event in events]
+        assert types == [
+            DatabaseEventType.ADDED,
+            DatabaseEventType.UPDATED,
+            DatabaseEventType.DELETED,
+        ]
+        assert events[0].term2 == "장미"
+        assert events[2].term2 is None
+        assert "rose" in repr(events[0])
+        db.remove_listener(events.append)
+        db.remove_listener(events.append)  # removing twice is not an error
+        ldb.delete_item("apple")
+        assert len(events) == 3
+
+    def test_rename(self, get_database: GetDatabase) -> None:
+        db = get_database()
+        ldb = db.get_local_database()
+        events: list[DatabaseEvent] = []
+        ldb.add_listener(events.append)
+        header = CsvDatabaseHeader()
+        item = db.get_term1_data("apple").copy()
+        item[header.term1] = "apples"
+        del item[header.status]
+        del item[header.last_modified]
+        ldb.rename_item("apple", item)
+        assert len(events) == 1
+        assert events[0].type == DatabaseEventType.RENAMED
+        assert events[0].old_term1 == "apple"
+        assert events[0].term1 == "apples"
+        assert not db.check_term1_exists("apple")
+
+    def test_assign(self, get_database: GetDatabase) -> None:
+        db = get_database()
+        ldb = db.get_local_database()
+        events: list[DatabaseEvent] = []
+        ldb.add_listener(events.append)
+        item = db.get_term1_data("apple").copy()
+        ldb.assign_item("apple", item)
+        ldb.assign_item("apple2", item)
+        assert [event.type for event in events] == [
+            DatabaseEventType.UPDATED,
+            DatabaseEventType.ADDED,
+        ]
+
+
+class TestReadOnly:
+    def test_reload(self, get_database: GetDatabase) -> None:
+        ldb = get_database().get_local_database()
+        header = ldb.get_header()
+        reader = LocalDatabase(ldb.config, ldb.voca_name, read_only=True)
+        events: list[DatabaseEvent] = []
+        reader.add_listener(events.append)
+        assert reader.get_term1_list() == ldb.get_term1_list()
+        assert reader.reload() == 0
+        now = ldb.epoch_in_seconds()
+        ldb.add_item(
+            {
+                header.term1: "yes",
+                header.term2: "네",
+                header.test_delay: 0,
+                header.last_test: now,
+            }
+        )
+        ldb.delete_item("apple")
+        # NOTE: the changes are written to disk by the writer thread
+        ldb.flush()
+        assert reader.reload() == 2
+        assert reader.get_term2("yes") == "네"
+        assert not reader.check_term1_exists("apple")
+        ldb.update_retest_value("and", 3)
+        ldb.flush()
+        assert reader.reload() == 0
+        assert reader.get_term1_data("and")[header.test_delay] == 3
+        assert [(event.type, event.term1) for event in events] == [
+            (DatabaseEventType.ADDED, "yes"),
+            (DatabaseEventType.DELETED, "apple"),
+            (DatabaseEventType.UPDATED, "and"),
+        ]
+
+    def test_incomplete_rows(self, get_database: GetDatabase) -> None:
+        ldb = get_database().get_local_database()
+        reader = LocalDatabase(ldb.config, ldb.voca_name, read_only=True)
+        with open(ldb.dbname, "ab") as fp:
+            fp.write("\r\n1,maybe,아".encode("utf_8"))
+        assert reader.reload() == 0
+        assert not reader.check_term1_exists("maybe")
+        with open(ldb.dbname, "ab") as fp:
+            fp.write(f'마,0,1,2,{VERSION}\r\n1,"two\n'.encode("utf_8"))
+        assert reader.reload() == 1
+        assert reader.get_term2("maybe") == "아마"
+        with open(ldb.dbname, "ab") as fp:
+            fp.write(f'lines",둘,0,1,2,{VERSION}\r\n'.encode("utf_8"))
+        assert reader.reload() == 1
+        assert reader.get_term2("two\nlines") == "둘"
+
+    def test_rewritten(self, get_database: GetDatabase) -> None:
+        ldb = get_database().get_local_database()
+        header = ldb.get_header()
+        reader = LocalDatabase(ldb.config, ldb.voca_name, read_only=True)
+        events: list[DatabaseEvent] = []
+        reader.add_listener(events.append)
+        ldb.delete_item("apple")
+        ldb.update_retest_value("and", 5)
+        item = ldb.get_term1_data("cloud").copy()
+        item[header.term1] = "clouds"
+        del item[header.status]
+        del item[header.last_modified]
+        ldb.add_item(item)
+        ldb.flush()
+        # NOTE: a new writer rewrites the database file at startup
+        LocalDatabase(ldb.config, ldb.voca_name)
+        assert reader.reload() == 40
+        assert not reader.check_term1_exists("apple")
+        assert reader.get_term1_data("and")[header.test_delay] == 5
+        assert {(event.type, event.term1) for event in events} == {
+            (DatabaseEventType.DELETED, "apple"),
+            (DatabaseEventType.UPDATED, "and"),
+            (DatabaseEventType.ADDED, "clouds"),
+        }
+
+    def test_database(
+        self,
+        setup_database_dir: Callable[[], Path],
+        get_config: GetConfig,
+        test_data: PytestDataDict,
+        mocker: MockerFixture,
+    ) -> None:
+        data_dir = setup_database_dir()
+        cfg = get_config(setup_firebase=True)
+        reference = mocker.patch(
+            "vocabuilder.firebase_database.firebase_admin.db.reference"
+        )
+        active = cfg.get_config_dir() / LocalDatabase.active_voca_info_fn
+        mtime = active.stat().st_mtime_ns
+        files = sorted(data_dir.parent.rglob("*"))
+        db = Database(cfg, test_data["vocaname"], read_only=True)
+        ldb = db.get_local_database()
+        assert ldb.read_only
+        assert len(db.get_term1_list()) == 40
+        # NOTE: firebase is not read, since reading it deletes duplicate items
+        assert not db.firebase_database.is_initialized()
+        reference.assert_not_called()
+        ldb.make_active()
+        ldb.close()
+        assert sorted(data_dir.parent.rglob("*")) == files
+        assert active.stat().st_mtime_ns == mtime
+
+    def test_errors(self, get_database: GetDatabase) -> None:
+        ldb = get_database().get_local_database()
+        reader = LocalDatabase(ldb.config, ldb.voca_name, read_only=True)
+        with pytest.raises(LocalDatabaseException) as excinfo:
+            reader.delete_item("apple")
+        assert "is opened read-only" in str(excinfo)
+        reader.close()
+        ldb.close()
+        with pytest.raises(LocalDatabaseException) as excinfo:
+            LocalDatabase(ldb.config, "unknown", read_only=True)
+        assert "does not exist" in str(excinfo)
@@ -0,0 +1,87 @@
+import threading
+from pathlib import Path
+from typing import Callable
+
+from pytest_mock.plugin import MockerFixture
+
+from vocabuilder.database import Database
+from vocabuilder.database_loader import DatabaseLoader
+from vocabuilder.exceptions import LocalDatabaseException
+from vocabuilder.local_database import LocalDatabase
+
+from .common import GetConfig, PytestDataDict, QtBot
+
+
+class TestDatabaseLoader:
+    def test_loaded(
+        self,
+        setup_database_dir: Callable[[], Path],
+        get_config: GetConfig,
+        test_data: PytestDataDict,
+        qtbot: QtBot,
+        mocker: MockerFixture,
+    ) -> None:
+        setup_database_dir()
+        cfg = get_config()
+        active = cfg.get_config_dir() / LocalDatabase.active_voca_info_fn
+        active.unlink(missing_ok=True)
+        mocker.patch.object(LocalDatabase, "progress_rows", 15)
+        db = Database(cfg, test_data["vocaname"], defer_load=True)
+        ldb = db.get_local_database()
+        assert ldb.lock.acquired
+        assert not ldb.loaded
+        assert db.get_term1_list() == []
+        loader = DatabaseLoader(db)
+        progress: list[int] = []
+        loader.progress.connect(progress.append)
+        with qtbot.waitSignal(loader.loaded, timeout=5000):
+            loader.start()
+        assert progress == [15, 30]
+        assert ldb.loaded
+        assert len(db.get_term1_list()) == 40
+        assert active.read_text(encoding="utf-8") == test_data["vocaname"]
+        ldb.close()
+
+    def test_failed(
+        self,
+        setup_database_dir: Callable[[], Path],
+        get_config: GetConfig,
+        test_data: PytestDataDict,
+        qtbot: QtBot,
+        mocker: MockerFixture,
+    ) -> None:
+        setup_database_dir()
+        db = Database(get_config(), test_data["vocaname"], defer_load=True)
+        mocker.patch.object(
+            db, "load", side_effect=LocalDatabaseException("Unexpected status")
+        )
+        loader = DatabaseLoader(db)
+        with qtbot.waitSignal(loader.failed, timeout=5000) as blocker:
+            loader.start()
+        assert blocker.args == ["Database exception: Unexpected status"]
+        assert not db.get_local_database().loaded
+        db.get_local_database().close()
+
+    def test_wait(
+        self,
+        setup_database_dir: Callable[[], Path],
+        get_config: GetConfig,
+        test_data: PytestDataDict,
+        qtbot: QtBot,
+        mocker: MockerFixture,
+    ) -> None:
+        setup_database_dir()
+        db = Database(get_config(), test_data["vocaname"], defer_load=True)
+        started = threading.Event()
+        mocker.patch.object(db, "load", side_effect=lambda progress: started.set())
+        loader = DatabaseLoader(db)
+        loaded: list[bool] = []
+        loader.loaded.connect(lambda: loaded.append(True))
+        loader.start()
+        started.wait(timeout=5)
+        loader.wait()
+        # NOTE: the result of the worker thread is ignored
+        qtbot.wait(50)
+        assert loaded == []
+        assert not db.get_local_database().loaded
+        db.get_local_database().close()
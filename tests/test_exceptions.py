@@ -4,9 +4,13 @@ from vocabuilder.exceptions import (
     CommandLineException,
     ConfigException,
     CsvFileException,
+    DatabaseLockedException,
+    ExportException,
     FirebaseDatabaseException,
     LocalDatabaseException,
+    ReviewLogException,
     SelectVocabularyException,
+    TaskCancelledException,
     TimeException,
 )
 
@@ -43,6 +47,22 @@ def test_firebase_database_exception() -> None:
         assert re.search(r"Testing", msg)
 
 
+def test_database_locked_exception() -> None:
+    try:
+        raise DatabaseLockedException("Testing")
+    except DatabaseLockedException as exc:
+        msg = str(exc)
+        assert re.search(r"Testing", msg)
+
+
+def test_export_exception() -> None:
+    try:
+        raise ExportException("Testing")
+    except ExportException as exc:
+        msg = str(exc)
+        assert re.search(r"Testing", msg)
+
+
 def test_localdatabase_exception() -> None:
     try:
         raise LocalDatabaseException("Testing")
@@ -51,6 +71,14 @@ def test_localdatabase_exception() -> None:
         assert re.search(r"Testing", msg)
 
 
+def test_review_log_exception() -> None:
+    try:
+        raise ReviewLogException("Testing")
+    except ReviewLogException as exc:
+        msg = str(exc)
+        assert re.search(r"Testing", msg)
+
+
 def test_select_vocabulary_exception() -> None:
     try:
         raise SelectVocabularyException("Testing")
@@ -59,6 +87,14 @@ def test_select_vocabulary_exception() -> None:
         assert re.search(r"Testing", msg)
 
 
+def test_task_cancelled_exception() -> None:
+    try:
+        raise TaskCancelledException("Testing")
+    except TaskCancelledException as exc:
+        msg = str(exc)
+        assert re.search(r"Testing", msg)
+
+
 def test_time_exception() -> None:
     try:
         raise TimeException("Testing")
@@ -0,0 +1,107 @@
+import gzip
+import io
+import json
+import sys
+import types
+from pathlib import Path
+from typing import BinaryIO
+
+import pytest
+from pytest_mock.plugin import MockerFixture
+
+from vocabuilder.exceptions import ExportException
+from vocabuilder.exporter import Compression, Exporter, ExportFormat, read_columnar
+
+from .common import GetDatabase
+
+
+class TestExporter:
+    def test_csv_compacted(self, get_database: GetDatabase, tmp_path: Path) -> None:
+        ldb = get_database().get_local_database()
+        ldb.delete_item("apple")
+        path = tmp_path / "terms.csv"
+        report = Exporter(ldb).export_file(path)
+        assert report.terms == 39
+        assert "exported 39 terms" in str(report)
+        lines = path.read_text(encoding="utf_8").splitlines()
+        assert lines[0] == "Status,Term1,Term2,TestDelay,LastTest,LastModified,Version"
+        assert len(lines) == 40
+        assert not any(",apple," in line for line in lines)
+
+    def test_jsonl_gzip(self, get_database: GetDatabase, tmp_path: Path) -> None:
+        ldb = get_database().get_local_database()
+        path = tmp_path / "terms.jsonl.gz"
+        assert Exporter(ldb).export_file(path).terms == 40
+        with gzip.open(path, "rt", encoding="utf_8") as fp:
+            items = [json.loads(line) for line in fp]
+        assert len(items) == 40
+        apple = next(item for item in items if item["Term1"] == "apple")
+        assert apple["Term2"] == "사과"
+        assert list(apple.keys()) == ldb.get_header().header
+
+    def test_anki(self, get_database: GetDatabase, tmp_path: Path) -> None:
+        ldb = get_database().get_local_database()
+        ldb.add_item(
+            {"Term1": "tab\there", "Term2": "two\nlines", "TestDelay": 0, "LastTest": 0}
+        )
+        path = tmp_path / "terms.txt"
+        assert Exporter(ldb).export_file(path).terms == 41
+        lines = path.read_text(encoding="utf_8").splitlines()
+        assert lines[:2] == ["#separator:tab", "#html:false"]
+        assert "apple\t사과" in lines
+        assert "tab here\ttwo lines" in lines
+
+    def test_columnar(self, get_database: GetDatabase, tmp_path: Path) -> None:
+        ldb = get_database().get_local_database()
+        path = tmp_path / "terms.vbc"
+        assert Exporter(ldb, row_group_size=16).export_file(path).terms == 40
+        with open(path, "rb") as fp:
+            groups = list(read_columnar(fp))
+        assert [len(group["Term1"]) for group in groups] == [16, 16, 8]
+        terms = [str(term) for group in groups for term in group["Term1"]]
+        assert terms == list(ldb.get_items().keys())
+        index = terms.index("apple")
+        assert str(groups[index // 16]["Term2"][index % 16]) == "사과"
+        assert groups[0]["LastTest"].dtype.kind == "i"
+
+    def test_explicit_format(self, get_database: GetDatabase, tmp_path: Path) -> None:
+        ldb = get_database().get_local_database()
+        path = tmp_path / "terms"
+        exporter = Exporter(ldb)
+        exporter.export_file(path, ExportFormat.JSONL, Compression.NONE)
+        assert len(path.read_text(encoding="utf_8").splitlines()) == 40
+        exporter.export_file(path)
+        assert path.read_text(encoding="utf_8").startswith("Status,")
+
+    def test_errors(self, get_database: GetDatabase, tmp_path: Path) -> None:
+        exporter = Exporter(get_database().get_local_database())
+        path = tmp_path / "terms.csv"
+        with pytest.raises(ExportException) as excinfo:
+            exporter.export_file(path, "xml")
+        assert "Unknown format" in str(excinfo)
+        with pytest.raises(ExportException) as excinfo:
+            exporter.export_file(path, compression="bzip2")
+        assert "Unknown compression" in str(excinfo)
+        with pytest.raises(ExportException) as excinfo:
+            list(read_columnar(io.BytesIO(b"xyz")))
+        assert "Bad columnar file format" in str(excinfo)
+
+    def test_zstd(
+        self, get_database: GetDatabase, tmp_path: Path, mocker: MockerFixture
+    ) -> None:
+        exporter = Exporter(get_database().get_local_database())
+        path = tmp_path / "terms.csv.zst"
+        mocker.patch.dict(sys.modules, {"zstandard": None})
+        with pytest.raises(ExportException) as excinfo:
+            exporter.export_file(path)
+        assert "requires the zstandard package" in str(excinfo)
+
+        class ZstdCompressor:
+            def stream_writer(self, fp: BinaryIO, closefd: bool) -> BinaryIO:
+                return fp
+
+        zstandard = types.ModuleType("zstandard")
+        zstandard.ZstdCompressor = ZstdCompressor  # type: ignore
+        mocker.patch.dict(sys.modules, {"zstandard": zstandard})
+        assert exporter.export_file(path).terms == 40
+        assert path.read_text(encoding="utf_8").startswith("Status,")
@@ -0,0 +1,142 @@
+import typing
+from pathlib import Path
+from typing import Callable
+
+from pytest_mock.plugin import MockerFixture
+
+from vocabuilder.csv_helpers import CSVwrapper
+from vocabuilder.database import Database
+from vocabuilder.hlc import HybridLogicalClock
+from vocabuilder.local_database import LocalDatabase
+from vocabuilder.type_aliases import DatabaseRow
+
+from .common import GetConfig, GetDatabase, PytestDataDict
+
+# NOTE: 2023-11-01, in milliseconds
+NOW = 1698866695000
+
+
+class TestHybridLogicalClock:
+    def test_now(self, mocker: MockerFixture) -> None:
+        wall = mocker.patch("vocabuilder.hlc.time.time_ns", return_value=NOW * 10**6)
+        clock = HybridLogicalClock("ab")
+        first = clock.now()
+        assert first == f"{NOW:012x}-0000-ab"
+        assert HybridLogicalClock.decode(first) == (NOW, 0, "ab")
+        assert HybridLogicalClock.to_seconds(first) == NOW // 1000
+        assert clock.now() == f"{NOW:012x}-0001-ab"
+        # NOTE: the wall clock is set back
+        wall.return_value = (NOW - 5000) * 10**6
+        assert clock.now() == f"{NOW:012x}-0002-ab"
+        wall.return_value = (NOW + 1) * 10**6
+        assert clock.now() == f"{NOW + 1:012x}-0000-ab"
+        clock.counter = clock.counter_max
+        assert clock.now() == f"{NOW + 2:012x}-0000-ab"
+
+    def test_update(self, mocker: MockerFixture) -> None:
+        mocker.patch("vocabuilder.hlc.time.time_ns", return_value=NOW * 10**6)
+        clock = HybridLogicalClock("ab")
+        # NOTE: a version from a device with a clock that is ahead
+        remote = HybridLogicalClock.encode(NOW + 60000, 7, "cd")
+        clock.update(remote)
+        version = clock.now()
+        assert version == f"{NOW + 60000:012x}-0008-ab"
+        assert version > remote
+        clock.update(HybridLogicalClock.encode(NOW, 0, "cd"))
+        assert clock.now() > version
+
+    def test_compare(self) -> None:
+        legacy = HybridLogicalClock.from_seconds(NOW // 1000)
+        assert legacy == f"{NOW:012x}-0000-"
+        assert legacy < HybridLogicalClock.encode(NOW, 0, "0")
+        # NOTE: the versions compare in the order of the physical times
+        assert HybridLogicalClock.encode(9, 1, "f") < HybridLogicalClock.encode(
+            10, 0, "0"
+        )
+        assert HybridLogicalClock.is_valid(legacy)
+        assert HybridLogicalClock.is_valid(f"{NOW:012x}-0001-ab")
+        assert not HybridLogicalClock.is_valid(NOW)
+        assert not HybridLogicalClock.is_valid("1-1-ab")
+
+    def test_node_id(self, tmp_path: Path) -> None:
+        node = HybridLogicalClock.get_node_id(tmp_path)
+        assert len(node) == 8
+        assert HybridLogicalClock.get_node_id(tmp_path) == node
+        path = tmp_path / HybridLogicalClock.node_id_fn
+        path.write_text("not hex", encoding="utf-8")
+        assert HybridLogicalClock.get_node_id(tmp_path) != node
+
+
+class TestLocalDatabase:
+    def test_old_format(
+        self,
+        setup_database_dir: Callable[[], Path],
+        get_config: GetConfig,
+        test_data: PytestDataDict,
+    ) -> None:
+        filename = setup_database_dir() / LocalDatabase.database_fn
+        voca_name = test_data["vocaname"]
+        header = CSVwrapper(filename).header
+        item: DatabaseRow = {
+            header.status: 1,
+            header.term1: "new",
+            header.term2: "새",
+            header.test_delay: 0,
+            header.last_test: NOW // 1000,
+            header.last_modified: NOW // 1000,
+            header.version: HybridLogicalClock.encode(NOW + 10**9, 0, "ab"),
+        }
+        # NOTE: a row with the version column, appended to a file without it
+        CSVwrapper(filename).append_line(item)
+        reader = LocalDatabase(get_config(), voca_name, read_only=True)
+        assert reader.get_term1_data("apple")[header.version] == (
+            HybridLogicalClock.from_seconds(1687329957)
+        )
+        assert reader.get_term1_data("new")[header.version] == item[header.version]
+        ldb = LocalDatabase(get_config(), voca_name)
+        assert filename.read_text(encoding="utf_8").startswith(
+            "Status,Term1,Term2,TestDelay,LastTest,LastModified,Version,Checksum"
+        )
+        # NOTE: the clock is ahead of the versions read from the file
+        assert ldb.clock.now() > typing.cast(str, item[header.version])
+        ldb.close()
+
+    def test_future_last_test(self, get_database: GetDatabase) -> None:
+        ldb = get_database().get_local_database()
+        item = ldb.get_term1_data("apple")
+        item[ldb.header.last_test] = ldb.epoch_in_seconds() + 24 * 60 * 60
+        item[ldb.header.test_delay] = 0
+        assert ldb.check_term1_exceeds_test_delay("apple")
+
+
+class TestSync:
+    def test_newer_version(self, get_database: GetDatabase) -> None:
+        db = get_database(init=True)
+        ldb = db.get_local_database()
+        header = ldb.header
+        child = db.firebase_database.db
+        item = ldb.get_term1_data("apple").copy()
+        # NOTE: modified on a device with a clock that is behind, after the local
+        #   version was seen
+        item[header.term1] = "apple"
+        item[header.term2] = "사과 (fruit)"
+        item[header.last_modified] = 1600000000
+        version = typing.cast(str, item[header.version])
+        physical, counter, _ = HybridLogicalClock.decode(version)
+        item[header.version] = HybridLogicalClock.encode(physical, counter + 1, "cd")
+        child.get.return_value = {"-NYJ18uc": item}
+        Database(db.config, db.voca_name, local_database=ldb)
+        assert ldb.get_term2("apple") == "사과 (fruit)"
+        assert ldb.clock.now() > typing.cast(str, item[header.version])
+
+    def test_update_item(self, get_database: GetDatabase) -> None:
+        db = get_database(init=True)
+        ldb = db.get_local_database()
+        item = ldb.get_term1_data("apple").copy()
+        old_version = item[ldb.header.version]
+        item[ldb.header.term2] = "능금"
+        db.update_item("apple", item)
+        version = ldb.get_term1_data("apple")[ldb.header.version]
+        assert version != old_version
+        update = db.firebase_database.db.child.return_value.update
+        assert update.call_args.args[0][ldb.header.version] == version
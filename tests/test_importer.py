@@ -0,0 +1,99 @@
+from pathlib import Path
+
+from firebase_admin.exceptions import FirebaseError  # type: ignore
+from pytest_mock.plugin import MockerFixture
+
+from vocabuilder.events import DatabaseEvent
+from vocabuilder.importer import BulkImporter, ImportFormat, ImportReport
+
+from .common import GetDatabase
+
+
+class TestBulkImporter:
+    def test_csv(self, get_database: GetDatabase, tmp_path: Path) -> None:
+        db = get_database()
+        ldb = db.get_local_database()
+        events: list[DatabaseEvent] = []
+        ldb.add_listener(events.append)
+        path = tmp_path / "terms.csv"
+        path.write_text(
+            'yes,네\napple,사과\n"no, thanks",아니요\nyes,예\n , x\nsingle\n',
+            encoding="utf_8",
+        )
+        report = BulkImporter(ldb, batch_size=2).import_file(path)
+        assert (report.rows, report.added, report.duplicates, report.invalid) == (
+            6,
+            2,
+            2,
+            2,
+        )
+        assert [event.term1 for event in events] == ["yes", "no, thanks"]
+        assert db.get_term2("yes") == "네"
+        ldb2 = type(ldb)(ldb.config, ldb.voca_name)
+        assert ldb2.get_term2("no, thanks") == "아니요"
+        assert len(ldb2.get_term1_list()) == 42
+
+    def test_tsv_and_anki(self, get_database: GetDatabase, tmp_path: Path) -> None:
+        ldb = get_database().get_local_database()
+        path = tmp_path / "terms.tsv"
+        path.write_text("yes\t네\textra\n", encoding="utf_8")
+        assert BulkImporter(ldb).import_file(path).added == 1
+        path = tmp_path / "anki.txt"
+        path.write_text(
+            "#separator:tab\n#html:true\n<b>no</b>\t아니요<br>\n", encoding="utf_8"
+        )
+        assert BulkImporter(ldb).import_file(path).added == 1
+        assert ldb.get_term2("no") == "아니요"
+        path = tmp_path / "terms.dat"
+        path.write_text("maybe\t아마\n", encoding="utf_8")
+        importer = BulkImporter(ldb)
+        assert importer.import_file(path, ImportFormat.TSV).added == 1
+
+    def test_many_rows(self, get_database: GetDatabase) -> None:
+        ldb = get_database().get_local_database()
+        rows = ([f"term{i}", f"translation{i}"] for i in range(50_000))
+        report = BulkImporter(ldb).import_rows(rows)
+        assert report.added == 50_000
+        assert report.rows_per_second() > 0
+        assert "50000 rows" in str(report)
+        assert ImportReport().rows_per_second() == 0
+
+    def test_firebase(self, get_database: GetDatabase, mocker: MockerFixture) -> None:
+        db = get_database(init=True)
+        ldb = db.get_local_database()
+        firebase = db.firebase_database
+        num_terms: list[int] = []
+
+        def written(updates: dict[str, dict[str, str]]) -> None:
+            # NOTE: the terms are pushed when they have been written to the file
+            text = ldb.dbname.read_text(encoding="utf_8")
+            assert all(item["Term1"] in text for item in updates.values())
+            num_terms.append(len(ldb.get_term1_list()))
+
+        update = mocker.patch.object(firebase.db, "update", side_effect=written)
+        rows = [[f"term{i}", f"translation{i}"] for i in range(5)]
+        importer = BulkImporter(ldb, firebase, batch_size=3, firebase_batch_size=2)
+        assert importer.import_rows(rows).added == 5
+        assert [len(call.args[0]) for call in update.call_args_list] == [2, 1, 2]
+        # NOTE: each batch is pushed before the next batch is read
+        assert num_terms == [43, 43, 45]
+        fb_key = firebase.get_firebase_key("term4")
+        assert len(fb_key) == 20
+        assert firebase.get_items()["term4"][db.get_local_database().header.term2] == (
+            "translation4"
+        )
+
+    def test_firebase_error(
+        self, get_database: GetDatabase, mocker: MockerFixture
+    ) -> None:
+        db = get_database(init=True)
+        firebase = db.firebase_database
+        mocker.patch.object(
+            firebase.db,
+            "update",
+            side_effect=FirebaseError(
+                "code", "message", cause=None, http_response=None
+            ),
+        )
+        assert not firebase.push_items([{"Term1": "x", "Term2": "y"}])
+        assert "x" not in firebase.get_items()
@@ -0,0 +1,81 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from vocabuilder.exceptions import DatabaseLockedException
+from vocabuilder.lock import VocabularyLock
+
+
+def try_lock_in_other_process(datadir: Path) -> str:
+    code = (
+        "import sys\n"
+        "from pathlib import Path\n"
+        "from vocabuilder.exceptions import DatabaseLockedException\n"
+        "from vocabuilder.lock import VocabularyLock\n"
+        "try:\n"
+        "    VocabularyLock(Path(sys.argv[1])).acquire()\n"
+        "except DatabaseLockedException as exc:\n"
+        "    print(exc)\n"
+        "else:\n"
+        "    print('acquired')\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code, str(datadir)],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout
+
+
+class TestVocabularyLock:
+    def test_other_process(self, tmp_path: Path) -> None:
+        lock = VocabularyLock(tmp_path)
+        lock.acquire()
+        lock.acquire()  # already acquired
+        out = try_lock_in_other_process(tmp_path)
+        assert "opened for writing by another process" in out
+        assert "acquired" not in out
+        lock.release()
+        lock.release()  # already released
+        assert try_lock_in_other_process(tmp_path).strip() == "acquired"
+
+    def test_same_process(self, tmp_path: Path) -> None:
+        lock1 = VocabularyLock(tmp_path)
+        lock2 = VocabularyLock(tmp_path)
+        lock1.acquire()
+        lock2.acquire()
+        lock1.release()
+        # NOTE: lock2 still holds the lock for this process
+        assert "another process" in try_lock_in_other_process(tmp_path)
+        lock2.release()
+        assert try_lock_in_other_process(tmp_path).strip() == "acquired"
+
+    def test_locked_by_pid(self, tmp_path: Path) -> None:
+        code = (
+            "import sys, time\n"
+            "from pathlib import Path\n"
+            "from vocabuilder.lock import VocabularyLock\n"
+            "VocabularyLock(Path(sys.argv[1])).acquire()\n"
+            "print('locked', flush=True)\n"
+            "sys.stdin.read()\n"
+        )
+        proc = subprocess.Popen(
+            [sys.executable, "-c", code, str(tmp_path)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            assert proc.stdout is not None
+            assert proc.stdout.readline().strip() == "locked"
+            with pytest.raises(DatabaseLockedException) as excinfo:
+                VocabularyLock(tmp_path).acquire()
+            assert f"pid {proc.pid}" in str(excinfo)
+        finally:
+            proc.communicate("")
+        lock = VocabularyLock(tmp_path)
+        lock.acquire()
+        lock.release()
@@ -6,10 +6,14 @@ from pathlib import Path
 from typing import Callable
 
 # from PyQt6.QtCore import Qt
+import pytest
+from _pytest.capture import CaptureFixture
 from PyQt6.QtWidgets import QApplication
 from pytest_mock.plugin import MockerFixture
 
 import vocabuilder.vocabuilder as vocab
+from vocabuilder.exceptions import DatabaseLockedException, LocalDatabaseException
+from vocabuilder.profiling import Profiler
 
 from .common import PytestDataDict, QtBot
 
@@ -48,3 +52,73 @@ class TestMain:
             mocker.patch.object(qapp, "exec", callback)
             vocab.main()
         assert True
+
+    def test_profile(
+        self,
+        mocker: MockerFixture,
+        test_data: PytestDataDict,
+        qapp: QApplication,
+        tmp_path: Path,
+        capsys: CaptureFixture[str],
+    ) -> None:
+        profiler = Profiler()
+        mocker.patch("vocabuilder.vocabuilder.profiler", profiler)
+        opts = mocker.patch("vocabuilder.vocabuilder.CommandLineOptions").return_value
+        opts.profile = True
+        opts.get_profile_output.return_value = tmp_path / "startup.prof"
+        mocker.patch("vocabuilder.vocabuilder.Config")
+        mocker.patch(
+            "vocabuilder.vocabuilder.select_vocabulary",
+            return_value=test_data["vocaname"],
+        )
+        mocker.patch("vocabuilder.vocabuilder.QApplication", return_value=qapp)
+        mocker.patch("vocabuilder.vocabuilder.Database")
+        mocker.patch("vocabuilder.vocabuilder.MainWindow")
+        mocker.patch.object(qapp, "exec")
+        vocab.main()
+        err = capsys.readouterr().err
+        for phase in ("select_vocabulary", "database", "main_window"):
+            assert f"startup.{phase}" in err
+        assert (tmp_path / "startup.prof").is_file()
+
+    def test_locked(
+        self,
+        mocker: MockerFixture,
+        test_data: PytestDataDict,
+        qapp: QApplication,
+    ) -> None:
+        mocker.patch("vocabuilder.vocabuilder.Config")
+        mocker.patch(
+            "vocabuilder.vocabuilder.select_vocabulary",
+            return_value=test_data["vocaname"],
+        )
+        mocker.patch("vocabuilder.vocabuilder.QApplication", return_value=qapp)
+        mocker.patch(
+            "vocabuilder.vocabuilder.Database",
+            side_effect=DatabaseLockedException("in use"),
+        )
+        warning = mocker.patch("vocabuilder.vocabuilder.QMessageBox.warning")
+        with pytest.raises(SystemExit):
+            vocab.main()
+        assert "in use" in warning.call_args.args[2]
+
+    def test_not_found(
+        self,
+        mocker: MockerFixture,
+        test_data: PytestDataDict,
+        qapp: QApplication,
+    ) -> None:
+        mocker.patch("vocabuilder.vocabuilder.Config")
+        mocker.patch(
+            "vocabuilder.vocabuilder.select_vocabulary",
+            return_value=test_data["vocaname"],
+        )
+        mocker.patch("vocabuilder.vocabuilder.QApplication", return_value=qapp)
+        mocker.patch(
+            "vocabuilder.vocabuilder.Database",
+            side_effect=LocalDatabaseException("database.csv does not exist"),
+        )
+        warning = mocker.patch("vocabuilder.vocabuilder.QMessageBox.warning")
+        with pytest.raises(SystemExit):
+            vocab.main()
+        assert "does not exist" in warning.call_args.args[2]
@@ -1,21 +1,27 @@
 import logging
 import re
 import typing
+from pathlib import Path
 from typing import Any, Callable
 
+import firebase_admin  # type: ignore
 import pytest
 from _pytest.logging import LogCaptureFixture
+from firebase_admin import initialize_app
 from PyQt6.QtCore import Qt
-from PyQt6.QtWidgets import QDialog, QMessageBox, QWidget
+from PyQt6.QtWidgets import QApplication, QDialog, QMessageBox, QWidget
 from pytest_mock.plugin import MockerFixture
 
-from vocabuilder.exceptions import ConfigException
+from vocabuilder.database import Database
+from vocabuilder.exceptions import ConfigException, DatabaseLockedException
+from vocabuilder.local_database import LocalDatabase, RecoveryReport
 from vocabuilder.test_window import (
     TestWindow as _TestWindow,  # cannot start with "Test"
 )
 from vocabuilder.vocabuilder import MainWindow
+from vocabuilder.widgets import SelectWordFromList
 
-from .common import QtBot
+from .common import GetConfig, GetDatabase, PytestDataDict, QtBot
 
 
 class TestConstructor:
@@ -28,6 +34,22 @@ class TestConstructor:
         with qtbot.wait_exposed(window):
             assert len(window.buttons) == 6
 
+    def test_recovery(
+        self,
+        get_config: GetConfig,
+        get_database: GetDatabase,
+        qtbot: QtBot,
+        mocker: MockerFixture,
+    ) -> None:
+        db = get_database()
+        ldb = db.get_local_database()
+        ldb.recovery = RecoveryReport(rows=2, size=10, path=ldb.datadir / "x.csv")
+        mock = mocker.patch.object(MainWindow, "display_warning")
+        app = typing.cast(QApplication, QApplication.instance())
+        window = MainWindow(app, db, get_config())
+        qtbot.add_widget(window)
+        assert "Skipped 2 corrupt rows" in mock.call_args.args[1]
+
 
 class TestOther:
     def test_add(
@@ -240,6 +262,176 @@ class TestMenuActions:
         qtbot.waitUntil(lambda: callback_called)
         assert True
 
+    def test_switch_vocabulary(
+        self,
+        main_window: MainWindow,
+        mocker: MockerFixture,
+    ) -> None:
+        window = main_window
+        name = window.db.get_voca_name()
+        old_ldb = window.db.get_local_database()
+        LocalDatabase(window.config, "other").close()
+        window.view_entries()
+        window.switch_action.trigger()
+        dialog = window.findChild(SelectWordFromList)
+        assert dialog is not None
+        assert dialog.words == [f"{name} (40 terms, 40 due)", "other (0 terms, 0 due)"]
+        dialog.ok_action(dialog.get_pair_callback(dialog.words[1], 1))
+        dialog.done(0)
+        assert window.view_window is None
+        assert window.db.get_voca_name() == "other"
+        assert "other" in window.database_info_label.text()
+        assert window.workspace.get_loaded_names() == [name, "other"]
+        window.switch_vocabulary("other")  # already selected
+        window.switch_vocabulary(name)
+        assert window.db.get_local_database() is old_ldb
+        mocker.patch.object(
+            window.workspace,
+            "get_database",
+            side_effect=DatabaseLockedException("other is opened for writing"),
+        )
+        mock = mocker.patch.object(window, "display_warning")
+        window.switch_vocabulary("other")
+        assert "opened for writing" in mock.call_args.args[1]
+        assert window.db.get_voca_name() == name
+
+    def test_switch_vocabulary_firebase(
+        self,
+        get_database: GetDatabase,
+        qtbot: QtBot,
+        mocker: MockerFixture,
+    ) -> None:
+        db = get_database(init=True)
+        name = db.get_voca_name()
+        LocalDatabase(db.config, "other").close()
+        # NOTE: Use the real initialize_app(), which raises ValueError if the default
+        #   app already exists
+        mocker.patch(
+            "vocabuilder.firebase_database.firebase_admin.initialize_app",
+            side_effect=initialize_app,
+        )
+        app = typing.cast(QApplication, QApplication.instance())
+        window = MainWindow(app, db, db.config)
+        qtbot.add_widget(window)
+        try:
+            window.switch_vocabulary("other")
+            assert window.db.firebase_database.is_initialized()
+            window.switch_vocabulary(name)
+            assert window.db.firebase_database.is_initialized()
+        finally:
+            firebase_admin.delete_app(firebase_admin.get_app())
+        assert window.db.get_voca_name() == name
+        window.workspace.close()
+
+
+class TestProgressiveStartup:
+    def test_loaded(
+        self,
+        setup_database_dir: Callable[[], Path],
+        get_config: GetConfig,
+        test_data: PytestDataDict,
+        qtbot: QtBot,
+        mocker: MockerFixture,
+    ) -> None:
+        setup_database_dir()
+        db = Database(get_config(), test_data["vocaname"], defer_load=True)
+        app = typing.cast(QApplication, QApplication.instance())
+        window = MainWindow(app, db, get_config())
+        qtbot.add_widget(window)
+        assert window.loader is not None
+        assert not any(button.isEnabled() for button in window.buttons)
+        assert not window.switch_action.isEnabled()
+        mock = mocker.patch.object(window, "add_new_entry")
+        qtbot.keyClick(window, Qt.Key.Key_A)
+        mock.assert_not_called()
+        window.show_load_progress(20)
+        assert window.terms_label.text() == "Loading... 20 terms"
+        with qtbot.waitSignal(window.loader.loaded, timeout=5000):
+            pass
+        assert window.loader is None
+        assert all(button.isEnabled() for button in window.buttons)
+        assert window.terms_label.text() == "40 terms"
+        assert window.workspace.get_loaded_names() == [test_data["vocaname"]]
+        db.get_local_database().delete_item("apple")
+        assert window.terms_label.text() == "39 terms"
+        window.workspace.close()
+
+    def test_quit(
+        self,
+        setup_database_dir: Callable[[], Path],
+        get_config: GetConfig,
+        test_data: PytestDataDict,
+        qtbot: QtBot,
+        mocker: MockerFixture,
+    ) -> None:
+        setup_database_dir()
+        db = Database(get_config(), test_data["vocaname"], defer_load=True)
+        app = typing.cast(QApplication, QApplication.instance())
+        window = MainWindow(app, db, get_config())
+        qtbot.add_widget(window)
+        mocker.patch.object(window, "app")
+        # NOTE: quit before the loaded signal has been received
+        window.quit()
+        assert not db.get_local_database().lock.acquired
+        qtbot.wait(50)
+        assert window.watcher is None
+
+    def test_failed(
+        self,
+        setup_database_dir: Callable[[], Path],
+        get_config: GetConfig,
+        test_data: PytestDataDict,
+        qtbot: QtBot,
+        mocker: MockerFixture,
+    ) -> None:
+        setup_database_dir()
+        db = Database(get_config(), test_data["vocaname"], defer_load=True)
+        mocker.patch.object(db, "load", side_effect=OSError("I/O error"))
+        app = typing.cast(QApplication, QApplication.instance())
+        window = MainWindow(app, db, get_config())
+        qtbot.add_widget(window)
+        mocker.patch.object(window, "app")
+        qtbot.waitUntil(lambda: window.terms_label.text() == "Loading failed")
+        mbox = window.findChild(QMessageBox)
+        assert mbox is not None
+        assert "Could not load vocabulary: I/O error" in mbox.text()
+        mbox.done(0)
+        window.app.quit.assert_called()  # type: ignore
+        assert not db.get_local_database().lock.acquired
+
+
+class TestReadOnly:
+    def test_disabled(
+        self,
+        get_config: GetConfig,
+        get_database: GetDatabase,
+        test_data: PytestDataDict,
+        qtbot: QtBot,
+        mocker: MockerFixture,
+    ) -> None:
+        name = test_data["vocaname"]
+        ldb = get_database().get_local_database()
+        ldb.close()
+        LocalDatabase(ldb.config, "other").close()
+        db = Database(get_config(), name, read_only=True)
+        app = typing.cast(QApplication, QApplication.instance())
+        window = MainWindow(app, db, get_config())
+        qtbot.add_widget(window)
+        assert window.windowTitle() == "VocaBuilder (read-only)"
+        enabled = [button.isEnabled() for button in window.buttons]
+        assert enabled == [False, False, False, False, True, False]
+        assert not window.reset_fb_action.isEnabled()
+        mock = mocker.patch.object(window, "backup")
+        qtbot.keyClick(window, Qt.Key.Key_B)
+        mock.assert_not_called()
+        mock = mocker.patch.object(window, "view_entries")
+        qtbot.keyClick(window, Qt.Key.Key_V)
+        mock.assert_called_once()
+        window.switch_vocabulary("other")
+        assert window.db.get_local_database().read_only
+        assert not window.db.firebase_database.is_initialized()
+        window.workspace.close()
+
 
 class TestKeyPressEvent:
     def test_press_b(
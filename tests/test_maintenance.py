@@ -0,0 +1,294 @@
+import logging
+import threading
+from pathlib import Path
+from typing import Callable
+
+import git
+import pytest
+from _pytest.logging import LogCaptureFixture
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QWidget
+
+from vocabuilder.catalog import VocabularyCatalog
+from vocabuilder.database import Database
+from vocabuilder.exceptions import TaskCancelledException
+from vocabuilder.local_database import LocalDatabase
+from vocabuilder.maintenance import (
+    CancelToken,
+    Finish,
+    MaintenanceScheduler,
+    MaintenanceTask,
+)
+from vocabuilder.vocabuilder import MainWindow
+
+from .common import GetConfig, GetDatabase, PytestDataDict, QtBot
+
+
+def make_scheduler(
+    get_config: GetConfig, idle_delay: str = "0", workers: str = "1"
+) -> MaintenanceScheduler:
+    cfg = get_config()
+    cfg.config["Maintenance"]["IdleDelay"] = idle_delay
+    cfg.config["Maintenance"]["Workers"] = workers
+    return MaintenanceScheduler(cfg)
+
+
+def wait_idle(scheduler: MaintenanceScheduler, qtbot: QtBot) -> None:
+    qtbot.waitUntil(lambda: scheduler.get_state() == "Maintenance: idle", timeout=5000)
+
+
+class TestMaintenanceScheduler:
+    def test_priority(self, get_config: GetConfig, qtbot: QtBot) -> None:
+        scheduler = make_scheduler(get_config)
+        assert scheduler.get_state() == "Maintenance: idle"
+        states: list[str] = []
+        scheduler.state_changed.connect(states.append)
+        order: list[str] = []
+        finished: list[bool] = []
+
+        def run(name: str) -> Callable[[CancelToken], Finish]:
+            def _run(token: CancelToken) -> Finish:
+                order.append(name)
+                if name == "b":
+                    return lambda: finished.append(
+                        threading.current_thread() is threading.main_thread()
+                    )
+                return None
+
+            return _run
+
+        scheduler.submit(MaintenanceTask("c", run("c"), priority=2))
+        scheduler.submit(MaintenanceTask("b", run("b"), priority=1, group="x"))
+        # NOTE: replaces the pending task with the same name and group
+        scheduler.submit(MaintenanceTask("b", run("b"), priority=0, group="x"))
+        scheduler.submit(MaintenanceTask("a", run("a"), priority=1))
+        assert scheduler.get_state() == "Maintenance: 3 waiting"
+        wait_idle(scheduler, qtbot)
+        assert order == ["b", "a", "c"]
+        assert finished == [True]
+        assert "Running b (x), 2 waiting" in states
+        scheduler.shutdown()
+
+    @pytest.mark.parametrize("resubmit", [False, True])
+    def test_user_input(
+        self,
+        get_config: GetConfig,
+        qtbot: QtBot,
+        caplog: LogCaptureFixture,
+        resubmit: bool,
+    ) -> None:
+        caplog.set_level(logging.INFO)
+        scheduler = make_scheduler(get_config)
+        widget = QWidget()
+        qtbot.add_widget(widget)
+        started = threading.Event()
+        runs: list[bool] = []
+
+        def run(token: CancelToken) -> Finish:
+            runs.append(True)
+            if len(runs) == 1:
+                started.set()
+                token.event.wait(timeout=5)
+            token.check()
+            return None
+
+        task = MaintenanceTask("wait", run, group="x")
+        scheduler.submit(task)
+        qtbot.waitUntil(started.is_set, timeout=5000)
+        assert scheduler.get_state() == "Running wait (x)"
+        if resubmit:
+            # NOTE: submitted again while it is running, the new task replaces the
+            #   cancelled task
+            scheduler.submit(MaintenanceTask("wait", run, group="x"))
+        qtbot.keyPress(widget, Qt.Key.Key_A)
+        assert not scheduler.idle
+        wait_idle(scheduler, qtbot)
+        assert len(runs) == 2
+        assert "Maintenance: cancelled wait (x)" in caplog.text
+        assert "Maintenance: finished wait (x)" in caplog.text
+        scheduler.shutdown()
+
+    def test_groups(self, get_config: GetConfig, qtbot: QtBot) -> None:
+        scheduler = make_scheduler(get_config, workers="2")
+        release = threading.Event()
+        running = []
+
+        def run(token: CancelToken) -> Finish:
+            running.append(True)
+            release.wait(timeout=5)
+            return None
+
+        scheduler.submit(MaintenanceTask("a", run, group="x"))
+        scheduler.submit(MaintenanceTask("b", run, group="x"))
+        qtbot.waitUntil(lambda: len(running) == 1, timeout=5000)
+        assert scheduler.get_state() == "Running a (x), 1 waiting"
+        release.set()
+        wait_idle(scheduler, qtbot)
+        assert len(running) == 2
+        scheduler.shutdown()
+
+    def test_failed(
+        self, get_config: GetConfig, qtbot: QtBot, caplog: LogCaptureFixture
+    ) -> None:
+        scheduler = make_scheduler(get_config)
+
+        def run(token: CancelToken) -> Finish:
+            raise OSError("disk full")
+
+        scheduler.submit(MaintenanceTask("fail", run))
+        wait_idle(scheduler, qtbot)
+        assert "Maintenance: fail failed: disk full" in caplog.text
+        scheduler.shutdown()
+
+    @pytest.mark.parametrize("shutdown", [False, True])
+    def test_cancel(self, get_config: GetConfig, qtbot: QtBot, shutdown: bool) -> None:
+        scheduler = make_scheduler(get_config)
+        started = threading.Event()
+        finished: list[bool] = []
+
+        def run(token: CancelToken) -> Finish:
+            started.set()
+            token.event.wait(timeout=5)
+            token.check()
+            return lambda: finished.append(True)  # pragma: no cover
+
+        scheduler.submit(MaintenanceTask("a", run, group="x"))
+        scheduler.submit(MaintenanceTask("b", run, group="x"))
+        scheduler.submit(MaintenanceTask("c", run, group="y", priority=1))
+        qtbot.waitUntil(started.is_set, timeout=5000)
+        if shutdown:
+            scheduler.shutdown()
+            assert scheduler.get_state() == "Maintenance: idle"
+        else:
+            scheduler.cancel("x")
+            assert scheduler.get_state() in (
+                "Maintenance: 1 waiting",
+                "Running c (y)",
+            )
+            scheduler.cancel("y")
+        # NOTE: the finished signal of the cancelled task is ignored
+        qtbot.wait(50)
+        assert scheduler.get_state() == "Maintenance: idle"
+        assert finished == []
+        scheduler.shutdown()
+
+
+class TestLocalDatabase:
+    def test_tasks(
+        self,
+        setup_database_dir: Callable[[], Path],
+        get_config: GetConfig,
+        test_data: PytestDataDict,
+        qtbot: QtBot,
+    ) -> None:
+        data_dir = setup_database_dir()
+        dbname = data_dir / LocalDatabase.database_fn
+        # NOTE: Without a scheduler, the file is compacted when it is opened
+        LocalDatabase(get_config(), test_data["vocaname"]).close()
+        size = dbname.stat().st_size
+        with open(dbname, "ab") as fp:
+            fp.write(dbname.read_bytes().split(b"\n", 2)[1] + b"\n")
+        scheduler = make_scheduler(get_config, workers="2")
+        ldb = LocalDatabase(get_config(), test_data["vocaname"], maintenance=scheduler)
+        assert dbname.stat().st_size > size
+        assert scheduler.get_state() == "Maintenance: 3 waiting"
+        wait_idle(scheduler, qtbot)
+        assert dbname.stat().st_size == size
+        repo = git.Repo(str(ldb.backupdir))
+        assert len(list(repo.iter_commits())) == 2
+        info = VocabularyCatalog(data_dir.parent).get_info(ldb.voca_name)
+        assert (info is not None) and (info.size == size)
+        ldb.close()
+        scheduler.shutdown()
+
+    def test_compaction(
+        self,
+        setup_database_dir: Callable[[], Path],
+        get_config: GetConfig,
+        test_data: PytestDataDict,
+        qtbot: QtBot,
+    ) -> None:
+        setup_database_dir()
+        scheduler = make_scheduler(get_config, idle_delay="1000")
+        ldb = LocalDatabase(get_config(), test_data["vocaname"], maintenance=scheduler)
+        tmpname = ldb.dbname.with_suffix(".tmp")
+        token = CancelToken()
+        token.cancel()
+        with pytest.raises(TaskCancelledException):
+            ldb._compaction_task(token)
+        assert not tmpname.exists()
+        finish = ldb._compaction_task(CancelToken())
+        assert (finish is not None) and tmpname.exists()
+        # NOTE: The compacted file is discarded, since it does not have the new term
+        ldb.delete_item("apple")
+        scheduler.pending = []
+        finish()
+        assert not tmpname.exists()
+        assert [str(task) for task in scheduler.pending] == [
+            f"compaction ({ldb.voca_name})"
+        ]
+        ldb.close()
+        assert scheduler.pending == []
+        scheduler.shutdown()
+
+    def test_recovery(
+        self,
+        setup_database_dir: Callable[[], Path],
+        get_config: GetConfig,
+        test_data: PytestDataDict,
+    ) -> None:
+        data_dir = setup_database_dir()
+        dbname = data_dir / LocalDatabase.database_fn
+        with open(dbname, "ab") as fp:
+            fp.write(b"1,partly")
+        scheduler = make_scheduler(get_config, idle_delay="1000")
+        ldb = LocalDatabase(get_config(), test_data["vocaname"], maintenance=scheduler)
+        # NOTE: The corrupt row is removed at once, since rows appended after it
+        #   would also be corrupt
+        assert ldb.recovery is not None
+        assert b"partly" not in dbname.read_bytes()
+        assert scheduler.pending == []
+        ldb.close()
+        scheduler.shutdown()
+
+
+class TestDatabase:
+    def test_firebase_sync(
+        self,
+        get_database: GetDatabase,
+        get_config: GetConfig,
+        qtbot: QtBot,
+        caplog: LogCaptureFixture,
+    ) -> None:
+        caplog.set_level(logging.INFO)
+        db = get_database(init=True)
+        db.get_local_database().delete_item("apple")
+        scheduler = make_scheduler(get_config)
+        caplog.clear()
+        database = Database(
+            db.config,
+            db.voca_name,
+            local_database=db.get_local_database(),
+            maintenance=scheduler,
+        )
+        assert database.firebase_database.is_initialized()
+        assert "updating firebase" not in caplog.text
+        wait_idle(scheduler, qtbot)
+        assert "Pushed 39 items to firebase" in caplog.text
+        assert "Pushed 1 tombstones to firebase" in caplog.text
+        assert "No items pushed to local database" in caplog.text
+        scheduler.shutdown()
+
+
+class TestMainWindow:
+    def test_label(self, main_window: MainWindow, qtbot: QtBot) -> None:
+        window = main_window
+        assert window.maintenance_label.text() == "Maintenance: idle"
+        window.maintenance.submit(MaintenanceTask("task", lambda token: None))
+        assert window.maintenance_label.text() == "Maintenance: 1 waiting"
+        window.maintenance.timer.start(0)
+        qtbot.waitUntil(
+            lambda: window.maintenance_label.text() == "Maintenance: idle",
+            timeout=5000,
+        )
+        window.maintenance.shutdown()
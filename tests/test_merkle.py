@@ -0,0 +1,170 @@
+import logging
+import typing
+from unittest.mock import MagicMock
+
+from _pytest.logging import LogCaptureFixture
+from firebase_admin.exceptions import FirebaseError  # type: ignore
+
+from vocabuilder.database import Database
+from vocabuilder.maintenance import CancelToken
+from vocabuilder.merkle import MerkleTree
+from vocabuilder.type_aliases import DatabaseType
+
+from .common import VERSION, GetDatabase
+
+
+def saved_summary(db: Database) -> dict[str, typing.Any]:
+    update = db.firebase_database.db.update
+    return typing.cast(dict[str, typing.Any], update.call_args.args[0]["_merkle"])
+
+
+class TestMerkleTree:
+    def test_diff(self) -> None:
+        items: DatabaseType = {f"term{i}": {"Version": VERSION} for i in range(100)}
+        tree = MerkleTree.from_items(items, "Version")
+        other = MerkleTree.from_items(items, "Version")
+        assert other.root() == tree.root()
+        assert other.diff(tree.root(), tree.inner_hashes, tree.leaves) == []
+        other.set("term5", "018b8f3ae759-0000-0")
+        other.set("term6", None)
+        other.set("new", VERSION)
+        buckets = other.diff(tree.root(), tree.inner_hashes, tree.leaves)
+        assert buckets is not None
+        assert sorted(MerkleTree.select(items | {"new": {}}, buckets)) == [
+            "new",
+            "term5",
+            "term6",
+        ]
+        assert len(buckets) == 3
+        other.set("term5", VERSION)
+        other.set("term6", VERSION)
+        other.set("new", None)
+        assert other.root() == tree.root()
+
+    def test_not_available(self) -> None:
+        items: DatabaseType = {"a": {"Version": VERSION}}
+        tree = MerkleTree.from_items(items, "Version")
+        other = MerkleTree()
+        assert tree.diff(other.root(), lambda: None, other.leaves) is None
+        assert tree.diff(other.root(), lambda: [], other.leaves) is None
+        assert tree.diff(other.root(), other.inner_hashes, lambda i: None) is None
+
+
+class TestSync:
+    def test_in_sync(
+        self, get_database: GetDatabase, caplog: LogCaptureFixture
+    ) -> None:
+        db = get_database(init=True)
+        caplog.set_level(logging.INFO)
+        child = db.firebase_database.db
+        summary = saved_summary(db)
+        assert summary["root"] == db.firebase_database.tree.root()
+        assert len(summary["leaves"]["f"]) == MerkleTree.fanout
+        child.child.return_value.child.return_value.get.return_value = summary["root"]
+        child.get.reset_mock()
+        database = Database(db.config, db.voca_name, local_database=db.local_database)
+        assert "Firebase: local database is in sync" in caplog.text
+        assert database._sync_task(CancelToken()) is None
+        # NOTE: the items are not read
+        child.get.assert_not_called()
+        assert not database.firebase_database.loaded
+        # NOTE: the items are read when they are changed
+        database.update_retest_value("apple", 3)
+        item = database.get_term1_data("apple")
+        database.update_item("apple", item)
+        child.get.assert_called_once()
+        assert database.firebase_database.loaded
+        # NOTE: the root is deleted before the item is changed
+        child.child.return_value.child.return_value.delete.assert_called_once()
+        assert saved_summary(database)["root"] != summary["root"]
+
+    def test_changed_bucket(
+        self, get_database: GetDatabase, caplog: LogCaptureFixture
+    ) -> None:
+        db = get_database(init=True)
+        caplog.set_level(logging.INFO)
+        summary = saved_summary(db)
+        db.update_retest_value("and", 3)
+        child = db.firebase_database.db
+        child.push.reset_mock()
+        get = child.child.return_value.child.return_value.get
+        inner = MerkleTree.bucket("and") // MerkleTree.fanout
+        get.side_effect = [
+            summary["root"],
+            summary["inner"],
+            summary["leaves"][f"{inner:x}"],
+        ]
+        Database(db.config, db.voca_name, local_database=db.local_database)
+        assert f"Firebase: comparing 1 of {MerkleTree.num_buckets} buckets" in (
+            caplog.text
+        )
+        # NOTE: only the terms in the bucket are compared (the mock of firebase only
+        #   has "apple")
+        pushed = [call.args[0]["Term1"] for call in child.push.call_args_list]
+        assert "and" in pushed
+        assert len(
+            MerkleTree.select(
+                db.get_local_database().get_items(), [MerkleTree.bucket("and")]
+            )
+        ) == len(pushed)
+
+    def test_errors(self, get_database: GetDatabase, caplog: LogCaptureFixture) -> None:
+        db = get_database(init=True)
+        caplog.set_level(logging.INFO)
+        fdb = db.firebase_database
+        error = FirebaseError(code="code", message="message", http_response=None)
+        child = fdb.db.child.return_value
+        fdb.db.update.side_effect = error
+        fdb.tree.set("apple", None)
+        assert not fdb.flush()
+        assert "Firebase: could not save changes" in caplog.text
+        fdb.db.update.side_effect = None
+        assert fdb.flush()
+        # NOTE: the items are not changed if the root can not be deleted
+        child.child.return_value.delete.side_effect = error
+        child.reset_mock()
+        fdb.db.push.reset_mock()
+        item = db.get_term1_data("apple")
+        fdb.push_item("apple", item)
+        assert not fdb.push_items([item])
+        fdb.update_item_same_key("apple", item)
+        fdb.delete_item("apple")
+        assert "Firebase: could not delete summary" in caplog.text
+        child.update.assert_not_called()
+        child.delete.assert_not_called()
+        fdb.db.push.assert_not_called()
+        # NOTE: nor are duplicate items deleted when the items are read
+        fdb.loaded = False
+        duplicate = dict(item, Term1="apple")
+        fdb.db.get.return_value = {"-a": duplicate, "-b": duplicate}
+        assert list(fdb.get_items()) == ["apple"]
+        child.delete.assert_not_called()
+        assert fdb.get_changed_buckets(fdb.tree) == []
+        get = child.child.return_value.get
+        get.side_effect = ["changed", error]
+        Database(db.config, db.voca_name, local_database=db.local_database)
+        assert "Firebase: could not read summary" in caplog.text
+        assert "Firebase: comparing all items" in caplog.text
+        get.side_effect = ["changed", None]
+        Database(db.config, db.voca_name, local_database=db.local_database)
+        get.side_effect = error
+        database = Database(db.config, db.voca_name, local_database=db.local_database)
+        assert not database.firebase_database.is_initialized()
+
+    def test_read_database(self, get_database: GetDatabase) -> None:
+        db = get_database(init=True)
+        fdb = db.firebase_database
+        fdb.db.get.return_value = {"_merkle": {"root": "abc"}}
+        assert fdb.read_database()
+        assert fdb.get_items() == {}
+        assert fdb.tree.root() == MerkleTree().root()
+        # NOTE: the summary is not saved if the object is not initialized
+        fdb.status = 0
+        assert fdb.flush()
+
+
+def test_lock(get_database: GetDatabase) -> None:
+    fdb = get_database(init=True).firebase_database
+    fdb.lock = MagicMock()
+    fdb.get_items()
+    fdb.lock.__enter__.assert_called_once()
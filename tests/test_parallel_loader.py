@@ -0,0 +1,191 @@
+from pathlib import Path
+from typing import Callable
+
+from pytest_mock.plugin import MockerFixture
+
+from vocabuilder.config import Config
+from vocabuilder.constants import TermStatus
+from vocabuilder.csv_helpers import CsvDatabaseHeader, CSVwrapper
+from vocabuilder.local_database import LocalDatabase
+from vocabuilder.parallel_loader import (
+    ChunkResult,
+    ParallelLoader,
+    parse_chunk,
+    plan_chunks,
+)
+from vocabuilder.type_aliases import DatabaseRow
+
+from .common import VERSION, GetConfig, PytestDataDict
+
+V = VERSION.encode("ascii")
+
+
+def append_rows(filename: Path) -> None:
+    """Append modified, deleted, and multi-line terms to the test database"""
+    csvwrapper = CSVwrapper(filename)
+    header = CsvDatabaseHeader()
+    for i in range(20):
+        item: DatabaseRow = {
+            header.status: 1,
+            header.term1: f'term "{i}"\nline 2',
+            header.term2: f"translation\r\n{i}, with a comma",
+            header.test_delay: i,
+            header.last_test: 1698866695,
+            header.last_modified: 1698866695,
+            header.version: VERSION,
+        }
+        csvwrapper.append_line(item)
+        item[header.term1] = "apple"
+        item[header.term2] = f"사과 {i}"
+        csvwrapper.append_line(item)
+    item[header.status] = TermStatus.DELETED
+    item[header.term1] = 'term "3"\nline 2'
+    csvwrapper.append_line(item)
+
+
+def setup_database(
+    setup_database_dir: Callable[[], Path],
+    get_config: GetConfig,
+    test_data: PytestDataDict,
+) -> Path:
+    """The test database, rewritten with the columns of this version of the app.
+    Files written by older versions are read sequentially"""
+    filename = setup_database_dir() / LocalDatabase.database_fn
+    LocalDatabase(get_config(), test_data["vocaname"]).close()
+    return filename
+
+
+def parallel_config(get_config: GetConfig, workers: int = 2) -> Config:
+    cfg = get_config()
+    cfg.config["Loader"]["ParallelMinSize"] = "0"
+    cfg.config["Loader"]["Workers"] = str(workers)
+    return cfg
+
+
+class TestParallelLoader:
+    def test_same_as_sequential(
+        self,
+        setup_database_dir: Callable[[], Path],
+        get_config: GetConfig,
+        test_data: PytestDataDict,
+    ) -> None:
+        filename = setup_database(setup_database_dir, get_config, test_data)
+        append_rows(filename)
+        with open(filename, "ab") as fp:
+            fp.write(b"1,no,x,0,1698866695,1698866695,%s,00000000\r\n" % V)
+        append_rows(filename)
+        voca_name = test_data["vocaname"]
+        cfg = parallel_config(get_config, workers=1)
+        expected = LocalDatabase(cfg, voca_name, read_only=True)
+        cfg = parallel_config(get_config)
+        ldb = LocalDatabase(cfg, voca_name, read_only=True, defer_load=True)
+        progress: list[int] = []
+        ldb.load(progress.append)
+        assert ldb.get_items() == expected.get_items()
+        assert progress[-1] == len(ldb.get_items())
+        assert ldb.db_offset == expected.db_offset == filename.stat().st_size
+        assert ldb.get_term2("apple") == "사과 19"
+        assert not ldb.check_term1_exists('term "3"\nline 2')
+        assert len(ldb.get_term1_list()) == 40 + 19
+        ldb = LocalDatabase(cfg, voca_name)
+        assert ldb.get_items() == expected.get_items()
+        assert ldb.recovery is not None
+        assert ldb.recovery.rows == 1
+        ldb.close()
+
+    def test_stopped_early(
+        self,
+        setup_database_dir: Callable[[], Path],
+        get_config: GetConfig,
+        test_data: PytestDataDict,
+    ) -> None:
+        filename = setup_database(setup_database_dir, get_config, test_data)
+        append_rows(filename)
+        with open(filename, "ab") as fp:
+            # NOTE: a quote inside an unquoted field, the read-only reader stops
+            fp.write(b'1,"no"x,x,0,1698866695,1698866695,%s\r\n' % V)
+        append_rows(filename)
+        voca_name = test_data["vocaname"]
+        cfg = parallel_config(get_config, workers=1)
+        expected = LocalDatabase(cfg, voca_name, read_only=True)
+        cfg = parallel_config(get_config)
+        ldb = LocalDatabase(cfg, voca_name, read_only=True)
+        assert ldb.get_items() == expected.get_items()
+        assert ldb.db_offset == expected.db_offset < filename.stat().st_size
+
+    def test_fallback(
+        self,
+        setup_database_dir: Callable[[], Path],
+        get_config: GetConfig,
+        tmp_path: Path,
+    ) -> None:
+        filename = setup_database_dir() / LocalDatabase.database_fn
+        csvwrapper = CSVwrapper(filename)
+        assert (
+            ParallelLoader(parallel_config(get_config, workers=1)).load(csvwrapper)
+            is None
+        )
+        cfg = get_config()
+        cfg.config["Loader"]["Workers"] = "2"
+        assert ParallelLoader(cfg).load(csvwrapper) is None
+        loader = ParallelLoader(parallel_config(get_config))
+        path = tmp_path / "swapped.csv"
+        path.write_text("Term1,Status\r\napple,1\r\n", encoding="utf_8")
+        assert loader.load(CSVwrapper(path)) is None
+        path.write_text("Status,Term1\r\n", encoding="utf_8")
+        assert loader.load(CSVwrapper(path), complete_only=True) is None
+        # NOTE: a single row can not be split
+        header = CsvDatabaseHeader()
+        path.write_text(
+            ",".join(header.header) + "\r\n1,a,b,0,1698866695,1698866695\r\n",
+            encoding="utf_8",
+        )
+        assert loader.load(CSVwrapper(path)) is None
+
+    def test_file_replaced(
+        self,
+        setup_database_dir: Callable[[], Path],
+        get_config: GetConfig,
+        test_data: PytestDataDict,
+        mocker: MockerFixture,
+    ) -> None:
+        setup_database_dir()
+        results = [ChunkResult([], 0, 10, [], 10, inode) for inode in (1, 2)]
+        mocker.patch.object(ParallelLoader, "load", return_value=results)
+        ldb = LocalDatabase(get_config(), test_data["vocaname"], read_only=True)
+        assert len(ldb.get_term1_list()) == 40
+
+    def test_parse_chunk(
+        self,
+        setup_database_dir: Callable[[], Path],
+        get_config: GetConfig,
+        test_data: PytestDataDict,
+    ) -> None:
+        filename = setup_database(setup_database_dir, get_config, test_data)
+        append_rows(filename)
+        with open(filename, "ab") as fp:
+            fp.write(b"1,no,x,0,1698866695,1698866695,%s,00000000\r\n" % V)
+        start = len(filename.read_bytes().split(b"\n", 1)[0]) + 1
+        end = filename.stat().st_size
+        chunks = plan_chunks(filename, start, end, 2)
+        assert len(chunks) == 2
+        results = [parse_chunk(str(filename), *chunk) for chunk in chunks]
+        assert results[0].offset == chunks[0][1]
+        assert results[0].count + results[1].count == 40 + 41
+        result = parse_chunk(str(filename), start, end)
+        assert result.count == 40 + 41
+        assert len(result.rows) == 40 + 20
+        # NOTE: the last row for a term, in the position of its first row
+        assert result.rows[40 + 3]["Status"] == TermStatus.DELETED
+        assert len(result.bad_rows) == 1
+        assert result.bad_rows[0][1] == result.offset == result.end == end
+
+    def test_plan_chunks(self, tmp_path: Path) -> None:
+        path = tmp_path / "database.csv"
+        path.write_bytes(b'h\r\n"a\r\nb",1\r\nc,2\r\nd,3')
+        assert plan_chunks(path, 3, 21, 100) == [(3, 13), (13, 18), (18, 21)]
+        assert plan_chunks(path, 3, 21, 100, complete_only=True) == [
+            (3, 13),
+            (13, 18),
+        ]
+        assert plan_chunks(path, 3, 21, 1) == [(3, 21)]
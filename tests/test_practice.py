@@ -0,0 +1,140 @@
+import json
+import random
+from pathlib import Path
+
+from pytest_mock.plugin import MockerFixture
+
+from vocabuilder.events import DatabaseEvent, DatabaseEventType
+from vocabuilder.practice import PracticeQueue, PracticeSession, reservoir_sample
+
+from .common import GetDatabase
+
+
+class TestReservoirSample:
+    def test_sample(self) -> None:
+        rng = random.Random(1)
+        sample = reservoir_sample(iter(range(100)), 10, rng)
+        assert len(sample) == 10
+        assert len(set(sample)) == 10
+        assert all(0 <= x < 100 for x in sample)
+
+    def test_few_items(self) -> None:
+        rng = random.Random(1)
+        sample = reservoir_sample(iter(range(3)), 10, rng)
+        assert sorted(sample) == [0, 1, 2]
+
+
+class TestPracticeQueue:
+    def test_refill(self, get_database: GetDatabase) -> None:
+        db = get_database()
+        queue = PracticeQueue(db, size=5, rng=random.Random(1))
+        assert len(queue) == 0
+        pair = queue.next_pair(exclude=set())
+        assert pair is not None
+        assert db.get_term2(pair[0]) == pair[1]
+        assert len(queue) == 4
+        queue.refill(exclude={pair[0]})
+        assert len(queue) == 5
+        terms = [pair[0] for pair in queue.queue]
+        assert len(set(terms)) == 5
+        assert pair[0] not in terms
+        queue.refill(exclude=set())  # already full
+        assert len(queue) == 5
+
+    def test_exclude(self, get_database: GetDatabase, mocker: MockerFixture) -> None:
+        db = get_database()
+        mocker.patch.object(
+            db,
+            "iter_pairs_exceeding_test_delay",
+            return_value=[("apple", "사과"), ("and", "그리고")],
+        )
+        queue = PracticeQueue(db, size=5)
+        queue.refill(exclude=set())
+        assert len(queue) == 2
+        pair = queue.next_pair(exclude={"apple", "and"})
+        assert pair is None
+        pair = queue.next_pair(exclude={"apple"})
+        assert pair == ("and", "그리고")
+
+    def test_invalidate(self, get_database: GetDatabase, mocker: MockerFixture) -> None:
+        db = get_database()
+        mocker.patch.object(
+            db,
+            "iter_pairs_exceeding_test_delay",
+            return_value=[("apple", "사과"), ("and", "그리고"), ("cloud", "구름")],
+        )
+        queue = PracticeQueue(db, size=5)
+        queue.refill(exclude=set())
+        queue.apply_event(DatabaseEvent(DatabaseEventType.UPDATED, "apple", "사과"))
+        assert len(queue) == 2
+        queue.apply_event(
+            DatabaseEvent(DatabaseEventType.RENAMED, "clouds", "구름", "cloud")
+        )
+        assert len(queue) == 1
+        queue.apply_event(DatabaseEvent(DatabaseEventType.DELETED, "xyz"))
+        assert len(queue) == 1
+        queue.clear()
+        assert len(queue) == 0
+
+
+class TestPracticeSession:
+    def test_save_and_resume(self, get_database: GetDatabase, tmp_path: Path) -> None:
+        db = get_database()
+        path = tmp_path / PracticeSession.session_fn
+        session = PracticeSession(db, size=5, path=path)
+        pair = session.next_pair(exclude=set())
+        assert pair is not None
+        session.save()
+        assert path.is_file()
+        session2 = PracticeSession(db, size=5, path=path)
+        assert list(session2.queue) == list(session.queue)
+        assert session2.shown == {pair[0]}
+        session2.clear()
+        session2.save()
+        assert not path.exists()
+        PracticeSession(db, size=5).save()  # no path given
+
+    def test_resume_not_ready(self, get_database: GetDatabase, tmp_path: Path) -> None:
+        db = get_database()
+        path = tmp_path / PracticeSession.session_fn
+        terms = ["apple", "no-such-term", "and"]
+        data = {"terms": terms, "shown": ["cloud"]}
+        path.write_text(json.dumps(data), encoding="utf-8")
+        db.get_local_database().update_retest_value("apple", 5)
+        session = PracticeSession(db, size=5, path=path)
+        assert list(session.queue) == [("and", "그리고")]
+        assert session.shown == {"cloud"}
+
+    def test_no_repeat(
+        self, get_database: GetDatabase, tmp_path: Path, mocker: MockerFixture
+    ) -> None:
+        db = get_database()
+        # NOTE: the terms are still ready for practice after they have been shown
+        pairs = [("apple", "사과"), ("and", "그리고"), ("cloud", "구름")]
+        mocker.patch.object(db, "iter_pairs_exceeding_test_delay", return_value=pairs)
+        path = tmp_path / PracticeSession.session_fn
+        session = PracticeSession(db, size=2, path=path)
+        shown = []
+        for _ in range(2):
+            pair = session.next_pair(exclude=set())
+            assert pair is not None
+            shown.append(pair)
+        session.save()
+        session = PracticeSession(db, size=2, path=path)
+        pair = session.next_pair(exclude=set())
+        assert pair is not None
+        shown.append(pair)
+        assert sorted(shown) == sorted(pairs)
+        # NOTE: all the terms have been shown, a new session is started
+        assert session.next_pair(exclude=set()) is None
+        assert session.shown == set()
+        session.save()
+        assert not path.exists()
+        assert session.next_pair(exclude=set()) in pairs
+
+    def test_invalid_file(self, get_database: GetDatabase, tmp_path: Path) -> None:
+        db = get_database()
+        path = tmp_path / PracticeSession.session_fn
+        path.write_text(json.dumps({"batch": ["apple"]}), encoding="utf-8")
+        session = PracticeSession(db, size=5, path=path)
+        assert len(session) == 0
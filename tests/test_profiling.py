@@ -0,0 +1,63 @@
+import io
+import pstats
+from pathlib import Path
+
+import pytest
+
+from vocabuilder.profiling import Profiler
+
+
+class TestProfiler:
+    def test_report(self) -> None:
+        profiler = Profiler()
+        for _ in range(3):
+            with profiler.timer("database.parse"):
+                pass
+        with pytest.raises(ValueError):
+            with profiler.timer("config.read"):
+                raise ValueError("timed anyway")
+        profiler.count("database.rows_read", 40)
+        profiler.count("database.rows_read")
+        assert profiler.timings["database.parse"][0] == 3
+        assert profiler.timings["config.read"][0] == 1
+        lines = profiler.report().splitlines()
+        assert lines[0].split() == ["phase", "calls", "seconds"]
+        assert lines[1].startswith("config.read ")
+        assert lines[2].split()[:2] == ["database.parse", "3"]
+        assert lines[3] == "database.rows_read: 41"
+        profiler.reset()
+        assert profiler.report().split() == ["phase", "calls", "seconds"]
+
+    def test_dump(self, tmp_path: Path) -> None:
+        profiler = Profiler()
+        out = io.StringIO()
+        profiler.dump(out)
+        assert out.getvalue() == ""  # NOTE: not enabled
+        output = tmp_path / "vocabuilder.prof"
+        profiler.enable(output)
+        with profiler.timer("startup"):
+            sum(range(1000))
+        profiler.dump(out)
+        assert "startup" in out.getvalue()
+        assert pstats.Stats(str(output)).total_calls > 0  # type: ignore
+
+    @pytest.mark.parametrize("value, enabled", [("", False), ("0", False), ("1", True)])
+    def test_environment(
+        self, value: str, enabled: bool, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv(Profiler.env_var, value)
+        profiler = Profiler()
+        profiler.enable_from_environment()
+        assert profiler.enabled == enabled
+        assert profiler.cprofile is None
+
+    def test_environment_output(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        output = tmp_path / "startup.prof"
+        monkeypatch.setenv(Profiler.env_var, str(output))
+        profiler = Profiler()
+        profiler.enable_from_environment()
+        assert profiler.output == output
+        profiler.dump(io.StringIO())
+        assert output.is_file()
@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from vocabuilder.constants import Grade
+from vocabuilder.exceptions import ReviewLogException
+from vocabuilder.review_log import Review, ReviewLog
+
+
+class TestReviewLog:
+    def test_append_and_read(self, tmp_path: Path) -> None:
+        log = ReviewLog(tmp_path)
+        assert log.get_history("apple") == []
+        assert len(log.records()) == 0
+        log.append("apple", Review(10, Grade.GOOD, 1))
+        log.append("and, or\n", Review(20, Grade.MANUAL, 3))
+        log.append("apple", Review(30, Grade.EASY, 6))
+        log2 = ReviewLog(tmp_path)
+        assert list(log2.terms()) == ["apple", "and, or\n"]
+        assert log2.get_history("apple") == [
+            Review(10, Grade.GOOD, 1),
+            Review(30, Grade.EASY, 6),
+        ]
+
+    def test_records(self, tmp_path: Path) -> None:
+        log = ReviewLog(tmp_path)
+        for i in range(5):
+            log.append(f"term{i % 2}", Review(100 * i, Grade.GOOD, i))
+        records = log.records()
+        assert isinstance(records, np.memmap)
+        assert records["interval"].tolist() == [0, 1, 2, 3, 4]
+        assert int(records["timestamp"].sum()) == 1000
+        assert log.get_term(int(records["term_id"][1])) == "term1"
+        size = log.path.stat().st_size
+        assert size == len(ReviewLog.magic) + 5 * ReviewLog.record_dtype.itemsize
+
+    def test_bad_file(self, tmp_path: Path) -> None:
+        path = tmp_path / ReviewLog.review_log_fn
+        path.write_bytes(b"xyz")
+        with pytest.raises(ReviewLogException) as excinfo:
+            ReviewLog(tmp_path)
+        assert "Bad file format" in str(excinfo)
+
+    def test_interrupted_write(self, tmp_path: Path) -> None:
+        log = ReviewLog(tmp_path)
+        log.append("apple", Review(10, Grade.GOOD, 1))
+        with open(log.path, "ab") as fp:
+            fp.write(b"\x01\x02\x03")
+        with open(log.terms_path, "a", encoding="utf_8") as fp:
+            fp.write('"clou')
+        log2 = ReviewLog(tmp_path)
+        assert len(log2.records()) == 1
+        log2.append("cloud", Review(20, Grade.GOOD, 1))
+        log3 = ReviewLog(tmp_path)
+        assert log3.get_history("cloud") == [Review(20, Grade.GOOD, 1)]
+        assert log3.get_history("apple") == [Review(10, Grade.GOOD, 1)]
+
+    def test_unknown_term_id(self, tmp_path: Path) -> None:
+        log = ReviewLog(tmp_path)
+        record = np.array([(7, 10, Grade.GOOD, 1)], dtype=ReviewLog.record_dtype)
+        with open(log.path, "ab") as fp:
+            fp.write(record.tobytes())
+        log2 = ReviewLog(tmp_path)
+        assert list(log2.terms()) == []
+
+    def test_read_only(self, tmp_path: Path) -> None:
+        reader = ReviewLog(tmp_path, read_only=True)
+        assert len(reader.records()) == 0
+        assert not reader.path.exists()
+        log = ReviewLog(tmp_path)
+        log.append("apple", Review(10, Grade.GOOD, 1))
+        assert reader.reload() == [("apple", Review(10, Grade.GOOD, 1))]
+        assert reader.reload() == []
+        assert reader.get_history("apple") == [Review(10, Grade.GOOD, 1)]
@@ -0,0 +1,143 @@
+import time
+
+import numpy as np
+import pytest
+
+from vocabuilder.constants import Grade
+from vocabuilder.exceptions import ConfigException
+from vocabuilder.local_database import LocalDatabase
+from vocabuilder.review_log import Review
+from vocabuilder.scheduler import (
+    SECONDS_PER_DAY,
+    FSRSScheduler,
+    SM2Scheduler,
+    get_scheduler,
+)
+
+from .common import GetConfig, GetDatabase
+
+DAY = SECONDS_PER_DAY
+
+
+class TestSM2:
+    def test_intervals(self) -> None:
+        scheduler = SM2Scheduler()
+        history = [Review(0, Grade.GOOD, 1), Review(DAY, Grade.GOOD, 6)]
+        assert scheduler.next_interval([], Grade.GOOD, 0) == 1
+        assert scheduler.next_interval(history[:1], Grade.GOOD, DAY) == 6
+        assert scheduler.next_interval(history, Grade.GOOD, 7 * DAY) == 15
+        assert scheduler.next_interval(history, Grade.AGAIN, 7 * DAY) == 0
+        ease = scheduler.memory_state([*history, Review(7 * DAY, Grade.HARD, 0)])[0]
+        assert ease == pytest.approx(2.36)
+
+    def test_manual_and_modifier(self) -> None:
+        scheduler = SM2Scheduler(interval_modifier=2.0)
+        assert scheduler.next_interval([], Grade.GOOD, 0) == 2
+        history = [Review(0, Grade.MANUAL, 10)]
+        states = scheduler.memory_states([history, []])
+        assert scheduler.intervals(states).tolist() == [10, 0]
+
+
+class TestFSRS:
+    def test_intervals(self) -> None:
+        scheduler = FSRSScheduler()
+        assert scheduler.next_interval([], Grade.AGAIN, 0) == 0
+        assert scheduler.next_interval([], Grade.EASY, 0) == 6
+        history = [Review(0, Grade.GOOD, 2)]
+        good = scheduler.next_interval(history, Grade.GOOD, 2 * DAY)
+        hard = scheduler.next_interval(history, Grade.HARD, 2 * DAY)
+        easy = scheduler.next_interval(history, Grade.EASY, 2 * DAY)
+        again = scheduler.next_interval(history, Grade.AGAIN, 2 * DAY)
+        assert again < hard < good < easy
+
+    def test_manual_and_retention(self) -> None:
+        scheduler = FSRSScheduler(desired_retention=0.9)
+        history = [Review(0, Grade.MANUAL, 10)]
+        assert scheduler.memory_state(history)[1] == pytest.approx(4.93)
+        state = scheduler.memory_state([*history, Review(DAY, Grade.MANUAL, 20)])
+        assert state[0] == pytest.approx(20)
+        states = scheduler.memory_states([history])
+        assert scheduler.intervals(states).tolist() == [10]
+        lower = FSRSScheduler(desired_retention=0.8)
+        assert lower.intervals(states).tolist() == [22]
+        assert lower.parameters() == {"desired_retention": 0.8}
+
+    def test_memory_states(self) -> None:
+        scheduler = FSRSScheduler()
+        histories = [
+            [Review(0, Grade.GOOD, 2)],
+            [],
+            [
+                Review(0, Grade.EASY, 6),
+                Review(3 * DAY, Grade.AGAIN, 0),
+                Review(4 * DAY, Grade.MANUAL, 3),
+            ],
+        ]
+        states = scheduler.memory_states(histories)
+        assert states.shape == (3, 2)
+        assert states[0].tolist() == pytest.approx([2.4, 4.93])
+        assert states[1].tolist() == [0, 0]
+        assert states[2][0] == pytest.approx(3)
+        assert states[2][1] == pytest.approx(
+            scheduler.memory_state(histories[2][:2])[1]
+        )
+        assert scheduler.memory_states([]).shape == (0, 2)
+
+    def test_batch_speed(self) -> None:
+        """Recomputing the intervals for 1M terms must take less than a second"""
+        scheduler = FSRSScheduler()
+        rng = np.random.default_rng(1)
+        states = rng.uniform(0.1, 100, size=(1_000_000, 2))
+        start = time.perf_counter()
+        intervals = scheduler.intervals(states)
+        assert time.perf_counter() - start < 1.0
+        assert intervals.shape == (1_000_000,)
+
+
+class TestGetScheduler:
+    def test_algorithms(self, get_config: GetConfig) -> None:
+        config = get_config()
+        assert isinstance(get_scheduler(config), SM2Scheduler)
+        config.config["Scheduler"]["Algorithm"] = "FSRS"
+        assert isinstance(get_scheduler(config), FSRSScheduler)
+        config.config["Scheduler"]["Algorithm"] = "xyz"
+        with pytest.raises(ConfigException) as excinfo:
+            get_scheduler(config)
+        assert "Unknown scheduler" in str(excinfo)
+
+
+class TestReschedule:
+    def test_parameters_changed(self, get_database: GetDatabase) -> None:
+        db = get_database()
+        ldb = db.get_local_database()
+        header = ldb.get_header()
+        assert db.next_interval("apple", Grade.GOOD) == 1
+        db.update_retest_value("apple", 1, Grade.GOOD)
+        db.update_retest_value("and", 5)
+        ldb.delete_item("cloud")
+        ldb.review_log.append("cloud", Review(0, Grade.GOOD, 1))
+        ldb.flush()
+        config = ldb.config
+        ldb2 = LocalDatabase(config, ldb.voca_name)  # parameters are unchanged
+        assert ldb2.get_term1_data("and")[header.test_delay] == 5
+        config.config["Scheduler"]["IntervalModifier"] = "3.0"
+        ldb3 = LocalDatabase(config, ldb.voca_name)
+        assert ldb3.get_term1_data("apple")[header.test_delay] == 3
+        assert ldb3.get_term1_data("and")[header.test_delay] == 5
+        assert not ldb3.check_term1_exists("cloud")
+        ldb4 = LocalDatabase(config, ldb.voca_name)  # file was rewritten
+        assert ldb4.get_term1_data("apple")[header.test_delay] == 3
+
+
+class TestReviewLogApplied:
+    def test_reopen(self, get_database: GetDatabase) -> None:
+        db = get_database()
+        ldb = db.get_local_database()
+        header = ldb.get_header()
+        db.update_retest_value("apple", 4, Grade.GOOD)
+        ldb.review_log.append("cloud", Review(0, Grade.GOOD, 9))  # too old
+        ldb.review_log.append("xyz", Review(0, Grade.GOOD, 9))  # not in database
+        ldb.flush()
+        ldb2 = LocalDatabase(ldb.config, ldb.voca_name)
+        assert ldb2.get_term1_data("apple")[header.test_delay] == 4
+        assert ldb2.get_term1_data("cloud")[header.test_delay] != 9
@@ -9,8 +9,9 @@ from PyQt6.QtWidgets import QApplication
 from pytest_mock.plugin import MockerFixture
 
 import vocabuilder.vocabuilder
+from vocabuilder.catalog import VocabularyCatalog, VocabularyInfo
 from vocabuilder.local_database import LocalDatabase
-from vocabuilder.select_voca import SelectNewVocabularyName
+from vocabuilder.select_voca import SelectNewVocabularyName, SelectVocabulary
 from vocabuilder.vocabuilder import CommandLineOptions, SelectVocabularyException
 
 from .common import GetConfig, QtBot
@@ -104,6 +105,26 @@ class TestGeneral:
         name = vocabuilder.vocabuilder.select_vocabulary(opts, cfg, app)
         assert name == retval
 
+    def test_most_recent(
+        self,
+        qapp: QApplication,
+        get_config: GetConfig,
+        mocker: MockerFixture,
+        setup_database_dir: Callable[[], Path],
+    ) -> None:
+        cfg = get_config()
+        datadir = setup_database_dir()
+        (cfg.get_config_dir() / LocalDatabase.active_voca_info_fn).unlink()
+        catalog = VocabularyCatalog(datadir.parent)
+        names = ["b-voca", "english-korean", "a-voca"]
+        for i, name in enumerate(names):
+            catalog.update(VocabularyInfo(name, modified=1000 + i))
+        opts = CommandLineOptions(qapp)
+        mocker.patch.object(opts, "get_database_name", return_value=None)
+        select = SelectVocabulary(opts, cfg, qapp)
+        assert select.existing_vocabularies == sorted(names)
+        assert select.get_name() == "a-voca"
+
     @pytest.mark.parametrize(
         "valid_name, bad_char", [(True, False), (False, False), (False, True)]
     )
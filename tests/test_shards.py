@@ -0,0 +1,190 @@
+import base64
+import logging
+import typing
+import zlib
+
+import pytest
+from _pytest.logging import LogCaptureFixture
+from firebase_admin.exceptions import FirebaseError  # type: ignore
+
+from vocabuilder.database import Database
+from vocabuilder.exceptions import FirebaseDatabaseException
+from vocabuilder.firebase_database import FirebaseDatabase
+from vocabuilder.shards import ShardedLayout
+from vocabuilder.type_aliases import DatabaseType
+
+from .common import VERSION, GetDatabase
+
+
+def sharded(db: Database, num_shards: str = "4") -> Database:
+    db.config.config["Firebase"]["Shards"] = num_shards
+    return Database(db.config, db.voca_name, local_database=db.local_database)
+
+
+def saved_changes(database: Database) -> dict[str, typing.Any]:
+    update = database.firebase_database.db.update
+    return typing.cast(dict[str, typing.Any], update.call_args.args[0])
+
+
+def saved_shards(database: Database) -> dict[str, str]:
+    return {
+        path.split("/")[1]: value
+        for path, value in saved_changes(database).items()
+        if path.startswith("_shards/") and (value is not None)
+    }
+
+
+class TestShardedLayout:
+    def test_keys(self) -> None:
+        layout = ShardedLayout(16)
+        assert layout.keys[0] == "00-0f"
+        assert layout.keys[-1] == "f0-ff"
+        assert ShardedLayout(3).keys == ["00-55", "56-aa", "ab-ff"]
+        assert ShardedLayout(256).keys[1] == "01-01"
+        assert 0 <= layout.shard("apple") < 16
+
+    def test_encode(self) -> None:
+        items: DatabaseType = {"사과": {"Term2": "apple", "Version": VERSION}}
+        blob = ShardedLayout.encode(items)
+        assert ShardedLayout.decode(blob) == items
+        assert ShardedLayout.decode(1) is None
+        assert ShardedLayout.decode("not base64!") is None
+        assert ShardedLayout.decode(base64.b64encode(b"not zlib").decode()) is None
+        blob = base64.b64encode(zlib.compress(b"[1, 2]")).decode()
+        assert ShardedLayout.decode(blob) is None
+
+
+class TestFirebase:
+    def test_migrate(self, get_database: GetDatabase) -> None:
+        db = get_database(init=True)
+        database = sharded(db)
+        changes = saved_changes(database)
+        # NOTE: the item saved as a child is moved to the shards
+        assert changes["NYJ18uc"] is None
+        assert "_merkle" in changes
+        shards = saved_shards(database)
+        assert sorted(shards) == ["00-3f", "40-7f", "80-bf", "c0-ff"]
+        items: DatabaseType = {}
+        for blob in shards.values():
+            decoded = ShardedLayout.decode(blob)
+            assert decoded is not None
+            items.update(decoded)
+        ldb = db.get_local_database()
+        assert items == ldb.get_items()
+
+    def test_changed_shards(
+        self, get_database: GetDatabase, caplog: LogCaptureFixture
+    ) -> None:
+        db = get_database(init=True)
+        shards = saved_shards(sharded(db))
+        caplog.set_level(logging.INFO)
+        child = db.firebase_database.db
+        child.get.return_value = {"_shards": shards}
+        database = sharded(db)
+        assert "Firebase: read 40 items from 4 shards" in caplog.text
+        assert "Firebase: local database is in sync" in caplog.text
+        assert list(saved_changes(database)) == ["_merkle"]
+        fdb = database.firebase_database
+        assert fdb.shards is not None
+        ldb = database.get_local_database()
+        item = ldb.get_term1_data("apple").copy()
+        item[ldb.header.term2] = "능금"
+        database.update_item("apple", item)
+        key = fdb.shards.keys[fdb.shards.shard("apple")]
+        assert set(saved_changes(database)) == {f"_shards/{key}", "_merkle"}
+        decoded = ShardedLayout.decode(saved_shards(database)[key])
+        assert decoded is not None
+        assert decoded["apple"][ldb.header.term2] == "능금"
+        database.delete_item("apple")
+        assert "apple" not in fdb.get_items()
+        assert fdb.get_tombstones() == {"apple": ldb.get_tombstones()["apple"]}
+        item = ldb.get_term1_data("and").copy()
+        item[ldb.header.term1] = "also"
+        database.modify_item("and", item)
+        assert "also" in fdb.get_items()
+        assert "and" not in fdb.get_items()
+        # NOTE: nothing is written if nothing has changed
+        child.update.reset_mock()
+        assert fdb.flush()
+        child.update.assert_not_called()
+
+    def test_flush(self, get_database: GetDatabase) -> None:
+        db = get_database(init=True)
+        child = db.firebase_database.db
+        error = FirebaseError(code="code", message="message", http_response=None)
+        child.update.side_effect = error
+        fdb = sharded(db).firebase_database
+        assert fdb.shards is not None
+        # NOTE: the changes are kept if they could not be written
+        assert fdb.shards.stale == {"NYJ18uc"}
+        assert len(fdb.shards.dirty) == 4
+        child.update.side_effect = None
+        assert fdb.flush()
+        assert fdb.shards.stale == set()
+        assert fdb.shards.dirty == set()
+        item = db.get_term1_data("and")
+
+        def push_item(updates: dict[str, typing.Any]) -> None:
+            # NOTE: an item pushed while the changes are written
+            assert fdb.shards is not None
+            assert fdb.shards.dirty == set()
+            fdb.push_item("and", item)
+
+        fdb.push_item("apple", db.get_term1_data("apple"))
+        child.update.side_effect = push_item
+        assert fdb.flush()
+        assert fdb.shards.dirty == {fdb.shards.shard("and")}
+
+    def test_resharded(
+        self, get_database: GetDatabase, caplog: LogCaptureFixture
+    ) -> None:
+        db = get_database(init=True)
+        shards = saved_shards(sharded(db))
+        caplog.set_level(logging.INFO)
+        ldb = db.get_local_database()
+        apple = ldb.get_term1_data("apple").copy()
+        newer = dict(apple, Term1="apple", Term2="능금", Version=f"f{VERSION[1:]}")
+        older = dict(apple, Term1="and", Version="000000000000-0000-")
+        child = db.firebase_database.db
+        child.get.return_value = {
+            "_shards": shards | {"00-3f": "bad"},
+            "-a": newer,
+            "-b": older,
+        }
+        database = sharded(db, "2")
+        assert "Firebase: invalid shard: '00-3f'" in caplog.text
+        changes = saved_changes(database)
+        assert {key for key, value in changes.items() if value is None} == {
+            "-a",
+            "-b",
+            "_shards/00-3f",
+            "_shards/40-7f",
+            "_shards/80-bf",
+            "_shards/c0-ff",
+        }
+        assert sorted(saved_shards(database)) == ["00-7f", "80-ff"]
+        assert ldb.get_term2("apple") == "능금"
+        # NOTE: the item in the shard is newer
+        version = database.firebase_database.get_items()["and"][ldb.header.version]
+        assert version == ldb.get_term1_data("and")[ldb.header.version]
+
+    def test_errors(self, get_database: GetDatabase, caplog: LogCaptureFixture) -> None:
+        db = get_database(init=True)
+        caplog.set_level(logging.INFO)
+        for option in ("x", "1000"):
+            db.config.config["Firebase"]["Shards"] = option
+            assert FirebaseDatabase(db.config, db.voca_name).shards is None
+            assert f"Invalid number of firebase shards in config file: {option}" in (
+                caplog.text
+            )
+        fdb = sharded(db).firebase_database
+        with pytest.raises(FirebaseDatabaseException):
+            fdb.delete_item("unknown")
+        item = db.get_term1_data("apple")
+        fdb.update_item_same_key("unknown", item)
+        fdb.update_item_different_key("unknown", "new", item)
+        assert "Cannot update item: Key 'unknown' not found" in caplog.text
+        assert "new" not in fdb.get_items()
+        assert fdb.push_items([dict(item, Term1="new")])
+        assert "new" in fdb.get_items()
+        assert len(saved_shards(db)) == 1
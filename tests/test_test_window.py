@@ -8,6 +8,7 @@ import pytest
 from PyQt6.QtCore import Qt
 from pytest_mock.plugin import MockerFixture
 
+from vocabuilder.constants import Grade, TestMethod
 from vocabuilder.test_window import (
     TestWindow as _TestWindow,  # Cannot start with "Test"
 )
@@ -67,8 +68,9 @@ class TestGeneral:
             testwin.main_dialog = wrapper  # type: ignore
             if not pair:  # pragma: no cover (this test is skipped on macOS)
                 mocker.patch(
-                    "vocabuilder.local_database.LocalDatabase.get_random_pair",
-                    return_value=None,
+                    "vocabuilder.local_database.LocalDatabase."
+                    "iter_pairs_exceeding_test_delay",
+                    return_value=[],
                 )
             idx = testwin.params.button_names.index(button_name)
             if not original_test_direction:
@@ -308,9 +310,11 @@ class TestGeneral:
             testwin.next_button.clicked.connect(wrapper)
             if not pair:
                 mocker.patch(
-                    "vocabuilder.local_database.LocalDatabase.get_random_pair",
-                    return_value=None,
+                    "vocabuilder.local_database.LocalDatabase."
+                    "iter_pairs_exceeding_test_delay",
+                    return_value=[],
                 )
+                testwin.session.clear()
             testwin.next_button.click()
         assert True
 
@@ -368,3 +372,76 @@ class TestGeneral:
             testwin.retest_buttons[button_idx].clicked.connect(wrapper)
             testwin.retest_buttons[button_idx].click()
         assert True
+
+
+class TestSession:
+    def test_next_writes_later(
+        self,
+        test_window: _TestWindow,
+        qtbot: QtBot,
+    ) -> None:
+        testwin = test_window
+        term1 = testwin.term1
+        testwin.delay_edit.setText("3")
+        testwin.next_button_clicked()
+        assert testwin.term1 != term1
+        assert testwin.pending_results == [(term1, 3, Grade.MANUAL)]
+        qtbot.waitUntil(lambda: len(testwin.pending_results) == 0)
+        header = testwin.db.local_database.header
+        assert testwin.db.get_term1_data(term1)[header.test_delay] == 3
+        assert term1 not in [pair[0] for pair in testwin.session.queue]
+
+    def test_refill_and_close(
+        self,
+        test_window: _TestWindow,
+        qtbot: QtBot,
+    ) -> None:
+        testwin = test_window
+        session = testwin.session
+        session.size = 5
+        session.clear()
+        # NOTE: the queue is not refilled until it is half empty
+        for size in (4, 3, 5):
+            testwin.next_button_clicked()
+            qtbot.waitUntil(lambda: len(testwin.pending_results) == 0)
+            assert len(session) == size
+        assert testwin.term1 not in [pair[0] for pair in session.queue]
+        term1 = session.queue[0][0]
+        testwin.db.update_retest_value(term1, 5)
+        assert term1 not in [pair[0] for pair in session.queue]
+        assert session.path is not None
+        assert session.path.is_file()
+        testwin.close()
+        assert session.path.is_file()
+
+    def test_grade_buttons(
+        self,
+        test_window: _TestWindow,
+        qtbot: QtBot,
+    ) -> None:
+        testwin = test_window
+        term1 = testwin.term1
+        testwin.grade_buttons[Grade.GOOD - 1].click()
+        assert testwin.grade == Grade.GOOD
+        assert testwin.delay_edit.text() == "1"
+        testwin.retest_buttons[3].click()
+        assert testwin.grade == Grade.MANUAL
+        testwin.grade_buttons[Grade.EASY - 1].click()
+        assert testwin.delay_edit.text() == "1"
+        testwin.done_button_clicked()
+        history = testwin.db.get_local_database().review_log.get_history(term1)
+        assert [review.grade for review in history] == [Grade.EASY]
+
+    def test_next_from_list(
+        self,
+        test_window: _TestWindow,
+        qtbot: QtBot,
+    ) -> None:
+        testwin = test_window
+        testwin.params.test_method = TestMethod.List
+        term1 = testwin.term1
+        testwin.delay_edit.setText("7")
+        testwin.next_button_clicked()
+        assert testwin.pending_results == []
+        header = testwin.db.local_database.header
+        assert testwin.db.get_term1_data(term1)[header.test_delay] == 7
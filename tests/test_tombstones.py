@@ -0,0 +1,256 @@
+import logging
+from pathlib import Path
+
+from _pytest.logging import LogCaptureFixture
+from firebase_admin.exceptions import FirebaseError  # type: ignore
+
+from vocabuilder.append_queue import AppendQueue
+from vocabuilder.database import Database
+from vocabuilder.events import DatabaseEvent, DatabaseEventType
+from vocabuilder.hlc import HybridLogicalClock
+from vocabuilder.local_database import LocalDatabase
+from vocabuilder.tombstones import TombstoneIndex
+
+from .common import GetConfig, GetDatabase
+
+
+def version(seconds: int) -> str:
+    return HybridLogicalClock.from_seconds(seconds, "a")
+
+
+class TestTombstoneIndex:
+    def test_add(self, tmp_path: Path) -> None:
+        index = TombstoneIndex(tmp_path)
+        assert index.add("a", version(10))
+        assert not index.add("a", version(5))
+        assert index.add("b", version(20))
+        assert index.get("a") == version(10)
+        assert index.get("c") is None
+        assert index.supersedes("a", version(10))
+        assert not index.supersedes("a", version(11))
+        assert not index.supersedes("c", version(0))
+        reader = TombstoneIndex(tmp_path, read_only=True)
+        assert reader.get_items() == {"a": version(10), "b": version(20)}
+        with open(index.path, "ab") as fp:
+            fp.write(b"bad line\n")
+            fp.write(b'["c", "')
+        # NOTE: the incomplete line is read when it is complete
+        assert reader.reload() == 0
+        assert reader.get_items() == {"a": version(10), "b": version(20)}
+        with open(index.path, "ab") as fp:
+            fp.write(version(30).encode("utf_8") + b'"]\n')
+        assert reader.reload() == 1
+        assert reader.get("c") == version(30)
+
+    def test_truncate(self, tmp_path: Path, caplog: LogCaptureFixture) -> None:
+        caplog.set_level(logging.INFO)
+        assert TombstoneIndex(tmp_path, read_only=True).reload() == 0
+        index = TombstoneIndex(tmp_path)
+        index.add("a", version(10))
+        with open(index.path, "ab") as fp:
+            fp.write(b'["b", 2')
+        index = TombstoneIndex(tmp_path)
+        assert "removing incomplete data" in caplog.text
+        index.add("c", version(30))
+        assert TombstoneIndex(tmp_path, read_only=True).get_items() == {
+            "a": version(10),
+            "c": version(30),
+        }
+
+    def test_collect_garbage(self, tmp_path: Path, get_config: GetConfig) -> None:
+        queue = AppendQueue(get_config())
+        index = TombstoneIndex(tmp_path, append_queue=queue)
+        index.add("a", version(10))
+        index.add("b", version(20))
+        reader = TombstoneIndex(tmp_path, read_only=True)
+        assert index.collect_garbage(5) == 0
+        assert index.collect_garbage(15) == 1
+        assert index.get_items() == {"b": version(20)}
+        assert index.path.read_text(encoding="utf_8") == (f'["b", "{version(20)}"]\n')
+        # NOTE: the rewritten file is read from the start
+        reader.reload()
+        assert reader.get_items() == {"b": version(20)}
+        queue.close()
+
+
+class TestLocalDatabase:
+    def test_delete(self, get_database: GetDatabase, get_config: GetConfig) -> None:
+        ldb = get_database().get_local_database()
+        apple = ldb.get_term1_data("apple")[ldb.header.version]
+        assert isinstance(apple, str)
+        ldb.delete_item("apple")
+        assert list(ldb.get_tombstones()) == ["apple"]
+        assert ldb.is_deleted("apple", apple)
+        # NOTE: a new term with the same name is not deleted
+        assert not ldb.is_deleted("apple", ldb.clock.now())
+        term1 = ldb.get_term1_list()[0]
+        item = ldb.get_term1_data(term1).copy()
+        item[ldb.header.term1] = term1
+        ldb.rename_item(term1, item.copy())
+        assert list(ldb.get_tombstones()) == ["apple"]
+        item[ldb.header.term1] = "new name"
+        ldb.rename_item(term1, item)
+        assert list(ldb.get_tombstones()) == ["apple", term1]
+        ldb.close()
+        ldb = LocalDatabase(ldb.config, ldb.voca_name, read_only=True)
+        assert list(ldb.get_tombstones()) == ["apple", term1]
+        # NOTE: the tombstones are removed when the file is cleaned up
+        cfg = get_config()
+        cfg.config["Tombstones"]["KeepDays"] = "-1"
+        ldb = LocalDatabase(cfg, ldb.voca_name)
+        assert ldb.get_tombstones() == {}
+        ldb.close()
+
+    def test_apply_tombstone(self, get_database: GetDatabase) -> None:
+        ldb = get_database().get_local_database()
+        events: list[DatabaseEvent] = []
+        ldb.add_listener(events.append)
+        apple = ldb.get_term1_data("apple")[ldb.header.version]
+        assert isinstance(apple, str)
+        assert not ldb.apply_tombstone("apple", version(0))
+        assert ldb.check_term1_exists("apple")
+        assert not ldb.apply_tombstone("unknown", apple)
+        assert ldb.apply_tombstone("apple", apple)
+        assert not ldb.check_term1_exists("apple")
+        assert ldb.get_tombstones()["apple"] == apple
+        assert [(event.type, event.term1) for event in events] == [
+            (DatabaseEventType.DELETED, "apple")
+        ]
+        ldb.reload()
+        assert not ldb.check_term1_exists("apple")
+        ldb.close()
+
+
+class TestSync:
+    def test_deleted_remotely(
+        self, get_database: GetDatabase, caplog: LogCaptureFixture
+    ) -> None:
+        db = get_database(init=True)
+        caplog.set_level(logging.INFO)
+        ldb = db.get_local_database()
+        child = db.firebase_database.db
+        item = db.firebase_database.get_items()["apple"].copy()
+        item[ldb.header.term1] = "apple"
+        child.get.return_value = {
+            "-NYJ18uc": item,
+            "_tombstones": {
+                "-a": {"Term1": "apple", "Deleted": version(1600000000)},
+                "-b": {"Term1": "apple", "Deleted": version(1800000000)},
+                "-c": {"Term1": "apple", "Deleted": "bad"},
+            },
+        }
+        child.push.reset_mock()
+        database = Database(db.config, db.voca_name, local_database=ldb)
+        tombstones = database.firebase_database.get_tombstones()
+        assert tombstones == {"apple": version(1800000000)}
+        assert "Firebase: invalid tombstone" in caplog.text
+        assert not ldb.check_term1_exists("apple")
+        assert ldb.get_tombstones()["apple"] == version(1800000000)
+        # NOTE: the clock has seen the tombstone
+        assert ldb.clock.now() > version(1800000000)
+        assert "Deleted 1 items deleted on other devices" in caplog.text
+        # NOTE: the local version is older than the tombstone, it is not pushed
+        pushed = [call.args[0]["Term1"] for call in child.push.call_args_list]
+        assert "apple" not in pushed
+        assert len(pushed) == 39
+
+    def test_deleted_locally(
+        self, get_database: GetDatabase, caplog: LogCaptureFixture
+    ) -> None:
+        db = get_database(init=True)
+        caplog.set_level(logging.INFO)
+        ldb = db.get_local_database()
+        ldb.delete_item("apple")
+        deleted = ldb.get_tombstones()["apple"]
+        child = db.firebase_database.db
+        tombstone = child.child.return_value.child.return_value
+        database = Database(db.config, db.voca_name, local_database=ldb)
+        # NOTE: the item in firebase is not added again, and is deleted
+        assert not ldb.check_term1_exists("apple")
+        assert "apple" not in database.firebase_database.get_items()
+        child.child.assert_any_call("NYJ18uc")
+        tombstone.set.assert_called_with({"Term1": "apple", "Deleted": deleted})
+        assert database.firebase_database.get_tombstones() == {"apple": deleted}
+        assert "Pushed 1 tombstones to firebase" in caplog.text
+        # NOTE: the tombstone is only saved once
+        tombstone.set.reset_mock()
+        database.push_updated_items_to_firebase()
+        tombstone.set.assert_not_called()
+
+    def test_added_again(self, get_database: GetDatabase) -> None:
+        db = get_database(init=True)
+        ldb = db.get_local_database()
+        header = ldb.header
+        ldb.delete_item("apple")
+        ldb.add_item(
+            {
+                header.term1: "apple",
+                header.term2: "사과",
+                header.test_delay: 0,
+                header.last_test: ldb.epoch_in_seconds(),
+            }
+        )
+        added = str(ldb.get_term1_data("apple")[header.version])
+        assert not ldb.is_deleted("apple", added)
+        child = db.firebase_database.db
+        tombstone = child.child.return_value.child.return_value
+        database = Database(db.config, db.voca_name, local_database=ldb)
+        # NOTE: the item added again is pushed, and is not deleted by the tombstone
+        assert ldb.check_term1_exists("apple")
+        assert "apple" in database.firebase_database.get_items()
+        child.child.return_value.delete.assert_not_called()
+        tombstone.set.assert_not_called()
+
+    def test_delete_failed(self, get_database: GetDatabase) -> None:
+        db = get_database(init=True)
+        ldb = db.get_local_database()
+        ldb.delete_item("apple")
+        error = FirebaseError(code="code", message="message", http_response=None)
+        db.firebase_database.db.child.return_value.delete.side_effect = error
+        database = Database(db.config, db.voca_name, local_database=ldb)
+        # NOTE: the item is still in firebase, but is not added again
+        assert "apple" in database.firebase_database.get_items()
+        assert not ldb.check_term1_exists("apple")
+
+    def test_rename(self, get_database: GetDatabase) -> None:
+        db = get_database(init=True)
+        ldb = db.get_local_database()
+        item = ldb.get_term1_data("apple").copy()
+        item[ldb.header.term1] = "red apple"
+        db.modify_item("apple", item)
+        assert list(db.firebase_database.get_tombstones()) == ["apple"]
+
+    def test_collect_garbage(
+        self, get_database: GetDatabase, caplog: LogCaptureFixture
+    ) -> None:
+        db = get_database(init=True)
+        caplog.set_level(logging.INFO)
+        child = db.firebase_database.db
+        child.get.return_value = {
+            "_tombstones": {"-a": {"Term1": "old", "Deleted": version(1)}},
+        }
+        database = Database(db.config, db.voca_name, local_database=db.local_database)
+        assert database.firebase_database.get_tombstones() == {}
+        child.child.return_value.update.assert_called_with({"-a": None})
+        assert "Firebase: deleted 1 expired tombstones" in caplog.text
+
+    def test_errors(self, get_database: GetDatabase, caplog: LogCaptureFixture) -> None:
+        caplog.set_level(logging.INFO)
+        fdb = get_database(init=True).firebase_database
+        error = FirebaseError(code="code", message="message", http_response=None)
+        tombstones = fdb.db.child.return_value
+        tombstones.child.return_value.set.side_effect = error
+        assert not fdb.add_tombstone("apple", version(10))
+        assert "could not save tombstone" in caplog.text
+        tombstones.child.return_value.set.side_effect = None
+        assert fdb.add_tombstone("apple", version(10))
+        # NOTE: a newer tombstone is already saved
+        assert fdb.add_tombstone("apple", version(5))
+        tombstones.update.side_effect = error
+        assert fdb.collect_garbage(20) == 0
+        assert "could not delete tombstones" in caplog.text
+        assert fdb.get_tombstones() == {"apple": version(10)}
+
+    def test_not_initialized(self, get_database: GetDatabase) -> None:
+        fdb = get_database().firebase_database
+        assert not fdb.add_tombstone("apple", version(1))
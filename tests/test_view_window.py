@@ -5,7 +5,9 @@ import pytest
 from PyQt6.QtCore import Qt
 from pytest_mock.plugin import MockerFixture
 
-from vocabuilder.view_window import ViewWindow
+from vocabuilder.csv_helpers import CsvDatabaseHeader
+from vocabuilder.type_aliases import DatabaseRow
+from vocabuilder.view_window import ViewScrollArea, ViewWindow
 from vocabuilder.vocabuilder import MainWindow
 from vocabuilder.widgets import QLabelClickable
 
@@ -108,3 +110,101 @@ class TestView:
             )
 
         assert callback.called
+
+
+class TestDatabaseEvents:
+    @staticmethod
+    def row_texts(scrollarea: ViewScrollArea, row: int) -> tuple[str, str]:
+        # NOTE: the first item in the layout is the stretch
+        layout_item = scrollarea.vbox.itemAt(row + 1)
+        assert layout_item is not None
+        widget = layout_item.widget()
+        assert widget is not None
+        hbox = widget.layout()
+        assert hbox is not None
+        texts = []
+        for i in range(2):
+            label_item = hbox.itemAt(i)
+            assert label_item is not None
+            label = typing.cast(QLabelClickable, label_item.widget())
+            texts.append(label.text())
+        return texts[0], texts[1]
+
+    def add_term(self, window: MainWindow, term1: str, term2: str) -> None:
+        header = CsvDatabaseHeader()
+        item: DatabaseRow = {
+            header.term1: term1,
+            header.term2: term2,
+            header.test_delay: 0,
+            header.last_test: window.db.epoch_in_seconds(),
+        }
+        window.db.add_item(item)
+
+    def test_add_and_delete(self, main_window: MainWindow) -> None:
+        window = main_window
+        window.view_entries()
+        view_win = typing.cast(ViewWindow, window.view_window)
+        scrollarea = view_win.scrollarea1
+        num_rows = scrollarea.loaded_rows
+        self.add_term(window, "0 zero", "영")
+        assert scrollarea.loaded_rows == num_rows + 1
+        assert self.row_texts(scrollarea, 0) == ("0 zero", "영")
+        assert self.row_texts(scrollarea, 1) == ("100,000,000", "억")
+        window.db.get_local_database().delete_item("0 zero")
+        assert scrollarea.loaded_rows == num_rows
+        assert self.row_texts(scrollarea, 0) == ("100,000,000", "억")
+        view_win.close()
+        self.add_term(window, "1 one", "일")  # the closed window is not updated
+        assert scrollarea.loaded_rows == num_rows
+
+    def test_rename_and_update(self, main_window: MainWindow) -> None:
+        window = main_window
+        window.view_entries()
+        view_win = typing.cast(ViewWindow, window.view_window)
+        scrollarea = view_win.scrollarea1
+        header = CsvDatabaseHeader()
+        item = window.db.get_term1_data("apple").copy()
+        item[header.term1] = "0 apple"
+        del item[header.status]
+        del item[header.last_modified]
+        window.db.modify_item("apple", item)
+        assert "apple" not in scrollarea.translations
+        assert self.row_texts(scrollarea, 0) == ("0 apple", "사과")
+        window.db.update_retest_value("0 apple", 3)  # translation is unchanged
+        assert self.row_texts(scrollarea, 0) == ("0 apple", "사과")
+        item = window.db.get_term1_data("0 apple").copy()
+        item[header.term2] = "사과나무"
+        window.db.update_item("0 apple", item)
+        assert self.row_texts(scrollarea, 0) == ("0 apple", "사과나무")
+
+    def test_filtered(self, main_window: MainWindow) -> None:
+        window = main_window
+        window.view_entries()
+        view_win = typing.cast(ViewWindow, window.view_window)
+        scrollarea = view_win.scrollarea1
+        view_win.edit2.setText("장미")
+        assert scrollarea.loaded_rows == 0
+        self.add_term(window, "rose", "장미")
+        self.add_term(window, "0 zero", "영")  # does not match the filter
+        assert scrollarea.filtered_terms == ["rose"]
+        assert self.row_texts(scrollarea, 0) == ("rose", "장미")
+        window.db.get_local_database().delete_item("0 zero")
+        assert scrollarea.loaded_rows == 1
+
+    def test_not_loaded(self, main_window: MainWindow) -> None:
+        window = main_window
+        window.view_entries()
+        view_win = typing.cast(ViewWindow, window.view_window)
+        scrollarea = view_win.scrollarea1
+        scrollarea.add_increment = 5
+        view_win.update_items1("")
+        assert scrollarea.loaded_rows == 5
+        self.add_term(window, "zzz", "자")
+        assert scrollarea.loaded_rows == 5
+        assert scrollarea.filtered_terms[-1] == "zzz"
+        window.db.get_local_database().delete_item("zzz")
+        assert scrollarea.filtered_terms[-1] != "zzz"
+        scrollarea.insert_row("apple", "사과")  # already present: replaced
+        assert scrollarea.terms.count("apple") == 1
+        scrollarea.remove_row("xyz")  # not present: ignored
+        assert scrollarea.loaded_rows == 5
@@ -0,0 +1,53 @@
+from vocabuilder.events import DatabaseEvent, DatabaseEventType
+from vocabuilder.local_database import LocalDatabase
+from vocabuilder.watcher import DatabaseWatcher
+
+from .common import VERSION, GetDatabase, QtBot
+
+
+def append_rows(ldb: LocalDatabase, terms: list[str]) -> int:
+    """Append rows like another process would do. Returns the number of bytes"""
+    data = "".join(
+        f"1,{term},번역,0,1698866695,1698866695,{VERSION}\r\n" for term in terms
+    )
+    with open(ldb.dbname, "ab") as fp:
+        return fp.write(data.encode("utf_8"))
+
+
+class TestDatabaseWatcher:
+    def test_check(self, get_database: GetDatabase) -> None:
+        ldb = get_database().get_local_database()
+        watcher = DatabaseWatcher(ldb, ldb.config)
+        events: list[DatabaseEvent] = []
+        ldb.add_listener(events.append)
+        assert watcher.check() == 0
+        offset = ldb.db_offset
+        size = append_rows(ldb, [f"new{i}" for i in range(10)])
+        assert watcher.check() == 10
+        assert ldb.db_offset == offset + size
+        assert len(events) == 10
+        assert all(event.type == DatabaseEventType.ADDED for event in events)
+        assert ldb.get_term2("new9") == "번역"
+        # NOTE: the rows written by the database itself are not read again
+        ldb.delete_item("new0")
+        assert watcher.check() == 0
+        watcher.stop()
+
+    def test_notification(self, get_database: GetDatabase, qtbot: QtBot) -> None:
+        ldb = get_database().get_local_database()
+        ldb.config.config["Watcher"]["PollInterval"] = "0"
+        watcher = DatabaseWatcher(ldb, ldb.config)
+        assert not watcher.timer.isActive()
+        append_rows(ldb, ["notified"])
+        qtbot.waitUntil(lambda: ldb.check_term1_exists("notified"), timeout=5000)
+        watcher.stop()
+
+    def test_polling(self, get_database: GetDatabase, qtbot: QtBot) -> None:
+        ldb = get_database().get_local_database()
+        ldb.config.config["Watcher"]["PollInterval"] = "0.01"
+        watcher = DatabaseWatcher(ldb, ldb.config)
+        watcher.watcher.removePaths(watcher.watcher.files())
+        assert watcher.timer.isActive()
+        # NOTE: the watcher starts watching the files again on the next check
+        qtbot.waitUntil(lambda: len(watcher.watcher.files()) == 2, timeout=5000)
+        watcher.stop()
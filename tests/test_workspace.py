@@ -0,0 +1,63 @@
+from vocabuilder.local_database import LocalDatabase
+from vocabuilder.workspace import Workspace
+
+from .common import GetDatabase, PytestDataDict
+
+
+class TestWorkspace:
+    def test_get_database(
+        self, get_database: GetDatabase, test_data: PytestDataDict
+    ) -> None:
+        name = test_data["vocaname"]
+        ldb = get_database().get_local_database()
+        config = ldb.config
+        ldb.close()
+        LocalDatabase(config, "other").close()
+        workspace = Workspace(config)
+        assert workspace.get_names() == [name, "other"]
+        assert str(workspace.get_info("unknown")) == "unknown"
+        db1 = workspace.get_database(name)
+        db2 = workspace.get_database("other")
+        assert workspace.get_loaded_names() == [name, "other"]
+        assert workspace.get_database(name) is db1
+        assert workspace.get_loaded_names() == ["other", name]
+        active = config.get_config_dir() / LocalDatabase.active_voca_info_fn
+        assert active.read_text(encoding="utf-8") == name
+        assert workspace.memory_usage() > 0
+        workspace.close()
+        assert workspace.get_loaded_names() == []
+        infos = Workspace(config).list_vocabularies()
+        assert [info.terms for info in infos] == [40, 0]
+        assert str(infos[1]) == "other (0 terms, 0 due)"
+        assert not db2.lock.acquired
+
+    def test_memory_budget(
+        self, get_database: GetDatabase, test_data: PytestDataDict
+    ) -> None:
+        name = test_data["vocaname"]
+        ldb = get_database().get_local_database()
+        config = ldb.config
+        ldb.close()
+        LocalDatabase(config, "other").close()
+        config.config["Workspace"]["MemoryBudget"] = "0"
+        workspace = Workspace(config)
+        db1 = workspace.get_database(name)
+        assert workspace.get_loaded_names() == [name]
+        workspace.get_database("other")
+        # NOTE: the least recently used database is closed
+        assert workspace.get_loaded_names() == ["other"]
+        assert not db1.lock.acquired
+        info = workspace.get_info(name)
+        assert info.terms == 40
+        assert (info.size is not None) and (info.size > 0)
+        workspace.close()
+
+    def test_loaded_info(self, get_database: GetDatabase) -> None:
+        ldb = get_database().get_local_database()
+        workspace = Workspace(ldb.config)
+        workspace.add_database(ldb)
+        ldb.delete_item("apple")
+        # NOTE: the catalog is updated when the database is closed, but the info
+        #   for a loaded database is always up to date
+        assert workspace.get_info(ldb.get_voca_name()).terms == 39
+        workspace.close()